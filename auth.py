@@ -17,7 +17,7 @@ from datetime import datetime, timedelta
 from typing import Optional, Tuple
 import streamlit as st
 
-from config import DB_PATH
+from db import connect
 
 # Роли пользователей
 ROLES = {
@@ -33,6 +33,27 @@ ADMIN_ROLES = ["superadmin", "admin"]
 # Роли с доступом к отчетам
 REPORT_ROLES = ["manager", "analyst", "admin", "superadmin"]
 
+# Запросы входа и восстановления пароля (их планы проверяет migrations.index_advisor_report)
+AUTHENTICATE_SQL = """
+    SELECT id, username, password_hash, role, email, is_active
+    FROM users
+    WHERE username = ?
+"""
+UPDATE_LAST_LOGIN_SQL = """
+    UPDATE users
+    SET last_login = ?
+    WHERE id = ?
+"""
+DELETE_UNUSED_RESET_TOKENS_SQL = """
+    DELETE FROM password_reset_tokens
+    WHERE username = ? AND used = 0
+"""
+VERIFY_RESET_TOKEN_SQL = """
+    SELECT username, expires_at, used
+    FROM password_reset_tokens
+    WHERE token = ?
+"""
+
 
 def init_db():
     """Инициализация базы данных: создание всех таблиц (делегируется в db)."""
@@ -43,6 +64,14 @@ def init_db():
         except Exception:
             pass
     init_all_tables(_show)
+    # Фоновый перенос старых записей журнала действий в архив (один поток на процесс)
+    try:
+        from log_retention import schedule_log_retention
+
+        schedule_log_retention()
+    except Exception as e:
+        import logging
+        logging.getLogger(__name__).warning("Не удалось запустить перенос журнала в архив: %s", e)
 
 
 def hash_password(password: str) -> str:
@@ -64,7 +93,7 @@ def create_user(
 ) -> bool:
     """Создание нового пользователя"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
 
         password_hash = hash_password(password)
@@ -101,17 +130,10 @@ def create_user(
 
 def authenticate(username: str, password: str) -> Tuple[bool, Optional[dict]]:
     """Аутентификация пользователя"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     cursor = conn.cursor()
 
-    cursor.execute(
-        """
-        SELECT id, username, password_hash, role, email, is_active
-        FROM users
-        WHERE username = ?
-    """,
-        (username,),
-    )
+    cursor.execute(AUTHENTICATE_SQL, (username,))
 
     user = cursor.fetchone()
 
@@ -120,14 +142,7 @@ def authenticate(username: str, password: str) -> Tuple[bool, Optional[dict]]:
 
         if verify_password(password, password_hash):
             # Обновляем время последнего входа
-            cursor.execute(
-                """
-                UPDATE users
-                SET last_login = ?
-                WHERE id = ?
-            """,
-                (datetime.now(), user_id),
-            )
+            cursor.execute(UPDATE_LAST_LOGIN_SQL, (datetime.now(), user_id))
             conn.commit()
 
             conn.close()
@@ -153,7 +168,7 @@ def authenticate(username: str, password: str) -> Tuple[bool, Optional[dict]]:
 
 def get_user_by_username(username: str) -> Optional[dict]:
     """Получение пользователя по имени"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     cursor = conn.cursor()
 
     cursor.execute(
@@ -190,17 +205,11 @@ def generate_reset_token(username: str) -> Optional[str]:
         secrets.choice(string.ascii_letters + string.digits) for _ in range(32)
     )
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     cursor = conn.cursor()
 
     # Удаляем старые неиспользованные токены для этого пользователя
-    cursor.execute(
-        """
-        DELETE FROM password_reset_tokens
-        WHERE username = ? AND used = 0
-    """,
-        (username,),
-    )
+    cursor.execute(DELETE_UNUSED_RESET_TOKENS_SQL, (username,))
 
     # Создаем новый токен (действителен 1 час)
     expires_at = datetime.now() + timedelta(hours=1)
@@ -220,17 +229,10 @@ def generate_reset_token(username: str) -> Optional[str]:
 
 def verify_reset_token(token: str) -> Optional[str]:
     """Проверка токена восстановления пароля"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     cursor = conn.cursor()
 
-    cursor.execute(
-        """
-        SELECT username, expires_at, used
-        FROM password_reset_tokens
-        WHERE token = ?
-    """,
-        (token,),
-    )
+    cursor.execute(VERIFY_RESET_TOKEN_SQL, (token,))
 
     result = cursor.fetchone()
     conn.close()
@@ -251,7 +253,7 @@ def reset_password(token: str, new_password: str) -> bool:
     if not username:
         return False
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     cursor = conn.cursor()
 
     # Обновляем пароль
@@ -332,7 +334,7 @@ def change_password(
     Returns:
         Tuple[bool, str]: (успех, сообщение)
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     cursor = conn.cursor()
 
     # Проверяем текущий пароль
@@ -382,7 +384,7 @@ def update_user_email(username: str, new_email: Optional[str]) -> Tuple[bool, st
     Returns:
         Tuple[bool, str]: (успех, сообщение)
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     cursor = conn.cursor()
 
     # Проверяем существование пользователя
@@ -758,43 +760,41 @@ def render_sidebar_menu(current_page: str = "reports"):
             if loaded_files_info:
                 st.markdown("### 📊 Загруженные файлы")
 
-                project_data = st.session_state.get("project_data")
-                if project_data is not None:
-                    total_rows = len(project_data)
+                # Счёт строк по файлам — без склейки данных сессии
+                project_files = [
+                    f
+                    for f, info in loaded_files_info.items()
+                    if info["type"] == "project"
+                ]
+                if project_files:
+                    total_rows = sum(loaded_files_info[f]["rows"] for f in project_files)
                     st.success(f"✅ Проекты: {total_rows} строк")
-                    project_files = [
-                        f
-                        for f, info in loaded_files_info.items()
-                        if info["type"] == "project"
-                    ]
                     for file_name in project_files:
                         st.caption(
                             f"  • {file_name} ({loaded_files_info[file_name]['rows']} строк)"
                         )
 
-                resources_data = st.session_state.get("resources_data")
-                if resources_data is not None:
-                    total_rows = len(resources_data)
+                resources_files = [
+                    f
+                    for f, info in loaded_files_info.items()
+                    if info["type"] == "resources"
+                ]
+                if resources_files:
+                    total_rows = sum(loaded_files_info[f]["rows"] for f in resources_files)
                     st.success(f"✅ Ресурсы: {total_rows} строк")
-                    resources_files = [
-                        f
-                        for f, info in loaded_files_info.items()
-                        if info["type"] == "resources"
-                    ]
                     for file_name in resources_files:
                         st.caption(
                             f"  • {file_name} ({loaded_files_info[file_name]['rows']} строк)"
                         )
 
-                technique_data = st.session_state.get("technique_data")
-                if technique_data is not None:
-                    total_rows = len(technique_data)
+                technique_files = [
+                    f
+                    for f, info in loaded_files_info.items()
+                    if info["type"] == "technique"
+                ]
+                if technique_files:
+                    total_rows = sum(loaded_files_info[f]["rows"] for f in technique_files)
                     st.success(f"✅ Техника: {total_rows} строк")
-                    technique_files = [
-                        f
-                        for f, info in loaded_files_info.items()
-                        if info["type"] == "technique"
-                    ]
                     for file_name in technique_files:
                         st.caption(
                             f"  • {file_name} ({loaded_files_info[file_name]['rows']} строк)"
@@ -0,0 +1,265 @@
+"""
+Справочник правил распределения бюджета этапа по месяцам (утвержденный и прогнозный бюджет).
+
+Правило задаёт доли месяцев этапа длиной n месяцев (сумма долей — 1). Встроенные правила
+объявлены в BUILTIN_BUDGET_RULES, пользовательские хранятся в параметре отчёта
+"Утвержденный бюджет" / budget_rules (report_params) и добавляются через register_budget_rule.
+Доли для всех длин этапов считаются одной таблицей на правило, поэтому правило применяется
+ко всем группам сразу (budget_rule_percents), а сравнение нескольких правил не требует
+повторного расчёта сумм по месяцам.
+"""
+import json
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Отчёт и ключ параметра, в котором хранятся пользовательские правила
+BUDGET_RULES_REPORT = "Утвержденный бюджет"
+BUDGET_RULES_PARAM = "budget_rules"
+
+# Виды правил
+RULE_FIRST_MIDDLE_LAST = "first_middle_last"  # доли первого / промежуточных / последнего месяца
+RULE_LINEAR = "linear"  # равномерно
+RULE_FRONT_LOADED = "front_loaded"  # линейно убывающие доли
+RULE_S_CURVE = "s_curve"  # накопленный бюджет по S-кривой (косинусной)
+RULE_WEIGHTS = "weights"  # произвольный вектор весов, растягивается на длину этапа
+
+RULE_KINDS = {
+    RULE_FIRST_MIDDLE_LAST: "Первый / промежуточные / последний месяц",
+    RULE_LINEAR: "Равномерно",
+    RULE_FRONT_LOADED: "С упором на начало",
+    RULE_S_CURVE: "S-кривая",
+    RULE_WEIGHTS: "Вектор весов",
+}
+
+BUILTIN_BUDGET_RULES: Dict[str, Dict] = {
+    "default": {
+        "name": "50 / 45 / 5",
+        "kind": RULE_FIRST_MIDDLE_LAST,
+        "first_month_percent": 0.50,  # 50% на первый месяц
+        "middle_months_percent": 0.45,  # 45% на промежуточные месяцы
+        "last_month_percent": 0.05,  # 5% на последний месяц
+        "description": "50% - первый месяц, 45% - равномерно по промежуточным месяцам, 5% - последний месяц",
+    },
+    "linear": {
+        "name": "Равномерно",
+        "kind": RULE_LINEAR,
+        "description": "Бюджет этапа делится поровну между всеми месяцами",
+    },
+    "front_loaded": {
+        "name": "С упором на начало",
+        "kind": RULE_FRONT_LOADED,
+        "description": "Доли месяцев линейно убывают от первого месяца к последнему",
+    },
+    "s_curve": {
+        "name": "S-кривая",
+        "kind": RULE_S_CURVE,
+        "description": "Медленный старт, пик освоения в середине этапа, медленное завершение",
+    },
+}
+
+_log = logging.getLogger(__name__)
+
+
+def _validate_rule(rule: Dict) -> Optional[str]:
+    """Текст ошибки, если правило задано некорректно, иначе None."""
+    kind = rule.get("kind")
+    if kind not in RULE_KINDS:
+        return f"неизвестный вид правила: {kind}"
+    if kind == RULE_FIRST_MIDDLE_LAST:
+        try:
+            parts = [
+                float(rule[key])
+                for key in ("first_month_percent", "middle_months_percent", "last_month_percent")
+            ]
+        except (KeyError, TypeError, ValueError):
+            return "нужны доли first_month_percent, middle_months_percent, last_month_percent"
+        if min(parts) < 0 or abs(sum(parts) - 1.0) > 1e-6:
+            return "доли должны быть неотрицательными и в сумме давать 1"
+    if kind == RULE_WEIGHTS:
+        try:
+            weights = [float(w) for w in rule.get("weights") or []]
+        except (TypeError, ValueError):
+            return "веса должны быть числами"
+        if not weights or min(weights) < 0 or sum(weights) <= 0:
+            return "нужен непустой вектор неотрицательных весов с положительной суммой"
+    return None
+
+
+def _load_custom_rules() -> Dict[str, Dict]:
+    """Пользовательские правила из report_params (некорректные пропускаются)."""
+    try:
+        from utils import get_report_param_value
+
+        stored = get_report_param_value(BUDGET_RULES_REPORT, BUDGET_RULES_PARAM, None)
+    except Exception as e:
+        _log.warning("Не удалось прочитать правила распределения бюджета: %s", e)
+        return {}
+    if isinstance(stored, str):
+        try:
+            stored = json.loads(stored)
+        except ValueError:
+            stored = None
+    if not isinstance(stored, dict):
+        return {}
+    rules = {}
+    for key, rule in stored.items():
+        if not isinstance(rule, dict) or key in BUILTIN_BUDGET_RULES:
+            continue
+        error = _validate_rule(rule)
+        if error:
+            _log.warning("Правило распределения бюджета %s пропущено: %s", key, error)
+            continue
+        rules[str(key)] = rule
+    return rules
+
+
+def _save_custom_rules(rules: Dict[str, Dict], updated_by: Optional[str]) -> Optional[str]:
+    """Сохраняет пользовательские правила в report_params. Возвращает текст ошибки или None."""
+    try:
+        from report_params import set_report_parameter
+    except ImportError:
+        return "Модуль параметров отчётов недоступен"
+    ok = set_report_parameter(
+        BUDGET_RULES_REPORT,
+        BUDGET_RULES_PARAM,
+        rules,
+        parameter_type="json",
+        description="Пользовательские правила распределения бюджета по месяцам",
+        is_editable=False,
+        updated_by=updated_by,
+    )
+    return None if ok else "Не удалось сохранить правила распределения бюджета"
+
+
+def get_budget_rules() -> Dict[str, Dict]:
+    """Все доступные правила: встроенные и пользовательские (ключ -> описание правила)."""
+    rules = dict(BUILTIN_BUDGET_RULES)
+    rules.update(_load_custom_rules())
+    return rules
+
+
+def register_budget_rule(key: str, rule: Dict, updated_by: Optional[str] = None) -> Optional[str]:
+    """
+    Добавляет или заменяет пользовательское правило в report_params.
+    Возвращает текст ошибки или None при успехе. Встроенные правила заменить нельзя.
+    """
+    if key in BUILTIN_BUDGET_RULES:
+        return f"Правило {key} встроенное и не может быть изменено"
+    error = _validate_rule(rule)
+    if error:
+        return f"Некорректное правило {key}: {error}"
+    if rule["kind"] == RULE_WEIGHTS:
+        # Веса из формы приходят строками — храним числами
+        rule = dict(rule, weights=[float(w) for w in rule["weights"]])
+    rules = _load_custom_rules()
+    rules[key] = rule
+    return _save_custom_rules(rules, updated_by)
+
+
+def delete_budget_rule(key: str, updated_by: Optional[str] = None) -> Optional[str]:
+    """Удаляет пользовательское правило. Возвращает текст ошибки или None."""
+    rules = _load_custom_rules()
+    if key not in rules:
+        return f"Пользовательское правило {key} не найдено"
+    del rules[key]
+    return _save_custom_rules(rules, updated_by)
+
+
+def rule_label(key: str, rule: Dict) -> str:
+    """Подпись правила для выбора в интерфейсе."""
+    return str(rule.get("name") or key)
+
+
+def _rule_signature(rule: Dict) -> Tuple:
+    """Хешируемое представление правила (ключ таблиц долей)."""
+    kind = rule["kind"]
+    if kind == RULE_FIRST_MIDDLE_LAST:
+        return (
+            kind,
+            float(rule["first_month_percent"]),
+            float(rule["middle_months_percent"]),
+            float(rule["last_month_percent"]),
+        )
+    if kind == RULE_WEIGHTS:
+        return (kind, tuple(float(w) for w in rule["weights"]))
+    return (kind,)
+
+
+def _cumulative_weights(cumulative: np.ndarray) -> np.ndarray:
+    """Доли месяцев из накопленной кривой 0..1 в границах месяцев."""
+    weights = np.diff(cumulative)
+    return weights / weights.sum()
+
+
+def _weights_for_length(signature: Tuple, n: int) -> np.ndarray:
+    """Доли месяцев этапа длиной n месяцев."""
+    kind = signature[0]
+    if n == 1:
+        return np.ones(1)
+    if kind == RULE_FIRST_MIDDLE_LAST:
+        first, middle, last = signature[1:]
+        if n == 2:
+            # Промежуточных месяцев нет — их доля уходит в последний месяц
+            return np.array([first, middle + last], dtype=float)
+        weights = np.full(n, middle / (n - 2), dtype=float)
+        weights[0] = first
+        weights[-1] = last
+        return weights
+    if kind == RULE_LINEAR:
+        return np.full(n, 1.0 / n)
+    if kind == RULE_FRONT_LOADED:
+        return _cumulative_weights(np.concatenate(([0.0], np.cumsum(np.arange(n, 0, -1.0)))))
+    edges = np.linspace(0.0, 1.0, n + 1)
+    if kind == RULE_S_CURVE:
+        return _cumulative_weights((1.0 - np.cos(np.pi * edges)) / 2.0)
+    # RULE_WEIGHTS: вектор весов как накопленная кривая, растянутая на n месяцев
+    source = np.asarray(signature[1], dtype=float)
+    source_edges = np.linspace(0.0, 1.0, len(source) + 1)
+    source_cumulative = np.concatenate(([0.0], np.cumsum(source) / source.sum()))
+    return _cumulative_weights(np.interp(edges, source_edges, source_cumulative))
+
+
+@lru_cache(maxsize=256)
+def _weight_table(signature: Tuple, max_length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Доли для всех длин этапа 1..max_length одним плоским массивом:
+    доля месяца position этапа длиной n — table[starts[n] + position].
+    """
+    lengths = np.arange(max_length + 1)
+    starts = np.cumsum(lengths) - lengths
+    table = np.concatenate(
+        [np.zeros(0)] + [_weights_for_length(signature, n) for n in range(1, max_length + 1)]
+    )
+    table.setflags(write=False)
+    starts.setflags(write=False)
+    return table, starts
+
+
+def budget_rule_percents(rule: Dict, positions: np.ndarray, num_months: np.ndarray) -> np.ndarray:
+    """
+    Доли месяцев по правилу для всех ячеек (группа, месяц) сразу.
+
+    Args:
+        rule: описание правила (см. BUILTIN_BUDGET_RULES)
+        positions: номер месяца внутри этапа (с 0)
+        num_months: длина этапа группы в месяцах
+    """
+    if len(num_months) == 0:
+        return np.zeros(0)
+    max_length = int(num_months.max())
+    # Таблица на степень двойки — меньше разных ключей кэша
+    table, starts = _weight_table(_rule_signature(rule), 1 << (max_length - 1).bit_length())
+    return table[starts[num_months] + positions]
+
+
+def resolve_rule_names(rule_names: Sequence[str], rules: Optional[Dict[str, Dict]] = None) -> List[str]:
+    """Известные ключи правил из rule_names без повторов; пустой результат — ["default"]."""
+    rules = get_budget_rules() if rules is None else rules
+    result = []
+    for name in rule_names:
+        if name in rules and name not in result:
+            result.append(name)
+    return result or ["default"]
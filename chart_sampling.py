@@ -0,0 +1,288 @@
+"""
+Режим больших данных для графиков Plotly: прореживание точек на сервере и WebGL.
+
+Линии и точки (scatter) с числом точек больше CHART_WEBGL_POINTS переводятся в scattergl,
+больше CHART_MAX_POINTS — прореживаются алгоритмом LTTB (Largest-Triangle-Three-Buckets),
+который сохраняет форму ряда. Для столбцов WebGL-варианта нет, поэтому при числе столбцов
+больше CHART_MAX_BARS остаются категории с минимумом и максимумом (по всем столбчатым рядам)
+в каждой группе соседних категорий (пики не теряются); все столбчатые ряды графика сохраняют
+одни и те же категории.
+Прореженный график помечается подписью «показано N из M». Применяется к графикам,
+построенным через dashboard_cache.cached_figure.
+"""
+import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from config import CHART_MAX_BARS, CHART_MAX_POINTS, CHART_WEBGL_POINTS
+
+# Вложенные свойства ряда, в которых могут быть массивы по точкам
+_NESTED_POINT_PROPS = ("marker", "textfont", "error_x", "error_y", "hoverlabel")
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Индексы threshold точек ряда по алгоритму LTTB (первая и последняя точки сохраняются).
+    x должен возрастать; точки с NaN пропускаются.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    finite = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    n = len(finite)
+    if threshold >= n or threshold < 3:
+        return finite
+    x = x[finite]
+    y = y[finite]
+    # threshold - 2 групп между первой и последней точкой
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    result = np.empty(threshold, dtype=np.int64)
+    result[0] = 0
+    result[-1] = n - 1
+    selected = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[end : edges[i + 2]].mean()
+            next_y = y[end : edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Площадь треугольника (выбранная точка, кандидат, среднее следующей группы)
+        area = np.abs(
+            (x[selected] - next_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (next_y - y[selected])
+        )
+        selected = start + int(np.argmax(area))
+        result[i + 1] = selected
+    return finite[result]
+
+
+def minmax_indices(
+    values: np.ndarray, threshold: int, highs: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Индексы не более threshold значений: минимум и максимум в каждой из threshold // 2
+    групп соседних значений (в исходном порядке). highs — отдельные значения для выбора
+    максимумов (по умолчанию values).
+    """
+    values = np.nan_to_num(np.asarray(values, dtype=float))
+    n = len(values)
+    if threshold >= n:
+        return np.arange(n)
+    buckets = max(1, threshold // 2)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    bucket_ids = np.repeat(np.arange(buckets), np.diff(edges))
+    # Внутри группы — по возрастанию значения: первый элемент — минимум, последний — максимум
+    order = np.lexsort((values, bucket_ids))
+    if highs is None:
+        high_order = order
+    else:
+        high_order = np.lexsort((np.nan_to_num(np.asarray(highs, dtype=float)), bucket_ids))
+    counts = np.diff(edges)
+    firsts = order[edges[:-1][counts > 0]]
+    lasts = high_order[edges[1:][counts > 0] - 1]
+    return np.unique(np.concatenate((firsts, lasts)))
+
+
+def _numeric_axis(values) -> np.ndarray:
+    """Значения оси как числа: даты — в наносекундах, категории — номер позиции."""
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iufb":
+        return arr.astype(float)
+    if arr.dtype.kind == "M":
+        return arr.astype("datetime64[ns]").astype(np.int64).astype(float)
+    if len(arr) and isinstance(arr[0], (datetime.date, pd.Timestamp)):
+        try:
+            dates = pd.to_datetime(pd.Series(arr)).to_numpy("datetime64[ns]")
+            return dates.astype(np.int64).astype(float)
+        except (TypeError, ValueError):
+            pass
+    try:
+        return pd.to_numeric(pd.Series(arr)).to_numpy(dtype=float)
+    except (TypeError, ValueError):
+        return np.arange(len(arr), dtype=float)
+
+
+def _take(value, indices: np.ndarray):
+    """Подмножество массива по точкам (numpy — срезом, списки — поэлементно)."""
+    if isinstance(value, np.ndarray):
+        return value[indices]
+    return [value[i] for i in indices]
+
+
+def _subset_points(props: Dict, n: int, indices: np.ndarray) -> Dict:
+    """Копия свойств ряда, в которой все массивы длины n оставлены только для indices."""
+    result = {}
+    for key, value in props.items():
+        if isinstance(value, (list, tuple, np.ndarray)) and len(value) == n:
+            result[key] = _take(value, indices)
+        elif key in _NESTED_POINT_PROPS and isinstance(value, dict):
+            result[key] = _subset_points(value, n, indices)
+        else:
+            result[key] = value
+    return result
+
+
+def _trace_length(trace) -> int:
+    """Число точек ряда (по самой длинной из осей x / y); 0 — у ряда нет осей (pie)."""
+    axes = (getattr(trace, "x", None), getattr(trace, "y", None))
+    return max((len(v) for v in axes if v is not None and not isinstance(v, str)), default=0)
+
+
+def _trace_props(trace, n: int) -> Dict:
+    """Свойства ряда без type; отсутствующая ось заполняется позициями 0..n-1."""
+    props = trace.to_plotly_json()
+    props.pop("type", None)
+    for axis in ("x", "y"):
+        if props.get(axis) is None:
+            props[axis] = np.arange(n)
+    return props
+
+
+def _sample_scatter(trace, n: int, max_points: int, webgl_points: int):
+    """
+    Ряд scatter / scattergl: WebGL при n > webgl_points, LTTB при n > max_points.
+    None — без изменений (в том числе накопительные области stackgroup).
+    """
+    if n <= webgl_points or (trace.type == "scatter" and trace.stackgroup):
+        return None
+    props = _trace_props(trace, n)
+    if n > max_points:
+        indices = lttb_indices(_numeric_axis(props["x"]), _numeric_axis(props["y"]), max_points)
+        props = _subset_points(props, n, indices)
+    gl_props = {k: v for k, v in props.items() if k in go.Scattergl()._valid_props}
+    try:
+        return go.Scattergl(gl_props)
+    except ValueError:
+        # Свойства, которых нет у scattergl (например, сглаженная линия), — остаёмся на SVG
+        return go.Scatter(props)
+
+
+def _bar_values(trace, props: Dict) -> np.ndarray:
+    """Величина столбцов: длина (с учётом base) вдоль оси значений."""
+    value_axis = "x" if trace.orientation == "h" else "y"
+    values = _numeric_axis(props[value_axis])
+    if props.get("base") is not None and not np.isscalar(props["base"]):
+        values = values - _numeric_axis(props["base"])
+    return values
+
+
+def _sample_bars(traces: List, lengths: List[int], max_bars: int) -> Optional[Tuple]:
+    """
+    Прореживание столбчатых рядов по общим категориям: категории всех рядов объединяются
+    (в порядке появления), для каждой берутся наименьшее и наибольшее значение по всем рядам,
+    и в группах соседних категорий остаются категории с минимумом и максимумом. Все ряды
+    оставляют одни и те же категории.
+    Возвращает (новые ряды, ось категорий, показанные категории, всего категорий) или None.
+    """
+    if not traces or max(lengths) <= max_bars:
+        return None
+    main = int(np.argmax(lengths))
+    position_axis = "y" if traces[main].orientation == "h" else "x"
+    all_props = []
+    all_positions = []
+    all_values = []
+    for trace, n in zip(traces, lengths):
+        props = _trace_props(trace, n)
+        positions = list(props["y" if trace.orientation == "h" else "x"])
+        all_props.append((props, positions))
+        all_positions.extend(positions)
+        all_values.append(_bar_values(trace, props))
+    # Номер категории в порядке первого появления (исходные объекты категорий сохраняются)
+    codes, categories = pd.factorize(
+        np.array(all_positions, dtype=object), use_na_sentinel=False
+    )
+    if len(categories) <= max_bars:
+        return None
+    values = np.concatenate(all_values)
+    lows = np.full(len(categories), np.nan)
+    highs = np.full(len(categories), np.nan)
+    np.fmin.at(lows, codes, values)
+    np.fmax.at(highs, codes, values)
+    indices = minmax_indices(lows, max_bars, highs=highs)
+    kept = {categories[i] for i in indices}
+    sampled = []
+    for trace, n, (props, positions) in zip(traces, lengths, all_props):
+        trace_indices = np.array(
+            [j for j, position in enumerate(positions) if position in kept], dtype=np.int64
+        )
+        sampled.append(type(trace)(_subset_points(props, n, trace_indices)))
+    return sampled, position_axis + "axis", kept, len(categories)
+
+
+def _filter_category_axis(fig: go.Figure, axis_name: str, kept: Set, total: int) -> None:
+    """
+    Оставляет в заданном порядке категорий оси и в подписях к столбцам (annotations по
+    данным оси) только показанные категории. Для горизонтальных столбцов (категории по оси Y)
+    высота уменьшается пропорционально числу категорий.
+    """
+    axis = fig.layout[axis_name]
+    if axis.categoryarray is not None:
+        axis.categoryarray = [c for c in axis.categoryarray if c in kept]
+    ref = axis_name[0]
+    if fig.layout.annotations:
+        fig.layout.annotations = [
+            a for a in fig.layout.annotations if (a[ref + "ref"] or ref) != ref or a[ref] in kept
+        ]
+    if axis_name == "yaxis" and fig.layout.height and total:
+        fig.layout.height = max(450, int(fig.layout.height * len(kept) / total))
+
+
+def downsample_figure(
+    fig: go.Figure,
+    max_points: int = CHART_MAX_POINTS,
+    max_bars: int = CHART_MAX_BARS,
+    webgl_points: int = CHART_WEBGL_POINTS,
+) -> go.Figure:
+    """
+    Режим больших данных: возвращает fig без изменений, если все ряды небольшие,
+    иначе новый график с рядами WebGL / прореженными рядами и подписью о прореживании.
+    """
+    lengths = [_trace_length(trace) for trace in fig.data]
+    if max(lengths, default=0) <= min(webgl_points, max_points, max_bars):
+        return fig
+
+    traces = list(fig.data)
+    total_points = sum(lengths)
+    webgl = False
+    for i, trace in enumerate(fig.data):
+        if trace.type in ("scatter", "scattergl"):
+            sampled = _sample_scatter(trace, lengths[i], max_points, webgl_points)
+            if sampled is not None:
+                traces[i] = sampled
+                webgl = webgl or sampled.type == "scattergl"
+
+    bar_numbers = [i for i, trace in enumerate(fig.data) if trace.type == "bar"]
+    bars = _sample_bars(
+        [fig.data[i] for i in bar_numbers], [lengths[i] for i in bar_numbers], max_bars
+    )
+    if bars is not None:
+        for i, sampled in zip(bar_numbers, bars[0]):
+            traces[i] = sampled
+
+    if all(new is old for new, old in zip(traces, fig.data)):
+        return fig
+
+    result = go.Figure(data=traces, layout=fig.layout)
+    if bars is not None:
+        _filter_category_axis(result, *bars[1:])
+    shown_points = sum(_trace_length(trace) for trace in result.data)
+    if shown_points < total_points or webgl:
+        note = f"Большой объём данных: показано {shown_points:,} из {total_points:,} точек"
+        note = note.replace(",", " ")
+        if webgl:
+            note += " (WebGL)"
+        result.add_annotation(
+            text=note,
+            xref="paper",
+            yref="paper",
+            x=0,
+            y=1,
+            xanchor="left",
+            yanchor="bottom",
+            showarrow=False,
+            font=dict(size=11, color="#F1C40F"),
+        )
+    return result
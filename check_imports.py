@@ -65,12 +65,15 @@ for module_name in own_modules:
 
 print()
 
-# Проверка загрузки дашбордов (dashboards._renderers)
+# Проверка загрузки дашбордов (все модули dashboards.*, с временем импорта)
 try:
     print("✓ Загрузка дашбордов (get_dashboards)...", end=" ")
-    from dashboards import get_dashboards
+    from dashboards import get_dashboards, load_all_dashboards
     dashboards = get_dashboards()
+    import_times = load_all_dashboards()
     print(f"OK ({len(dashboards)} дашбордов)")
+    for module_name, seconds in import_times.items():
+        print(f"    {module_name}: {seconds:.3f} с")
 except Exception as e:
     print(f"ОШИБКА: {e}")
     errors.append(f"dashboards/get_dashboards: {e}")
@@ -24,3 +24,85 @@ RUSSIAN_MONTHS: Dict[int, str] = {
     11: "Ноябрь",
     12: "Декабрь",
 }
+
+# Кэш разобранных файлов (data_loader): общий для всех сессий процесса
+PARSED_DATA_CACHE_MAX_BYTES: int = int(
+    os.environ.get("PARSED_DATA_CACHE_MAX_BYTES", 1024 * 1024 * 1024)
+)
+PARSED_DATA_CACHE_MAX_ENTRIES: int = int(
+    os.environ.get("PARSED_DATA_CACHE_MAX_ENTRIES", 32)
+)
+
+# Колоночные снимки нормализованных данных (data_snapshot): рядом с users.db
+SNAPSHOT_DIR: str = os.environ.get("SNAPSHOT_DIR", os.path.join(BASE_DIR, "data_snapshots"))
+SNAPSHOT_MAX_BYTES: int = int(os.environ.get("SNAPSHOT_MAX_BYTES", 5 * 1024 * 1024 * 1024))
+
+# Потоковая загрузка больших CSV (data_loader): порог размера файла и размер части в строках
+CHUNKED_INGEST_MIN_BYTES: int = int(os.environ.get("CHUNKED_INGEST_MIN_BYTES", 100 * 1024 * 1024))
+CHUNKED_INGEST_ROWS: int = int(os.environ.get("CHUNKED_INGEST_ROWS", 200_000))
+
+# Параллельный разбор нескольких загруженных файлов (data_loader.load_files)
+PARALLEL_LOAD_WORKERS: int = int(os.environ.get("PARALLEL_LOAD_WORKERS", min(8, os.cpu_count() or 1)))
+
+# Индексы фильтров дашбордов (filter_engine): сколько наборов данных держать в памяти
+FILTER_INDEX_CACHE_MAX_ENTRIES: int = int(os.environ.get("FILTER_INDEX_CACHE_MAX_ENTRIES", 16))
+FILTER_INDEX_CACHE_MAX_BYTES: int = int(
+    os.environ.get("FILTER_INDEX_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+)
+# Битовых карт значений на одну колонку (самые давно использованные вытесняются)
+FILTER_BITMAPS_PER_COLUMN: int = int(os.environ.get("FILTER_BITMAPS_PER_COLUMN", 256))
+
+# Кэш подготовленных данных дашбордов (dashboard_cache): общий для всех сессий
+DASHBOARD_CACHE_MAX_BYTES: int = int(
+    os.environ.get("DASHBOARD_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+)
+DASHBOARD_CACHE_MAX_ENTRIES: int = int(os.environ.get("DASHBOARD_CACHE_MAX_ENTRIES", 256))
+
+# Прогнозный бюджет: строк задач на одной странице формы редактирования
+FORECAST_EDIT_PAGE_ROWS: int = int(os.environ.get("FORECAST_EDIT_PAGE_ROWS", 50))
+
+# Кэш готовых графиков Plotly (dashboard_cache.cached_figure): общий для всех сессий
+FIGURE_CACHE_MAX_BYTES: int = int(os.environ.get("FIGURE_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+FIGURE_CACHE_MAX_ENTRIES: int = int(os.environ.get("FIGURE_CACHE_MAX_ENTRIES", 512))
+
+# Режим больших данных графиков (chart_sampling): линии/точки с числом точек больше порога
+# рисуются через WebGL, больше максимума — прореживаются (LTTB); столбцы — по минимуму/максимуму
+CHART_WEBGL_POINTS: int = int(os.environ.get("CHART_WEBGL_POINTS", 1000))
+CHART_MAX_POINTS: int = int(os.environ.get("CHART_MAX_POINTS", 2000))
+CHART_MAX_BARS: int = int(os.environ.get("CHART_MAX_BARS", 300))
+
+# Таблицы HTML (utils.paginate_table): строк на одной странице
+TABLE_PAGE_ROWS: int = int(os.environ.get("TABLE_PAGE_ROWS", 200))
+
+# SQLite (db.connect): пул соединений, WAL и параметры соединения
+DB_POOL_SIZE: int = int(os.environ.get("DB_POOL_SIZE", 32))  # свободных соединений в пуле
+DB_BUSY_TIMEOUT_MS: int = int(os.environ.get("DB_BUSY_TIMEOUT_MS", 5000))
+DB_CACHE_SIZE_KB: int = int(os.environ.get("DB_CACHE_SIZE_KB", 8 * 1024))  # кэш страниц соединения
+DB_MMAP_SIZE: int = int(os.environ.get("DB_MMAP_SIZE", 64 * 1024 * 1024))
+DB_STATEMENT_CACHE: int = int(os.environ.get("DB_STATEMENT_CACHE", 128))  # подготовленных запросов
+
+# Журнал действий пользователей (logger): фоновая запись пачками
+LOG_QUEUE_MAX_SIZE: int = int(os.environ.get("LOG_QUEUE_MAX_SIZE", 10000))  # событий в очереди
+LOG_BATCH_SIZE: int = int(os.environ.get("LOG_BATCH_SIZE", 500))  # строк в одной транзакции
+LOG_FLUSH_INTERVAL_MS: int = int(os.environ.get("LOG_FLUSH_INTERVAL_MS", 500))
+# Сколько ждать места в переполненной очереди, прежде чем отбросить событие
+LOG_ENQUEUE_TIMEOUT_MS: int = int(os.environ.get("LOG_ENQUEUE_TIMEOUT_MS", 50))
+# Полный пересчёт количества записей журнала (logger.get_logs_count) не чаще, с
+LOG_COUNT_RECOUNT_SECONDS: int = int(os.environ.get("LOG_COUNT_RECOUNT_SECONDS", 600))
+
+# Хранение журнала действий (log_retention): записи старше срока переносятся из users.db
+# в помесячные архивные БД в LOG_ARCHIVE_DIR
+LOG_ARCHIVE_DIR: str = os.environ.get("LOG_ARCHIVE_DIR", os.path.join(BASE_DIR, "log_archive"))
+LOG_RETENTION_DAYS: int = int(os.environ.get("LOG_RETENTION_DAYS", 90))
+# Срок для отдельных действий: "login=30,view_report=14"
+LOG_RETENTION_DAYS_BY_ACTION: Dict[str, int] = {
+    action.strip(): int(days)
+    for action, _, days in (
+        item.partition("=") for item in os.environ.get("LOG_RETENTION_DAYS_BY_ACTION", "").split(",")
+    )
+    if action.strip() and days.strip()
+}
+# Сколько месяцев хранить архивные БД (0 — бессрочно)
+LOG_ARCHIVE_KEEP_MONTHS: int = int(os.environ.get("LOG_ARCHIVE_KEEP_MONTHS", 0))
+LOG_RETENTION_INTERVAL_HOURS: int = int(os.environ.get("LOG_RETENTION_INTERVAL_HOURS", 24))
+LOG_RETENTION_BATCH_ROWS: int = int(os.environ.get("LOG_RETENTION_BATCH_ROWS", 5000))
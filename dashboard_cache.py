@@ -0,0 +1,81 @@
+"""
+Кэш подготовленных данных дашбордов: агрегаты, посчитанные по набору данных и значениям
+фильтров. Streamlit перезапускает весь дашборд при любом изменении виджета; переключатели,
+которые влияют только на отображение (скрыть отклонение, вид графика), в ключ не входят,
+поэтому агрегат берётся из кэша. Кэш общий для всех сессий и ограничен по объёму.
+Возвращаемые значения общие — вызывающий код не должен их изменять (только .copy()).
+
+Отдельно кэшируются готовые графики Plotly (cached_figure): построение фигуры через
+plotly.express и apply_chart_background дороже подготовки агрегата, а при переключении
+вкладок и фильтров одни и те же графики строятся заново. Перед кэшированием к графику
+применяется режим больших данных (chart_sampling.downsample_figure).
+"""
+from typing import Callable, Hashable, Tuple, TypeVar
+
+import pandas as pd
+
+from chart_sampling import downsample_figure
+from config import (
+    DASHBOARD_CACHE_MAX_BYTES,
+    DASHBOARD_CACHE_MAX_ENTRIES,
+    FIGURE_CACHE_MAX_BYTES,
+    FIGURE_CACHE_MAX_ENTRIES,
+)
+from data_cache import ByteLRUCache, frame_fingerprint
+from utils import CHART_THEME
+
+T = TypeVar("T")
+
+_computations = ByteLRUCache(DASHBOARD_CACHE_MAX_BYTES, max_entries=DASHBOARD_CACHE_MAX_ENTRIES)
+_figures = ByteLRUCache(FIGURE_CACHE_MAX_BYTES, max_entries=FIGURE_CACHE_MAX_ENTRIES)
+
+
+def cached_computation(
+    name: str, df: pd.DataFrame, params: Tuple[Hashable, ...], compute: Callable[[], T]
+) -> T:
+    """
+    Результат compute() для (name, отпечаток df, params); при повторном вызове с теми же
+    данными и параметрами — из кэша. compute не должен возвращать None.
+    """
+    key = (name, frame_fingerprint(df), params)
+    result = _computations.get(key)
+    if result is None:
+        result = compute()
+        _computations.put(key, result)
+    return result
+
+
+def cached_figure(
+    name: str,
+    data: pd.DataFrame,
+    params: Tuple[Hashable, ...],
+    build: Callable[[], T],
+    theme: str = CHART_THEME,
+) -> T:
+    """
+    Готовый график (после apply_chart_background) для (name, данные графика, params, theme).
+
+    data — агрегат, по которому строится график; хешируется целиком, поэтому ключ точно
+    соответствует точкам графика. В params — всё остальное, что влияет на фигуру (подписи,
+    переключатели). build() строит фигуру; она общая для сессий и не должна изменяться
+    после получения (st.plotly_chart её только сериализует). Большие ряды прореживаются
+    и переводятся в WebGL (chart_sampling), поэтому объём графика в браузере ограничен.
+    """
+    key = (name, frame_fingerprint(data, sample_rows=None), params, theme)
+    figure = _figures.get(key)
+    if figure is None:
+        figure = downsample_figure(build())
+        # Объём — по размеру JSON-спецификации, которую Streamlit отправляет в браузер
+        _figures.put(key, figure, nbytes=len(figure.to_json()))
+    return figure
+
+
+def get_dashboard_cache_stats():
+    """Статистика кэшей подготовленных данных и графиков дашбордов."""
+    return {"computations": _computations.stats(), "figures": _figures.stats()}
+
+
+def clear_dashboard_cache() -> None:
+    """Очищает кэши подготовленных данных и графиков дашбордов."""
+    _computations.clear()
+    _figures.clear()
@@ -1,8 +1,16 @@
 """
 Регистр дашбордов: имя отчёта -> функция отрисовки.
-Функции отрисовки импортируются из dashboards._renderers.
+Функции отрисовки разложены по модулям семейств дашбордов (dashboards.deviations,
+dashboards.budget и т.д.) и импортируются лениво: модуль загружается при первой
+отрисовке одного из его отчётов, время импорта каждого модуля сохраняется.
 """
-from typing import Callable, Dict, List, Tuple
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
 
 # Список отчётов по категориям (3 категории: причины+отклонения от плана, финансы, прочее)
 REPORT_CATEGORIES: List[Tuple[str, List[str]]] = [
@@ -34,94 +42,123 @@ REPORT_CATEGORIES: List[Tuple[str, List[str]]] = [
     ),
 ]
 
+# Имя отчёта -> (модуль семейства, функция отрисовки)
+DASHBOARD_RENDERERS: Dict[str, Tuple[str, str]] = {
+    "Динамика отклонений": ("dashboards.deviations", "dashboard_deviations_combined"),
+    "Динамика отклонений по месяцам": ("dashboards.deviations", "dashboard_deviations_combined"),
+    "Динамика причин отклонений": ("dashboards.deviations", "dashboard_deviations_combined"),
+    "БДДС": ("dashboards.budget", "dashboard_budget_by_period"),
+    "БДДС по месяцам": ("dashboards.budget", "dashboard_budget_by_period"),
+    "БДР": ("dashboards.budget", "dashboard_bdr"),
+    "Бюджет по лотам": ("dashboards.budget", "dashboard_budget_by_period"),
+    "Бюджет план/факт": ("dashboards.budget", "dashboard_budget_by_type"),
+    "Бюджет План/Прогноз/Факт": ("dashboards.budget", "dashboard_budget_by_type"),
+    "Утвержденный бюджет": ("dashboards.approved_budget", "dashboard_approved_budget"),
+    "Бюджет по проекту": ("dashboards.approved_budget", "dashboard_approved_budget"),
+    "Прогнозный бюджет": ("dashboards.approved_budget", "dashboard_forecast_budget"),
+    "Отклонение текущего срока от базового плана": (
+        "dashboards.deviations",
+        "dashboard_plan_fact_dates",
+    ),
+    "Значения отклонений от базового плана": (
+        "dashboards.deviations",
+        "dashboard_deviation_by_tasks_current_month",
+    ),
+    "Выдача рабочей/проектной документации": (
+        "dashboards.documentation",
+        "dashboard_documentation",
+    ),
+    "Аналитика по технике": ("dashboards.resources", "dashboard_technique"),
+    "График движения рабочей силы": ("dashboards.resources", "dashboard_workforce_and_skud"),
+    "Просрочка выдачи РД": ("dashboards.documentation", "dashboard_rd_delay"),
+    "СКУД стройка": ("dashboards.resources", "dashboard_skud_stroyka"),
+}
+
+_log = logging.getLogger(__name__)
+_import_lock = threading.Lock()
+# Модуль семейства -> время первого импорта, с
+_import_times: Dict[str, float] = {}
+
 
-def _get_dashboards() -> Dict[str, Callable]:
-    """Строит словарь имя_отчёта -> render(df). Импорт из dashboards._renderers."""
-    import os
-    import sys
-    import streamlit as st
+def _load_module(module_name: str):
+    """Импортирует модуль семейства дашбордов (один раз) и запоминает время импорта."""
+    if module_name in _import_times:
+        return sys.modules[module_name]
     # Родительская папка (bi-analytics) должна быть в sys.path для config, utils и т.д.
-    _this_dir = os.path.dirname(os.path.abspath(__file__))
-    _parent = os.path.dirname(_this_dir)
+    _parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     if _parent and _parent not in sys.path:
         sys.path.insert(0, _parent)
-    try:
-        from dashboards import _renderers
-    except Exception as e:
-        import traceback
-        raise RuntimeError(
-            f"Ошибка при загрузке дашбордов (dashboards._renderers): {e!r}\n\n"
-            f"Полный traceback:\n{traceback.format_exc()}"
-        ) from e
-
-    dashboard_deviations_combined = _renderers.dashboard_deviations_combined
-    dashboard_reasons_of_deviation = _renderers.dashboard_reasons_of_deviation
-    dashboard_dynamics_of_deviations = _renderers.dashboard_dynamics_of_deviations
-    dashboard_plan_fact_dates = _renderers.dashboard_plan_fact_dates
-    dashboard_deviation_by_tasks_current_month = _renderers.dashboard_deviation_by_tasks_current_month
-    dashboard_dynamics_of_reasons = _renderers.dashboard_dynamics_of_reasons
-    dashboard_budget_by_period = _renderers.dashboard_budget_by_period
-    dashboard_budget_by_section = _renderers.dashboard_budget_by_section
-    dashboard_bdr = getattr(_renderers, "dashboard_bdr", None)
-    if dashboard_bdr is None:
-
-        def _stub_bdr(df):
-            st.error(
-                "Дашборд БДР не найден в dashboards/_renderers.py. "
-                "Убедитесь, что функция dashboard_bdr определена в файле."
-            )
-
-        dashboard_bdr = _stub_bdr
-    dashboard_budget_by_type = _renderers.dashboard_budget_by_type
-    dashboard_approved_budget = _renderers.dashboard_approved_budget
-    dashboard_forecast_budget = _renderers.dashboard_forecast_budget
-    dashboard_rd_delay = _renderers.dashboard_rd_delay
-    dashboard_documentation = _renderers.dashboard_documentation
-    dashboard_technique = _renderers.dashboard_technique
-    dashboard_workforce_movement = _renderers.dashboard_workforce_movement
-    dashboard_workforce_and_skud = getattr(_renderers, "dashboard_workforce_and_skud", None)
-    if dashboard_workforce_and_skud is None:
-        dashboard_workforce_and_skud = _renderers.dashboard_workforce_movement
-    dashboard_skud_stroyka = _renderers.dashboard_skud_stroyka
-
-    return {
-        "Динамика отклонений": dashboard_deviations_combined,
-        "Динамика отклонений по месяцам": dashboard_deviations_combined,
-        "Динамика причин отклонений": dashboard_deviations_combined,
-        "БДДС": dashboard_budget_by_period,
-        "БДДС по месяцам": dashboard_budget_by_period,
-        "БДР": dashboard_bdr,
-        "Бюджет по лотам": dashboard_budget_by_period,
-        "Бюджет план/факт": dashboard_budget_by_type,
-        "Бюджет План/Прогноз/Факт": dashboard_budget_by_type,
-        "Утвержденный бюджет": dashboard_approved_budget,
-        "Бюджет по проекту": dashboard_approved_budget,
-        "Прогнозный бюджет": dashboard_forecast_budget,
-        "Отклонение текущего срока от базового плана": dashboard_plan_fact_dates,
-        "Значения отклонений от базового плана": dashboard_deviation_by_tasks_current_month,
-        "Выдача рабочей/проектной документации": dashboard_documentation,
-        "Аналитика по технике": dashboard_technique,
-        "График движения рабочей силы": dashboard_workforce_and_skud,
-        "Просрочка выдачи РД": dashboard_rd_delay,
-        "СКУД стройка": dashboard_skud_stroyka,
-    }
-
-
-# Ленивая загрузка, чтобы при импорте dashboards не тянуть project_visualization_app
+    with _import_lock:
+        if module_name in _import_times:
+            return sys.modules[module_name]
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(module_name)
+        except Exception as e:
+            import traceback
+            raise RuntimeError(
+                f"Ошибка при загрузке дашбордов ({module_name}): {e!r}\n\n"
+                f"Полный traceback:\n{traceback.format_exc()}"
+            ) from e
+        elapsed = time.perf_counter() - start
+        _import_times[module_name] = elapsed
+    _log.info("Модуль дашбордов %s импортирован за %.3f с", module_name, elapsed)
+    return module
+
+
+def _resolve(name: str) -> Optional[Callable]:
+    """Функция отрисовки отчёта (с импортом модуля семейства) или None."""
+    target = DASHBOARD_RENDERERS.get(name)
+    if target is None:
+        return None
+    module_name, function_name = target
+    return getattr(_load_module(module_name), function_name)
+
+
+class _LazyRenderer:
+    """Функция отрисовки отчёта, модуль которой импортируется при первом вызове."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __call__(self, df):
+        return _resolve(self.name)(df)
+
+    def __repr__(self) -> str:
+        module_name, function_name = DASHBOARD_RENDERERS[self.name]
+        return f"<dashboard {self.name!r}: {module_name}.{function_name}>"
+
+
+# Ленивая загрузка, чтобы при импорте dashboards не тянуть модули отрисовки
 _dashboards_cache: Dict[str, Callable] = {}
 
 
 def get_dashboards() -> Dict[str, Callable]:
-    """Возвращает словарь DASHBOARDS (кэшируется)."""
+    """
+    Возвращает словарь DASHBOARDS (кэшируется). Модули дашбордов при этом не импортируются —
+    только при вызове функции отрисовки.
+    """
     global _dashboards_cache
     if not _dashboards_cache:
-        _dashboards_cache = _get_dashboards()
+        _dashboards_cache = {name: _LazyRenderer(name) for name in DASHBOARD_RENDERERS}
     return _dashboards_cache
 
 
 def get_dashboard_renderer(name: str) -> Callable:
-    """Возвращает функцию отрисовки по имени отчёта или None."""
-    return get_dashboards().get(name)
+    """Возвращает функцию отрисовки по имени отчёта (импортируя её модуль) или None."""
+    return _resolve(name)
+
+
+def load_all_dashboards() -> Dict[str, float]:
+    """Импортирует все модули дашбордов (проверка окружения); возвращает время импорта."""
+    for module_name in sorted({module for module, _ in DASHBOARD_RENDERERS.values()}):
+        _load_module(module_name)
+    return get_import_times()
+
+
+def get_import_times() -> Dict[str, float]:
+    """Время импорта уже загруженных модулей дашбордов: модуль -> секунды."""
+    return dict(_import_times)
 
 
 def get_all_report_names() -> List[str]:
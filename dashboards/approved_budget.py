@@ -0,0 +1,1209 @@
+"""
+Утвержденный и прогнозный бюджет: распределение бюджета этапов по месяцам по правилам.
+"""
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+import numpy as np
+
+from budget_rules import (
+    BUILTIN_BUDGET_RULES,
+    budget_rule_percents,
+    get_budget_rules,
+    resolve_rule_names,
+    rule_label,
+)
+from config import FORECAST_EDIT_PAGE_ROWS
+from dashboard_cache import cached_computation, cached_figure
+from filter_engine import apply_filters, filter_options, get_filter_engine
+from utils import (
+    apply_chart_background,
+    dark_table_to_html,
+    paginate_table,
+    style_dataframe_for_dark_theme,
+    to_datetime_series,
+)
+
+
+# ==================== DASHBOARD: Approved Budget ====================
+def _month_index(dates):
+    """Порядковый номер месяца даты (как ordinal pd.Period с частотой M)."""
+    return ((dates.dt.year - 1970) * 12 + dates.dt.month - 1).to_numpy(dtype=np.int64)
+
+
+def _allocate_by_months(group_ids, starts, ends, budgets):
+    """
+    Распределение бюджета по месяцам без циклов по группам и месяцам.
+
+    Задача активна в месяцах [starts, ends] (номера месяцев). Для каждой группы берутся
+    все месяцы от первого начала до последнего окончания; 100% месяца — сумма плановых
+    бюджетов активных в нём задач (в порядке строк, как при суммировании по маске).
+    Доли месяцев от правила не зависят и считаются отдельно (budget_rule_percents).
+
+    Returns:
+        (номера месяцев, номера групп, суммы за месяц, номер месяца в этапе, длина этапа) —
+        только месяцы с ненулевой суммой, по группам и месяцам в порядке возрастания.
+    """
+    n_groups = int(group_ids.max()) + 1
+    group_first = np.full(n_groups, np.iinfo(np.int64).max, dtype=np.int64)
+    group_last = np.full(n_groups, np.iinfo(np.int64).min, dtype=np.int64)
+    np.minimum.at(group_first, group_ids, starts)
+    np.maximum.at(group_last, group_ids, ends)
+    span = group_last - group_first + 1
+    offsets = np.cumsum(span) - span
+
+    # Каждая задача -> ячейки (группа, месяц) своего интервала
+    lengths = ends - starts + 1
+    task_rows = np.repeat(np.arange(len(starts)), lengths)
+    month_in_task = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    task_groups = group_ids[task_rows]
+    cells = (
+        offsets[task_groups]
+        + (starts[task_rows] - group_first[task_groups])
+        + month_in_task
+    )
+    weights = budgets[task_rows]
+    n_cells = int(span.sum())
+    counts = np.bincount(cells, minlength=n_cells)
+    # Последовательная сумма в порядке строк — как .sum() по маске при числе слагаемых < 8
+    monthly_totals = np.bincount(cells, weights=weights, minlength=n_cells)
+    # Для 8+ слагаемых numpy суммирует попарно: считаем такие ячейки так же, чтобы результат
+    # совпадал до бита
+    large_cells = np.flatnonzero(counts >= 8)
+    if len(large_cells):
+        order = np.argsort(cells, kind="stable")
+        sorted_weights = weights[order]
+        bounds = np.cumsum(counts) - counts
+        for cell in large_cells:
+            monthly_totals[cell] = sorted_weights[bounds[cell] : bounds[cell] + counts[cell]].sum()
+
+    cell_group = np.repeat(np.arange(n_groups), span)
+    position = np.arange(len(cell_group)) - offsets[cell_group]
+    num_months = span[cell_group]
+
+    nonzero = monthly_totals != 0
+    return (
+        (group_first[cell_group] + position)[nonzero],
+        cell_group[nonzero],
+        monthly_totals[nonzero],
+        position[nonzero],
+        num_months[nonzero],
+    )
+
+
+def _approved_budget_allocation(df):
+    """
+    Не зависящая от правила часть расчета утвержденного бюджета: суммы по месяцам этапов.
+
+    Returns:
+        {"base": DataFrame (month, budget plan, колонки группировки),
+         "positions": номер месяца в этапе, "num_months": длина этапа,
+         "groups": номер группы строки} или {"error": текст}
+    """
+    # Проверяем наличие необходимых колонок
+    required_cols = ["budget plan", "plan start", "plan end"]
+    missing_cols = [col for col in required_cols if col not in df.columns]
+    if missing_cols:
+        return {"error": f"Отсутствуют необходимые колонки: {', '.join(missing_cols)}"}
+
+    # Копируем данные для работы
+    work_df = df.copy()
+
+    # Конвертируем даты
+    work_df["plan start"] = to_datetime_series(work_df["plan start"])
+    work_df["plan end"] = to_datetime_series(work_df["plan end"])
+    work_df["budget plan"] = pd.to_numeric(work_df["budget plan"], errors="coerce")
+
+    # Фильтруем строки с валидными данными
+    valid_mask = (
+        work_df["plan start"].notna()
+        & work_df["plan end"].notna()
+        & work_df["budget plan"].notna()
+        & (work_df["budget plan"] > 0)
+        & (work_df["plan start"] <= work_df["plan end"])
+    )
+    work_df = work_df[valid_mask].copy()
+
+    if work_df.empty:
+        return {"error": "Нет данных с валидными датами и бюджетом"}
+
+    # Определяем группировку: группируем по комбинации project + section + task
+    # Это позволяет правильно обрабатывать случаи, когда выбраны разные уровни фильтрации
+    grouping_cols = []
+    if "project name" in work_df.columns:
+        grouping_cols.append("project name")
+    if "section" in work_df.columns:
+        grouping_cols.append("section")
+    if "task name" in work_df.columns:
+        grouping_cols.append("task name")
+
+    # Если нет колонок для группировки, обрабатываем все задачи вместе
+    if not grouping_cols:
+        # Создаем фиктивную группу для всех задач
+        work_df["_group"] = "all"
+        grouping_cols = ["_group"]
+
+    # Группы в порядке groupby (отсортированные ключи); строки с пустым ключом не участвуют
+    group_ids = work_df.groupby(grouping_cols, observed=True, sort=True).ngroup()
+    in_group = (group_ids.notna() & (group_ids >= 0)).to_numpy()
+    group_ids = group_ids.fillna(-1).to_numpy(dtype=np.int64)
+    if not in_group.any():
+        return {"error": "Нет данных для расчета утвержденного бюджета"}
+
+    month_ordinals, row_groups, monthly_totals, positions, num_months = _allocate_by_months(
+        group_ids[in_group],
+        _month_index(work_df["plan start"])[in_group],
+        _month_index(work_df["plan end"])[in_group],
+        work_df["budget plan"].to_numpy(dtype=float)[in_group],
+    )
+    if len(month_ordinals) == 0:
+        return {"error": "Нет данных для расчета утвержденного бюджета"}
+
+    base = pd.DataFrame(
+        {
+            "month": pd.arrays.PeriodArray(month_ordinals, dtype=pd.PeriodDtype("M")),
+            "budget plan": monthly_totals,  # Плановый бюджет для месяца (100%)
+        }
+    )
+    # Значения группировки (исключаем фиктивную колонку _group): первая строка каждой группы
+    first_rows = np.unique(group_ids[in_group], return_index=True)[1]
+    for col in grouping_cols:
+        if col != "_group":
+            group_values = work_df[col].to_numpy()[in_group][first_rows]
+            base[col] = group_values[row_groups]
+
+    return {
+        "base": base,
+        "positions": positions,
+        "num_months": num_months,
+        "groups": row_groups,  # номер группы строки base в порядке groupby
+    }
+
+
+def calculate_approved_budget_by_rules(df, rule_names):
+    """
+    Утвержденный бюджет сразу по нескольким правилам распределения.
+
+    Суммы по месяцам считаются один раз (и кэшируются по набору данных), для каждого
+    правила добавляется только умножение на его доли.
+
+    Args:
+        df: DataFrame с данными проектов
+        rule_names: ключи правил из справочника (budget_rules); неизвестные пропускаются
+
+    Returns:
+        ({ключ правила: DataFrame распределения}, None) или ({}, текст ошибки)
+    """
+    rules = get_budget_rules()
+    allocation = cached_computation(
+        "approved_budget_allocation", df, (), lambda: _approved_budget_allocation(df)
+    )
+    if "error" in allocation:
+        return {}, allocation["error"]
+    return _apply_budget_rules(allocation, rules, resolve_rule_names(rule_names, rules)), None
+
+
+def _apply_budget_rules(allocation, rules, rule_names):
+    """Распределения по правилам rule_names из общих сумм по месяцам (allocation)."""
+    base = allocation["base"]
+    results = {}
+    for rule_name in rule_names:
+        percents = budget_rule_percents(
+            rules[rule_name], allocation["positions"], allocation["num_months"]
+        )
+        columns = {
+            "month": base["month"].array,
+            "approved budget": base["budget plan"].to_numpy() * percents,
+            "budget plan": base["budget plan"].to_numpy(),
+            "rule_name": rule_name,
+        }
+        for col in base.columns[2:]:
+            columns[col] = base[col].to_numpy()
+        results[rule_name] = pd.DataFrame(columns)
+    return results
+
+
+def calculate_approved_budget(df, rule_name="default"):
+    """
+    Рассчитывает утвержденный бюджет на основе правил распределения.
+
+    Логика расчета:
+    1. Группируем задачи по проекту/разделу/задаче
+    2. Для каждой группы находим все месяцы этапа (от минимальной даты начала до максимальной даты окончания)
+    3. Для каждого месяца находим все задачи, активные в этом месяце
+    4. Суммируем плановый бюджет активных задач - это 100% для месяца
+    5. Распределяем эту сумму по правилу между месяцами этапа
+
+    Правила распределения — справочник budget_rules (встроенные и пользовательские), например:
+    - default: 50% - первый месяц, 45% - равномерно по промежуточным месяцам, 5% - последний месяц
+
+    Args:
+        df: DataFrame с данными проектов
+        rule_name: название правила из справочника (неизвестное — default)
+
+    Returns:
+        DataFrame с распределением утвержденного бюджета по месяцам
+    """
+    results, error = calculate_approved_budget_by_rules(df, [rule_name])
+    if error:
+        return pd.DataFrame(), error
+    return next(iter(results.values())), None
+
+
+def _filter_approved_budget_rows(df, project_col, selected_project, selected_section, selected_task):
+    """
+    Строки «Утвержденного бюджета» по фильтрам проекта, этапа и лота.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    filtered_df = apply_filters(
+        df,
+        {
+            project_col: selected_project,
+            "section": selected_section,
+            "task name": selected_task,
+        },
+    )
+    return {"filtered_df": filtered_df}
+
+
+def dashboard_approved_budget(df):
+    """Панель для отображения утвержденного бюджета"""
+    st.header("💰 Утвержденный бюджет")
+
+    budget_rules = get_budget_rules()
+
+    # Информация о правилах
+    with st.expander("ℹ️ Правила распределения бюджета", expanded=False):
+        st.markdown(
+            """
+        **Основное правило (default):**
+        - 50% планового бюджета - на первый месяц этапа
+        - 45% планового бюджета - равномерно распределяется между промежуточными месяцами
+        - 5% планового бюджета - на последний месяц этапа
+        
+        При изменении дат начала и окончания этапа бюджет автоматически пересчитывается.
+        Для сравнения можно выбрать несколько правил: первое из выбранных — основное
+        (по нему строится детальная таблица).
+        """
+        )
+        st.markdown(
+            "\n".join(
+                f"- **{rule_label(key, rule)}**"
+                + (" (пользовательское)" if key not in BUILTIN_BUDGET_RULES else "")
+                + f": {rule.get('description', '')}"
+                for key, rule in budget_rules.items()
+            )
+        )
+
+    # Фильтры (три колонки: проект, этап, лот)
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        # Check for project column - try English name first (alias from load_data), then Russian
+        project_col = None
+        if "project name" in df.columns:
+            project_col = "project name"
+        elif "Проект" in df.columns:
+            project_col = "Проект"
+        
+        if project_col:
+            projects = filter_options(df, project_col)
+            selected_project = st.selectbox(
+                "Фильтр по проекту", projects, key="approved_budget_project"
+            )
+        else:
+            st.warning("⚠️ Колонка 'project name' не найдена.")
+            selected_project = "Все"
+
+    with col2:
+        if "section" in df.columns:
+            sections = filter_options(df, "section")
+            selected_section = st.selectbox(
+                "Фильтр по этапу", sections, key="approved_budget_section"
+            )
+        else:
+            selected_section = "Все"
+
+    with col3:
+        if "task name" in df.columns:
+            tasks = filter_options(df, "task name")
+            selected_task = st.selectbox(
+                "Фильтр по лоту", tasks, key="approved_budget_task"
+            )
+        else:
+            selected_task = "Все"
+
+    # Применяем фильтры (отбор строк кэшируется по набору данных и фильтрам)
+    filtered_df = cached_computation(
+        "approved_budget_rows",
+        df,
+        (project_col, selected_project, selected_section, selected_task),
+        lambda: _filter_approved_budget_rows(
+            df, project_col, selected_project, selected_section, selected_task
+        ),
+    )["filtered_df"]
+
+    selected_rules = st.multiselect(
+        "Правила распределения (сравнение)",
+        list(budget_rules.keys()),
+        default=["default"],
+        format_func=lambda key: rule_label(key, budget_rules[key]),
+        key="approved_budget_rules",
+    )
+    rule_names = resolve_rule_names(selected_rules, budget_rules)
+
+    # Рассчитываем утвержденный бюджет: суммы по месяцам одни на все правила
+    budgets_by_rule, error = calculate_approved_budget_by_rules(filtered_df, rule_names)
+
+    if error:
+        st.error(error)
+        return
+    approved_budget_df = budgets_by_rule[rule_names[0]]
+
+    if approved_budget_df.empty:
+        st.info("Нет данных для построения графика утвержденного бюджета.")
+        return
+
+    # Группируем по месяцам для графика
+    monthly_approved = (
+        approved_budget_df.groupby("month", observed=True)
+        .agg({"approved budget": "sum", "budget plan": "sum"})  # Для сравнения
+        .reset_index()
+    )
+    # Утвержденный бюджет по остальным правилам (месяцы те же — суммы общие)
+    rule_columns = {rule_names[0]: "approved budget"}
+    for rule_name in rule_names[1:]:
+        column = f"approved budget {rule_name}"
+        rule_columns[rule_name] = column
+        monthly_approved[column] = (
+            budgets_by_rule[rule_name]
+            .groupby("month", observed=True)["approved budget"]
+            .sum()
+            .to_numpy()
+        )
+
+    # Сортируем по месяцам
+    monthly_approved = monthly_approved.sort_values("month")
+
+    # Форматируем месяц для отображения
+    def format_month_display(period_val):
+        if pd.isna(period_val):
+            return "Н/Д"
+        try:
+            if isinstance(period_val, pd.Period):
+                month_num = period_val.month
+                year = period_val.year
+                RUSSIAN_MONTHS = {
+                    1: "Январь",
+                    2: "Февраль",
+                    3: "Март",
+                    4: "Апрель",
+                    5: "Май",
+                    6: "Июнь",
+                    7: "Июль",
+                    8: "Август",
+                    9: "Сентябрь",
+                    10: "Октябрь",
+                    11: "Ноябрь",
+                    12: "Декабрь",
+                }
+                return f"{RUSSIAN_MONTHS.get(month_num, 'Н/Д')} {year}"
+            return str(period_val)
+        except:
+            return str(period_val)
+
+    monthly_approved["Месяц"] = monthly_approved["month"].apply(format_month_display)
+    # Значения в млн руб. для отображения
+    for column in rule_columns.values():
+        monthly_approved[f"{column} млн"] = (monthly_approved[column] / 1e6).round(2)
+    monthly_approved["budget plan млн"] = (monthly_approved["budget plan"] / 1e6).round(2)
+    comparing = len(rule_names) > 1
+
+    def _approved_budget_chart():
+        # Создаем график (ось Y — млн руб.)
+        fig = go.Figure()
+
+        # Добавляем утвержденный бюджет (по столбцу на каждое правило)
+        rule_colors = ["#2E86AB", "#A23B72", "#3B8EA5", "#C73E1D", "#6A994E", "#8E7DBE"]
+        for i, (rule_name, column) in enumerate(rule_columns.items()):
+            values = monthly_approved[f"{column} млн"]
+            fig.add_trace(
+                go.Bar(
+                    x=monthly_approved["Месяц"],
+                    y=values,
+                    name=(
+                        f"Утвержденный бюджет: {rule_label(rule_name, budget_rules[rule_name])}"
+                        if comparing
+                        else "Утвержденный бюджет"
+                    ),
+                    marker_color=rule_colors[i % len(rule_colors)],
+                    # Подписи над столбцами при сравнении нечитаемы
+                    text=None if comparing else values.apply(lambda x: f"{x:.2f}" if pd.notna(x) else ""),
+                    textposition="outside",
+                    textfont=dict(size=14, color="white"),
+                )
+            )
+
+        # Добавляем плановый бюджет для сравнения (линия)
+        fig.add_trace(
+            go.Scatter(
+                x=monthly_approved["Месяц"],
+                y=monthly_approved["budget plan млн"],
+                name="Плановый бюджет (сумма)",
+                mode="lines+markers",
+                line=dict(color="#F18F01", width=2),
+                marker=dict(size=8, color="#F18F01"),
+            )
+        )
+
+        fig.update_layout(
+            title="Утвержденный бюджет по месяцам",
+            xaxis_title="Месяц",
+            yaxis_title="млн руб.",
+            hovermode="x unified",
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+            height=600,
+            barmode="group",
+        )
+
+        return apply_chart_background(fig)
+
+    st.plotly_chart(
+        cached_figure(
+            "approved_budget",
+            monthly_approved,
+            (tuple(rule_label(name, budget_rules[name]) for name in rule_columns),),
+            _approved_budget_chart,
+        ),
+        use_container_width=True,
+    )
+
+    # Сводная таблица (млн руб.)
+    st.subheader("Сводная таблица утвержденного бюджета по месяцам")
+    summary_table = monthly_approved[
+        ["Месяц"] + [f"{column} млн" for column in rule_columns.values()] + ["budget plan млн"]
+    ].copy()
+    summary_table.columns = (
+        ["Месяц"]
+        + [
+            f"Утвержденный бюджет ({rule_label(rule_name, budget_rules[rule_name])}), млн руб."
+            if comparing
+            else "Утвержденный бюджет, млн руб."
+            for rule_name in rule_columns
+        ]
+        + ["Плановый бюджет (сумма), млн руб."]
+    )
+    for column in summary_table.columns[1:]:
+        summary_table[column] = summary_table[column].apply(
+            lambda x: f"{float(x):.2f}" if pd.notna(x) else "0.00"
+        )
+    st.table(style_dataframe_for_dark_theme(summary_table))
+
+    # Детальная таблица (млн руб.)
+    with st.expander("📋 Детальная таблица распределения бюджета", expanded=False):
+        detail_table = approved_budget_df[
+            [
+                "project name",
+                "section",
+                "task name",
+                "month",
+                "budget plan",
+                "approved budget",
+            ]
+        ].copy()
+        detail_table["month"] = detail_table["month"].apply(format_month_display)
+        detail_table["Плановый бюджет"] = (detail_table["budget plan"] / 1e6).round(2).apply(
+            lambda x: f"{float(x):.2f}" if pd.notna(x) else "0.00"
+        )
+        detail_table["Утвержденный бюджет"] = (detail_table["approved budget"] / 1e6).round(2).apply(
+            lambda x: f"{float(x):.2f}" if pd.notna(x) else "0.00"
+        )
+        detail_table = detail_table.drop(columns=["budget plan", "approved budget"], errors="ignore")
+        detail_table.columns = [
+            "Проект",
+            "Раздел",
+            "Задача",
+            "Месяц",
+            "Плановый бюджет, млн руб.",
+            "Утвержденный бюджет, млн руб.",
+        ]
+        detail_table = paginate_table(detail_table, key="approved_budget_detail_page")
+        st.markdown(dark_table_to_html(detail_table), unsafe_allow_html=True)
+
+
+# ==================== DASHBOARD: Forecast Budget ====================
+# Колонки, от которых зависит распределение бюджета (ключи групп и параметры задач)
+_FORECAST_GROUP_COLUMNS = ["project name", "section", "task name"]
+_FORECAST_VALUE_COLUMNS = ["plan start", "plan end", "budget plan"]
+
+
+def _forecast_inputs(work_df):
+    """Входные данные расчета: ключи групп и нормализованные даты/бюджет (None — нет колонок)."""
+    if any(col not in work_df.columns for col in _FORECAST_VALUE_COLUMNS):
+        return None
+    group_cols = [col for col in _FORECAST_GROUP_COLUMNS if col in work_df.columns]
+    if not group_cols:
+        return None
+    inputs = work_df[group_cols].reset_index(drop=True)
+    inputs["plan start"] = to_datetime_series(work_df["plan start"]).to_numpy()
+    inputs["plan end"] = to_datetime_series(work_df["plan end"]).to_numpy()
+    inputs["budget plan"] = pd.to_numeric(work_df["budget plan"], errors="coerce").to_numpy()
+    return inputs
+
+
+def _changed_rows(previous, inputs):
+    """Маска строк, в которых изменилось хотя бы одно входное значение (пустые равны пустым)."""
+    changed = np.zeros(len(inputs), dtype=bool)
+    for col in inputs.columns:
+        old, new = previous[col], inputs[col]
+        if isinstance(old.dtype, pd.CategoricalDtype) and old.dtype == new.dtype:
+            # Одинаковые категории — достаточно сравнить коды (пустое значение — код -1)
+            changed |= old.cat.codes.to_numpy() != new.cat.codes.to_numpy()
+            continue
+        if old.dtype.kind in "mMfiu" and new.dtype.kind in "mMfiu":
+            old_values, new_values = old.to_numpy(), new.to_numpy()
+        else:
+            old_values, new_values = old.to_numpy(dtype=object), new.to_numpy(dtype=object)
+        both_missing = pd.isna(old_values) & pd.isna(new_values)
+        changed |= (old_values != new_values) & ~both_missing
+    return changed
+
+
+def _group_index(frame, group_cols):
+    """MultiIndex ключей групп по строкам frame (значения как объекты — для сравнения)."""
+    return pd.MultiIndex.from_arrays([frame[col].to_numpy(dtype=object) for col in group_cols])
+
+
+def _forecast_groups(inputs, group_cols):
+    """
+    Группы входных данных в порядке groupby: номер группы каждой строки (-1 — пустой ключ)
+    и MultiIndex ключей групп по номерам.
+    """
+    group_ids = inputs.groupby(group_cols, observed=True, sort=True).ngroup()
+    group_ids = group_ids.fillna(-1).to_numpy(dtype=np.int64)
+    valid_rows = np.flatnonzero(group_ids >= 0)
+    first_rows = valid_rows[np.unique(group_ids[valid_rows], return_index=True)[1]]
+    return group_ids, _group_index(inputs.iloc[first_rows], group_cols)
+
+
+def _patch_forecast_groups(state, work_df, inputs, changed, rule, rule_name):
+    """
+    Пересчитывает только группы (проект, раздел, задача), затронутые изменёнными строками,
+    и подставляет их в прошлый результат. None — обновление невозможно, нужен полный расчет.
+
+    Returns:
+        (результат, номер группы каждой строки результата, ключи групп) или None
+    """
+    group_cols = [col for col in _FORECAST_GROUP_COLUMNS if col in inputs.columns]
+    old_keys = state["group_keys"]
+    group_ids, new_keys = _forecast_groups(inputs, group_cols)
+    affected = _group_index(state["inputs"][changed], group_cols).union(
+        _group_index(inputs[changed], group_cols)
+    )
+
+    # Новые данные затронутых групп — пересчитываем целиком (суммы месяцев зависят от всех задач группы)
+    affected_new = new_keys.get_indexer(affected)
+    rows_in_affected = np.isin(group_ids, affected_new[affected_new >= 0])
+    patch = None
+    if rows_in_affected.any():
+        allocation = _approved_budget_allocation(work_df[rows_in_affected])
+        if "error" not in allocation:
+            patch = _apply_budget_rules(allocation, {rule_name: rule}, [rule_name])[rule_name]
+
+    # Строки прошлого результата из незатронутых групп: их ключи есть и среди новых групп
+    affected_old = old_keys.get_indexer(affected)
+    kept = ~np.isin(state["result_groups"], affected_old[affected_old >= 0])
+    result = state["result"][kept]
+    result_groups = new_keys.get_indexer(old_keys)[state["result_groups"][kept]]
+    if patch is not None:
+        result = pd.concat([result, patch], ignore_index=True)
+        result_groups = np.concatenate(
+            [result_groups, new_keys.get_indexer(_group_index(patch, group_cols))]
+        )
+    if result.empty or (result_groups < 0).any():
+        return None
+
+    # Порядок как при полном расчете: группы в порядке groupby, внутри группы — месяцы
+    order = np.lexsort((result["month"].array.asi8, result_groups))
+    return result.iloc[order].reset_index(drop=True), result_groups[order], new_keys
+
+
+def _incremental_approved_budget(work_df, rule_name, state):
+    """
+    Утвержденный бюджет для редактируемых данных с пересчетом только изменённых групп.
+
+    state — словарь сессии (st.session_state) с входными данными и результатом прошлого
+    расчета. Входные данные сравниваются построчно целиком (а не по отпечатку выборки),
+    поэтому правка любой ячейки замечается; результат совпадает с полным расчетом.
+    """
+    rules = get_budget_rules()
+    rule_name = resolve_rule_names([rule_name], rules)[0]
+    rule = rules[rule_name]
+    inputs = _forecast_inputs(work_df)
+
+    previous = state.get("inputs")
+    patched = None
+    if (
+        inputs is not None
+        and previous is not None
+        and state.get("error") is None
+        and state.get("rule") == rule
+        and list(previous.columns) == list(inputs.columns)
+        and len(previous) == len(inputs)
+    ):
+        changed = _changed_rows(previous, inputs)
+        if not changed.any():
+            return state["result"], None
+        # Если изменилась большая часть строк, полный расчет дешевле
+        if changed.sum() * 2 <= len(inputs):
+            patched = _patch_forecast_groups(state, work_df, inputs, changed, rule, rule_name)
+
+    error = None
+    if patched is not None:
+        result, result_groups, group_keys = patched
+    else:
+        result_groups = group_keys = None
+        allocation = _approved_budget_allocation(work_df)
+        if "error" in allocation:
+            result, error = pd.DataFrame(), allocation["error"]
+        else:
+            result = _apply_budget_rules(allocation, {rule_name: rule}, [rule_name])[rule_name]
+            if inputs is not None:
+                # Номера групп расчета (только группы с валидными задачами) -> номера групп inputs
+                group_cols = [col for col in _FORECAST_GROUP_COLUMNS if col in inputs.columns]
+                group_keys = _forecast_groups(inputs, group_cols)[1]
+                first_rows = np.unique(allocation["groups"], return_index=True)[1]
+                allocation_keys = _group_index(result.iloc[first_rows], group_cols)
+                result_groups = group_keys.get_indexer(allocation_keys)[allocation["groups"]]
+
+    state.update(
+        {
+            # Без ключей групп следующий расчет будет полным
+            "inputs": inputs if group_keys is not None else None,
+            "result": result,
+            "result_groups": result_groups,
+            "group_keys": group_keys,
+            "rule": rule,
+            "error": error,
+        }
+    )
+    return result, error
+
+
+def calculate_forecast_budget(df, edited_data=None, rule_name="default", state=None):
+    """
+    Рассчитывает прогнозный бюджет на основе утвержденного бюджета с учетом возможных изменений.
+
+    Args:
+        df: DataFrame с исходными данными проектов
+        edited_data: DataFrame с отредактированными данными (даты, утвержденный бюджет)
+        rule_name: название правила распределения
+        state: словарь для хранения прошлого расчета между перезапусками (например, в
+            st.session_state); при повторном вызове пересчитываются только изменённые группы
+
+    Returns:
+        DataFrame с распределением прогнозного бюджета по месяцам
+    """
+    # Используем отредактированные данные, если они есть, иначе исходные
+    work_df = edited_data if edited_data is not None else df
+
+    # Рассчитываем утвержденный бюджет на основе текущих данных (без кэша по отпечатку:
+    # отредактированные данные отличаются от исходных в отдельных ячейках)
+    approved_budget_df, error = _incremental_approved_budget(
+        work_df, rule_name, {} if state is None else state
+    )
+
+    if error:
+        return pd.DataFrame(), error
+
+    # Прогнозный бюджет = утвержденный бюджет (но может быть изменен пользователем)
+    # Если пользователь изменил утвержденный бюджет вручную, используем эти значения
+    forecast_budget_df = approved_budget_df.copy()
+
+    # Переименовываем колонку для ясности
+    if "approved budget" in forecast_budget_df.columns:
+        forecast_budget_df["forecast budget"] = forecast_budget_df["approved budget"]
+
+    return forecast_budget_df, None
+
+
+def dashboard_forecast_budget(df):
+    """Панель для отображения и редактирования прогнозного бюджета"""
+    st.header("📈 Прогнозный бюджет")
+
+    # Информация о прогнозном бюджете
+    with st.expander("ℹ️ О прогнозном бюджете", expanded=False):
+        st.markdown(
+            """
+        **Прогнозный бюджет** рассчитывается на основе утвержденного бюджета и может быть скорректирован:
+        - При изменении плановых дат начала и окончания этапов
+        - При изменении утвержденного бюджета по задачам
+        
+        Прогнозный бюджет автоматически пересчитывается при любых изменениях.
+        """
+        )
+
+    # Фильтр по проекту (обязательный для прогнозного бюджета)
+    # Check English name first (alias created in load_data), then Russian
+    project_col = None
+    if "project name" in df.columns:
+        project_col = "project name"
+    elif "Проект" in df.columns:
+        project_col = "Проект"
+    
+    if not project_col:
+        st.warning(
+            "Колонка 'project name' не найдена. Необходима для работы с прогнозным бюджетом."
+        )
+        return
+
+    projects = get_filter_engine(df).options(df, project_col)
+    if not projects:
+        st.warning("Проекты не найдены в данных.")
+        return
+
+    selected_project = st.selectbox(
+        "Выберите проект", projects, key="forecast_budget_project"
+    )
+
+    # Фильтруем данные по выбранному проекту (отбор строк кэшируется)
+    project_df = cached_computation(
+        "forecast_budget_rows",
+        df,
+        (project_col, selected_project),
+        lambda: {"project_df": apply_filters(df, {project_col: selected_project})},
+    )["project_df"]
+
+    if project_df.empty:
+        st.info("Нет данных для выбранного проекта.")
+        return
+
+    # Проверяем наличие необходимых колонок
+    required_cols = ["budget plan", "plan start", "plan end", "task name"]
+    missing_cols = [col for col in required_cols if col not in project_df.columns]
+    if missing_cols:
+        st.warning(f"Отсутствуют необходимые колонки: {', '.join(missing_cols)}")
+        return
+
+    # Инициализируем session_state для хранения отредактированных данных
+    if f"forecast_edited_data_{selected_project}" not in st.session_state:
+        st.session_state[f"forecast_edited_data_{selected_project}"] = project_df.copy()
+
+    # Инициализируем session_state для хранения отредактированной таблицы (для отображения)
+    if f"forecast_edit_table_{selected_project}" not in st.session_state:
+        # Подготавливаем данные для редактирования в первый раз
+        current_data = project_df.copy()
+        if "section" not in current_data.columns:
+            current_data["section"] = "—"
+        edit_df = current_data[
+            ["task name", "section", "plan start", "plan end", "budget plan"]
+        ].copy()
+
+        # Конвертируем даты в datetime для корректного отображения
+        edit_df["plan start"] = to_datetime_series(edit_df["plan start"])
+        edit_df["plan end"] = to_datetime_series(edit_df["plan end"])
+
+        # Форматируем для отображения
+        edit_df["plan start"] = edit_df["plan start"].dt.date
+        edit_df["plan end"] = edit_df["plan end"].dt.date
+
+        # Переименовываем колонки; бюджет в млн руб. для отображения с точкой
+        edit_df["budget plan"] = (edit_df["budget plan"].astype(float) / 1e6).round(2)
+        edit_df.columns = [
+            "Задача",
+            "Раздел",
+            "План. начало",
+            "План. окончание",
+            "Плановый бюджет, млн руб.",
+        ]
+
+        st.session_state[f"forecast_edit_table_{selected_project}"] = edit_df.copy()
+
+    # Получаем текущую таблицу для редактирования (страховка: пересобрать, если ключа не было)
+    if f"forecast_edit_table_{selected_project}" not in st.session_state:
+        current_data = project_df.copy()
+        if "section" not in current_data.columns:
+            current_data["section"] = "—"
+        edit_df = current_data[
+            ["task name", "section", "plan start", "plan end", "budget plan"]
+        ].copy()
+        edit_df["plan start"] = to_datetime_series(edit_df["plan start"])
+        edit_df["plan end"] = to_datetime_series(edit_df["plan end"])
+        edit_df["plan start"] = edit_df["plan start"].dt.date
+        edit_df["plan end"] = edit_df["plan end"].dt.date
+        edit_df["budget plan"] = (edit_df["budget plan"].astype(float) / 1e6).round(2)
+        edit_df.columns = [
+            "Задача",
+            "Раздел",
+            "План. начало",
+            "План. окончание",
+            "Плановый бюджет, млн руб.",
+        ]
+        st.session_state[f"forecast_edit_table_{selected_project}"] = edit_df.copy()
+    edit_df = st.session_state[f"forecast_edit_table_{selected_project}"].copy()
+
+    # Нормализация колонок: если в session_state старые имена (budget plan и т.д.), приводим к русским
+    _budget_col = "Плановый бюджет, млн руб."
+    if _budget_col not in edit_df.columns and "budget plan" in edit_df.columns:
+        edit_df = edit_df.rename(columns={"budget plan": _budget_col})
+    if "Задача" not in edit_df.columns and "task name" in edit_df.columns:
+        edit_df = edit_df.rename(columns={"task name": "Задача"})
+    if "Раздел" not in edit_df.columns and "section" in edit_df.columns:
+        edit_df = edit_df.rename(columns={"section": "Раздел"})
+    if "План. начало" not in edit_df.columns and "plan start" in edit_df.columns:
+        edit_df = edit_df.rename(columns={"plan start": "План. начало"})
+    if "План. окончание" not in edit_df.columns and "plan end" in edit_df.columns:
+        edit_df = edit_df.rename(columns={"plan end": "План. окончание"})
+
+    st.subheader("📝 Редактирование данных задач")
+    st.info(
+        "Измените даты начала/окончания или плановый бюджет (в млн руб.). Изменения применяются при нажатии 'Применить изменения'."
+    )
+
+    if edit_df.empty:
+        st.info("Нет задач для отображения в таблице редактирования для выбранного проекта.")
+        edited_df = edit_df.copy()
+    else:
+        # Форма с отдельными полями ввода вместо data_editor — текст и значения видны в тёмной теме
+        # Заголовки в тех же колонках, что и данные — подписи не кучкуются
+        h1, h2, h3, h4, h5 = st.columns(5)
+        with h1:
+            st.caption("**Задача**")
+        with h2:
+            st.caption("**Раздел**")
+        with h3:
+            st.caption("**План. начало**")
+        with h4:
+            st.caption("**План. окончание**")
+        with h5:
+            st.caption("**Плановый бюджет, млн руб.**")
+        # Поля ввода строятся только для текущей страницы: на каждом перезапуске Streamlit
+        # создаёт все виджеты заново, а строки других страниц берутся из сохранённой таблицы
+        page_rows = max(1, FORECAST_EDIT_PAGE_ROWS)
+        page_count = (len(edit_df) + page_rows - 1) // page_rows
+        page = 1
+        if page_count > 1:
+            page = int(
+                st.number_input(
+                    f"Страница (по {page_rows} задач, всего {page_count})",
+                    min_value=1,
+                    max_value=page_count,
+                    value=1,
+                    step=1,
+                    key=f"forecast_edit_page_{selected_project}",
+                )
+            )
+        page_start = (page - 1) * page_rows
+        page_stop = min(len(edit_df), page_start + page_rows)
+        edited_rows = []
+        budget_col_name = "Плановый бюджет, млн руб." if "Плановый бюджет, млн руб." in edit_df.columns else "budget plan"
+        for i in range(page_start, page_stop):
+            row = edit_df.iloc[i]
+            plan_start_val = row["План. начало"] if "План. начало" in row.index else row.get("plan start")
+            plan_end_val = row["План. окончание"] if "План. окончание" in row.index else row.get("plan end")
+            raw_budget = row.get(budget_col_name)
+            if pd.notna(raw_budget):
+                v = float(raw_budget)
+                # Всегда показывать в млн руб.: если значение в рублях (по имени колонки или по величине), делим на 1e6
+                if budget_col_name == "budget plan" or v > 1e5:
+                    budget_val = round(v / 1e6, 2)
+                else:
+                    budget_val = v
+            else:
+                budget_val = 0.0
+            c1, c2, c3, c4, c5 = st.columns(5)
+            with c1:
+                st.text(str(row["Задача"])[:50] + ("…" if len(str(row["Задача"])) > 50 else ""))
+            with c2:
+                st.text(str(row["Раздел"])[:30] + ("…" if len(str(row["Раздел"])) > 30 else ""))
+            with c3:
+                plan_start = st.date_input(
+                    "План. начало",
+                    value=plan_start_val,
+                    key=f"forecast_plan_start_{selected_project}_{i}",
+                    label_visibility="collapsed",
+                )
+            with c4:
+                plan_end = st.date_input(
+                    "План. окончание",
+                    value=plan_end_val,
+                    key=f"forecast_plan_end_{selected_project}_{i}",
+                    label_visibility="collapsed",
+                )
+            with c5:
+                budget = st.number_input(
+                    "Бюджет, млн руб.",
+                    value=budget_val,
+                    min_value=0.0,
+                    step=0.01,
+                    format="%.2f",
+                    key=f"forecast_budget_{selected_project}_{i}",
+                    label_visibility="collapsed",
+                )
+            edited_rows.append({
+                "Задача": row.get("Задача", row.get("task name", "")),
+                "Раздел": row.get("Раздел", row.get("section", "")),
+                "План. начало": plan_start,
+                "План. окончание": plan_end,
+                "Плановый бюджет, млн руб.": budget,
+            })
+        edited_df = edit_df.reset_index(drop=True)
+        if budget_col_name != "Плановый бюджет, млн руб.":
+            edited_df = edited_df.rename(columns={budget_col_name: "Плановый бюджет, млн руб."})
+        edited_df = edited_df[
+            ["Задача", "Раздел", "План. начало", "План. окончание", "Плановый бюджет, млн руб."]
+        ].astype(object)
+        edited_df.iloc[page_start:page_stop] = pd.DataFrame(edited_rows).to_numpy(dtype=object)
+
+    # Кнопка для применения изменений
+    col_apply, col_reset = st.columns(2)
+    with col_apply:
+        apply_changes = st.button(
+            "✅ Применить изменения",
+            key=f"apply_forecast_{selected_project}",
+            type="primary",
+        )
+    with col_reset:
+        reset_changes = st.button(
+            "🔄 Сбросить изменения", key=f"reset_forecast_{selected_project}"
+        )
+
+    # Обрабатываем сброс изменений
+    if reset_changes:
+        # Сбрасываем данные
+        st.session_state[f"forecast_edited_data_{selected_project}"] = project_df.copy()
+        project_for_reset = project_df.copy()
+        if "section" not in project_for_reset.columns:
+            project_for_reset["section"] = "—"
+        edit_df_reset = project_for_reset[
+            ["task name", "section", "plan start", "plan end", "budget plan"]
+        ].copy()
+        edit_df_reset["plan start"] = to_datetime_series(edit_df_reset["plan start"])
+        edit_df_reset["plan end"] = to_datetime_series(edit_df_reset["plan end"])
+        edit_df_reset["plan start"] = edit_df_reset["plan start"].dt.date
+        edit_df_reset["plan end"] = edit_df_reset["plan end"].dt.date
+        edit_df_reset["budget plan"] = (edit_df_reset["budget plan"].astype(float) / 1e6).round(2)
+        edit_df_reset.columns = [
+            "Задача",
+            "Раздел",
+            "План. начало",
+            "План. окончание",
+            "Плановый бюджет, млн руб.",
+        ]
+        st.session_state[f"forecast_edit_table_{selected_project}"] = (
+            edit_df_reset.copy()
+        )
+        st.success("🔄 Изменения сброшены!")
+        st.rerun()
+
+    # Сохраняем отредактированную таблицу в session_state
+    st.session_state[f"forecast_edit_table_{selected_project}"] = edited_df.copy()
+
+    # Получаем исходные данные проекта
+    current_data = st.session_state[f"forecast_edited_data_{selected_project}"].copy()
+
+    # Обновляем исходные данные с учетом изменений из отредактированной таблицы
+    updated_data = current_data.copy().reset_index(drop=True)
+    edited_df_reset = edited_df.reset_index(drop=True)
+
+    # Обновляем даты и бюджет по индексам (бюджет из млн руб. переводим в рубли)
+    if len(updated_data) == len(edited_df_reset):
+        # Обновляем даты - конвертируем из date обратно в datetime
+        if "План. начало" in edited_df_reset.columns:
+            updated_data["plan start"] = pd.to_datetime(
+                edited_df_reset["План. начало"], errors="coerce"
+            )
+        if "План. окончание" in edited_df_reset.columns:
+            updated_data["plan end"] = pd.to_datetime(
+                edited_df_reset["План. окончание"], errors="coerce"
+            )
+        budget_col = "Плановый бюджет, млн руб." if "Плановый бюджет, млн руб." in edited_df_reset.columns else "Плановый бюджет"
+        if budget_col in edited_df_reset.columns:
+            millions = pd.to_numeric(edited_df_reset[budget_col], errors="coerce")
+            updated_data["budget plan"] = (millions * 1e6).round(0)
+
+    # Применяем изменения при нажатии кнопки
+    if apply_changes:
+        # Сохраняем обновленные данные в session_state
+        st.session_state[f"forecast_edited_data_{selected_project}"] = updated_data
+        st.success("✅ Изменения применены! График обновлен.")
+
+    # ВСЕГДА используем актуальные данные из отредактированной таблицы для расчета
+    # Это позволяет видеть изменения сразу после применения
+    current_data = updated_data
+
+    # Рассчитываем прогнозный бюджет с актуальными данными
+    forecast_budget_df, error = calculate_forecast_budget(
+        df,
+        edited_data=current_data,
+        rule_name="default",
+        state=st.session_state.setdefault(f"forecast_engine_{selected_project}", {}),
+    )
+
+    # Перезапускаем только после применения изменений
+    if apply_changes:
+        st.rerun()
+
+    if error:
+        st.error(error)
+        return
+
+    if forecast_budget_df.empty:
+        st.info("Нет данных для построения графика прогнозного бюджета.")
+        return
+
+    # Группируем по месяцам для графика
+    monthly_forecast = (
+        forecast_budget_df.groupby("month", observed=True)
+        .agg({"forecast budget": "sum", "budget plan": "sum"})  # Для сравнения
+        .reset_index()
+    )
+
+    # Сортируем по месяцам
+    monthly_forecast = monthly_forecast.sort_values("month")
+
+    # Форматируем месяц для отображения
+    def format_month_display(period_val):
+        if pd.isna(period_val):
+            return "Н/Д"
+        try:
+            if isinstance(period_val, pd.Period):
+                month_num = period_val.month
+                year = period_val.year
+                RUSSIAN_MONTHS = {
+                    1: "Январь",
+                    2: "Февраль",
+                    3: "Март",
+                    4: "Апрель",
+                    5: "Май",
+                    6: "Июнь",
+                    7: "Июль",
+                    8: "Август",
+                    9: "Сентябрь",
+                    10: "Октябрь",
+                    11: "Ноябрь",
+                    12: "Декабрь",
+                }
+                return f"{RUSSIAN_MONTHS.get(month_num, 'Н/Д')} {year}"
+            return str(period_val)
+        except:
+            return str(period_val)
+
+    monthly_forecast["Месяц"] = monthly_forecast["month"].apply(format_month_display)
+    # Значения в млн руб. с точкой как десятичным разделителем
+    monthly_forecast["forecast budget млн"] = (monthly_forecast["forecast budget"] / 1e6).round(2)
+    monthly_forecast["budget plan млн"] = (monthly_forecast["budget plan"] / 1e6).round(2)
+
+    def _fmt_million_dot(x):
+        if x is None or (isinstance(x, float) and pd.isna(x)):
+            return ""
+        return f"{float(x):.2f}".replace(",", ".")
+
+    def _forecast_budget_chart():
+        # Создаем график (ось Y — млн руб.)
+        fig = go.Figure()
+
+        # Добавляем прогнозный бюджет
+        fig.add_trace(
+            go.Bar(
+                x=monthly_forecast["Месяц"],
+                y=monthly_forecast["forecast budget млн"],
+                name="Прогнозный бюджет",
+                marker_color="#06A77D",
+                text=monthly_forecast["forecast budget млн"].apply(
+                    lambda x: _fmt_million_dot(x) + " млн руб." if pd.notna(x) else ""
+                ),
+                textposition="outside",
+                textfont=dict(size=14, color="white"),
+            )
+        )
+
+        # Добавляем плановый бюджет для сравнения (линия)
+        fig.add_trace(
+            go.Scatter(
+                x=monthly_forecast["Месяц"],
+                y=monthly_forecast["budget plan млн"],
+                name="Плановый бюджет (сумма)",
+                mode="lines+markers",
+                line=dict(color="#F18F01", width=2),
+                marker=dict(size=8, color="#F18F01"),
+            )
+        )
+
+        fig.update_layout(
+            title=f"Прогнозный бюджет по месяцам (Проект: {selected_project})",
+            xaxis_title="Месяц",
+            yaxis_title="млн руб.",
+            hovermode="x unified",
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+            height=600,
+        )
+
+        return apply_chart_background(fig)
+
+    st.plotly_chart(
+        cached_figure(
+            "forecast_budget",
+            monthly_forecast,
+            (selected_project,),
+            _forecast_budget_chart,
+        ),
+        use_container_width=True,
+    )
+
+    # Сводная таблица — значения в млн руб. (пересчёт из рублей: / 1e6)
+    st.subheader("Сводная таблица прогнозного бюджета по месяцам")
+    summary_table = monthly_forecast[["Месяц", "forecast budget", "budget plan"]].copy()
+    summary_table.columns = ["Месяц", "Прогнозный бюджет, млн руб.", "Плановый бюджет (сумма), млн руб."]
+    summary_table["Прогнозный бюджет, млн руб."] = (
+        pd.to_numeric(summary_table["Прогнозный бюджет, млн руб."], errors="coerce").fillna(0) / 1e6
+    ).round(2)
+    summary_table["Плановый бюджет (сумма), млн руб."] = (
+        pd.to_numeric(summary_table["Плановый бюджет (сумма), млн руб."], errors="coerce").fillna(0) / 1e6
+    ).round(2)
+    summary_table["Прогнозный бюджет, млн руб."] = summary_table["Прогнозный бюджет, млн руб."].apply(
+        lambda x: f"{float(x):.2f}" if pd.notna(x) else "0.00"
+    )
+    summary_table["Плановый бюджет (сумма), млн руб."] = summary_table[
+        "Плановый бюджет (сумма), млн руб."
+    ].apply(lambda x: f"{float(x):.2f}" if pd.notna(x) else "0.00")
+    st.table(style_dataframe_for_dark_theme(summary_table))
+
+    # Детальная таблица — значения в млн руб. (пересчёт из рублей: / 1e6)
+    with st.expander(
+        "📋 Детальная таблица распределения прогнозного бюджета", expanded=False
+    ):
+        detail_table = forecast_budget_df[
+            [
+                "project name",
+                "section",
+                "task name",
+                "month",
+                "budget plan",
+                "forecast budget",
+            ]
+        ].copy()
+        detail_table["month"] = detail_table["month"].apply(format_month_display)
+        # Пересчёт в млн руб.: исходные колонки в рублях
+        detail_table["Плановый бюджет, млн руб."] = (
+            pd.to_numeric(detail_table["budget plan"], errors="coerce").fillna(0) / 1e6
+        ).round(2)
+        detail_table["Прогнозный бюджет, млн руб."] = (
+            pd.to_numeric(detail_table["forecast budget"], errors="coerce").fillna(0) / 1e6
+        ).round(2)
+        detail_table = detail_table.drop(columns=["budget plan", "forecast budget"], errors="ignore")
+        detail_table = detail_table.rename(columns={
+            "project name": "Проект",
+            "section": "Раздел",
+            "task name": "Задача",
+            "month": "Месяц",
+        })
+        # Формат отображения с точкой
+        detail_table["Плановый бюджет, млн руб."] = detail_table["Плановый бюджет, млн руб."].apply(
+            lambda x: f"{float(x):.2f}" if pd.notna(x) else "0.00"
+        )
+        detail_table["Прогнозный бюджет, млн руб."] = detail_table["Прогнозный бюджет, млн руб."].apply(
+            lambda x: f"{float(x):.2f}" if pd.notna(x) else "0.00"
+        )
+        detail_table = paginate_table(detail_table, key=f"forecast_detail_page_{selected_project}")
+        st.markdown(dark_table_to_html(detail_table), unsafe_allow_html=True)
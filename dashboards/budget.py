@@ -0,0 +1,2015 @@
+"""
+Бюджетные дашборды: БДДС по периодам и лотам, накопительный бюджет, БДР, бюджет план/факт.
+"""
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from config import RUSSIAN_MONTHS
+from dashboard_cache import cached_computation, cached_figure
+from filter_engine import apply_filters, filter_options
+from utils import (
+    get_russian_month_name,
+    apply_chart_background,
+    ensure_budget_columns,
+    ensure_date_columns,
+    style_dataframe_for_dark_theme,
+    budget_table_to_html,
+    format_million_rub,
+    to_datetime_series,
+)
+
+
+# ==================== DASHBOARD 6: Budget Plan/Fact/Reserve by Project by Period ====================
+def _format_budget_period(period_val):
+    """Подпись периода БДДС: «Январь 2025», «Q1 2025», «2025»."""
+    if pd.isna(period_val):
+        return "Н/Д"
+    if isinstance(period_val, pd.Period):
+        try:
+            if period_val.freqstr == "M" or period_val.freqstr.startswith(
+                "M"
+            ):  # Month
+                month_name = get_russian_month_name(period_val)
+                year = period_val.year
+                return f"{month_name} {year}"
+            elif period_val.freqstr == "Q" or period_val.freqstr.startswith(
+                "Q"
+            ):  # Quarter
+                return f"Q{period_val.quarter} {period_val.year}"
+            elif period_val.freqstr == "Y" or period_val.freqstr == "A-DEC":  # Year
+                return str(period_val.year)
+            else:
+                month_name = get_russian_month_name(period_val)
+                year = period_val.year
+                return f"{month_name} {year}"
+        except:
+            # Try parsing as string
+            period_str = str(period_val)
+            try:
+                if "-" in period_str:
+                    parts = period_str.split("-")
+                    if len(parts) >= 2:
+                        year = parts[0]
+                        month = parts[1]
+                        month_num = int(month)
+                        month_name = RUSSIAN_MONTHS.get(month_num, "")
+                        if month_name:
+                            return f"{month_name} {year}"
+            except:
+                pass
+            return str(period_val)
+    elif isinstance(period_val, str):
+        # Try parsing string like "2025-01"
+        try:
+            if "-" in period_val:
+                parts = period_val.split("-")
+                if len(parts) >= 2:
+                    year = parts[0]
+                    month = parts[1]
+                    month_num = int(month)
+                    month_name = RUSSIAN_MONTHS.get(month_num, "")
+                    if month_name:
+                        return f"{month_name} {year}"
+        except:
+            pass
+    return str(period_val)
+
+
+def _prepare_budget_by_period(
+    df, selected_project, selected_task, selected_section, period_type_en
+):
+    """
+    Подготовка данных БДДС (без отрисовки): фильтры, колонки периодов, числовые бюджеты,
+    сводки по периодам/проектам и по лотам. При невозможности построить отчёт — {"warning": текст}.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Apply filters (shared filter engine: bitmap AND, no full-frame copy)
+    filtered_df = apply_filters(
+        df,
+        {
+            "project name": selected_project,
+            "task name": selected_task,
+            "section": selected_section,
+        },
+    )
+
+    # Check for budget columns (нормализуем русские названия)
+    ensure_budget_columns(filtered_df)
+    has_budget = (
+        "budget plan" in filtered_df.columns and "budget fact" in filtered_df.columns
+    )
+
+    if not has_budget:
+        return {"warning": "Столбцы бюджета (budget plan, budget fact) не найдены в данных."}
+
+    # Determine adjusted budget column name
+    adjusted_budget_col = None
+    if "budget adjusted" in filtered_df.columns:
+        adjusted_budget_col = "budget adjusted"
+    elif "adjusted budget" in filtered_df.columns:
+        adjusted_budget_col = "adjusted budget"
+
+    # Determine period column and ensure it exists (create from plan end if missing)
+    ensure_date_columns(filtered_df)
+    if "plan end" in filtered_df.columns:
+        plan_end = to_datetime_series(filtered_df["plan end"])
+        mask = plan_end.notna()
+        if mask.any():
+            if "plan_month" not in filtered_df.columns:
+                filtered_df.loc[mask, "plan_month"] = plan_end.loc[mask].dt.to_period("M")
+            if "plan_quarter" not in filtered_df.columns:
+                filtered_df.loc[mask, "plan_quarter"] = plan_end.loc[mask].dt.to_period("Q")
+            if "plan_year" not in filtered_df.columns:
+                filtered_df.loc[mask, "plan_year"] = plan_end.loc[mask].dt.to_period("Y")
+
+    if period_type_en == "Month":
+        period_col = "plan_month"
+        period_label = "Месяц"
+    elif period_type_en == "Quarter":
+        period_col = "plan_quarter"
+        period_label = "Квартал"
+    else:
+        period_col = "plan_year"
+        period_label = "Год"
+
+    if period_col not in filtered_df.columns:
+        return {
+            "warning": f"Столбец периода '{period_col}' не найден. Убедитесь, что в данных есть колонка дат (например, «Конец План» / plan end)."
+        }
+
+    # Отклонение = факт - план (положительное — перерасход, красный; отрицательное — экономия, зелёный)
+    filtered_df["budget plan"] = pd.to_numeric(
+        filtered_df["budget plan"], errors="coerce"
+    )
+    filtered_df["budget fact"] = pd.to_numeric(
+        filtered_df["budget fact"], errors="coerce"
+    )
+    filtered_df["reserve budget"] = (
+        filtered_df["budget fact"] - filtered_df["budget plan"]
+    )
+
+    # Convert adjusted budget to numeric if it exists
+    if adjusted_budget_col:
+        filtered_df[adjusted_budget_col] = pd.to_numeric(
+            filtered_df[adjusted_budget_col], errors="coerce"
+        )
+
+    # Колонка для группировки по лотам (лот = section или колонка "лот"/"lot")
+    lot_col = "лот" if "лот" in filtered_df.columns else ("lot" if "lot" in filtered_df.columns else "section")
+    if lot_col not in filtered_df.columns:
+        lot_col = "section"  # fallback для группировки по лотам
+
+    # Group by period and project
+    agg_dict = {"budget plan": "sum", "budget fact": "sum", "reserve budget": "sum"}
+    if adjusted_budget_col:
+        agg_dict[adjusted_budget_col] = "sum"
+    budget_summary = (
+        filtered_df.groupby([period_col, "project name"], observed=True).agg(agg_dict).reset_index()
+    )
+    # Store original period values for sorting before formatting
+    budget_summary["period_original"] = budget_summary[period_col]
+    budget_summary[period_col] = budget_summary[period_col].apply(_format_budget_period)
+
+    # По лотам: группировка по периоду и лоту (section / лот / lot)
+    budget_summary_lot = None
+    lot_chart_data = None
+    if lot_col in filtered_df.columns:
+        agg_dict_lot = {"budget plan": "sum", "budget fact": "sum", "reserve budget": "sum"}
+        budget_summary_lot = (
+            filtered_df.groupby([period_col, lot_col], observed=True).agg(agg_dict_lot).reset_index()
+        )
+        budget_summary_lot["period_original"] = budget_summary_lot[period_col]
+        budget_summary_lot[period_col] = budget_summary_lot[period_col].apply(_format_budget_period)
+        # По лотам: ось Y = этапы (лоты), ось X = млн руб.
+        lot_chart_data = (
+            budget_summary_lot.groupby(lot_col, observed=True)
+            .agg({"budget plan": "sum", "budget fact": "sum", "reserve budget": "sum"})
+            .reset_index()
+        )
+        lot_chart_data = lot_chart_data.sort_values("budget plan", ascending=True)
+
+    return {
+        "adjusted_budget_col": adjusted_budget_col,
+        "period_col": period_col,
+        "period_label": period_label,
+        "lot_col": lot_col,
+        "budget_summary": budget_summary,
+        "budget_summary_lot": budget_summary_lot,
+        "lot_chart_data": lot_chart_data,
+    }
+
+
+def dashboard_budget_by_period(df):
+    st.header("💰 БДДС")
+    st.caption("Вид отображения: по месяцам или накопительно.")
+
+    # Filters row 1: Period and Project
+    col1, col2 = st.columns(2)
+
+    with col1:
+        period_type = st.selectbox(
+            "Группировать по", ["Месяц", "Квартал", "Год"], key="budget_period"
+        )
+        period_map = {"Месяц": "Month", "Квартал": "Quarter", "Год": "Year"}
+        period_type_en = period_map.get(period_type, "Month")
+
+    with col2:
+        if "project name" in df.columns:
+            projects = filter_options(df, "project name")
+            selected_project = st.selectbox(
+                "Фильтр по проекту", projects, key="budget_project"
+            )
+        else:
+            selected_project = "Все"
+
+    # Filters row 2: Task, Section
+    col3, col4 = st.columns(2)
+
+    with col3:
+        if "task name" in df.columns:
+            tasks = filter_options(df, "task name")
+            selected_task = st.selectbox("Фильтр по лоту", tasks, key="budget_task")
+        else:
+            selected_task = "Все"
+
+    with col4:
+        if "section" in df.columns:
+            sections = filter_options(df, "section")
+            selected_section = st.selectbox(
+                "Фильтр по этапу", sections, key="budget_section"
+            )
+        else:
+            selected_section = "Все"
+
+    # Filters row 3: Block
+    col6 = st.columns(1)[0]
+    with col6:
+        pass
+
+    # Filters row 4: View type (в фрагменте — без полного перезапуска) and Hide adjusted budget
+    col7, col8 = st.columns(2)
+    with col8:
+        hide_adjusted = st.checkbox(
+            "Скрыть скорректированный бюджет",
+            value=True,
+            key="budget_period_hide_adjusted",
+        )
+
+    # Filters row 5: Hide deviation
+    col9, col10 = st.columns(2)
+
+    with col9:
+        hide_reserve = st.checkbox(
+            "Скрыть отклонение", value=True, key="budget_period_hide_reserve"
+        )
+
+    # Подготовка данных кэшируется по (набор данных, фильтры): переключатели отображения
+    # («Скрыть отклонение», «Скрыть скорректированный бюджет», вид графика) её не пересчитывают
+    prepared = cached_computation(
+        "budget_by_period",
+        df,
+        (selected_project, selected_task, selected_section, period_type_en),
+        lambda: _prepare_budget_by_period(
+            df, selected_project, selected_task, selected_section, period_type_en
+        ),
+    )
+    if "warning" in prepared:
+        st.warning(prepared["warning"])
+        return
+    adjusted_budget_col = prepared["adjusted_budget_col"]
+    period_col = prepared["period_col"]
+    period_label = prepared["period_label"]
+    lot_col = prepared["lot_col"]
+    budget_summary = prepared["budget_summary"]
+
+    tab_period, tab_lot = st.tabs(["По периодам", "По лотам"])
+
+    with tab_period:
+        @st.fragment
+        def _budget_period_chart():
+            view_type = st.selectbox(
+                "Вид отображения", ["По месяцам", "Накопительно"], key="budget_period_view"
+            )
+            if selected_project != "Все":
+                project_data = budget_summary[
+                    budget_summary["project name"] == selected_project
+                ].copy()
+            else:
+                agg_dict_all = {
+                    "budget plan": "sum",
+                    "budget fact": "sum",
+                    "reserve budget": "sum",
+                    "period_original": "first",
+                }
+                if adjusted_budget_col:
+                    agg_dict_all[adjusted_budget_col] = "sum"
+                project_data = (
+                    budget_summary.groupby(period_col, observed=True).agg(agg_dict_all).reset_index()
+                )
+            if project_data["period_original"].dtype == "object":
+                try:
+                    project_data["period_sort"] = project_data["period_original"].apply(
+                        lambda x: (
+                            x if isinstance(x, pd.Period)
+                            else (pd.Period(str(x), freq=period_type_en[0]) if pd.notna(x) else None)
+                        )
+                    )
+                    project_data = project_data.sort_values("period_sort").copy()
+                    project_data = project_data.drop("period_sort", axis=1)
+                except Exception:
+                    project_data = project_data.sort_values("period_original").copy()
+            else:
+                project_data = project_data.sort_values("period_original").copy()
+            if view_type == "Накопительно":
+                project_data["budget plan"] = project_data["budget plan"].cumsum()
+                project_data["budget fact"] = project_data["budget fact"].cumsum()
+                project_data["reserve budget"] = project_data["reserve budget"].cumsum()
+                if adjusted_budget_col and adjusted_budget_col in project_data.columns:
+                    project_data[adjusted_budget_col] = project_data[adjusted_budget_col].cumsum()
+                title_suffix = " (накопительно)"
+            else:
+                title_suffix = ""
+            def _budget_by_period_chart():
+                fig = go.Figure()
+                fig.add_trace(
+                    go.Bar(
+                        x=project_data[period_col],
+                        y=project_data["budget plan"].div(1e6),
+                        name="Бюджет План",
+                        marker_color="#2E86AB",
+                        text=project_data["budget plan"].apply(format_million_rub),
+                        textposition="outside",
+                        textfont=dict(size=14, color="white"),
+                        customdata=project_data["budget plan"].apply(format_million_rub),
+                        hovertemplate="<b>%{x}</b><br>Бюджет План: %{customdata}<br><extra></extra>",
+                    )
+                )
+                fig.add_trace(
+                    go.Bar(
+                        x=project_data[period_col],
+                        y=project_data["budget fact"].div(1e6),
+                        name="Бюджет Факт",
+                        marker_color="#A23B72",
+                        text=project_data["budget fact"].apply(format_million_rub),
+                        textposition="outside",
+                        textfont=dict(size=14, color="white"),
+                        customdata=project_data["budget fact"].apply(format_million_rub),
+                        hovertemplate="<b>%{x}</b><br>Бюджет Факт: %{customdata}<br><extra></extra>",
+                    )
+                )
+                if not hide_reserve:
+                    dev_vals = project_data["reserve budget"].div(1e6)
+                    dev_colors = ["#e74c3c" if v >= 0 else "#27ae60" for v in project_data["reserve budget"]]
+                    fig.add_trace(
+                        go.Bar(
+                            x=project_data[period_col],
+                            y=dev_vals,
+                            name="Отклонение",
+                            marker_color=dev_colors,
+                            text=project_data["reserve budget"].apply(format_million_rub),
+                            textposition="outside",
+                            textfont=dict(size=14, color="white"),
+                            customdata=project_data["reserve budget"].apply(format_million_rub),
+                            hovertemplate="<b>%{x}</b><br>Отклонение: %{customdata}<br><extra></extra>",
+                        )
+                    )
+                if (
+                    adjusted_budget_col
+                    and adjusted_budget_col in project_data.columns
+                    and not hide_adjusted
+                ):
+                    fig.add_trace(
+                        go.Bar(
+                            x=project_data[period_col],
+                            y=project_data[adjusted_budget_col].div(1e6),
+                            name="Скорректированный бюджет",
+                            marker_color="#F18F01",
+                            text=project_data[adjusted_budget_col].apply(format_million_rub),
+                            textposition="outside",
+                            textfont=dict(size=14, color="white"),
+                            customdata=project_data[adjusted_budget_col].apply(format_million_rub),
+                            hovertemplate="<b>%{x}</b><br>Скорректированный бюджет: %{customdata}<br><extra></extra>",
+                        )
+                    )
+                fig.update_layout(
+                    title=f"БДДС{title_suffix}",
+                    xaxis_title=period_label,
+                    yaxis_title="млн руб.",
+                    barmode="group",
+                    xaxis=dict(tickangle=-45),
+                )
+                return apply_chart_background(fig)
+
+            st.plotly_chart(
+                cached_figure(
+                    "budget_by_period",
+                    project_data,
+                    (period_col, period_label, title_suffix, hide_reserve, hide_adjusted, adjusted_budget_col),
+                    _budget_by_period_chart,
+                ),
+                use_container_width=True,
+            )
+
+        _budget_period_chart()
+
+        # Summary table — суммы в млн руб.
+        st.subheader(f"Сводка бюджета по {period_label.lower()}")
+        table_display = budget_summary.drop(columns=["period_original"], errors="ignore").copy()
+        budget_cols_table = ["budget plan", "budget fact", "reserve budget"]
+        if adjusted_budget_col and adjusted_budget_col in table_display.columns:
+            budget_cols_table = budget_cols_table + [adjusted_budget_col]
+        for col in budget_cols_table:
+            if col in table_display.columns:
+                table_display[col] = (table_display[col] / 1e6).round(2).apply(
+                    lambda x: f"{float(x):.2f} млн руб." if pd.notna(x) else ""
+                )
+        table_display = table_display.rename(columns={
+            "budget plan": "Бюджет План, млн руб.",
+            "budget fact": "Бюджет Факт, млн руб.",
+            "reserve budget": "Отклонение, млн руб.",
+            **({adjusted_budget_col: "Скорр. бюджет, млн руб."} if adjusted_budget_col and adjusted_budget_col in table_display.columns else {}),
+        })
+        if period_col in table_display.columns:
+            table_display = table_display.rename(columns={period_col: period_label})
+        st.markdown(
+            budget_table_to_html(table_display, finance_deviation_column="Отклонение, млн руб."),
+            unsafe_allow_html=True,
+        )
+
+    with tab_lot:
+        # По лотам: группировка по периоду и лоту (section / лот / lot)
+        budget_summary_lot = prepared["budget_summary_lot"]
+        if budget_summary_lot is None:
+            st.info("Нет колонки для группировки по лотам (section / лот).")
+        else:
+            lot_chart_data = prepared["lot_chart_data"]
+            hide_reserve_lot = st.checkbox(
+                "Скрыть отклонение", value=True, key="budget_lot_hide_reserve"
+            )
+            def _budget_by_lot_chart():
+                fig_lot = go.Figure()
+                fig_lot.add_trace(
+                    go.Bar(
+                        y=lot_chart_data[lot_col],
+                        x=lot_chart_data["budget plan"].div(1e6),
+                        name="Бюджет План",
+                        marker_color="#2E86AB",
+                        text=lot_chart_data["budget plan"].apply(format_million_rub),
+                        textposition="outside",
+                        textfont=dict(size=18, color="white"),
+                        orientation="h",
+                    )
+                )
+                fig_lot.add_trace(
+                    go.Bar(
+                        y=lot_chart_data[lot_col],
+                        x=lot_chart_data["budget fact"].div(1e6),
+                        name="Бюджет Факт",
+                        marker_color="#A23B72",
+                        text=lot_chart_data["budget fact"].apply(format_million_rub),
+                        textposition="outside",
+                        textfont=dict(size=18, color="white"),
+                        orientation="h",
+                    )
+                )
+                if not hide_reserve_lot:
+                    dev_colors_lot = ["#e74c3c" if v >= 0 else "#27ae60" for v in lot_chart_data["reserve budget"]]
+                    fig_lot.add_trace(
+                        go.Bar(
+                            y=lot_chart_data[lot_col],
+                            x=lot_chart_data["reserve budget"].div(1e6),
+                            name="Отклонение",
+                            marker_color=dev_colors_lot,
+                            text=lot_chart_data["reserve budget"].apply(format_million_rub),
+                            textposition="outside",
+                            textfont=dict(size=18, color="white"),
+                            orientation="h",
+                        )
+                    )
+                fig_lot.update_layout(
+                    title=dict(text="План/факт/отклонение по лотам", font=dict(size=24)),
+                    xaxis_title="млн руб.",
+                    yaxis_title="Этапы",
+                    barmode="group",
+                    xaxis=dict(tickangle=0, tickfont=dict(size=16)),
+                    yaxis=dict(tickfont=dict(size=16), categoryorder="trace"),
+                    legend=dict(font=dict(size=18)),
+                    height=max(400, len(lot_chart_data) * 44),
+                )
+                return apply_chart_background(fig_lot)
+
+            st.plotly_chart(
+                cached_figure(
+                    "budget_by_lot",
+                    lot_chart_data,
+                    (lot_col, hide_reserve_lot),
+                    _budget_by_lot_chart,
+                ),
+                use_container_width=True,
+            )
+
+            st.subheader("Сводка бюджета по лотам")
+            table_lot = budget_summary_lot.drop(columns=["period_original"], errors="ignore").copy()
+            for col in ["budget plan", "budget fact", "reserve budget"]:
+                if col in table_lot.columns:
+                    table_lot[col] = (table_lot[col] / 1e6).round(2).apply(
+                        lambda x: f"{float(x):.2f} млн руб." if pd.notna(x) else ""
+                    )
+            rename_cols = {
+                "budget plan": "Бюджет План, млн руб.",
+                "budget fact": "Бюджет Факт, млн руб.",
+                "reserve budget": "Отклонение, млн руб.",
+            }
+            if lot_col in table_lot.columns:
+                rename_cols[lot_col] = "Лот"
+            table_lot = table_lot.rename(columns=rename_cols)
+            st.markdown(
+                budget_table_to_html(table_lot, finance_deviation_column="Отклонение, млн руб."),
+                unsafe_allow_html=True,
+            )
+
+
+# ==================== DASHBOARD 6.5: Budget Cumulative ====================
+def dashboard_budget_cumulative(df):
+    st.header("💰 БДДС накопительно")
+
+    # Filters row 1: Period and Project
+    col1, col2 = st.columns(2)
+
+    with col1:
+        period_type = st.selectbox(
+            "Группировать по", ["Месяц", "Квартал", "Год"], key="budget_cum_period"
+        )
+        period_map = {"Месяц": "Month", "Квартал": "Quarter", "Год": "Year"}
+        period_type_en = period_map.get(period_type, "Month")
+
+    with col2:
+        if "project name" in df.columns:
+            projects = filter_options(df, "project name")
+            selected_project = st.selectbox(
+                "Фильтр по проекту", projects, key="budget_cum_project"
+            )
+        else:
+            selected_project = "Все"
+
+    # Filters row 2: Task and Section
+    col3, col4 = st.columns(2)
+
+    with col3:
+        # Task filter
+        if "task name" in df.columns:
+            tasks = filter_options(df, "task name")
+            selected_task = st.selectbox(
+                "Фильтр по лоту", tasks, key="budget_cum_task"
+            )
+        else:
+            selected_task = "Все"
+
+    with col4:
+        # Section filter (блоки)
+        if "section" in df.columns:
+            sections = filter_options(df, "section")
+            selected_section = st.selectbox(
+                "Фильтр по этапу", sections, key="budget_cum_section"
+            )
+        else:
+            selected_section = "Все"
+
+    # Apply filters
+    filtered_df = apply_filters(
+        df,
+        {
+            "project name": selected_project,
+            "task name": selected_task,
+            "section": selected_section,
+        },
+    )
+
+    # Check for budget columns (нормализуем русские названия)
+    ensure_budget_columns(filtered_df)
+    has_budget = (
+        "budget plan" in filtered_df.columns and "budget fact" in filtered_df.columns
+    )
+
+    if not has_budget:
+        st.warning("Столбцы бюджета (budget plan, budget fact) не найдены в данных.")
+        return
+
+    # Determine adjusted budget column name
+    adjusted_budget_col = None
+    if "budget adjusted" in filtered_df.columns:
+        adjusted_budget_col = "budget adjusted"
+    elif "adjusted budget" in filtered_df.columns:
+        adjusted_budget_col = "adjusted budget"
+
+    # Determine period column
+    if period_type_en == "Month":
+        period_col = "plan_month"
+        period_label = "Месяц"
+    elif period_type_en == "Quarter":
+        period_col = "plan_quarter"
+        period_label = "Квартал"
+    else:
+        period_col = "plan_year"
+        period_label = "Год"
+
+    if period_col not in filtered_df.columns:
+        st.warning(f"Столбец периода '{period_col}' не найден.")
+        return
+
+    # Convert to numeric
+    filtered_df["budget plan"] = pd.to_numeric(
+        filtered_df["budget plan"], errors="coerce"
+    )
+    filtered_df["budget fact"] = pd.to_numeric(
+        filtered_df["budget fact"], errors="coerce"
+    )
+    if adjusted_budget_col:
+        filtered_df[adjusted_budget_col] = pd.to_numeric(
+            filtered_df[adjusted_budget_col], errors="coerce"
+        )
+
+    # Group by period and project
+    agg_dict = {"budget plan": "sum", "budget fact": "sum"}
+    if adjusted_budget_col:
+        agg_dict[adjusted_budget_col] = "sum"
+
+    budget_summary = (
+        filtered_df.groupby([period_col, "project name"], observed=True).agg(agg_dict).reset_index()
+    )
+
+    # Format period for display
+    def format_period_display(period_val):
+        if pd.isna(period_val):
+            return "Н/Д"
+        if isinstance(period_val, pd.Period):
+            try:
+                if period_val.freqstr == "M" or period_val.freqstr.startswith(
+                    "M"
+                ):  # Month
+                    month_name = get_russian_month_name(period_val)
+                    year = period_val.year
+                    return f"{month_name} {year}"
+                elif period_val.freqstr == "Q" or period_val.freqstr.startswith(
+                    "Q"
+                ):  # Quarter
+                    return f"Q{period_val.quarter} {period_val.year}"
+                elif period_val.freqstr == "Y" or period_val.freqstr == "A-DEC":  # Year
+                    return str(period_val.year)
+                else:
+                    month_name = get_russian_month_name(period_val)
+                    year = period_val.year
+                    return f"{month_name} {year}"
+            except:
+                # Try parsing as string
+                period_str = str(period_val)
+                try:
+                    if "-" in period_str:
+                        parts = period_str.split("-")
+                        if len(parts) >= 2:
+                            year = parts[0]
+                            month = parts[1]
+                            month_num = int(month)
+                            month_name = RUSSIAN_MONTHS.get(month_num, "")
+                            if month_name:
+                                return f"{month_name} {year}"
+                except:
+                    pass
+                return str(period_val)
+        elif isinstance(period_val, str):
+            # Try parsing string like "2025-01"
+            try:
+                if "-" in period_val:
+                    parts = period_val.split("-")
+                    if len(parts) >= 2:
+                        year = parts[0]
+                        month = parts[1]
+                        month_num = int(month)
+                        month_name = RUSSIAN_MONTHS.get(month_num, "")
+                        if month_name:
+                            return f"{month_name} {year}"
+            except:
+                pass
+        return str(period_val)
+
+    budget_summary[period_col] = budget_summary[period_col].apply(format_period_display)
+
+    # Aggregate data
+    if selected_project != "Все":
+        project_data = budget_summary[
+            budget_summary["project name"] == selected_project
+        ]
+    else:
+        agg_dict_all = {"budget plan": "sum", "budget fact": "sum"}
+        if adjusted_budget_col:
+            agg_dict_all[adjusted_budget_col] = "sum"
+        project_data = (
+            budget_summary.groupby(period_col, observed=True).agg(agg_dict_all).reset_index()
+        )
+
+    # Sort data by period to ensure correct cumulative calculation
+    project_data_sorted = project_data.sort_values(period_col).copy()
+
+    # Calculate cumulative sums
+    project_data_sorted["budget plan_cum"] = project_data_sorted["budget plan"].cumsum()
+    project_data_sorted["budget fact_cum"] = project_data_sorted["budget fact"].cumsum()
+    if adjusted_budget_col and adjusted_budget_col in project_data_sorted.columns:
+        project_data_sorted[f"{adjusted_budget_col}_cum"] = project_data_sorted[
+            adjusted_budget_col
+        ].cumsum()
+
+    def _budget_cumulative_chart():
+        # Create cumulative chart (в млн руб., два знака после запятой)
+        fig_cum = go.Figure()
+        fig_cum.add_trace(
+            go.Bar(
+                x=project_data_sorted[period_col],
+                y=project_data_sorted["budget plan_cum"].div(1e6),
+                name="Бюджет План (накопительно)",
+                marker_color="#2E86AB",
+                text=project_data_sorted["budget plan_cum"].apply(format_million_rub),
+                textposition="outside",
+                textfont=dict(size=14, color="white"),
+            )
+        )
+        fig_cum.add_trace(
+            go.Bar(
+                x=project_data_sorted[period_col],
+                y=project_data_sorted["budget fact_cum"].div(1e6),
+                name="Бюджет Факт (накопительно)",
+                marker_color="#A23B72",
+                text=project_data_sorted["budget fact_cum"].apply(format_million_rub),
+                textposition="outside",
+                textfont=dict(size=14, color="white"),
+            )
+        )
+
+        # Add adjusted budget cumulative if available
+        if adjusted_budget_col and adjusted_budget_col in project_data_sorted.columns:
+            fig_cum.add_trace(
+                go.Bar(
+                    x=project_data_sorted[period_col],
+                    y=project_data_sorted[f"{adjusted_budget_col}_cum"].div(1e6),
+                    name="Скорректированный бюджет (накопительно)",
+                    marker_color="#F18F01",
+                    text=project_data_sorted[f"{adjusted_budget_col}_cum"].apply(format_million_rub),
+                    textposition="outside",
+                    textfont=dict(size=14, color="white"),
+                )
+            )
+
+        fig_cum.update_layout(
+            title="БДДС накопительно",
+            xaxis_title=period_label,
+            yaxis_title="млн руб.",
+            barmode="group",
+            xaxis=dict(tickangle=-45),
+        )
+        return apply_chart_background(fig_cum)
+
+    st.plotly_chart(
+        cached_figure(
+            "budget_cumulative",
+            project_data_sorted,
+            (period_col, period_label, adjusted_budget_col),
+            _budget_cumulative_chart,
+        ),
+        use_container_width=True,
+    )
+
+    # Summary table with cumulative data (млн руб., два знака после запятой)
+    st.subheader(f"Сводка бюджета (накопительно) по {period_label.lower()}")
+    summary_cum = project_data_sorted[
+        [period_col, "budget plan_cum", "budget fact_cum"]
+    ].copy()
+    if (
+        adjusted_budget_col
+        and f"{adjusted_budget_col}_cum" in project_data_sorted.columns
+    ):
+        summary_cum[f"{adjusted_budget_col}_cum"] = project_data_sorted[
+            f"{adjusted_budget_col}_cum"
+        ]
+    # Переводим в млн руб. и форматируем с двумя знаками
+    summary_cum["budget plan_cum"] = (summary_cum["budget plan_cum"] / 1e6).round(2)
+    summary_cum["budget fact_cum"] = (summary_cum["budget fact_cum"] / 1e6).round(2)
+    if adjusted_budget_col and f"{adjusted_budget_col}_cum" in summary_cum.columns:
+        summary_cum[f"{adjusted_budget_col}_cum"] = (summary_cum[f"{adjusted_budget_col}_cum"] / 1e6).round(2)
+    for c in ["budget plan_cum", "budget fact_cum"] + ([f"{adjusted_budget_col}_cum"] if adjusted_budget_col and f"{adjusted_budget_col}_cum" in summary_cum.columns else []):
+        if c in summary_cum.columns:
+            summary_cum[c] = summary_cum[c].apply(lambda x: f"{float(x):.2f}" if pd.notna(x) else "")
+    summary_cum.columns = [
+        period_label,
+        "Бюджет План (накопительно), млн руб.",
+        "Бюджет Факт (накопительно), млн руб.",
+    ] + (
+        ["Скорр. бюджет (накопительно), млн руб."]
+        if adjusted_budget_col
+        and f"{adjusted_budget_col}_cum" in project_data_sorted.columns
+        else []
+    )
+    st.table(style_dataframe_for_dark_theme(summary_cum))
+
+
+# ==================== DASHBOARD 7: Budget Plan/Fact/Reserve by Section by Period ====================
+def dashboard_budget_by_section(df):
+    st.header("💰 БДДС по лотам")
+    st.caption("Вид отображения: по месяцам или накопительно.")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        period_type = st.selectbox(
+            "Группировать по", ["Месяц", "Квартал", "Год"], key="budget_section_period"
+        )
+        period_map = {"Месяц": "Month", "Квартал": "Quarter", "Год": "Year"}
+        period_type_en = period_map.get(period_type, "Month")
+
+    with col2:
+        if "section" in df.columns:
+            sections = filter_options(df, "section")
+            selected_section = st.selectbox(
+                "Фильтр по этапу", sections, key="budget_section"
+            )
+        else:
+            selected_section = "Все"
+
+    with col3:
+        pass
+
+    # Apply filters
+    filtered_df = apply_filters(df, {"section": selected_section})
+
+    # Check for budget columns (нормализуем русские названия)
+    ensure_budget_columns(filtered_df)
+    has_budget = (
+        "budget plan" in filtered_df.columns and "budget fact" in filtered_df.columns
+    )
+
+    if not has_budget:
+        st.warning("Столбцы бюджета (budget plan, budget fact) не найдены в данных.")
+        return
+
+    # Determine period column
+    if period_type_en == "Month":
+        period_col = "plan_month"
+        period_label = "Месяц"
+    elif period_type_en == "Quarter":
+        period_col = "plan_quarter"
+        period_label = "Квартал"
+    else:
+        period_col = "plan_year"
+        period_label = "Год"
+
+    if period_col not in filtered_df.columns:
+        st.warning(f"Столбец периода '{period_col}' не найден.")
+        return
+
+    # Отклонение = факт - план (положительное — перерасход, красный; отрицательное — экономия, зелёный)
+    filtered_df["budget plan"] = pd.to_numeric(
+        filtered_df["budget plan"], errors="coerce"
+    )
+    filtered_df["budget fact"] = pd.to_numeric(
+        filtered_df["budget fact"], errors="coerce"
+    )
+    filtered_df["reserve budget"] = (
+        filtered_df["budget fact"] - filtered_df["budget plan"]
+    )
+
+    # Group by period and section
+    budget_summary = (
+        filtered_df.groupby([period_col, "section"], observed=True)
+        .agg({"budget plan": "sum", "budget fact": "sum", "reserve budget": "sum"})
+        .reset_index()
+    )
+
+    # Format period for display
+    def format_period_display(period_val):
+        if pd.isna(period_val):
+            return "Н/Д"
+        if isinstance(period_val, pd.Period):
+            try:
+                if period_val.freqstr == "M" or period_val.freqstr.startswith(
+                    "M"
+                ):  # Month
+                    month_name = get_russian_month_name(period_val)
+                    year = period_val.year
+                    return f"{month_name} {year}"
+                elif period_val.freqstr == "Q" or period_val.freqstr.startswith(
+                    "Q"
+                ):  # Quarter
+                    return f"Q{period_val.quarter} {period_val.year}"
+                elif period_val.freqstr == "Y" or period_val.freqstr == "A-DEC":  # Year
+                    return str(period_val.year)
+                else:
+                    month_name = get_russian_month_name(period_val)
+                    year = period_val.year
+                    return f"{month_name} {year}"
+            except:
+                # Try parsing as string
+                period_str = str(period_val)
+                try:
+                    if "-" in period_str:
+                        parts = period_str.split("-")
+                        if len(parts) >= 2:
+                            year = parts[0]
+                            month = parts[1]
+                            month_num = int(month)
+                            month_name = RUSSIAN_MONTHS.get(month_num, "")
+                            if month_name:
+                                return f"{month_name} {year}"
+                except:
+                    pass
+                return str(period_val)
+        elif isinstance(period_val, str):
+            # Try parsing string like "2025-01"
+            try:
+                if "-" in period_val:
+                    parts = period_val.split("-")
+                    if len(parts) >= 2:
+                        year = parts[0]
+                        month = parts[1]
+                        month_num = int(month)
+                        month_name = RUSSIAN_MONTHS.get(month_num, "")
+                        if month_name:
+                            return f"{month_name} {year}"
+            except:
+                pass
+        return str(period_val)
+
+    # Store original period values for sorting before formatting
+    budget_summary["period_original"] = budget_summary[period_col]
+    budget_summary[period_col] = budget_summary[period_col].apply(format_period_display)
+
+    # Checkbox to hide/show deviation
+    hide_reserve = st.checkbox(
+        "Скрыть отклонение", value=True, key="budget_section_hide_reserve"
+    )
+
+    @st.fragment
+    def _budget_section_chart():
+        if selected_section != "Все":
+            section_data = budget_summary[
+                budget_summary["section"] == selected_section
+            ].copy()
+            if section_data["period_original"].dtype == "object":
+                try:
+                    section_data["period_sort"] = section_data["period_original"].apply(
+                        lambda x: (
+                            x if isinstance(x, pd.Period)
+                            else (pd.Period(str(x), freq=period_type_en[0]) if pd.notna(x) else None)
+                        )
+                    )
+                    section_data = section_data.sort_values("period_sort").copy()
+                    section_data = section_data.drop("period_sort", axis=1)
+                except Exception:
+                    section_data = section_data.sort_values("period_original").copy()
+            else:
+                section_data = section_data.sort_values("period_original").copy()
+            view_type = st.selectbox(
+                "Вид отображения", ["По месяцам", "Накопительно"], key="budget_section_view"
+            )
+            if view_type == "Накопительно":
+                section_data = section_data.copy()
+                section_data["budget plan"] = section_data["budget plan"].cumsum()
+                section_data["budget fact"] = section_data["budget fact"].cumsum()
+                section_data["reserve budget"] = section_data["reserve budget"].cumsum()
+                title_suffix = " (накопительно)"
+            else:
+                title_suffix = ""
+            fig = go.Figure()
+            fig.add_trace(
+                go.Bar(
+                    x=section_data[period_col],
+                    y=section_data["budget plan"].div(1e6),
+                    name="Бюджет План",
+                    marker_color="#2E86AB",
+                    text=section_data["budget plan"].apply(format_million_rub),
+                    textposition="outside",
+                    textfont=dict(size=18, color="white"),
+                )
+            )
+            fig.add_trace(
+                go.Bar(
+                    x=section_data[period_col],
+                    y=section_data["budget fact"].div(1e6),
+                    name="Бюджет Факт",
+                    marker_color="#A23B72",
+                    text=section_data["budget fact"].apply(format_million_rub),
+                    textposition="outside",
+                    textfont=dict(size=18, color="white"),
+                )
+            )
+            if not hide_reserve:
+                dev_colors_sec = ["#e74c3c" if v >= 0 else "#27ae60" for v in section_data["reserve budget"]]
+                fig.add_trace(
+                    go.Bar(
+                        x=section_data[period_col],
+                        y=section_data["reserve budget"].div(1e6),
+                        name="Отклонение",
+                        marker_color=dev_colors_sec,
+                        text=section_data["reserve budget"].apply(format_million_rub),
+                        textposition="outside",
+                        textfont=dict(size=18, color="white"),
+                    )
+                )
+            fig.update_layout(
+                title=dict(text=f"План/факт/отклонение по лотам{title_suffix}", font=dict(size=24)),
+                xaxis_title=dict(text=period_label, font=dict(size=20)),
+                yaxis_title=dict(text="млн руб.", font=dict(size=20)),
+                barmode="group",
+                xaxis=dict(tickangle=0, tickfont=dict(size=16)),
+                yaxis=dict(tickfont=dict(size=16)),
+                legend=dict(font=dict(size=18)),
+                height=600,
+            )
+        else:
+            # Все этапы: ось Y = этапы, ось X = млн руб.
+            section_chart_data = (
+                budget_summary.groupby("section", observed=True)
+                .agg({"budget plan": "sum", "budget fact": "sum", "reserve budget": "sum"})
+                .reset_index()
+            )
+            section_chart_data = section_chart_data.sort_values("budget plan", ascending=True)
+            fig = go.Figure()
+            fig.add_trace(
+                go.Bar(
+                    y=section_chart_data["section"],
+                    x=section_chart_data["budget plan"].div(1e6),
+                    name="Бюджет План",
+                    marker_color="#2E86AB",
+                    text=section_chart_data["budget plan"].apply(format_million_rub),
+                    textposition="outside",
+                    textfont=dict(size=18, color="white"),
+                    orientation="h",
+                )
+            )
+            fig.add_trace(
+                go.Bar(
+                    y=section_chart_data["section"],
+                    x=section_chart_data["budget fact"].div(1e6),
+                    name="Бюджет Факт",
+                    marker_color="#A23B72",
+                    text=section_chart_data["budget fact"].apply(format_million_rub),
+                    textposition="outside",
+                    textfont=dict(size=18, color="white"),
+                    orientation="h",
+                )
+            )
+            if not hide_reserve:
+                dev_colors_sec = ["#e74c3c" if v >= 0 else "#27ae60" for v in section_chart_data["reserve budget"]]
+                fig.add_trace(
+                    go.Bar(
+                        y=section_chart_data["section"],
+                        x=section_chart_data["reserve budget"].div(1e6),
+                        name="Отклонение",
+                        marker_color=dev_colors_sec,
+                        text=section_chart_data["reserve budget"].apply(format_million_rub),
+                        textposition="outside",
+                        textfont=dict(size=18, color="white"),
+                        orientation="h",
+                    )
+                )
+            fig.update_layout(
+                title=dict(text="План/факт/отклонение по лотам", font=dict(size=24)),
+                xaxis_title=dict(text="млн руб.", font=dict(size=20)),
+                yaxis_title=dict(text="Этапы", font=dict(size=20)),
+                barmode="group",
+                xaxis=dict(tickangle=0, tickfont=dict(size=16)),
+                yaxis=dict(tickfont=dict(size=16), categoryorder="trace order"),
+                legend=dict(font=dict(size=18)),
+                height=max(400, len(section_chart_data) * 44),
+            )
+        fig = apply_chart_background(fig)
+        st.plotly_chart(fig, use_container_width=True)
+
+    _budget_section_chart()
+
+    # Summary table — в млн руб., два знака после запятой
+    st.subheader("Сводка бюджета по периоду")
+    table_section = budget_summary.drop(columns=["period_original"], errors="ignore").copy()
+    for col in ["budget plan", "budget fact", "reserve budget"]:
+        if col in table_section.columns:
+            table_section[col] = (table_section[col] / 1e6).round(2).apply(
+                lambda x: f"{float(x):.2f} млн руб." if pd.notna(x) else ""
+            )
+    table_section = table_section.rename(columns={
+        "budget plan": "Бюджет План, млн руб.",
+        "budget fact": "Бюджет Факт, млн руб.",
+        "reserve budget": "Отклонение, млн руб.",
+    })
+    st.markdown(
+        budget_table_to_html(table_section, finance_deviation_column="Отклонение, млн руб."),
+        unsafe_allow_html=True,
+    )
+
+
+# ==================== DASHBOARD: БДР (бюджет доходов и расходов) ====================
+def _format_bdr_period(period_val):
+    """Подпись периода БДР: «Январь 2025», «Q1 2025» или период как есть."""
+    if pd.isna(period_val):
+        return "Н/Д"
+    if isinstance(period_val, pd.Period):
+        try:
+            if getattr(period_val, "freqstr", "") and ("M" in str(period_val.freqstr) or str(period_val.freqstr).startswith("M")):
+                return f"{get_russian_month_name(period_val)} {period_val.year}"
+            if getattr(period_val, "freqstr", "") and "Q" in str(period_val.freqstr):
+                return f"Q{period_val.quarter} {period_val.year}"
+            return str(period_val)
+        except Exception:
+            return str(period_val)
+    return str(period_val)
+
+
+def _prepare_bdr(
+    df,
+    revenue_col,
+    expense_col,
+    period_col,
+    selected_project,
+    selected_task,
+    selected_section,
+):
+    """
+    Подготовка данных БДР (без отрисовки): фильтры и суммы доходов, расходов и сальдо
+    по периоду. Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Лот — task name, а без неё колонка лота/этапа (как в выборе лота в dashboard_bdr)
+    lot_col = "task name"
+    if lot_col not in df.columns:
+        lot_col = "лот" if "лот" in df.columns else ("lot" if "lot" in df.columns else "section")
+    selections = {"project name": selected_project, lot_col: selected_task}
+    if lot_col != "section" or selected_task == "Все":
+        selections["section"] = selected_section
+    filtered_df = apply_filters(df, selections)
+    if lot_col == "section" and selected_task != "Все":
+        # Лот и этап выбираются по одной колонке — строка должна подходить под оба выбора
+        filtered_df = apply_filters(filtered_df, {"section": selected_section})
+
+    filtered_df["_revenue"] = pd.to_numeric(filtered_df[revenue_col], errors="coerce")
+    filtered_df["_expense"] = pd.to_numeric(filtered_df[expense_col], errors="coerce")
+    filtered_df["_result"] = filtered_df["_revenue"] - filtered_df["_expense"]
+
+    agg_dict = {"_revenue": "sum", "_expense": "sum", "_result": "sum"}
+    bdr_summary = (
+        filtered_df.groupby(period_col, observed=True).agg(agg_dict).reset_index()
+    )
+    bdr_summary = bdr_summary.rename(
+        columns={"_revenue": "Доходы", "_expense": "Расходы", "_result": "Результат (сальдо)"}
+    )
+
+    bdr_summary["period_display"] = bdr_summary[period_col].apply(_format_bdr_period)
+    return {"bdr_summary": bdr_summary}
+
+
+def dashboard_bdr(df):
+    """
+    БДР — бюджет доходов и расходов.
+    Доходы и расходы берутся из колонок (доход/доходы/revenue, расход/расходы/expense)
+    или из budget plan / budget fact: план = доходы, факт = расходы.
+    Результат (сальдо) = Доходы - Расходы.
+    """
+    st.header("💰 БДР")
+
+    if df is None or not hasattr(df, "columns") or df.empty:
+        st.warning("⚠️ Нет данных для отображения. Загрузите данные проекта.")
+        return
+
+    # Определяем колонки для доходов и расходов
+    def find_col(df, variants):
+        for v in variants:
+            for c in df.columns:
+                if str(c).strip().lower() == v.lower() or v.lower() in str(c).lower():
+                    return c
+        return None
+
+    revenue_col = find_col(
+        df,
+        ["доходы", "доход", "revenue", "income", "Бюджет План", "budget plan"],
+    )
+    expense_col = find_col(
+        df,
+        ["расходы", "расход", "expense", "Бюджет Факт", "budget fact"],
+    )
+    ensure_budget_columns(df)
+    if revenue_col is None and "budget plan" in df.columns:
+        revenue_col = "budget plan"
+    if expense_col is None and "budget fact" in df.columns:
+        expense_col = "budget fact"
+
+    if revenue_col is None or expense_col is None:
+        st.warning(
+            "Для отчёта БДР нужны столбцы доходов и расходов "
+            "(например «Доходы»/«Расходы» или «Бюджет План»/«Бюджет Факт»)."
+        )
+        return
+
+    # Фильтры — в одном стиле с БДДС: строка 1 — Группировать по, Фильтр по проекту; строка 2 — Фильтр по лоту, Фильтр по этапу
+    st.caption("Доходы и расходы по периоду.")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        period_type = st.selectbox(
+            "Группировать по", ["Месяц", "Квартал", "Год"], key="bdr_period"
+        )
+        period_map = {"Месяц": "Month", "Квартал": "Quarter", "Год": "Year"}
+        period_type_en = period_map.get(period_type, "Month")
+    with col2:
+        if "project name" in df.columns:
+            projects = filter_options(df, "project name")
+            selected_project = st.selectbox(
+                "Фильтр по проекту", projects, key="bdr_project"
+            )
+        else:
+            selected_project = "Все"
+
+    col3, col4 = st.columns(2)
+    with col3:
+        # Фильтр по лоту: task name или лот/section (как в БДДС)
+        if "task name" in df.columns:
+            tasks = filter_options(df, "task name")
+            selected_task = st.selectbox("Фильтр по лоту", tasks, key="bdr_task")
+        else:
+            bdr_lot_col = "лот" if "лот" in df.columns else ("lot" if "lot" in df.columns else "section")
+            if bdr_lot_col in df.columns:
+                bdr_lots = filter_options(df, bdr_lot_col)
+                selected_task = st.selectbox("Фильтр по лоту", bdr_lots, key="bdr_lot")
+            else:
+                selected_task = "Все"
+    with col4:
+        if "section" in df.columns:
+            sections = filter_options(df, "section")
+            selected_section = st.selectbox(
+                "Фильтр по этапу", sections, key="bdr_section"
+            )
+        else:
+            selected_section = "Все"
+
+    # Период
+    if period_type_en == "Month":
+        period_col = "plan_month"
+        period_label = "Месяц"
+    elif period_type_en == "Quarter":
+        period_col = "plan_quarter"
+        period_label = "Квартал"
+    else:
+        period_col = "plan_year"
+        period_label = "Год"
+
+    if period_col not in df.columns:
+        st.warning(f"Столбец периода «{period_col}» не найден. Добавьте даты в данные.")
+        return
+
+    # Сводка кэшируется по (набор данных, колонки, фильтры); вид графика её не пересчитывает
+    bdr_summary = cached_computation(
+        "bdr",
+        df,
+        (revenue_col, expense_col, period_col, selected_project, selected_task, selected_section),
+        lambda: _prepare_bdr(
+            df,
+            revenue_col,
+            expense_col,
+            period_col,
+            selected_project,
+            selected_task,
+            selected_section,
+        ),
+    )["bdr_summary"]
+
+    @st.fragment
+    def _bdr_chart():
+        view_type = st.selectbox(
+            "Вид отображения", ["По месяцам", "Накопительно"], key="bdr_view"
+        )
+        chart_df = bdr_summary.copy()
+        if view_type == "Накопительно":
+            chart_df["Доходы"] = chart_df["Доходы"].cumsum()
+            chart_df["Расходы"] = chart_df["Расходы"].cumsum()
+            chart_df["Результат (сальдо)"] = chart_df["Результат (сальдо)"].cumsum()
+            title_suffix = " (накопительно)"
+        else:
+            title_suffix = ""
+
+        def _build_bdr_chart():
+            fig = go.Figure()
+            x_vals = chart_df["period_display"]
+            fig.add_trace(
+                go.Bar(
+                    x=x_vals,
+                    y=chart_df["Доходы"].div(1e6),
+                    name="Доходы",
+                    marker_color="#2E86AB",
+                    text=chart_df["Доходы"].apply(format_million_rub),
+                    textposition="outside",
+                    textfont=dict(size=12, color="white"),
+                )
+            )
+            fig.add_trace(
+                go.Bar(
+                    x=x_vals,
+                    y=chart_df["Расходы"].div(1e6),
+                    name="Расходы",
+                    marker_color="#A23B72",
+                    text=chart_df["Расходы"].apply(format_million_rub),
+                    textposition="outside",
+                    textfont=dict(size=12, color="white"),
+                )
+            )
+            fig.add_trace(
+                go.Bar(
+                    x=x_vals,
+                    y=chart_df["Результат (сальдо)"].div(1e6),
+                    name="Результат (сальдо)",
+                    marker_color="#06A77D",
+                    text=chart_df["Результат (сальдо)"].apply(format_million_rub),
+                    textposition="outside",
+                    textfont=dict(size=12, color="white"),
+                )
+            )
+            fig.update_layout(
+                title=f"БДР — доходы и расходы{title_suffix}",
+                xaxis_title=period_label,
+                yaxis_title="млн руб.",
+                barmode="group",
+                xaxis=dict(tickangle=-45),
+            )
+            return apply_chart_background(fig)
+
+        st.plotly_chart(
+            cached_figure("bdr", chart_df, (period_label, title_suffix), _build_bdr_chart),
+            use_container_width=True,
+        )
+
+    _bdr_chart()
+
+    st.subheader("Сводка БДР по периоду")
+    display_df = bdr_summary[
+        [c for c in ["period_display", "Доходы", "Расходы", "Результат (сальдо)"] if c in bdr_summary.columns]
+    ].copy()
+    display_df = display_df.rename(columns={"period_display": period_label})
+    for col in ["Доходы", "Расходы", "Результат (сальдо)"]:
+        if col in display_df.columns:
+            display_df[col] = (display_df[col] / 1e6).round(2).apply(
+                lambda x: f"{float(x):.2f} млн руб." if pd.notna(x) else ""
+            )
+    display_df = display_df.rename(columns={
+        "Доходы": "Доходы, млн руб.",
+        "Расходы": "Расходы, млн руб.",
+        "Результат (сальдо)": "Результат (сальдо), млн руб.",
+    })
+    st.markdown(
+        budget_table_to_html(display_df, finance_deviation_column="Результат (сальдо), млн руб."),
+        unsafe_allow_html=True,
+    )
+
+
+# ==================== DASHBOARD 8: Budget by Type (Plan/Fact/Reserve) ====================
+def _prepare_budget_by_type(df, selected_project, selected_section):
+    """
+    Подготовка данных «Бюджет план/факт» (без отрисовки): фильтры, числовые бюджеты
+    и суммы план/факт/отклонение/корректировка по проектам. При отсутствии колонок бюджета —
+    {"warning": текст}; budget_by_project = None, если строк нет или нет колонки проекта.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Apply filters
+    filtered_df = apply_filters(
+        df,
+        {
+            "project name": selected_project,
+            "section": selected_section,
+        },
+    )
+    # Check for budget columns (нормализуем русские названия)
+    ensure_budget_columns(filtered_df)
+    has_budget = (
+        "budget plan" in filtered_df.columns and "budget fact" in filtered_df.columns
+    )
+
+    if not has_budget:
+        return {"warning": "Столбцы бюджета (budget plan, budget fact) не найдены в данных."}
+
+    # Отклонение = факт - план (положительное — перерасход, красный; отрицательное — экономия, зелёный)
+    filtered_df["budget plan"] = pd.to_numeric(
+        filtered_df["budget plan"], errors="coerce"
+    )
+    filtered_df["budget fact"] = pd.to_numeric(
+        filtered_df["budget fact"], errors="coerce"
+    )
+    filtered_df["reserve budget"] = (
+        filtered_df["budget fact"] - filtered_df["budget plan"]
+    )
+
+    # Check for adjusted budget column in original dataframe
+    adjusted_budget_col = None
+    if "budget adjusted" in df.columns:
+        adjusted_budget_col = "budget adjusted"
+    elif "adjusted budget" in df.columns:
+        adjusted_budget_col = "adjusted budget"
+
+    # Гистограмма — по тем же строкам (фильтры проекта и этапа уже применены)
+    hist_df = filtered_df.copy(deep=False)
+
+    result = {
+        "adjusted_budget_col": adjusted_budget_col,
+        "hist_empty": hist_df.empty,
+        "budget_by_project": None,
+    }
+    if hist_df.empty or "project name" not in hist_df.columns:
+        return result
+
+    # Convert budget columns to numeric
+    hist_df["budget plan"] = pd.to_numeric(
+        hist_df["budget plan"], errors="coerce"
+    ).fillna(0)
+    hist_df["budget fact"] = pd.to_numeric(
+        hist_df["budget fact"], errors="coerce"
+    ).fillna(0)
+    hist_df["reserve budget"] = hist_df["budget fact"] - hist_df["budget plan"]
+
+    # Group by project and aggregate
+    budget_by_project = (
+        hist_df.groupby("project name", observed=True)
+        .agg(
+            {
+                "budget plan": "sum",
+                "budget fact": "sum",
+                "reserve budget": "sum",
+            }
+        )
+        .reset_index()
+    )
+
+    # Add adjusted budget if available
+    if adjusted_budget_col and adjusted_budget_col in hist_df.columns:
+        # Convert to numeric first
+        hist_df[adjusted_budget_col] = pd.to_numeric(
+            hist_df[adjusted_budget_col], errors="coerce"
+        ).fillna(0)
+        budget_by_project["budget adjusted"] = (
+            hist_df.groupby("project name", observed=True)[adjusted_budget_col].sum().values
+        )
+    else:
+        budget_by_project["budget adjusted"] = 0
+
+    result["budget_by_project"] = budget_by_project
+    return result
+
+
+def dashboard_budget_by_type(df):
+    st.header("💰 Бюджет план/факт")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        if "project name" in df.columns:
+            projects = filter_options(df, "project name")
+            selected_project = st.selectbox(
+                "Фильтр по проекту", projects, key="budget_type_project"
+            )
+        else:
+            selected_project = "Все"
+            st.info("Колонка 'project name' не найдена")
+
+    with col2:
+        if "section" in df.columns:
+            sections = filter_options(df, "section")
+            selected_section = st.selectbox(
+                "Фильтр по этапу", sections, key="budget_type_section"
+            )
+        else:
+            selected_section = "Все"
+
+    with col3:
+        pass
+
+    # Суммы по проектам кэшируются по (набор данных, фильтры); «Показать отклонение»
+    # влияет только на набор столбцов гистограммы
+    prepared = cached_computation(
+        "budget_by_type",
+        df,
+        (selected_project, selected_section),
+        lambda: _prepare_budget_by_type(df, selected_project, selected_section),
+    )
+    if "warning" in prepared:
+        st.warning(prepared["warning"])
+        return
+    adjusted_budget_col = prepared["adjusted_budget_col"]
+    budget_by_project = prepared["budget_by_project"]
+
+    # ========== Histogram: Budget by Project and Type ==========
+    st.subheader("📊 Гистограмма: Бюджет план/факт/корректировка/отклонение по проектам")
+
+    # Filters for histogram
+    col_hist1 = st.columns(1)[0]
+
+    with col_hist1:
+        # Checkbox for showing deviation
+        show_reserve = st.checkbox(
+            "Показать отклонение", value=False, key="budget_show_reserve"
+        )
+
+        # Budget types to show (always show Plan and Fact, optionally Deviation)
+        selected_budget_types = ["Бюджет План", "Бюджет Факт"]
+        if adjusted_budget_col:
+            selected_budget_types.append("Бюджет Корректировка")
+        if show_reserve:
+            selected_budget_types.append("Отклонение (перерасход)")
+            selected_budget_types.append("Отклонение (экономия)")
+
+    if prepared["hist_empty"]:
+        st.info("Нет данных для отображения гистограммы с выбранными фильтрами.")
+    elif budget_by_project is None:
+        st.warning(
+            "Колонка 'project name' не найдена в данных для построения гистограммы."
+        )
+    else:
+        # Transform to long format
+        hist_melted = []
+        for idx, row in budget_by_project.iterrows():
+            project = row["project name"]
+
+            if "Бюджет План" in selected_budget_types:
+                hist_melted.append(
+                    {
+                        "project name": project,
+                        "Тип бюджета": "Бюджет План",
+                        "Сумма": row["budget plan"],
+                    }
+                )
+
+            if "Бюджет Факт" in selected_budget_types:
+                hist_melted.append(
+                    {
+                        "project name": project,
+                        "Тип бюджета": "Бюджет Факт",
+                        "Сумма": row["budget fact"],
+                    }
+                )
+
+            if (
+                "Бюджет Корректировка" in selected_budget_types
+                and adjusted_budget_col
+            ):
+                hist_melted.append(
+                    {
+                        "project name": project,
+                        "Тип бюджета": "Бюджет Корректировка",
+                        "Сумма": row["budget adjusted"],
+                    }
+                )
+
+            if "Отклонение (перерасход)" in selected_budget_types and row["reserve budget"] >= 0:
+                hist_melted.append(
+                    {
+                        "project name": project,
+                        "Тип бюджета": "Отклонение (перерасход)",
+                        "Сумма": row["reserve budget"],
+                    }
+                )
+            if "Отклонение (экономия)" in selected_budget_types and row["reserve budget"] < 0:
+                hist_melted.append(
+                    {
+                        "project name": project,
+                        "Тип бюджета": "Отклонение (экономия)",
+                        "Сумма": row["reserve budget"],
+                    }
+                )
+
+        hist_by_type_df = pd.DataFrame(hist_melted)
+
+        if hist_by_type_df.empty:
+            st.info("Нет данных для отображения с выбранными типами бюджета.")
+        else:
+            # Преобразуем значения в миллионы рублей для отображения на столбцах
+            hist_by_type_df["Сумма_млн"] = hist_by_type_df["Сумма"] / 1000000
+
+            def _budget_by_project_type_chart():
+                # Create histogram
+                fig_hist = px.bar(
+                    hist_by_type_df,
+                    x="project name",
+                    y="Сумма",
+                    color="Тип бюджета",
+                    title="Бюджет план/факт/корректировка/отклонение по проектам",
+                    labels={"project name": "Проект", "Сумма": "Сумма бюджета (руб.)"},
+                    barmode="group",
+                    text="Сумма_млн",
+                    color_discrete_map={
+                        "Бюджет План": "#2E86AB",
+                        "Бюджет Факт": "#A23B72",
+                        "Бюджет Корректировка": "#F18F01",
+                        "Отклонение (перерасход)": "#e74c3c",
+                        "Отклонение (экономия)": "#27ae60",
+                    },
+                )
+
+                # Update layout
+                fig_hist.update_layout(
+                    xaxis_title="Проект",
+                    yaxis_title="Сумма бюджета (руб.)",
+                    height=600,
+                    legend=dict(
+                        orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1
+                    ),
+                    xaxis=dict(tickangle=-45, tickfont=dict(size=12)),
+                )
+
+                # Add text labels on the edge of bars (в миллионах рублей)
+                fig_hist.update_traces(
+                    textposition="outside",
+                    texttemplate="%{text:.1f} млн руб.",
+                    textfont=dict(size=12, color="white"),
+                )
+
+                return apply_chart_background(fig_hist)
+
+            st.plotly_chart(
+                cached_figure(
+                    "budget_by_project_type",
+                    hist_by_type_df,
+                    (),
+                    _budget_by_project_type_chart,
+                ),
+                use_container_width=True,
+            )
+
+            # Summary table (суммы в млн руб., два знака, подпись в названии колонки)
+            with st.expander("📋 Сводная таблица по проектам", expanded=False):
+                summary_hist = hist_by_type_df.pivot_table(
+                    index="project name",
+                    columns="Тип бюджета",
+                    values="Сумма",
+                    aggfunc="sum",
+                    fill_value=0,
+                    observed=True,
+                ).reset_index()
+
+                # Переводим в млн руб., два знака после запятой; подпись "млн руб." в названии колонки
+                for col in summary_hist.columns:
+                    if col != "project name":
+                        summary_hist[col] = (
+                            (summary_hist[col].astype(float) / 1e6)
+                            .round(2)
+                            .apply(lambda x: f"{float(x):.2f}" if pd.notna(x) else "0.00")
+                        )
+                summary_hist = summary_hist.rename(
+                    columns={
+                        c: f"{c}, млн руб."
+                        for c in summary_hist.columns
+                        if c != "project name"
+                    }
+                )
+
+                st.table(style_dataframe_for_dark_theme(summary_hist))
+
+
+# ==================== DASHBOARD 8.1: Budget Old Charts ====================
+def dashboard_budget_old_charts(df):
+    st.header("💰 БДДС (старые графики)")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        period_type = st.selectbox(
+            "Группировать по", ["Месяц", "Квартал", "Год"], key="budget_old_period"
+        )
+        period_map = {"Месяц": "Month", "Квартал": "Quarter", "Год": "Year"}
+        period_type_en = period_map.get(period_type, "Month")
+
+    with col2:
+        if "project name" in df.columns:
+            projects = filter_options(df, "project name")
+            selected_project = st.selectbox(
+                "Фильтр по проекту", projects, key="budget_old_project"
+            )
+        else:
+            selected_project = "Все"
+
+    with col3:
+        if "section" in df.columns:
+            sections = filter_options(df, "section")
+            selected_section = st.selectbox(
+                "Фильтр по этапу", sections, key="budget_old_section"
+            )
+        else:
+            selected_section = "Все"
+
+    # Apply filters
+    filtered_df = apply_filters(
+        df,
+        {
+            "project name": selected_project,
+            "section": selected_section,
+        },
+    )
+    # Check for budget columns (нормализуем русские названия)
+    ensure_budget_columns(filtered_df)
+    has_budget = (
+        "budget plan" in filtered_df.columns and "budget fact" in filtered_df.columns
+    )
+
+    if not has_budget:
+        st.warning("Столбцы бюджета (budget plan, budget fact) не найдены в данных.")
+        return
+
+    # Determine period column
+    if period_type_en == "Month":
+        period_col = "plan_month"
+        period_label = "Месяц"
+    elif period_type_en == "Quarter":
+        period_col = "plan_quarter"
+        period_label = "Квартал"
+    else:
+        period_col = "plan_year"
+        period_label = "Год"
+
+    if period_col not in filtered_df.columns:
+        st.warning(f"Столбец периода '{period_col}' не найден.")
+        return
+
+    # Отклонение = факт - план (положительное — перерасход, красный; отрицательное — экономия, зелёный)
+    filtered_df["budget plan"] = pd.to_numeric(
+        filtered_df["budget plan"], errors="coerce"
+    )
+    filtered_df["budget fact"] = pd.to_numeric(
+        filtered_df["budget fact"], errors="coerce"
+    )
+    filtered_df["reserve budget"] = (
+        filtered_df["budget fact"] - filtered_df["budget plan"]
+    )
+
+    # Group by period first to get totals
+    budget_by_period = (
+        filtered_df.groupby(period_col, observed=True)
+        .agg({"budget plan": "sum", "budget fact": "sum", "reserve budget": "sum"})
+        .reset_index()
+    )
+
+    # Format period for display
+    def format_period_display(period_val):
+        if pd.isna(period_val):
+            return "Н/Д"
+        if isinstance(period_val, pd.Period):
+            try:
+                if period_val.freqstr == "M" or period_val.freqstr.startswith(
+                    "M"
+                ):  # Month
+                    month_name = get_russian_month_name(period_val)
+                    year = period_val.year
+                    return f"{month_name} {year}"
+                elif period_val.freqstr == "Q" or period_val.freqstr.startswith(
+                    "Q"
+                ):  # Quarter
+                    return f"Q{period_val.quarter} {period_val.year}"
+                elif period_val.freqstr == "Y" or period_val.freqstr == "A-DEC":  # Year
+                    return str(period_val.year)
+                else:
+                    month_name = get_russian_month_name(period_val)
+                    year = period_val.year
+                    return f"{month_name} {year}"
+            except:
+                # Try parsing as string
+                period_str = str(period_val)
+                try:
+                    if "-" in period_str:
+                        parts = period_str.split("-")
+                        if len(parts) >= 2:
+                            year = parts[0]
+                            month = parts[1]
+                            month_num = int(month)
+                            month_name = RUSSIAN_MONTHS.get(month_num, "")
+                            if month_name:
+                                return f"{month_name} {year}"
+                except:
+                    pass
+                return str(period_val)
+        elif isinstance(period_val, str):
+            # Try parsing string like "2025-01"
+            try:
+                if "-" in period_val:
+                    parts = period_val.split("-")
+                    if len(parts) >= 2:
+                        year = parts[0]
+                        month = parts[1]
+                        month_num = int(month)
+                        month_name = RUSSIAN_MONTHS.get(month_num, "")
+                        if month_name:
+                            return f"{month_name} {year}"
+            except:
+                pass
+        return str(period_val)
+
+    budget_by_period[period_col] = budget_by_period[period_col].apply(
+        format_period_display
+    )
+
+    # Checkbox to hide/show deviation (default: hidden)
+    hide_reserve = st.checkbox(
+        "Скрыть отклонение", value=True, key="budget_old_hide_reserve"
+    )
+
+    # Transform data to long format - group by budget type
+    budget_melted = []
+    for idx, row in budget_by_period.iterrows():
+        period = row[period_col]
+        budget_melted.append(
+            {
+                period_col: period,
+                "Тип бюджета": "Бюджет План",
+                "Сумма": row["budget plan"],
+            }
+        )
+        budget_melted.append(
+            {
+                period_col: period,
+                "Тип бюджета": "Бюджет Факт",
+                "Сумма": row["budget fact"],
+            }
+        )
+        # Add deviation only if not hidden (split by sign for red/green)
+        if not hide_reserve:
+            if row["reserve budget"] >= 0:
+                budget_melted.append(
+                    {
+                        period_col: period,
+                        "Тип бюджета": "Отклонение (перерасход)",
+                        "Сумма": row["reserve budget"],
+                    }
+                )
+            else:
+                budget_melted.append(
+                    {
+                        period_col: period,
+                        "Тип бюджета": "Отклонение (экономия)",
+                        "Сумма": row["reserve budget"],
+                    }
+                )
+
+    budget_by_type_df = pd.DataFrame(budget_melted)
+    # Суммы в млн руб. (исходные в рублях)
+    budget_by_type_df["Сумма"] = (budget_by_type_df["Сумма"] / 1e6).round(2)
+
+    # Visualizations
+    col1, col2 = st.columns(2)
+
+    with col1:
+        def _budget_by_type_area_chart():
+            # Stacked area chart showing all budget types
+            fig = px.area(
+                budget_by_type_df,
+                x=period_col,
+                y="Сумма",
+                color="Тип бюджета",
+                title="Бюджет по типам по периоду (накопительно)",
+                labels={period_col: period_label, "Сумма": "Сумма, млн руб."},
+                text="Сумма",
+                color_discrete_map={
+                    "Бюджет План": "#2E86AB",
+                    "Бюджет Факт": "#A23B72",
+                    "Отклонение (перерасход)": "#e74c3c",
+                    "Отклонение (экономия)": "#27ae60",
+                },
+            )
+            fig.update_xaxes(tickangle=-45)
+            fig.update_traces(textposition="top center")
+            return apply_chart_background(fig)
+
+        st.plotly_chart(
+            cached_figure(
+                "budget_by_type_area",
+                budget_by_type_df,
+                (period_col, period_label),
+                _budget_by_type_area_chart,
+            ),
+            use_container_width=True,
+        )
+
+    with col2:
+        def _budget_by_type_bar_chart():
+            # Grouped bar chart
+            fig = px.bar(
+                budget_by_type_df,
+                x=period_col,
+                y="Сумма",
+                color="Тип бюджета",
+                title="Бюджет по типам по периоду",
+                labels={period_col: period_label, "Сумма": "Сумма, млн руб."},
+                barmode="group",
+                text="Сумма",
+                color_discrete_map={
+                    "Бюджет План": "#2E86AB",
+                    "Бюджет Факт": "#A23B72",
+                    "Отклонение (перерасход)": "#e74c3c",
+                    "Отклонение (экономия)": "#27ae60",
+                },
+            )
+            fig.update_xaxes(tickangle=-45)
+            fig.update_traces(textposition="outside", textfont=dict(size=14, color="white"))
+            return apply_chart_background(fig)
+
+        st.plotly_chart(
+            cached_figure(
+                "budget_by_type_bar",
+                budget_by_type_df,
+                (period_col, period_label),
+                _budget_by_type_bar_chart,
+            ),
+            use_container_width=True,
+        )
+
+    def _budget_by_type_line_chart():
+        # Line chart comparing all types
+        fig = px.line(
+            budget_by_type_df,
+            x=period_col,
+            y="Сумма",
+            color="Тип бюджета",
+            title="Сравнение типов бюджета по периоду",
+            labels={period_col: period_label, "Сумма": "Сумма, млн руб."},
+            markers=True,
+            text="Сумма",
+            color_discrete_map={
+                "Бюджет План": "#2E86AB",
+                "Бюджет Факт": "#A23B72",
+                "Отклонение (перерасход)": "#e74c3c",
+                "Отклонение (экономия)": "#27ae60",
+            },
+        )
+        fig.update_xaxes(tickangle=-45)
+        fig.update_traces(textposition="top center")
+        return apply_chart_background(fig)
+
+    st.plotly_chart(
+        cached_figure(
+            "budget_by_type_line",
+            budget_by_type_df,
+            (period_col, period_label),
+            _budget_by_type_line_chart,
+        ),
+        use_container_width=True,
+    )
+
+    # Summary metrics (суммы уже в млн руб.)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        total_plan = budget_by_type_df[
+            budget_by_type_df["Тип бюджета"] == "Бюджет План"
+        ]["Сумма"].sum()
+        st.metric("Всего План", f"{total_plan:.2f} млн руб." if pd.notna(total_plan) else "Н/Д")
+    with col2:
+        total_fact = budget_by_type_df[
+            budget_by_type_df["Тип бюджета"] == "Бюджет Факт"
+        ]["Сумма"].sum()
+        st.metric("Всего Факт", f"{total_fact:.2f} млн руб." if pd.notna(total_fact) else "Н/Д")
+    with col3:
+        total_dev = (
+            budget_by_type_df[
+                budget_by_type_df["Тип бюджета"].isin(
+                    ["Отклонение (перерасход)", "Отклонение (экономия)"]
+                )
+            ]["Сумма"].sum()
+            if budget_by_type_df["Тип бюджета"].isin(
+                ["Отклонение (перерасход)", "Отклонение (экономия)"]
+            ).any()
+            else 0
+        )
+        st.metric(
+            "Всего Отклонение",
+            f"{total_dev:.2f} млн руб." if pd.notna(total_dev) else "Н/Д",
+        )
+    with col4:
+        variance = (
+            total_plan - total_fact
+            if pd.notna(total_plan) and pd.notna(total_fact)
+            else None
+        )
+        st.metric(
+            "Отклонение",
+            (
+                f"{variance:.2f} млн руб."
+                if variance is not None and pd.notna(variance)
+                else "Н/Д"
+            ),
+        )
+
+    # Pivot table for better readability (Сумма уже в млн — budget_by_type_df["Сумма"] = /1e6)
+    pivot_table = budget_by_type_df.pivot(
+        index=period_col, columns="Тип бюджета", values="Сумма"
+    ).fillna(0)
+
+    # Detailed table — суммы в млн руб., два знака, подпись "млн руб." в названии колонки
+    st.subheader("Детальная таблица")
+    detailed_table = pivot_table.copy()
+
+    # Названия колонок с подписью "млн руб."
+    detailed_table = detailed_table.rename(
+        columns={c: f"{c}, млн руб." for c in detailed_table.columns}
+    )
+    # Формат: два знака после запятой
+    for col in detailed_table.columns:
+        detailed_table[col] = detailed_table[col].apply(
+            lambda x: f"{float(x):.2f}" if pd.notna(x) else "0.00"
+        )
+
+    st.table(style_dataframe_for_dark_theme(detailed_table))
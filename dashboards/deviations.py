@@ -0,0 +1,2805 @@
+"""
+Дашборды отклонений от плана: динамика отклонений и причин, план/факт сроков задач.
+"""
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from datetime import date, datetime
+import numpy as np
+
+from config import RUSSIAN_MONTHS
+from dashboard_cache import cached_computation, cached_figure
+from filter_engine import apply_filters, filter_options, get_filter_engine
+from schema import get_field_column
+from utils import (
+    get_russian_month_name,
+    apply_chart_background,
+    dark_table_to_html,
+    ensure_date_columns,
+    paginate_table,
+    style_dataframe_for_dark_theme,
+    to_datetime_series,
+)
+
+
+def dashboard_deviations_combined(df):
+    """Единый отчёт «Динамика отклонений» с табами: по месяцам, динамика, причины."""
+    if df is None or not hasattr(df, "columns") or df.empty:
+        st.warning(
+            "⚠️ Нет данных для отображения. Пожалуйста, загрузите данные проекта."
+        )
+        return
+    st.header("📊 Динамика отклонений")
+    tab_by_month, tab_dynamics, tab_reasons = st.tabs(
+        ["По месяцам", "Динамика отклонений", "Причины отклонений"]
+    )
+    with tab_by_month:
+        dashboard_reasons_of_deviation(df)
+    with tab_dynamics:
+        dashboard_dynamics_of_deviations(df)
+    with tab_reasons:
+        dashboard_dynamics_of_reasons(df)
+
+
+def _prepare_reasons_of_deviation(
+    df, selected_project, selected_task, selected_section, selected_reason, selected_month
+):
+    """
+    Отбор задач с отклонениями по фильтрам отчёта «Динамика отклонений по месяцам»
+    (без отрисовки). Нет строк — {"info": текст}.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Apply all filters (shared filter engine: bitmap AND, no full-frame string passes)
+    filtered_df = apply_filters(
+        df,
+        {
+            "project name": selected_project,
+            "reason of deviation": selected_reason,
+            "task name": selected_task,
+            "section": selected_section,
+        },
+    )
+
+    try:
+        has_plan_month_col = "plan_month" in filtered_df.columns
+    except (AttributeError, TypeError):
+        has_plan_month_col = False
+
+    if selected_month != "Все" and has_plan_month_col:
+        # Convert selected month back to Period format for comparison
+        def month_to_period(month_str):
+            try:
+                # Parse "Январь 2025" format (Russian month names)
+                parts = month_str.split()
+                if len(parts) == 2:
+                    month_name, year = parts
+                    # Find month number from Russian month name
+                    month_num = None
+                    for num, russian_name in RUSSIAN_MONTHS.items():
+                        if russian_name == month_name:
+                            month_num = num
+                            break
+                    if month_num:
+                        return pd.Period(f"{year}-{month_num:02d}", freq="M")
+            except:
+                pass
+            return None
+
+        selected_period = month_to_period(selected_month)
+        if selected_period is not None:
+            filtered_df = filtered_df[filtered_df["plan_month"] == selected_period]
+        else:
+            # Fallback: try to match formatted string
+            def format_month_for_comparison(period_val):
+                if isinstance(period_val, pd.Period):
+                    try:
+                        month_name = get_russian_month_name(period_val)
+                        year = period_val.year
+                        return f"{month_name} {year}"
+                    except:
+                        pass
+                return str(period_val)
+
+            filtered_df = filtered_df[
+                filtered_df["plan_month"].apply(format_month_for_comparison)
+                == selected_month
+            ]
+
+    # Filter tasks relevant for "dynamics of deviations": deviation=1/True OR reason of deviation filled
+    try:
+        has_deviation_col = "deviation" in filtered_df.columns
+        has_reason_col = "reason of deviation" in filtered_df.columns
+    except (AttributeError, TypeError):
+        has_deviation_col = False
+        has_reason_col = False
+
+    if has_deviation_col or has_reason_col:
+        # Rows with deviation flag = 1/True
+        if has_deviation_col:
+            deviation_flag = (
+                (filtered_df["deviation"] == True)
+                | (filtered_df["deviation"] == 1)
+                | (filtered_df["deviation"].astype(str).str.lower() == "true")
+                | (filtered_df["deviation"].astype(str).str.strip() == "1")
+            )
+        else:
+            deviation_flag = pd.Series(False, index=filtered_df.index)
+        # Rows with non-empty reason of deviation (для project_fixed: показываем и при причине)
+        if has_reason_col:
+            reason_filled = (
+                filtered_df["reason of deviation"].notna()
+                & (filtered_df["reason of deviation"].astype(str).str.strip() != "")
+            )
+        else:
+            reason_filled = pd.Series(False, index=filtered_df.index)
+        filtered_df = filtered_df[deviation_flag | reason_filled]
+
+    if filtered_df.empty:
+        return {"info": "Нет данных для выбранных фильтров."}
+
+    return {"filtered_df": filtered_df}
+
+
+def dashboard_reasons_of_deviation(df):
+    # Проверка на None или пустой DataFrame
+    if df is None:
+        st.warning(
+            "⚠️ Нет данных для отображения. Пожалуйста, загрузите данные проекта."
+        )
+        return
+
+    # Проверка, что df является DataFrame и имеет атрибут columns
+    if not hasattr(df, "columns") or df.empty:
+        st.warning(
+            "⚠️ Нет данных для отображения. Пожалуйста, загрузите данные проекта."
+        )
+        return
+
+    st.header("📋 Динамика отклонений по месяцам")
+
+    # Add CSS to force filters in one row
+    st.markdown(
+        """
+        <style>
+        div[data-testid="column"] {
+            flex: 1 1 0%;
+            min-width: 0;
+        }
+        </style>
+        """,
+        unsafe_allow_html=True,
+    )
+
+    # Helper function to format months
+    def format_month(period_val):
+        if pd.isna(period_val):
+            return "Н/Д"
+        if isinstance(period_val, pd.Period):
+            try:
+                month_name = get_russian_month_name(period_val)
+                year = period_val.year
+                return f"{month_name} {year}"
+            except:
+                return str(period_val)
+        return str(period_val)
+
+    # Все фильтры в один ряд: Проект, Задача, Этап, Причина, Месяц (5 колонок)
+    col1, col2, col3, col4, col5 = st.columns(5)
+
+    with col1:
+        try:
+            has_project_column = "project name" in df.columns
+        except (AttributeError, TypeError):
+            has_project_column = False
+
+        if has_project_column:
+            projects = filter_options(df, "project name")
+            selected_project = st.selectbox("Проект", projects, key="reason_project")
+        else:
+            selected_project = "Все"
+
+    with col2:
+        try:
+            has_task_column = "task name" in df.columns
+        except (AttributeError, TypeError):
+            has_task_column = False
+
+        if has_task_column:
+            tasks = filter_options(df, "task name")
+            selected_task = st.selectbox("Задача", tasks, key="reason_task")
+        else:
+            selected_task = "Все"
+
+    with col3:
+        try:
+            has_section_column = "section" in df.columns
+        except (AttributeError, TypeError):
+            has_section_column = False
+
+        if has_section_column:
+            sections = filter_options(df, "section")
+            selected_section = st.selectbox("Этап", sections, key="reason_section")
+        else:
+            selected_section = "Все"
+
+    with col4:
+        try:
+            has_reason_column = "reason of deviation" in df.columns
+        except (AttributeError, TypeError):
+            has_reason_column = False
+
+        if has_reason_column:
+            reasons = ["Все"] + sorted(
+                df["reason of deviation"].dropna().unique().tolist()
+            )
+            selected_reason = st.selectbox("Причина", reasons, key="reason_filter")
+        else:
+            selected_reason = "Все"
+
+    with col5:
+        available_months = []
+        try:
+            has_plan_month_column = "plan_month" in df.columns
+        except (AttributeError, TypeError):
+            has_plan_month_column = False
+
+        if has_plan_month_column:
+            unique_months = df["plan_month"].dropna().unique()
+            if len(unique_months) > 0:
+                month_dict = {format_month(m): m for m in unique_months}
+                available_months = sorted(
+                    month_dict.keys(), key=lambda x: month_dict[x]
+                )
+        else:
+            try:
+                has_plan_end_column = "plan end" in df.columns
+            except (AttributeError, TypeError):
+                has_plan_end_column = False
+
+            if has_plan_end_column:
+                mask = df["plan end"].notna()
+                if mask.any():
+                    temp_months = df.loc[mask, "plan end"].dt.to_period("M").unique()
+                    if len(temp_months) > 0:
+                        month_dict = {format_month(m): m for m in temp_months}
+                        available_months = sorted(
+                            month_dict.keys(), key=lambda x: month_dict[x]
+                        )
+
+        if len(available_months) > 0:
+            months = ["Все"] + available_months
+            selected_month = st.selectbox("Месяц", months, key="reason_month")
+        else:
+            selected_month = "Все"
+            st.selectbox("Месяц", ["Все"], key="reason_month", disabled=True)
+
+    # Отбор строк кэшируется по (набор данных, фильтры)
+    prepared = cached_computation(
+        "reasons_of_deviation",
+        df,
+        (selected_project, selected_task, selected_section, selected_reason, selected_month),
+        lambda: _prepare_reasons_of_deviation(
+            df, selected_project, selected_task, selected_section, selected_reason, selected_month
+        ),
+    )
+    if "info" in prepared:
+        st.info(prepared["info"])
+        return
+    filtered_df = prepared["filtered_df"]
+
+    # Summary metrics: всего задач, основная причина отклонения, её процент и количество
+    has_reason_col_metric = "reason of deviation" in filtered_df.columns
+    main_reason_name = "—"
+    main_reason_pct = 0.0
+    main_reason_count = 0
+    if has_reason_col_metric and not filtered_df.empty:
+        reason_counts = filtered_df["reason of deviation"].value_counts()
+        reason_counts = reason_counts[reason_counts > 0]  # категориальная колонка: без пустых категорий
+        if not reason_counts.empty:
+            main_reason_name = str(reason_counts.index[0]).strip() or "—"
+            main_reason_count = int(reason_counts.iloc[0])
+            total_tasks = len(filtered_df)
+            main_reason_pct = (main_reason_count / total_tasks * 100) if total_tasks else 0.0
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Всего задач с отклонениями", len(filtered_df))
+    with col2:
+        st.metric("Основная причина отклонения", main_reason_name[:50] + ("…" if len(main_reason_name) > 50 else ""))
+    with col3:
+        col3_value = f"{main_reason_pct:.1f}% ({main_reason_count})" if (has_reason_col_metric and main_reason_count > 0) else "—"
+        st.metric("Доля основной причины", col3_value)
+
+    # Reasons breakdown
+    try:
+        has_reason_col_breakdown = "reason of deviation" in filtered_df.columns
+    except (AttributeError, TypeError):
+        has_reason_col_breakdown = False
+
+    if has_reason_col_breakdown:
+        st.subheader("Распределение по причинам")
+        reason_counts = filtered_df["reason of deviation"].value_counts()
+        reason_counts = reason_counts[reason_counts > 0].reset_index()
+        reason_counts.columns = ["Причина", "Количество"]
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            def _deviation_reasons_bar_chart():
+                fig = px.bar(
+                    reason_counts,
+                    x="Причина",
+                    y="Количество",
+                    title="Количество задач по причинам",
+                    labels={
+                        "Причина": "Причина отклонения",
+                        "Количество": "Количество задач",
+                    },
+                    text="Количество",
+                )
+                fig.update_xaxes(tickangle=-45)
+                fig.update_traces(
+                    textposition="outside", textfont=dict(size=14, color="white")
+                )
+                return apply_chart_background(fig)
+
+            st.plotly_chart(
+                cached_figure(
+                    "deviation_reasons_bar",
+                    reason_counts,
+                    (),
+                    _deviation_reasons_bar_chart,
+                ),
+                use_container_width=True,
+            )
+
+        with col2:
+            def _deviation_reasons_pie_chart():
+                fig = px.pie(
+                    reason_counts,
+                    values="Количество",
+                    names="Причина",
+                    title="Причины отклонений",
+                )
+                fig.update_traces(
+                    textinfo="label+value+percent",
+                    texttemplate="%{label}<br>%{value}<br>(%{percent:.0%})",
+                    textposition="inside",
+                    textfont=dict(size=12, color="white"),
+                )
+                return apply_chart_background(fig)
+
+            st.plotly_chart(
+                cached_figure(
+                    "deviation_reasons_pie",
+                    reason_counts,
+                    (),
+                    _deviation_reasons_pie_chart,
+                ),
+                use_container_width=True,
+            )
+
+    # Detailed table — названия колонок на русском, дни: красный если > 0, зелёный если 0
+    with st.expander("📊 Просмотр детальных данных"):
+        display_cols = [
+            "project name",
+            "task name",
+            "section",
+            "deviation in days",
+            "reason of deviation",
+        ]
+
+        try:
+            has_plan_end_col = "plan end" in filtered_df.columns
+        except (AttributeError, TypeError):
+            has_plan_end_col = False
+
+        if has_plan_end_col:
+            display_cols.insert(-1, "plan end")
+
+        try:
+            has_base_end_col = "base end" in filtered_df.columns
+        except (AttributeError, TypeError):
+            has_base_end_col = False
+
+        if has_base_end_col:
+            display_cols.insert(-1, "base end")
+
+        available_cols = [col for col in display_cols if col in filtered_df.columns]
+        display_df = filtered_df[available_cols].copy()
+        # Русские названия колонок
+        col_ru = {
+            "project name": "Проект",
+            "task name": "Задача",
+            "section": "Раздел",
+            "deviation in days": "Отклонений в днях",
+            "reason of deviation": "Причина отклонений",
+            "plan end": "Конец плана",
+            "base end": "Конец факт",
+        }
+        display_df = display_df.rename(columns={c: col_ru[c] for c in display_df.columns if c in col_ru})
+        if "Отклонений в днях" in display_df.columns:
+            display_df["Отклонений в днях"] = display_df["Отклонений в днях"].apply(
+                lambda x: int(round(float(x), 0)) if pd.notna(x) and str(x).strip() != "" else x
+            )
+        def _date_only(val):
+            if pd.isna(val):
+                return "Н/Д"
+            if hasattr(val, "strftime"):
+                return val.strftime("%d.%m.%Y")
+            try:
+                dt = pd.to_datetime(val, errors="coerce", dayfirst=True)
+                return dt.strftime("%d.%m.%Y") if pd.notna(dt) else str(val)
+            except Exception:
+                return str(val)
+        for date_col in ("Конец плана", "Конец факт"):
+            if date_col in display_df.columns:
+                display_df[date_col] = display_df[date_col].apply(_date_only)
+        display_df = paginate_table(display_df, key="reasons_detail_page")
+        st.markdown(
+            dark_table_to_html(display_df, days_column="Отклонений в днях"),
+            unsafe_allow_html=True,
+        )
+
+
+# ==================== DASHBOARD 2: Dynamics of Deviations ====================
+def _format_dynamics_period(period_val):
+    """Подпись периода динамики отклонений: дата, «Январь 2025», «Q1 2025» или «2025»."""
+    if pd.isna(period_val):
+        return "Н/Д"
+
+    # Группировка по дням: дата, а не месяц из строки вида "2025-01-15"
+    if isinstance(period_val, date):
+        return period_val.strftime("%d.%m.%Y")
+
+    # Try to convert to Period if it's a string representation
+    period_obj = None
+    if isinstance(period_val, pd.Period):
+        period_obj = period_val
+    elif isinstance(period_val, str):
+        # Try to parse string like "2025-01" or "2025-01-01"
+        try:
+            if "-" in period_val:
+                parts = period_val.split("-")
+                if len(parts) >= 2:
+                    year = int(parts[0])
+                    month = int(parts[1])
+                    # Try to create Period object
+                    try:
+                        period_obj = pd.Period(f"{year}-{month:02d}", freq="M")
+                    except:
+                        # If that fails, try to parse as date and convert
+                        try:
+                            date_obj = pd.to_datetime(period_val)
+                            period_obj = date_obj.to_period("M")
+                        except:
+                            pass
+        except:
+            pass
+
+    # If we have a Period object, format it
+    if period_obj is not None:
+        try:
+            if period_obj.freqstr == "M" or period_obj.freqstr.startswith(
+                "M"
+            ):  # Month
+                month_name = get_russian_month_name(period_obj)
+                year = period_obj.year
+                if month_name:
+                    return f"{month_name} {year}"
+            elif period_obj.freqstr == "Q" or period_obj.freqstr.startswith(
+                "Q"
+            ):  # Quarter
+                return f"Q{period_obj.quarter} {period_obj.year}"
+            elif period_obj.freqstr == "Y" or period_obj.freqstr == "A-DEC":  # Year
+                return str(period_obj.year)
+            else:
+                month_name = get_russian_month_name(period_obj)
+                year = period_obj.year
+                if month_name:
+                    return f"{month_name} {year}"
+        except:
+            pass
+
+    # If it's still a Period object (original), try direct formatting
+    if isinstance(period_val, pd.Period):
+        try:
+            if period_val.freqstr == "M" or period_val.freqstr.startswith(
+                "M"
+            ):  # Month
+                month_name = get_russian_month_name(period_val)
+                year = period_val.year
+                if month_name:
+                    return f"{month_name} {year}"
+            elif period_val.freqstr == "Q" or period_val.freqstr.startswith(
+                "Q"
+            ):  # Quarter
+                return f"Q{period_val.quarter} {period_val.year}"
+            elif period_val.freqstr == "Y" or period_val.freqstr == "A-DEC":  # Year
+                return str(period_val.year)
+        except:
+            pass
+
+    # Try parsing as string
+    period_str = str(period_val)
+    try:
+        if "-" in period_str:
+            parts = period_str.split("-")
+            if len(parts) >= 2:
+                year = parts[0]
+                month = parts[1]
+                # Remove any extra characters
+                month = month.split()[0] if " " in month else month
+                try:
+                    month_num = int(month)
+                    month_name = RUSSIAN_MONTHS.get(month_num, "")
+                    if month_name:
+                        return f"{month_name} {year}"
+                except:
+                    pass
+    except:
+        pass
+
+    # If it's a date, format it
+    try:
+        if isinstance(period_val, (pd.Timestamp, datetime)):
+            return period_val.strftime("%d.%m.%Y")
+    except:
+        pass
+
+    return period_str
+
+
+def _prepare_dynamics_of_deviations(df, selected_project, selected_reason, period_type_en):
+    """
+    Подготовка данных динамики отклонений (без отрисовки): фильтры, задачи с отклонениями,
+    периоды по plan end и агрегаты по периоду/проекту/причине.
+    При невозможности построить отчёт — {"warning": текст} или {"info": текст}.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Apply filters (shared filter engine: bitmap AND, no full-frame copy)
+    filtered_df = apply_filters(
+        df,
+        {"project name": selected_project, "reason of deviation": selected_reason},
+    )
+
+    # Filter tasks: deviation=1/True OR reason of deviation filled
+    if "deviation" in filtered_df.columns:
+        deviation_flag = (
+            (filtered_df["deviation"] == True)
+            | (filtered_df["deviation"] == 1)
+            | (filtered_df["deviation"].astype(str).str.lower() == "true")
+            | (filtered_df["deviation"].astype(str).str.strip() == "1")
+        )
+    else:
+        deviation_flag = pd.Series(False, index=filtered_df.index)
+    if "reason of deviation" in filtered_df.columns:
+        reason_filled = (
+            filtered_df["reason of deviation"].notna()
+            & (filtered_df["reason of deviation"].astype(str).str.strip() != "")
+        )
+    else:
+        reason_filled = pd.Series(False, index=filtered_df.index)
+    filtered_df = filtered_df[deviation_flag | reason_filled]
+
+    if filtered_df.empty:
+        return {"info": "Нет данных для выбранных фильтров."}
+
+    # Extract period from plan end dates
+    if period_type_en == "Day":
+        # Use date (day level)
+        if "plan end" in filtered_df.columns:
+            mask = filtered_df["plan end"].notna()
+            filtered_df.loc[mask, "period"] = filtered_df.loc[mask, "plan end"].dt.date
+            period_label = "День"
+        else:
+            return {"warning": "Поле 'plan end' не найдено для группировки по дням."}
+    elif period_type_en == "Month":
+        if "plan end" in filtered_df.columns:
+            mask = filtered_df["plan end"].notna()
+            filtered_df.loc[mask, "period"] = filtered_df.loc[
+                mask, "plan end"
+            ].dt.to_period("M")
+            period_label = "Месяц"
+        else:
+            return {"warning": "Поле 'plan end' не найдено для группировки по месяцам."}
+    elif period_type_en == "Quarter":
+        if "plan end" in filtered_df.columns:
+            mask = filtered_df["plan end"].notna()
+            filtered_df.loc[mask, "period"] = filtered_df.loc[
+                mask, "plan end"
+            ].dt.to_period("Q")
+            period_label = "Квартал"
+        else:
+            return {"warning": "Поле 'plan end' не найдено для группировки по кварталам."}
+    else:  # Year
+        if "plan end" in filtered_df.columns:
+            mask = filtered_df["plan end"].notna()
+            filtered_df.loc[mask, "period"] = filtered_df.loc[
+                mask, "plan end"
+            ].dt.to_period("Y")
+            period_label = "Год"
+        else:
+            return {"warning": "Поле 'plan end' не найдено для группировки по годам."}
+
+    # Filter out rows without period data
+    filtered_df = filtered_df[filtered_df["period"].notna()]
+
+    if filtered_df.empty:
+        return {"info": "Нет данных с указанными периодами."}
+
+    # Convert deviation in days to numeric
+    if "deviation in days" in filtered_df.columns:
+        filtered_df["deviation in days"] = pd.to_numeric(
+            filtered_df["deviation in days"], errors="coerce"
+        )
+
+    # Group by project, period, and reason - count deviation days
+    group_cols = ["period"]
+    if "project name" in filtered_df.columns:
+        group_cols.append("project name")
+    if "reason of deviation" in filtered_df.columns:
+        group_cols.append("reason of deviation")
+
+    # Aggregate: count tasks and sum deviation days
+    # For average: sum deviation days / number of tasks (grouped by project if project is in group)
+    agg_dict = {"deviation": "count"}  # Count tasks
+    if "deviation in days" in filtered_df.columns:
+        agg_dict["deviation in days"] = "sum"  # Sum deviation days
+
+    grouped_data = filtered_df.groupby(group_cols, observed=True).agg(agg_dict).reset_index()
+
+    # Ensure period column is preserved as Period type if possible
+    # After groupby, Period objects might be converted, so we need to handle this
+    if "period" in grouped_data.columns:
+        # Try to preserve Period type or convert back if needed
+        try:
+            # Check if period values are still Period objects
+            if isinstance(grouped_data["period"].iloc[0], pd.Period):
+                # Period objects are preserved, good
+                pass
+            else:
+                # Try to convert back to Period if they're strings
+                try:
+                    # Try to convert string representations back to Period
+                    def try_convert_to_period(val):
+                        if isinstance(val, pd.Period):
+                            return val
+                        if isinstance(val, str) and "-" in val:
+                            try:
+                                parts = val.split("-")
+                                if len(parts) >= 2:
+                                    year = int(parts[0])
+                                    month = int(parts[1])
+                                    return pd.Period(f"{year}-{month:02d}", freq="M")
+                            except:
+                                pass
+                        return val
+
+                    grouped_data["period"] = grouped_data["period"].apply(
+                        try_convert_to_period
+                    )
+                except:
+                    pass
+        except:
+            pass
+
+    # Calculate average: sum of deviation days / number of tasks
+    if "deviation in days" in filtered_df.columns:
+        # Rename columns
+        if "deviation in days" in grouped_data.columns:
+            grouped_data = grouped_data.rename(
+                columns={
+                    "deviation": "Количество задач",
+                    "deviation in days": "Всего дней отклонений",
+                }
+            )
+        else:
+            grouped_data = grouped_data.rename(
+                columns={"deviation": "Количество задач"}
+            )
+            grouped_data["Всего дней отклонений"] = 0
+
+        # Calculate average: sum / count of tasks
+        grouped_data["Среднее дней отклонений"] = (
+            grouped_data["Всего дней отклонений"] / grouped_data["Количество задач"]
+        ).round(0)
+    else:
+        grouped_data = grouped_data.rename(columns={"deviation": "Количество задач"})
+        grouped_data["Всего дней отклонений"] = 0
+        grouped_data["Среднее дней отклонений"] = 0
+
+    grouped_data["period"] = grouped_data["period"].apply(_format_dynamics_period)
+
+    return {
+        "filtered_df": filtered_df,
+        "grouped_data": grouped_data,
+        "group_cols": group_cols,
+        "period_label": period_label,
+    }
+
+
+def dashboard_dynamics_of_deviations(df):
+    st.header("📈 Динамика отклонений")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        period_type = st.selectbox(
+            "Группировать по",
+            ["День", "Месяц", "Квартал", "Год"],
+            key="dynamics_period",
+        )
+        period_map = {
+            "День": "Day",
+            "Месяц": "Month",
+            "Квартал": "Quarter",
+            "Год": "Year",
+        }
+        period_type_en = period_map.get(period_type, "Month")
+
+    with col2:
+        if "project name" in df.columns:
+            projects = filter_options(df, "project name")
+            selected_project = st.selectbox(
+                "Фильтр по проекту", projects, key="dynamics_project"
+            )
+        else:
+            selected_project = "Все"
+
+    with col3:
+        if "reason of deviation" in df.columns:
+            reasons = filter_options(df, "reason of deviation")
+            selected_reason = st.selectbox(
+                "Фильтр по причине", reasons, key="dynamics_reason"
+            )
+        else:
+            selected_reason = "Все"
+
+    # Подготовка кэшируется по (набор данных, фильтры, группировка)
+    prepared = cached_computation(
+        "dynamics_of_deviations",
+        df,
+        (selected_project, selected_reason, period_type_en),
+        lambda: _prepare_dynamics_of_deviations(
+            df, selected_project, selected_reason, period_type_en
+        ),
+    )
+    if "warning" in prepared:
+        st.warning(prepared["warning"])
+        return
+    if "info" in prepared:
+        st.info(prepared["info"])
+        return
+    filtered_df = prepared["filtered_df"]
+    grouped_data = prepared["grouped_data"]
+    group_cols = prepared["group_cols"]
+    period_label = prepared["period_label"]
+
+    # Visualizations
+    if len(group_cols) == 1:  # Only period
+        col1, col2 = st.columns(2)
+
+        with col1:
+            def _deviations_count_by_period_chart():
+                fig = px.bar(
+                    grouped_data,
+                    x="period",
+                    y="Количество задач",
+                    title=f"Количество задач с отклонениями по {period_label.lower()}",
+                    labels={"period": period_label, "Количество задач": "Количество задач"},
+                    text="Количество задач",
+                )
+                fig.update_xaxes(tickangle=-45)
+                fig.update_traces(
+                    textposition="outside", textfont=dict(size=14, color="white")
+                )
+                return apply_chart_background(fig)
+
+            st.plotly_chart(
+                cached_figure(
+                    "deviations_count_by_period",
+                    grouped_data,
+                    (period_label,),
+                    _deviations_count_by_period_chart,
+                ),
+                use_container_width=True,
+            )
+
+        with col2:
+            if grouped_data["Всего дней отклонений"].sum() > 0:
+                grouped_data = grouped_data.copy()
+                grouped_data["_дни_текст"] = grouped_data["Всего дней отклонений"].apply(
+                    lambda x: f"{int(round(x, 0))}" if pd.notna(x) else ""
+                )
+                def _deviation_days_by_period_chart():
+                    fig = px.line(
+                        grouped_data,
+                        x="period",
+                        y="Всего дней отклонений",
+                        title=f"Всего дней отклонений по {period_label.lower()}",
+                        markers=True,
+                        text="_дни_текст",
+                    )
+                    fig.update_xaxes(tickangle=-45)
+                    fig.update_traces(textposition="top center", textfont=dict(color="white"))
+                    return apply_chart_background(fig)
+
+                st.plotly_chart(
+                    cached_figure(
+                        "deviation_days_by_period",
+                        grouped_data,
+                        (period_label,),
+                        _deviation_days_by_period_chart,
+                    ),
+                    use_container_width=True,
+                )
+            else:
+                st.info("Нет данных по дням отклонений.")
+    else:  # Grouped by project and/or reason
+        # Show by project if project is in group
+        if "project name" in group_cols:
+            st.subheader("По проектам")
+            # If reason is also in group_cols, aggregate by period and project only (sum across reasons)
+            if "reason of deviation" in group_cols:
+                project_data = (
+                    grouped_data.groupby(["period", "project name"], observed=True)
+                    .agg({"Всего дней отклонений": "sum", "Количество задач": "sum"})
+                    .reset_index()
+                )
+            else:
+                project_data = grouped_data
+
+            project_data = project_data.copy()
+            project_data["_дни_текст"] = project_data["Всего дней отклонений"].apply(
+                lambda x: f"{int(round(x, 0))}" if pd.notna(x) else ""
+            )
+            def _deviation_days_by_project_chart():
+                fig = px.bar(
+                    project_data,
+                    x="period",
+                    y="Всего дней отклонений",
+                    color="project name",
+                    title="Дни отклонений по периоду",
+                    labels={"period": "", "Всего дней отклонений": "Дни отклонений"},
+                    text="_дни_текст",
+                )
+                # Set barmode to 'group' to group bars by period
+                fig.update_layout(barmode="group")
+                fig.update_xaxes(tickangle=-45, title_text="")
+                # Update traces to ensure horizontal text orientation
+                fig.update_traces(
+                    textposition="outside", textfont=dict(size=14, color="white")
+                )
+                # Explicitly set textangle to 0 for all traces to ensure horizontal text
+                # In Plotly, textangle is set per trace
+                for i, trace in enumerate(fig.data):
+                    # Update trace with textangle=0 to ensure horizontal text
+                    fig.data[i].update(textangle=0)
+                return apply_chart_background(fig)
+
+            st.plotly_chart(
+                cached_figure(
+                    "deviation_days_by_project",
+                    project_data,
+                    (),
+                    _deviation_days_by_project_chart,
+                ),
+                use_container_width=True,
+            )
+
+        # Show by reason if reason is in group
+        if "reason of deviation" in group_cols:
+            st.subheader("По причинам")
+            # Агрегируем данные по периоду и причинам (один столбец за месяц с секторами по причинам)
+            if "project name" in group_cols:
+                # Сначала суммируем по проектам и причинам, затем по периодам
+                reason_data = (
+                    grouped_data.groupby(["period", "reason of deviation"], observed=True)
+                    .agg({"Всего дней отклонений": "sum", "Количество задач": "sum"})
+                    .reset_index()
+                )
+            else:
+                reason_data = grouped_data
+
+            # Вычисляем суммарные значения по каждому периоду для отображения над столбцами
+            period_totals = (
+                reason_data.groupby("period", observed=True)["Всего дней отклонений"]
+                .sum()
+                .reset_index()
+            )
+
+            reason_data = reason_data.copy()
+            reason_data["_дни_текст"] = reason_data["Всего дней отклонений"].apply(
+                lambda x: f"{int(round(x, 0))}" if pd.notna(x) else ""
+            )
+            def _deviation_days_by_reason_chart():
+                fig = px.bar(
+                    reason_data,
+                    x="period",
+                    y="Всего дней отклонений",
+                    color="reason of deviation",
+                    title="Дни отклонений по периоду и причинам",
+                    labels={"period": "", "Всего дней отклонений": "Дни отклонений"},
+                    text="_дни_текст",
+                )
+                # Используем накопление (stack) для отображения секторов причин в одном столбце
+                fig.update_layout(barmode="stack")
+                fig.update_xaxes(tickangle=-45, title_text="")
+                # Убираем текст внутри столбцов, так как итоговые значения выводятся над столбцами через аннотации
+                fig.update_traces(
+                    textposition="none", textfont=dict(size=12, color="white")
+                )
+                # Explicitly set textangle to 0 for all traces to ensure horizontal text
+                # In Plotly, textangle is set per trace
+                for i, trace in enumerate(fig.data):
+                    # Update trace with textangle=0 to ensure horizontal text
+                    fig.data[i].update(textangle=0)
+
+                # Добавляем суммарные значения над столбцами
+                annotations = []
+                for idx, row in period_totals.iterrows():
+                    period = row["period"]
+                    total = row["Всего дней отклонений"]
+                    # Для положительных значений - над столбцом (от верхней точки)
+                    # Для отрицательных значений - над столбцом (от верхней точки, которая находится внизу на y=0)
+                    if total >= 0:
+                        # Положительное значение: аннотация над столбцом
+                        y_coord = total
+                        y_anchor = "bottom"
+                        y_shift = (
+                            20  # Фиксированное расстояние 20px от верхней точки столбца
+                        )
+                    else:
+                        # Отрицательное значение: аннотация над столбцом (который идет вниз)
+                        # Верхняя точка отрицательного столбца находится на y=0, нижняя - на y=total
+                        y_coord = 0  # Позиционируем относительно верхней точки (y=0)
+                        y_anchor = "bottom"
+                        y_shift = (
+                            20  # Фиксированное расстояние 20px от верхней точки столбца
+                        )
+
+                    annotations.append(
+                        dict(
+                            x=period,
+                            y=y_coord,
+                            text=f"{int(round(total, 0))}",
+                            showarrow=False,
+                            xanchor="center",
+                            yanchor=y_anchor,
+                            yshift=y_shift,
+                            font=dict(size=14, color="white", weight="bold"),
+                        )
+                    )
+                fig.update_layout(annotations=annotations)
+
+                return apply_chart_background(fig)
+
+            st.plotly_chart(
+                cached_figure(
+                    "deviation_days_by_reason",
+                    reason_data,
+                    (),
+                    _deviation_days_by_reason_chart,
+                ),
+                use_container_width=True,
+            )
+
+    # Summary table
+    # If project is in group, show summary grouped by project overall (aggregate across all periods)
+    if "project name" in group_cols:
+        # Create project-level summary (aggregate across all periods, not by day/period)
+        project_summary_cols = ["project name"]
+        if "reason of deviation" in group_cols:
+            project_summary_cols.append("reason of deviation")
+
+        # Получаем доступные периоды из grouped_data для фильтра
+        available_periods = []
+        if "period" in grouped_data.columns:
+            available_periods = sorted(
+                grouped_data["period"].dropna().unique().tolist()
+            )
+
+        st.subheader(
+            f"Сводная таблица (группировка: {', '.join(project_summary_cols)})"
+        )
+
+        # Добавляем селекторы для фильтрации таблицы
+        filter_cols = st.columns(3)
+        filtered_df_for_summary = filtered_df.copy()
+
+        with filter_cols[0]:
+            if "project name" in filtered_df_for_summary.columns:
+                available_projects = ["Все"] + sorted(
+                    filtered_df_for_summary["project name"].dropna().unique().tolist()
+                )
+                selected_project_filter = st.selectbox(
+                    "Фильтр по проекту",
+                    available_projects,
+                    key="summary_project_filter",
+                )
+                if selected_project_filter != "Все":
+                    filtered_df_for_summary = filtered_df_for_summary[
+                        filtered_df_for_summary["project name"]
+                        == selected_project_filter
+                    ]
+
+        with filter_cols[1]:
+            if "reason of deviation" in filtered_df_for_summary.columns:
+                available_reasons = ["Все"] + sorted(
+                    filtered_df_for_summary["reason of deviation"]
+                    .dropna()
+                    .unique()
+                    .tolist()
+                )
+                selected_reason_filter = st.selectbox(
+                    "Фильтр по причине отклонения",
+                    available_reasons,
+                    key="summary_reason_filter",
+                )
+                if selected_reason_filter != "Все":
+                    filtered_df_for_summary = filtered_df_for_summary[
+                        filtered_df_for_summary["reason of deviation"]
+                        == selected_reason_filter
+                    ]
+
+        with filter_cols[2]:
+            # Фильтр по периоду
+            period_options = ["Весь период"] + available_periods
+            selected_period_filter = st.selectbox(
+                "Фильтр по периоду", period_options, key="summary_period_filter"
+            )
+
+            # Применяем фильтр по периоду
+            if (
+                selected_period_filter != "Весь период"
+                and "period" in filtered_df_for_summary.columns
+            ):
+                # Фильтруем по отформатированному периоду
+                if "plan end" in filtered_df_for_summary.columns:
+                    # Создаем временную колонку с отформатированными периодами для фильтрации
+                    filtered_df_for_summary = filtered_df_for_summary.copy()
+                    mask = filtered_df_for_summary["plan end"].notna()
+                    if period_type_en == "Month":
+                        filtered_df_for_summary.loc[mask, "temp_period"] = (
+                            filtered_df_for_summary.loc[mask, "plan end"].dt.to_period(
+                                "M"
+                            )
+                        )
+                    elif period_type_en == "Quarter":
+                        filtered_df_for_summary.loc[mask, "temp_period"] = (
+                            filtered_df_for_summary.loc[mask, "plan end"].dt.to_period(
+                                "Q"
+                            )
+                        )
+                    elif period_type_en == "Year":
+                        filtered_df_for_summary.loc[mask, "temp_period"] = (
+                            filtered_df_for_summary.loc[mask, "plan end"].dt.to_period(
+                                "Y"
+                            )
+                        )
+                    else:
+                        filtered_df_for_summary.loc[mask, "temp_period"] = (
+                            filtered_df_for_summary.loc[mask, "plan end"].dt.date
+                        )
+
+                    # Форматируем периоды для сравнения
+                    filtered_df_for_summary.loc[mask, "temp_period_formatted"] = (
+                        filtered_df_for_summary.loc[mask, "temp_period"].apply(
+                            _format_dynamics_period
+                        )
+                    )
+                    # Фильтруем по выбранному периоду
+                    period_mask = (
+                        filtered_df_for_summary["temp_period_formatted"]
+                        == selected_period_filter
+                    )
+                    filtered_df_for_summary = filtered_df_for_summary[period_mask]
+                    # Удаляем временные колонки
+                    filtered_df_for_summary = filtered_df_for_summary.drop(
+                        columns=["temp_period", "temp_period_formatted"],
+                        errors="ignore",
+                    )
+
+        # Aggregate by project (and reason if present) - sum across selected periods
+        project_summary = (
+            filtered_df_for_summary.groupby(project_summary_cols, observed=True)
+            .agg(
+                {
+                    "deviation": "count",  # Count tasks
+                    "deviation in days": (
+                        "sum"
+                        if "deviation in days" in filtered_df_for_summary.columns
+                        else "count"
+                    ),
+                }
+            )
+            .reset_index()
+        )
+
+        # Rename columns
+        period_col_name = (
+            f"Дни отклонений ({selected_period_filter})"
+            if selected_period_filter != "Весь период"
+            else "Всего дней отклонений"
+        )
+        col_ru_summary = {
+            "deviation": "Количество отклонений",
+            "deviation in days": period_col_name,
+            "project name": "Проект",
+            "reason of deviation": "Причина отклонений",
+        }
+        project_summary = project_summary.rename(
+            columns={c: col_ru_summary[c] for c in project_summary.columns if c in col_ru_summary}
+        )
+
+        # Если нет данных по дням отклонений, добавляем нулевую колонку
+        if period_col_name not in project_summary.columns:
+            project_summary[period_col_name] = 0
+
+        # Sort by total deviation days (descending)
+        if period_col_name in project_summary.columns:
+            project_summary = project_summary.sort_values(
+                period_col_name, ascending=False
+            )
+
+        # Строка "Итого": для колонок группировки (после переименования — Проект, Причина отклонений)
+        total_row = {}
+        for col in project_summary.columns:
+            if col in ("Проект", "Причина отклонений"):
+                total_row[col] = "Итого"
+            elif col == "Количество отклонений":
+                total_row[col] = round(project_summary[col].sum(), 0)
+            elif col == period_col_name:
+                total_row[col] = round(project_summary[col].sum(), 0)
+            else:
+                total_row[col] = ""
+
+        # Создаем DataFrame для строки "Итого"
+        total_df = pd.DataFrame([total_row])
+        # Объединяем с основным DataFrame
+        project_summary = pd.concat([project_summary, total_df], ignore_index=True)
+
+        # Отображение дней целыми числами (без дробной части)
+        if period_col_name in project_summary.columns:
+            def _fmt_days(x):
+                if pd.isna(x): return x
+                if str(x).strip() == "Итого": return x
+                try: return round(float(x), 0)
+                except (TypeError, ValueError): return x
+            project_summary[period_col_name] = project_summary[period_col_name].apply(_fmt_days)
+
+        st.table(style_dataframe_for_dark_theme(project_summary))
+    else:
+        # No project in group, show regular summary by period (только количество, без дней)
+        group_desc = [period_label] + [c for c in group_cols if c != "period"]
+        st.subheader(f"Сводная таблица (группировка: {', '.join(group_desc)})")
+        table_cols = ["period", "Количество задач"]
+        table_cols.extend([c for c in grouped_data.columns if c not in ("period", "Количество задач", "Всего дней отклонений", "Среднее дней отклонений")])
+        display_grouped = grouped_data[[c for c in table_cols if c in grouped_data.columns]].copy()
+        display_grouped = display_grouped.rename(columns={
+            "period": "Период",
+            "project name": "Проект",
+            "reason of deviation": "Причина отклонений",
+        })
+        display_grouped = paginate_table(display_grouped, key="dynamics_table_page")
+        st.markdown(dark_table_to_html(display_grouped), unsafe_allow_html=True)
+
+
+# ==================== DASHBOARD 3: Plan/Fact Dates for Tasks ====================
+def _plan_fact_bar_data(rows):
+    """
+    Данные столбцов «План/факт»: по строке на каждую пару дат (План: plan start/end,
+    Факт: base start/end), где обе даты заданы. Порядок — как в rows, План перед Фактом.
+    """
+    display_names = pd.Series(
+        [
+            f"{task} ({project})"
+            for task, project in zip(
+                rows["task name"],
+                rows["project name"] if "project name" in rows.columns
+                else ["Неизвестно"] * len(rows),
+            )
+        ],
+        index=rows.index,
+        dtype=object,
+    )
+    # Этап (section) для оси X; пустые — «—»
+    if "section" in rows.columns:
+        sections = rows["section"].astype(object)
+        blank = sections.isna() | (sections.astype(str).str.strip() == "")
+        sections = sections.where(~blank, "—")
+    else:
+        sections = pd.Series("—", index=rows.index, dtype=object)
+
+    parts = []
+    for order, (kind, start_col, end_col) in enumerate(
+        (("План", "plan start", "plan end"), ("Факт", "base start", "base end"))
+    ):
+        valid = rows[start_col].notna() & rows[end_col].notna()
+        part = pd.DataFrame(
+            {
+                "Задача": display_names[valid],
+                "Этап": sections[valid],
+                "Тип": kind,
+                "Дата начала": rows.loc[valid, start_col],
+                "Дата окончания": rows.loc[valid, end_col],
+                "Длительность": (
+                    rows.loc[valid, end_col] - rows.loc[valid, start_col]
+                ).dt.total_seconds() / 86400,
+                "Отклонение": rows.loc[valid, "total_diff_days"],
+            }
+        )
+        part["_pos"] = np.flatnonzero(valid.to_numpy()) * 2 + order
+        parts.append(part)
+    bar_df = pd.concat(parts, ignore_index=True)
+    return bar_df.sort_values("_pos", kind="stable").drop(columns="_pos").reset_index(drop=True)
+
+
+def _completion_percent(bar_df):
+    """
+    Процент выполнения (факт / план * 100) для строк План с длительностью > 0 и для первой
+    строки Факт той же задачи; «Н/Д» — у плана нет факта. Остальные строки — пустая строка.
+    """
+    is_plan = (bar_df["Тип"] == "План") & (bar_df["Длительность"] > 0)
+    first_fact = bar_df[bar_df["Тип"] == "Факт"].drop_duplicates(subset=["Задача"])
+    fact_duration = first_fact.set_index("Задача")["Длительность"]
+    result = pd.Series("", index=bar_df.index, dtype=object)
+
+    plan_rows = bar_df[is_plan]
+    plan_pct = plan_rows["Задача"].map(fact_duration) / plan_rows["Длительность"] * 100
+    result[plan_rows.index] = [
+        f"{v:.1f}%" if pd.notna(v) else "Н/Д" for v in plan_pct
+    ]
+    # Строка факта получает процент последней строки плана этой задачи
+    last_plan = plan_rows.drop_duplicates(subset=["Задача"], keep="last")
+    plan_duration = last_plan.set_index("Задача")["Длительность"]
+    fact_pct = first_fact["Длительность"] / first_fact["Задача"].map(plan_duration) * 100
+    matched = fact_pct.notna()
+    result[fact_pct.index[matched]] = [f"{v:.1f}%" for v in fact_pct[matched]]
+    return result
+
+
+def _prepare_plan_fact_dates(df, selected_project, selected_task, selected_section):
+    """
+    Подготовка данных план/факт сроков (без отрисовки): фильтры, даты, отклонения
+    начала/конца в днях и строки графика (_plan_fact_bar_data).
+    При невозможности построить отчёт — {"warning": текст} или {"info": текст}.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Apply filters (shared filter engine: bitmap AND, no full-frame copy)
+    filtered_df = apply_filters(
+        df,
+        {
+            "project name": selected_project,
+            "task name": selected_task,
+            "section": selected_section,
+        },
+    )
+
+    if filtered_df.empty:
+        return {"info": "Нет данных для выбранных фильтров."}
+
+    ensure_date_columns(filtered_df)
+    # Prepare data for visualization - compare plan and fact dates
+    # First, ensure all dates are datetime objects
+    date_cols = ["plan start", "plan end", "base start", "base end"]
+    for col in date_cols:
+        if col in filtered_df.columns:
+            filtered_df[col] = to_datetime_series(filtered_df[col])
+
+    missing_date_cols = [col for col in date_cols if col not in filtered_df.columns]
+    if missing_date_cols:
+        return {"warning": f"Отсутствуют необходимые колонки с датами: {', '.join(missing_date_cols)}"}
+
+    # Filter to rows that have at least plan OR fact dates (not necessarily both)
+    has_plan_dates = filtered_df["plan start"].notna() & filtered_df["plan end"].notna()
+    has_fact_dates = filtered_df["base start"].notna() & filtered_df["base end"].notna()
+    has_any_dates = has_plan_dates | has_fact_dates
+    filtered_df = filtered_df[has_any_dates]
+
+    if filtered_df.empty:
+        return {"info": "Нет задач с плановыми или фактическими датами для выбранных фильтров."}
+
+    # Calculate date differences for tasks that have both plan and fact
+    # Дни с дробной частью (total_seconds / 86400); для строк без пары дат — NaN / 0
+    both_dates_mask = (has_plan_dates & has_fact_dates).loc[filtered_df.index]
+    start_diff = (
+        filtered_df["base start"] - filtered_df["plan start"]
+    ).dt.total_seconds() / 86400
+    end_diff = (
+        filtered_df["base end"] - filtered_df["plan end"]
+    ).dt.total_seconds() / 86400
+    filtered_df["plan_start_diff"] = start_diff.where(both_dates_mask)
+    filtered_df["plan_end_diff"] = end_diff.where(both_dates_mask)
+    filtered_df["total_diff_days"] = end_diff.abs().where(both_dates_mask, 0.0)
+
+    # Sort by task name (alphabetically) for consistent display
+    filtered_df = filtered_df.sort_values("task name", ascending=True, kind="stable")
+
+    # Prepare data for bar chart - plan and fact side by side for each task
+    # If "Все" projects selected, show every row; otherwise only the first row of each task
+    bar_source = filtered_df[filtered_df["task name"].notna()]
+    if selected_project != "Все":
+        bar_source = bar_source.drop_duplicates(subset=["task name"])
+    bar_df = _plan_fact_bar_data(bar_source)
+
+    return {"filtered_df": filtered_df, "bar_df": bar_df}
+
+
+def dashboard_plan_fact_dates(df):
+    st.header("📅 Отклонение текущего срока от базового плана")
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        if "project name" in df.columns:
+            projects = filter_options(df, "project name")
+            selected_project = st.selectbox(
+                "Фильтр по проекту", projects, key="dates_project"
+            )
+        else:
+            selected_project = "Все"
+
+    with col2:
+        if "task name" in df.columns:
+            tasks = filter_options(df, "task name")
+            selected_task = st.selectbox("Фильтр по лоту", tasks, key="dates_task")
+        else:
+            selected_task = "Все"
+
+    with col3:
+        if "section" in df.columns:
+            sections = filter_options(df, "section")
+            selected_section = st.selectbox(
+                "Фильтр по этапу", sections, key="dates_section"
+            )
+        else:
+            selected_section = "Все"
+
+    with col4:
+        pass
+
+    # Подготовка кэшируется по (набор данных, фильтры); «Показать процент выполнения»
+    # и выбор задачи для метрик её не пересчитывают
+    prepared = cached_computation(
+        "plan_fact_dates",
+        df,
+        (selected_project, selected_task, selected_section),
+        lambda: _prepare_plan_fact_dates(df, selected_project, selected_task, selected_section),
+    )
+    if "warning" in prepared:
+        st.warning(prepared["warning"])
+        return
+    if "info" in prepared:
+        st.info(prepared["info"])
+        return
+    filtered_df = prepared["filtered_df"]
+    # Копия: ниже в строки графика дописываются служебные колонки
+    bar_df = prepared["bar_df"].copy()
+
+    if bar_df.empty:
+        st.info("Нет данных для отображения графика.")
+    else:
+        # График по этапам: ось X = этап, ось Y = отклонение (дней)
+        if "Этап" in bar_df.columns:
+            section_dev = (
+                bar_df.drop_duplicates(subset=["Задача"])[["Этап", "Отклонение"]]
+                .groupby("Этап", as_index=False, observed=True)["Отклонение"]
+                .max()
+            )
+            if not section_dev.empty:
+                def _plan_fact_sections_chart():
+                    fig_section = go.Figure()
+                    fig_section.add_trace(
+                        go.Bar(
+                            x=section_dev["Этап"],
+                            y=section_dev["Отклонение"],
+                            text=section_dev["Отклонение"].apply(
+                                lambda v: f"{int(round(v, 0))}" if pd.notna(v) else ""
+                            ),
+                            textposition="inside",
+                            textfont=dict(size=12, color="white"),
+                            marker_color="#2E86AB",
+                            name="Отклонение (дней)",
+                        )
+                    )
+                    fig_section.update_layout(
+                        title="Отклонение текущего срока от базового плана по этапам",
+                        xaxis_title="Этап",
+                        yaxis_title="Отклонение (дней)",
+                        height=max(400, len(section_dev) * 50),
+                        showlegend=False,
+                    )
+                    return apply_chart_background(fig_section)
+
+                st.plotly_chart(
+                    cached_figure(
+                        "plan_fact_sections",
+                        section_dev,
+                        (),
+                        _plan_fact_sections_chart,
+                    ),
+                    use_container_width=True,
+                )
+
+        # Checkbox to show/hide completion percentage
+        show_completion = st.checkbox(
+            "Показать процент выполнения",
+            value=False,
+            key="show_completion_percent_dates",
+        )
+
+        # Calculate completion percentage if needed: (fact / plan) * 100 на первой строке факта задачи
+        if show_completion:
+            bar_df["Процент выполнения"] = _completion_percent(bar_df)
+
+        # Sort tasks by start date (earliest first)
+        if not bar_df.empty:
+            # Get unique tasks and sort by earliest start date
+            task_start_dates = (
+                bar_df.groupby("Задача", observed=True)["Дата начала"].min().sort_values()
+            )
+            task_order = {task: idx for idx, task in enumerate(task_start_dates.index)}
+            bar_df["sort_order"] = bar_df["Задача"].map(task_order)
+            bar_df = bar_df.sort_values(["sort_order", "Тип"], ascending=[True, True])
+            bar_df = bar_df.drop("sort_order", axis=1)
+            bar_df = bar_df.reset_index(drop=True)
+
+        # График «План/факт по этапам»: ось Y — названия этапов и задача (без План/Факт в подписи)
+        # По оси Y только этап и задача (названия этапов); План и Факт — два столбца в одной строке
+        bar_df["_y"] = [
+            f"{stage} — {task}" for stage, task in zip(bar_df["Этап"], bar_df["Задача"])
+        ]
+        plan_df = bar_df[bar_df["Тип"] == "План"]
+        fact_df = bar_df[bar_df["Тип"] == "Факт"]
+        def _sort_key(s):
+            parts = s.split(" — ", 2)
+            stage = parts[0] if len(parts) > 0 else ""
+            task = parts[1] if len(parts) > 1 else ""
+            return (stage, task)
+        unique_tasks_sorted = sorted(
+            pd.unique(pd.concat([plan_df["_y"], fact_df["_y"]])), key=_sort_key
+        )
+
+        def _plan_fact_gantt_chart():
+            fig_gantt = go.Figure()
+
+            # План — отдельный столбец; при «Показать процент выполнения» показываем только Факт
+            if not show_completion and not plan_df.empty:
+                fig_gantt.add_trace(
+                    go.Bar(
+                        x=plan_df["Дата окончания"],
+                        base=plan_df["Дата начала"],
+                        y=plan_df["_y"],
+                        orientation="h",
+                        name="План",
+                        marker_color="#2E86AB",
+                        text=plan_df["Дата окончания"].dt.strftime("%d.%m.%Y"),
+                        textposition="outside",
+                        textfont=dict(size=11, color="white"),
+                        hovertemplate="<b>%{y}</b><br>Начало: %{base|%d.%m.%Y}<br>Окончание: %{x|%d.%m.%Y}<br><extra></extra>",
+                    )
+                )
+
+            if not fact_df.empty:
+                fact_texts = fact_df["Дата окончания"].dt.strftime("%d.%m.%Y")
+                if show_completion:
+                    pct = fact_df["Процент выполнения"]
+                    has_pct = pct.notna() & (pct != "")
+                    fact_texts = fact_texts.where(
+                        ~has_pct, fact_texts + " (" + pct.astype(str) + ")"
+                    )
+                fig_gantt.add_trace(
+                    go.Bar(
+                        x=fact_df["Дата окончания"],
+                        base=fact_df["Дата начала"],
+                        y=fact_df["_y"],
+                        orientation="h",
+                        name="Факт",
+                        marker_color="#FF6347",
+                        text=fact_texts,
+                        textposition="outside",
+                        textfont=dict(size=11, color="white"),
+                        hovertemplate="<b>%{y}</b><br>Начало: %{base|%d.%m.%Y}<br>Окончание: %{x|%d.%m.%Y}<br><extra></extra>",
+                    )
+                )
+
+            fig_gantt.update_layout(
+                title="План/факт по этапам",
+                xaxis_title="Дата",
+                yaxis_title="Этапы",
+                height=max(600, len(unique_tasks_sorted) * 45),
+                barmode="group",  # План и Факт — два столбца в одной строке (название этапа — задача)
+                hovermode="closest",
+                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+                xaxis=dict(type="date", tickformat="%d.%m.%Y"),
+                yaxis=dict(categoryorder="array", categoryarray=list(reversed(unique_tasks_sorted))),
+            )
+            return apply_chart_background(fig_gantt)
+
+        st.plotly_chart(
+            cached_figure("plan_fact_gantt", bar_df, (show_completion,), _plan_fact_gantt_chart),
+            use_container_width=True,
+        )
+
+    # Форматирование даты для отображения
+    def format_date_display(date_val):
+        if pd.isna(date_val):
+            return "Н/Д"
+        if isinstance(date_val, pd.Timestamp):
+            return date_val.strftime("%d.%m.%Y")
+        try:
+            dt = pd.to_datetime(date_val, errors="coerce", dayfirst=True)
+            if pd.notna(dt):
+                return dt.strftime("%d.%m.%Y")
+        except:
+            pass
+        return str(date_val) if date_val else "Н/Д"
+
+    # Селектор задачи для метрик окончания проекта (только при выборе конкретного проекта)
+    selected_task_for_metrics = None
+    if (
+        selected_project != "Все"
+        and "task name" in df.columns
+        and "project name" in df.columns
+    ):
+        # Получаем список задач выбранного проекта
+        project_tasks = apply_filters(df, {"project name": selected_project})
+        if not project_tasks.empty:
+            available_tasks = sorted(
+                project_tasks["task name"].dropna().unique().tolist()
+            )
+            if available_tasks:
+                # По умолчанию используем "Разрешение на ввод в эксплуатацию", если она есть
+                default_task = (
+                    "Разрешение на ввод в эксплуатацию"
+                    if "Разрешение на ввод в эксплуатацию" in available_tasks
+                    else available_tasks[0]
+                )
+                selected_task_for_metrics = st.selectbox(
+                    "Задача для расчета окончания проекта",
+                    available_tasks,
+                    index=(
+                        available_tasks.index(default_task)
+                        if default_task in available_tasks
+                        else 0
+                    ),
+                    key="task_for_project_end_metrics",
+                )
+
+    # Найти задачу для метрик (либо выбранную через селектор, либо "Разрешение на ввод в эксплуатацию" по умолчанию)
+    task_name_to_find = (
+        selected_task_for_metrics
+        if selected_task_for_metrics
+        else "Разрешение на ввод в эксплуатацию"
+    )
+    task_row = None
+
+    if "task name" in df.columns:
+        # Ищем задачу в исходных данных (не в отфильтрованных);
+        # если выбран конкретный проект — только в этом проекте
+        task_rows = apply_filters(
+            df, {"task name": task_name_to_find, "project name": selected_project}
+        )
+        if not task_rows.empty:
+            task_row = task_rows.iloc[0]
+
+    # Add comparison metrics
+    col1, col2, col3 = st.columns(3)
+
+    # Максимальное отклонение (дней) - отклонение факта от плана для выбранной задачи
+    with col1:
+        if task_row is not None:
+            # Преобразуем даты в datetime если нужно
+            plan_end = task_row.get("plan end")
+            base_end = task_row.get("base end")
+
+            if pd.notna(plan_end):
+                plan_end = pd.to_datetime(plan_end, errors="coerce", dayfirst=True)
+            if pd.notna(base_end):
+                base_end = pd.to_datetime(base_end, errors="coerce", dayfirst=True)
+
+            if pd.notna(plan_end) and pd.notna(base_end):
+                deviation_days = (base_end - plan_end).total_seconds() / 86400
+                deviation_str = f"{int(round(deviation_days, 0))}"
+
+                # Цвет: отрицательное = зеленый, положительное = красный
+                # Используем delta_color="inverse": отрицательные значения = зеленый, положительные = красный
+                st.metric(
+                    "Максимальное отклонение (дней)",
+                    deviation_str,
+                    delta=f"{int(round(deviation_days, 0))}",
+                    delta_color="inverse",
+                )
+            else:
+                st.metric("Максимальное отклонение (дней)", "Н/Д")
+        else:
+            st.metric("Максимальное отклонение (дней)", "Н/Д")
+
+    # План окончания проекта - дата из задачи "Разрешение на ввод в эксплуатацию"
+    with col2:
+        if task_row is not None:
+            plan_end = task_row.get("plan end")
+            if pd.notna(plan_end):
+                plan_end = pd.to_datetime(plan_end, errors="coerce", dayfirst=True)
+                plan_end_str = format_date_display(plan_end)
+            else:
+                plan_end_str = "Н/Д"
+            st.metric("План окончания проекта", plan_end_str)
+        else:
+            st.metric("План окончания проекта", "Н/Д")
+
+    # Факт окончания проекта - дата из задачи "Разрешение на ввод в эксплуатацию"
+    with col3:
+        if task_row is not None:
+            base_end = task_row.get("base end")
+            if pd.notna(base_end):
+                base_end = pd.to_datetime(base_end, errors="coerce", dayfirst=True)
+                fact_end_str = format_date_display(base_end)
+            else:
+                fact_end_str = "Н/Д"
+            st.metric("Факт окончания проекта", fact_end_str)
+        else:
+            st.metric("Факт окончания проекта", "Н/Д")
+
+    # Добавляем разделитель и аналогичные метрики для задачи "Разрешение на строительство"
+    st.markdown("---")
+    col1_construction, col2_construction, col3_construction = st.columns(3)
+
+    # Найти задачу "Разрешение на строительство"
+    task_name_construction = "Разрешение на строительство"
+    task_row_construction = None
+
+    if "task name" in df.columns:
+        # Ищем задачу в исходных данных (не в отфильтрованных)
+        task_rows_construction = apply_filters(df, {"task name": task_name_construction})
+        if not task_rows_construction.empty:
+            task_row_construction = task_rows_construction.iloc[0]
+
+    # Максимальное отклонение (дней) - отклонение факта от плана для задачи "Разрешение на строительство"
+    with col1_construction:
+        if task_row_construction is not None:
+            # Преобразуем даты в datetime если нужно
+            plan_end_construction = task_row_construction.get("plan end")
+            base_end_construction = task_row_construction.get("base end")
+
+            if pd.notna(plan_end_construction):
+                plan_end_construction = pd.to_datetime(
+                    plan_end_construction, errors="coerce", dayfirst=True
+                )
+            if pd.notna(base_end_construction):
+                base_end_construction = pd.to_datetime(
+                    base_end_construction, errors="coerce", dayfirst=True
+                )
+
+            if pd.notna(plan_end_construction) and pd.notna(base_end_construction):
+                deviation_days_construction = (
+                    base_end_construction - plan_end_construction
+                ).total_seconds() / 86400
+                deviation_str_construction = f"{int(round(deviation_days_construction, 0))}"
+
+                # Цвет: отрицательное = зеленый, положительное = красный
+                # Используем delta_color="inverse": отрицательные значения = зеленый, положительные = красный
+                st.metric(
+                    "Максимальное отклонение (дней)",
+                    deviation_str_construction,
+                    delta=f"{int(round(deviation_days_construction, 0))}",
+                    delta_color="inverse",
+                )
+            else:
+                st.metric("Максимальное отклонение (дней)", "Н/Д")
+        else:
+            st.metric("Максимальное отклонение (дней)", "Н/Д")
+
+    # План окончания проекта - дата из задачи "Разрешение на строительство"
+    with col2_construction:
+        if task_row_construction is not None:
+            plan_end_construction = task_row_construction.get("plan end")
+            if pd.notna(plan_end_construction):
+                plan_end_construction = pd.to_datetime(
+                    plan_end_construction, errors="coerce", dayfirst=True
+                )
+                plan_end_str_construction = format_date_display(plan_end_construction)
+            else:
+                plan_end_str_construction = "Н/Д"
+            st.metric("План окончания проекта", plan_end_str_construction)
+        else:
+            st.metric("План окончания проекта", "Н/Д")
+
+    # Факт окончания проекта - дата из задачи "Разрешение на строительство"
+    with col3_construction:
+        if task_row_construction is not None:
+            base_end_construction = task_row_construction.get("base end")
+            if pd.notna(base_end_construction):
+                base_end_construction = pd.to_datetime(
+                    base_end_construction, errors="coerce", dayfirst=True
+                )
+                fact_end_str_construction = format_date_display(base_end_construction)
+            else:
+                fact_end_str_construction = "Н/Д"
+            st.metric("Факт окончания проекта", fact_end_str_construction)
+        else:
+            st.metric("Факт окончания проекта", "Н/Д")
+
+    # Summary table - format dates properly, sorted by difference
+    def _column_or(name, default):
+        if name in filtered_df.columns:
+            return filtered_df[name].to_numpy()
+        return default
+
+    def _format_dates(col):
+        return filtered_df[col].dt.strftime("%d.%m.%Y").fillna("Н/Д").to_numpy()
+
+    summary_df = pd.DataFrame(
+        {
+            "Проект": _column_or("project name", "Н/Д"),
+            "Задача": _column_or("task name", "Н/Д"),
+            "Раздел": _column_or("section", "Н/Д"),
+            "План Начало": _format_dates("plan start"),
+            "План Конец": _format_dates("plan end"),
+            "Факт Начало": _format_dates("base start"),
+            "Факт Конец": _format_dates("base end"),
+            "Отклонение начала (дней)": filtered_df["plan_start_diff"].to_numpy(),
+            "Отклонение конца (дней)": filtered_df["plan_end_diff"].to_numpy(),
+        }
+    )
+    # Convert 'Отклонение конца (дней)' to numeric for proper sorting
+    summary_df["Отклонение конца (дней)"] = pd.to_numeric(
+        summary_df["Отклонение конца (дней)"], errors="coerce"
+    )
+    summary_df["Отклонение начала (дней)"] = pd.to_numeric(
+        summary_df["Отклонение начала (дней)"], errors="coerce"
+    )
+
+    # If "Все" projects selected, add summary column with totals per task
+    if selected_project == "Все" and "Задача" in summary_df.columns:
+        # Calculate totals per task
+        task_totals = (
+            summary_df.groupby("Задача", observed=True)
+            .agg({"Отклонение начала (дней)": "sum", "Отклонение конца (дней)": "sum"})
+            .reset_index()
+        )
+        task_totals.columns = [
+            "Задача",
+            "Сумма отклонения начала (дней)",
+            "Сумма отклонения конца (дней)",
+        ]
+
+        # Calculate total deviation per task (sum of start and end deviations)
+        task_totals["Суммарное отклонение (дней)"] = task_totals[
+            "Сумма отклонения начала (дней)"
+        ].fillna(0) + task_totals["Сумма отклонения конца (дней)"].fillna(0)
+
+        # Merge totals back to summary_df
+        summary_df = summary_df.merge(task_totals, on="Задача", how="left")
+
+        # Reorder columns to put summary columns after deviation columns
+        cols = summary_df.columns.tolist()
+        # Remove summary columns from their current position
+        cols.remove("Сумма отклонения начала (дней)")
+        cols.remove("Сумма отклонения конца (дней)")
+        cols.remove("Суммарное отклонение (дней)")
+        # Add them after deviation columns
+        start_idx = cols.index("Отклонение начала (дней)")
+        end_idx = cols.index("Отклонение конца (дней)")
+        cols.insert(end_idx + 1, "Сумма отклонения начала (дней)")
+        cols.insert(end_idx + 2, "Сумма отклонения конца (дней)")
+        cols.insert(end_idx + 3, "Суммарное отклонение (дней)")
+        summary_df = summary_df[cols]
+
+    # Sort by end date difference (largest first, descending order)
+    # Handle NaN values by placing them at the end
+    summary_df = summary_df.sort_values(
+        "Отклонение конца (дней)", ascending=False, na_position="last"
+    )
+    # Отображение дней целыми числами (без дробной части)
+    for col in ["Отклонение начала (дней)", "Отклонение конца (дней)"]:
+        if col in summary_df.columns:
+            summary_df[col] = summary_df[col].apply(
+                lambda x: round(float(x), 0) if pd.notna(x) and str(x).strip() != "" else x
+            )
+    for col in ["Сумма отклонения начала (дней)", "Сумма отклонения конца (дней)", "Суммарное отклонение (дней)"]:
+        if col in summary_df.columns:
+            summary_df[col] = summary_df[col].apply(
+                lambda x: round(float(x), 0) if pd.notna(x) and str(x).strip() != "" else x
+            )
+    st.subheader("Детальные даты задач")
+    summary_df = paginate_table(summary_df, key="plan_fact_detail_page")
+    st.markdown(dark_table_to_html(summary_df), unsafe_allow_html=True)
+
+
+# ==================== DASHBOARD 4: Deviation Amount by Tasks ====================
+def _prepare_deviation_by_tasks(
+    df, project_col, selected_project, selected_task, selected_section
+):
+    """
+    Подготовка данных «Значения отклонений от базового плана» (без отрисовки): фильтры,
+    задачи с отклонениями, процент выполнения и сумма дней отклонений по проекту/разделу/задаче.
+    При невозможности построить отчёт — {"warning": текст} или {"info": текст}.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    filtered_df = apply_filters(
+        df,
+        {
+            project_col: selected_project,
+            "task name": selected_task,
+            "section": selected_section,
+        },
+    )
+
+    # Filter tasks: deviation=1/True OR reason of deviation filled
+    try:
+        has_deviation_col = "deviation" in filtered_df.columns
+        has_reason_col = "reason of deviation" in filtered_df.columns
+    except (AttributeError, TypeError):
+        has_deviation_col = False
+        has_reason_col = False
+
+    if has_deviation_col or has_reason_col:
+        if has_deviation_col:
+            deviation_flag = (
+                (filtered_df["deviation"] == True)
+                | (filtered_df["deviation"] == 1)
+                | (filtered_df["deviation"].astype(str).str.lower() == "true")
+                | (filtered_df["deviation"].astype(str).str.strip() == "1")
+            )
+        else:
+            deviation_flag = pd.Series(False, index=filtered_df.index)
+        if has_reason_col:
+            reason_filled = (
+                filtered_df["reason of deviation"].notna()
+                & (filtered_df["reason of deviation"].astype(str).str.strip() != "")
+            )
+        else:
+            reason_filled = pd.Series(False, index=filtered_df.index)
+        filtered_df = filtered_df[deviation_flag | reason_filled]
+    else:
+        return {"warning": "Поле 'deviation' или 'reason of deviation' не найдено в данных."}
+
+    if filtered_df.empty:
+        return {"info": "Отклонения не найдены для выбранных фильтров."}
+
+    # Group by project and task - aggregate across all periods
+    # Find task column
+    task_col = (
+        "task name"
+        if "task name" in filtered_df.columns
+        else get_field_column(filtered_df, "task")
+    )
+    
+    has_task_col = task_col is not None
+    if not (project_col and has_task_col):
+        return {
+            "warning": "Необходимые поля 'project name' или 'task name' не найдены в данных."
+        }
+
+    # Convert deviation in days to numeric
+    try:
+        has_deviation_days_col = "deviation in days" in filtered_df.columns
+    except (AttributeError, TypeError):
+        has_deviation_days_col = False
+
+    if has_deviation_days_col:
+        filtered_df["deviation in days"] = pd.to_numeric(
+            filtered_df["deviation in days"], errors="coerce"
+        )
+
+    # Подставляем колонки дат из русских названий, если их ещё нет
+    ensure_date_columns(filtered_df)
+    # Calculate completion percentage if dates are available
+    try:
+        has_plan_start = "plan start" in filtered_df.columns
+        has_plan_end = "plan end" in filtered_df.columns
+        has_base_start = "base start" in filtered_df.columns
+        has_base_end = "base end" in filtered_df.columns
+    except (AttributeError, TypeError):
+        has_plan_start = False
+        has_plan_end = False
+        has_base_start = False
+        has_base_end = False
+
+    if has_plan_start and has_plan_end and has_base_start and has_base_end:
+        # Convert dates to datetime
+        for col in ["plan start", "plan end", "base start", "base end"]:
+            filtered_df[col] = to_datetime_series(filtered_df[col])
+
+        # Calculate completion percentage:
+        # (Планируемая дата окончания - планируемая дата начала) / (Фактическая дата окончания - фактическая дата начала) * 100
+        filtered_df["plan_duration"] = (
+            filtered_df["plan end"] - filtered_df["plan start"]
+        ).dt.days
+        filtered_df["fact_duration"] = (
+            filtered_df["base end"] - filtered_df["base start"]
+        ).dt.days
+
+        # Calculate percentage: plan_duration / fact_duration * 100
+        # Avoid division by zero
+        filtered_df["completion_percent"] = (
+            filtered_df["plan_duration"]
+            / filtered_df["fact_duration"].replace(0, np.nan)
+            * 100
+        ).fillna(0)
+        # Cap at reasonable values (0-200%)
+        filtered_df["completion_percent"] = filtered_df["completion_percent"].clip(
+            0, 200
+        )
+    else:
+        filtered_df["completion_percent"] = None
+
+    # Determine grouping level based on applied filters
+    # Priority: task > section > project
+    if selected_task != "Все":
+        # If specific task is selected, group by task (only one task will be shown)
+        group_by_cols = [project_col, task_col]
+        y_column = "Задача"
+    elif selected_section != "Все":
+        # If section is selected but not task, group by section
+        group_by_cols = ["section"]
+        y_column = "Раздел"
+    elif selected_project != "Все":
+        # If project is selected but not task/section, group by project
+        group_by_cols = [project_col]
+        y_column = "Проект"
+    else:
+        # If nothing is selected, group by project
+        group_by_cols = [project_col]
+        y_column = "Проект"
+
+    # Group data based on determined grouping level
+    deviations = (
+        filtered_df.groupby(group_by_cols, observed=True)
+        .agg(
+            {
+                "deviation in days": (
+                    "sum" if "deviation in days" in filtered_df.columns else "count"
+                ),
+                "completion_percent": (
+                    "mean"
+                    if "completion_percent" in filtered_df.columns
+                    and filtered_df["completion_percent"].notna().any()
+                    else lambda x: None
+                ),
+            }
+        )
+        .reset_index()
+    )
+
+    # Set column names based on grouping level
+    if len(group_by_cols) == 2:  # project + task
+        deviations.columns = [
+            "Проект",
+            "Задача",
+            "Суммарно дней отклонений",
+            "Процент выполнения",
+        ]
+        deviations["Отображение"] = (
+            deviations["Задача"].astype(str)
+            + " ("
+            + deviations["Проект"].astype(str)
+            + ")"
+        )
+    elif "section" in group_by_cols:
+        deviations.columns = [
+            "Раздел",
+            "Суммарно дней отклонений",
+            "Процент выполнения",
+        ]
+        deviations["Отображение"] = deviations["Раздел"]
+    else:  # project only
+        deviations.columns = [
+            "Проект",
+            "Суммарно дней отклонений",
+            "Процент выполнения",
+        ]
+        deviations["Отображение"] = deviations["Проект"]
+
+    # If completion percent calculation failed, set to None
+    if "Процент выполнения" in deviations.columns:
+        deviations["Процент выполнения"] = pd.to_numeric(
+            deviations["Процент выполнения"], errors="coerce"
+        )
+
+    # Sort by deviation amount (descending - largest first)
+    deviations = deviations.sort_values("Суммарно дней отклонений", ascending=False)
+
+    if deviations.empty:
+        return {"info": "Нет данных для отображения."}
+
+    return {"deviations": deviations, "y_column": y_column}
+
+
+def _prepare_deviation_detail(df, project_col, selected_project):
+    """
+    Детализация отклонений по разделам и задачам (только фильтр по проекту, без отрисовки).
+    Нет строк — {"info": текст}, нет колонок раздела/задачи — {"warning": текст}.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Apply project filter if selected
+    detail_df = apply_filters(df, {project_col: selected_project})
+
+    # Filter only tasks with deviations
+    if "deviation" in detail_df.columns:
+        deviation_mask = (
+            (detail_df["deviation"] == True)
+            | (detail_df["deviation"] == 1)
+            | (detail_df["deviation"].astype(str).str.lower() == "true")
+            | (detail_df["deviation"].astype(str).str.strip() == "1")
+        )
+        detail_df = detail_df[deviation_mask]
+
+    if detail_df.empty:
+        return {"info": "Нет данных для отображения детализации."}
+
+    # Convert deviation in days to numeric
+    if "deviation in days" in detail_df.columns:
+        detail_df["deviation in days"] = pd.to_numeric(
+            detail_df["deviation in days"], errors="coerce"
+        )
+
+    # Group by section and task
+    if "section" not in detail_df.columns or "task name" not in detail_df.columns:
+        return {"warning": "Поля 'section' или 'task name' не найдены для детализации."}
+    detail_deviations = (
+        detail_df.groupby(["section", "task name"], observed=True)
+        .agg(
+            {
+                "deviation in days": (
+                    "sum"
+                    if "deviation in days" in detail_df.columns
+                    else "count"
+                )
+            }
+        )
+        .reset_index()
+    )
+
+    detail_deviations.columns = [
+        "Раздел",
+        "Задача",
+        "Суммарно дней отклонений",
+    ]
+    detail_deviations["Отображение"] = (
+        detail_deviations["Задача"].astype(str)
+        + " ("
+        + detail_deviations["Раздел"].astype(str)
+        + ")"
+    )
+
+    # Не выводить отрицательные значения на графике
+    detail_deviations = detail_deviations[
+        detail_deviations["Суммарно дней отклонений"] >= 0
+    ]
+
+    # Sort by deviation amount (descending)
+    detail_deviations = detail_deviations.sort_values(
+        "Суммарно дней отклонений", ascending=False
+    )
+
+    return {"detail_deviations": detail_deviations}
+
+
+def dashboard_deviation_by_tasks_current_month(df):
+    # Проверка на None или пустой DataFrame
+    if df is None:
+        st.warning(
+            "⚠️ Нет данных для отображения. Пожалуйста, загрузите данные проекта."
+        )
+        return
+
+    # Проверка, что df является DataFrame и имеет атрибут columns
+    if not hasattr(df, "columns") or df.empty:
+        st.warning(
+            "⚠️ Нет данных для отображения. Пожалуйста, загрузите данные проекта."
+        )
+        return
+
+    st.header("📊 Значения отклонений от базового плана")
+    
+
+    # Filters row 1: Project, Task, Section, Block
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        # Project filter - show all projects from full dataset
+        selected_project = "Все"  # Initialize default value
+        # Find project column
+        project_col = (
+            "project name"
+            if "project name" in df.columns
+            else get_field_column(df, "project")
+        )
+        
+        if project_col:
+            # Get all unique projects from the full dataset
+            all_projects = get_filter_engine(df).options(df, project_col)
+            if all_projects:
+                projects = ["Все"] + all_projects
+                selected_project = st.selectbox(
+                    "Фильтр по проекту", projects, key="deviation_tasks_project"
+                )
+            else:
+                st.warning("Проекты не найдены в данных.")
+                return
+        else:
+            st.warning("Поле 'project name' / 'Проект' не найдено в данных.")
+            return
+
+    with col2:
+        # Task filter - use original df to show all available tasks
+        try:
+            has_task_column = "task name" in df.columns
+        except (AttributeError, TypeError):
+            has_task_column = False
+
+        if has_task_column:
+            tasks = filter_options(df, "task name")
+            selected_task = st.selectbox(
+                "Фильтр по лоту", tasks, key="deviation_tasks_task"
+            )
+        else:
+            selected_task = "Все"
+
+    with col3:
+        # Section filter - use original df to show all available sections
+        try:
+            has_section_column = "section" in df.columns
+        except (AttributeError, TypeError):
+            has_section_column = False
+
+        if has_section_column:
+            sections = filter_options(df, "section")
+            selected_section = st.selectbox(
+                "Фильтр по этапу", sections, key="deviation_tasks_section"
+            )
+        else:
+            selected_section = "Все"
+
+    with col4:
+        pass
+
+    # Подготовка кэшируется по (набор данных, фильтры); «Топ 5» и процент выполнения
+    # влияют только на отображение
+    prepared = cached_computation(
+        "deviation_by_tasks",
+        df,
+        (project_col, selected_project, selected_task, selected_section),
+        lambda: _prepare_deviation_by_tasks(
+            df, project_col, selected_project, selected_task, selected_section
+        ),
+    )
+    if "warning" in prepared:
+        st.warning(prepared["warning"])
+        return
+    if "info" in prepared:
+        st.info(prepared["info"])
+        return
+    deviations = prepared["deviations"]
+    y_column = prepared["y_column"]
+
+    # Checkboxes row 2: Top 5 and Completion percentage
+    col5, col6 = st.columns(2)
+
+    with col5:
+        # Checkbox for Top 5 filter
+        show_top5 = st.checkbox(
+            "Топ 5 отклонений", value=False, key="show_top5_deviations"
+        )
+
+    with col6:
+        # Checkbox to show/hide completion percentage
+        show_completion = st.checkbox(
+            "Показывать процент выполнения",
+            value=False,
+            key="show_completion_percent",
+        )
+
+    # Apply Top 5 filter if enabled
+    if show_top5:
+        deviations = deviations.head(5)
+
+    # Visualization - horizontal bar chart
+    def _deviation_by_tasks_chart():
+        # Format text for display on bars
+        text_values = []
+        for _, row in deviations.iterrows():
+            if show_completion and pd.notna(row.get("Процент выполнения")):
+                text_values.append(
+                    f"{int(round(row['Суммарно дней отклонений'], 0))} ({row['Процент выполнения']:.1f}%)"
+                )
+            else:
+                text_values.append(f"{int(round(row['Суммарно дней отклонений'], 0))}")
+
+        fig = px.bar(
+            deviations,
+            x="Суммарно дней отклонений",
+            y="Отображение",
+            orientation="h",
+            title="Отклонения от базового плана",
+            labels={
+                "Суммарно дней отклонений": "Суммарно дней отклонений",
+                "Отображение": y_column,
+            },
+            text=text_values,
+            color_discrete_sequence=["#1f77b4"],  # Blue color for all bars
+        )
+
+        # Set category order to show largest values at top (descending order)
+        # For horizontal bars, reverse the list so largest is at top
+        category_list = deviations["Отображение"].tolist()
+        fig.update_layout(
+            showlegend=False,
+            yaxis=dict(
+                categoryorder="array",
+                categoryarray=list(
+                    reversed(category_list)
+                ),  # Reverse to show largest at top
+            ),
+        )
+        fig.update_traces(
+            textposition="outside", textfont=dict(size=14, color="white")
+        )  # Show text outside bars at the end
+
+        return apply_chart_background(fig)
+
+    st.plotly_chart(
+        cached_figure(
+            "deviation_by_tasks",
+            deviations,
+            (show_completion, y_column),
+            _deviation_by_tasks_chart,
+        ),
+        use_container_width=True,
+    )
+
+    # Additional histogram with detail by section and task
+    st.subheader("📊 Детализация отклонений по разделам и задачам")
+
+    # Детализация зависит только от проекта: кэшируется отдельно от фильтров лота и этапа
+    detail = cached_computation(
+        "deviation_detail",
+        df,
+        (project_col, selected_project),
+        lambda: _prepare_deviation_detail(df, project_col, selected_project),
+    )
+    if "info" in detail:
+        st.info(detail["info"])
+    elif "warning" in detail:
+        st.warning(detail["warning"])
+    else:
+        detail_deviations = detail["detail_deviations"]
+        # Create horizontal bar chart (только неотрицательные)
+        if detail_deviations.empty:
+            st.info("Нет неотрицательных отклонений для детализации.")
+        else:
+            def _deviation_detail_chart():
+                fig_detail = px.bar(
+                    detail_deviations,
+                    x="Суммарно дней отклонений",
+                    y="Отображение",
+                    orientation="h",
+                    title="Детализация отклонений по разделам и задачам",
+                    labels={
+                        "Суммарно дней отклонений": "Суммарно дней отклонений",
+                        "Отображение": "Задача (Раздел)",
+                    },
+                    text=detail_deviations["Суммарно дней отклонений"].apply(
+                        lambda x: f"{int(round(x, 0))}" if pd.notna(x) else ""
+                    ),
+                    color_discrete_sequence=["#1f77b4"],
+                )
+
+                # Set category order to show largest values at top
+                category_list_detail = detail_deviations["Отображение"].tolist()
+                fig_detail.update_layout(
+                    showlegend=False,
+                    yaxis=dict(
+                        categoryorder="array",
+                        categoryarray=list(reversed(category_list_detail)),
+                    ),
+                    height=max(
+                        400, len(detail_deviations) * 30
+                    ),  # Dynamic height based on number of items
+                )
+                fig_detail.update_traces(
+                    textposition="outside", textfont=dict(size=12, color="white")
+                )
+
+                return apply_chart_background(fig_detail)
+
+            st.plotly_chart(
+                cached_figure(
+                    "deviation_detail",
+                    detail_deviations,
+                    (),
+                    _deviation_detail_chart,
+                ),
+                use_container_width=True,
+            )
+
+
+# ==================== DASHBOARD 5: Dynamics of Reasons by Month ====================
+def _format_reasons_period(period_val):
+    """Подпись периода динамики причин: «Январь 2025», «Q1 2025» или «2025»."""
+    if pd.isna(period_val):
+        return "Н/Д"
+    if isinstance(period_val, pd.Period):
+        try:
+            if period_val.freqstr == "M" or period_val.freqstr.startswith(
+                "M"
+            ):  # Month
+                month_name = get_russian_month_name(period_val)
+                year = period_val.year
+                return f"{month_name} {year}"
+            elif period_val.freqstr == "Q" or period_val.freqstr.startswith(
+                "Q"
+            ):  # Quarter
+                return f"Q{period_val.quarter} {period_val.year}"
+            elif (
+                period_val.freqstr == "Y" or period_val.freqstr == "A-DEC"
+            ):  # Year
+                return str(period_val.year)
+            else:
+                month_name = get_russian_month_name(period_val)
+            year = period_val.year
+            return f"{month_name} {year}"
+        except:
+            # Try parsing as string
+            period_str = str(period_val)
+            try:
+                if "-" in period_str:
+                    parts = period_str.split("-")
+                    if len(parts) >= 2:
+                        year = parts[0]
+                        month = parts[1]
+                        month_num = int(month)
+                        month_name = RUSSIAN_MONTHS.get(month_num, "")
+                        if month_name:
+                            return f"{month_name} {year}"
+            except:
+                pass
+            return str(period_val)
+    elif isinstance(period_val, str):
+        # Try parsing string like "2025-01"
+        try:
+            if "-" in period_val:
+                parts = period_val.split("-")
+                if len(parts) >= 2:
+                    year = parts[0]
+                    month = parts[1]
+                    month_num = int(month)
+                    month_name = RUSSIAN_MONTHS.get(month_num, "")
+                    if month_name:
+                        return f"{month_name} {year}"
+        except:
+            pass
+    return str(period_val)
+
+
+def _prepare_dynamics_of_reasons(
+    df, selected_reason, selected_project, selected_section, period_type_en
+):
+    """
+    Подготовка данных динамики причин отклонений (без отрисовки): фильтры, задачи
+    с отклонениями, число отклонений по периоду и причине.
+    При невозможности построить отчёт — {"warning": текст} или {"info": текст}.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Apply filters (shared filter engine: bitmap AND, no full-frame copy)
+    filtered_df = apply_filters(
+        df,
+        {
+            "reason of deviation": selected_reason,
+            "project name": selected_project,
+            "section": selected_section,
+        },
+    )
+
+    # Filter tasks: deviation=1/True OR reason of deviation filled
+    try:
+        has_deviation_col = "deviation" in filtered_df.columns
+        has_reason_col = "reason of deviation" in filtered_df.columns
+    except (AttributeError, TypeError):
+        has_deviation_col = False
+        has_reason_col = False
+
+    if has_deviation_col or has_reason_col:
+        if has_deviation_col:
+            deviation_flag = (
+                (filtered_df["deviation"] == True)
+                | (filtered_df["deviation"] == 1)
+                | (filtered_df["deviation"].astype(str).str.lower() == "true")
+                | (filtered_df["deviation"].astype(str).str.strip() == "1")
+            )
+        else:
+            deviation_flag = pd.Series(False, index=filtered_df.index)
+        if has_reason_col:
+            reason_filled = (
+                filtered_df["reason of deviation"].notna()
+                & (filtered_df["reason of deviation"].astype(str).str.strip() != "")
+            )
+        else:
+            reason_filled = pd.Series(False, index=filtered_df.index)
+        filtered_df = filtered_df[deviation_flag | reason_filled]
+
+    if filtered_df.empty:
+        return {"info": "Нет данных для выбранных фильтров."}
+
+    # Determine period column - use plan_month for month grouping
+    try:
+        has_plan_end_col = "plan end" in filtered_df.columns
+    except (AttributeError, TypeError):
+        has_plan_end_col = False
+
+    if period_type_en == "Month":
+        period_col = "plan_month"
+        period_label = "Месяц"
+        # If plan_month doesn't exist, try to create it from plan end
+        try:
+            has_period_col = period_col in filtered_df.columns
+        except (AttributeError, TypeError):
+            has_period_col = False
+
+        if not has_period_col and has_plan_end_col:
+            mask = filtered_df["plan end"].notna()
+            filtered_df.loc[mask, period_col] = filtered_df.loc[
+                mask, "plan end"
+            ].dt.to_period("M")
+    elif period_type_en == "Quarter":
+        period_col = "plan_quarter"
+        period_label = "Квартал"
+        try:
+            has_period_col = period_col in filtered_df.columns
+        except (AttributeError, TypeError):
+            has_period_col = False
+
+        if not has_period_col and has_plan_end_col:
+            mask = filtered_df["plan end"].notna()
+            filtered_df.loc[mask, period_col] = filtered_df.loc[
+                mask, "plan end"
+            ].dt.to_period("Q")
+    else:
+        period_col = "plan_year"
+        period_label = "Год"
+        try:
+            has_period_col = period_col in filtered_df.columns
+        except (AttributeError, TypeError):
+            has_period_col = False
+
+        if not has_period_col and has_plan_end_col:
+            mask = filtered_df["plan end"].notna()
+            filtered_df.loc[mask, period_col] = filtered_df.loc[
+                mask, "plan end"
+            ].dt.to_period("Y")
+
+    if period_col not in filtered_df.columns:
+        return {"warning": f"Столбец периода '{period_col}' не найден."}
+
+    # Group by period and reason - ensure we have both project name and reason
+
+    # Group by period and reason - ensure we have both project name and reason
+    if "reason of deviation" not in filtered_df.columns:
+        return {"warning": "Столбец 'reason of deviation' не найден в данных."}
+    # Filter out rows without period data
+    reason_dynamics = (
+        filtered_df[filtered_df[period_col].notna()]
+        .groupby([period_col, "reason of deviation"], observed=True)
+        .size()
+        .reset_index(name="Количество")
+    )
+
+    reason_dynamics[period_col] = reason_dynamics[period_col].apply(_format_reasons_period)
+
+    # Aggregate again after formatting to handle potential duplicates from formatting
+    reason_dynamics = (
+        reason_dynamics.groupby([period_col, "reason of deviation"], observed=True)["Количество"]
+        .sum()
+        .reset_index()
+    )
+
+    return {
+        "reason_dynamics": reason_dynamics,
+        "period_col": period_col,
+        "period_label": period_label,
+    }
+
+
+def dashboard_dynamics_of_reasons(df):
+    # Проверка на None или пустой DataFrame
+    if df is None:
+        st.warning(
+            "⚠️ Нет данных для отображения. Пожалуйста, загрузите данные проекта."
+        )
+        return
+
+    # Проверка, что df является DataFrame и имеет атрибут columns
+    if not hasattr(df, "columns") or df.empty:
+        st.warning(
+            "⚠️ Нет данных для отображения. Пожалуйста, загрузите данные проекта."
+        )
+        return
+
+    st.header("📉 Динамика причин отклонений")
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        period_type = st.selectbox(
+            "Группировать по", ["Месяц", "Квартал", "Год"], key="reasons_period"
+        )
+        period_map = {"Месяц": "Month", "Квартал": "Quarter", "Год": "Year"}
+        period_type_en = period_map.get(period_type, "Month")
+
+    with col2:
+        try:
+            has_reason_column = "reason of deviation" in df.columns
+        except (AttributeError, TypeError):
+            has_reason_column = False
+
+        if has_reason_column:
+            reasons = filter_options(df, "reason of deviation")
+            selected_reason = st.selectbox(
+                "Фильтр по причине", reasons, key="reasons_reason"
+            )
+        else:
+            selected_reason = "Все"
+
+    with col3:
+        try:
+            has_project_column = "project name" in df.columns
+        except (AttributeError, TypeError):
+            has_project_column = False
+
+        if has_project_column:
+            projects = filter_options(df, "project name")
+            selected_project = st.selectbox(
+                "Фильтр по проекту", projects, key="reasons_project"
+            )
+        else:
+            selected_project = "Все"
+
+    with col4:
+        try:
+            has_section_column = "section" in df.columns
+        except (AttributeError, TypeError):
+            has_section_column = False
+
+        if has_section_column:
+            sections = filter_options(df, "section")
+            selected_section = st.selectbox(
+                "Фильтр по этапу", sections, key="reasons_section"
+            )
+        else:
+            selected_section = "Все"
+
+    # View type selector
+    view_type = st.selectbox(
+        "Вид отображения", ["По причинам", "По месяцам"], key="reasons_view_type"
+    )
+
+    # Подготовка кэшируется по (набор данных, фильтры, группировка); вид отображения
+    # и линия тренда её не пересчитывают
+    prepared = cached_computation(
+        "dynamics_of_reasons",
+        df,
+        (selected_reason, selected_project, selected_section, period_type_en),
+        lambda: _prepare_dynamics_of_reasons(
+            df, selected_reason, selected_project, selected_section, period_type_en
+        ),
+    )
+    if "warning" in prepared:
+        st.warning(prepared["warning"])
+        return
+    if "info" in prepared:
+        st.info(prepared["info"])
+        return
+    reason_dynamics = prepared["reason_dynamics"]
+    period_col = prepared["period_col"]
+    period_label = prepared["period_label"]
+
+    # Checkbox to show/hide trend line
+    show_trend = st.checkbox(
+        "Показывать линию тренда", value=False, key="show_trend_line"
+    )
+
+    def _reason_dynamics_chart():
+        # Build visualization based on view type
+        if view_type == "По причинам":
+            # View 1: By reasons - reason on X-axis, count on Y-axis
+            # Group by reason and sum across all periods
+            reason_summary = (
+                reason_dynamics.groupby("reason of deviation", observed=True)["Количество"]
+                .sum()
+                .reset_index()
+            )
+            reason_summary = reason_summary.sort_values("Количество", ascending=False)
+
+            # Visualization - vertical bar chart with reasons on X-axis
+            fig = px.bar(
+                reason_summary,
+                x="reason of deviation",
+                y="Количество",
+                title="Динамика причин отклонений по причинам",
+                labels={
+                    "reason of deviation": "Причина отклонения",
+                    "Количество": "Количество отклонений",
+                },
+                text="Количество",
+                color_discrete_sequence=["#1f77b4"],
+            )
+            fig.update_xaxes(tickangle=-45)
+            fig.update_traces(
+                textposition="outside", textfont=dict(size=12, color="white")
+            )
+        else:
+            # View 2: By months - month on X-axis, count on Y-axis, reasons as colors (stacked)
+            # If "Все" projects selected, show aggregated view (one column per period)
+            if selected_project == "Все":
+                # For chart: group only by period (sum all reasons)
+                chart_data = (
+                    reason_dynamics.groupby(period_col, observed=True)["Количество"]
+                    .sum()
+                    .reset_index()
+                )
+                chart_data["reason of deviation"] = (
+                    "Все проекты"  # Dummy column for consistency
+                )
+
+                # Visualization - vertical bar chart with single column per period
+                fig = px.bar(
+                    chart_data,
+                    x=period_col,
+                    y="Количество",
+                    title="Динамика причин отклонений по периодам",
+                    labels={
+                        period_col: period_label,
+                        "Количество": "Количество отклонений",
+                    },
+                    text="Количество",
+                    color_discrete_sequence=["#1f77b4"],  # Single color for all bars
+                )
+            else:
+                # Visualization - vertical bar chart with stacked reasons
+                # Use period_col for x-axis and reason for color (legend)
+                # Use stacked mode to show all reasons in one column per period
+                fig = px.bar(
+                    reason_dynamics,
+                    x=period_col,
+                    y="Количество",
+                    color="reason of deviation",
+                    title="Динамика причин отклонений по периодам",
+                    labels={
+                        period_col: period_label,
+                        "reason of deviation": "Причина отклонения",
+                        "Количество": "Количество отклонений",
+                    },
+                    text="Количество",
+                    barmode="stack",  # Stacked bars: all reasons in one column per period
+                )
+        # Update layout based on view type
+        if view_type == "По причинам":
+            # For "По причинам" view, no additional annotations needed
+            pass
+        else:
+            # For "По месяцам" view, add annotations and trend line
+            fig.update_xaxes(tickangle=-45)
+            # Show values inside bars for each reason - horizontal text (same as other charts)
+            fig.update_traces(
+                textposition="inside", textfont=dict(size=12, color="white")
+            )
+            # Set text angle to horizontal (0 degrees) for inside bar labels - same as other charts
+            for i, trace in enumerate(fig.data):
+                fig.data[i].update(textangle=0)
+
+            # Add total values above bars and trend line
+            if selected_project == "Все":
+                # For "Все проекты": use chart_data for annotations and trend
+                total_by_period = (
+                    chart_data.groupby(period_col, observed=True)["Количество"].sum().reset_index()
+                )
+                periods = sorted(chart_data[period_col].unique())
+                max_y_value = chart_data["Количество"].max()
+            else:
+                # Calculate total deviations per period for annotations
+                total_by_period = (
+                    reason_dynamics.groupby(period_col, observed=True)["Количество"]
+                    .sum()
+                    .reset_index()
+                )
+                total_by_period_dict = dict(
+                    zip(total_by_period[period_col], total_by_period["Количество"])
+                )
+                periods = sorted(reason_dynamics[period_col].unique())
+                max_y_value = reason_dynamics["Количество"].max()
+
+                # Add annotations for individual project view
+                for period in periods:
+                    total = total_by_period_dict.get(period, 0)
+                    if total > 0:
+                        # Get all bars for this period to find max height
+                        period_bars = reason_dynamics[
+                            reason_dynamics[period_col] == period
+                        ]
+                        if not period_bars.empty:
+                            # Find the maximum height among all bars in this period group
+                            max_bar_height = period_bars["Количество"].max()
+
+                            # Calculate offset
+                            if max_y_value > 0:
+                                y_offset = max_y_value * 0.10
+                            else:
+                                y_offset = max_bar_height * 0.10
+
+                            # Position annotation
+                            x_position = period
+                            y_position = max_bar_height + y_offset
+
+                            fig.add_annotation(
+                                x=x_position,
+                                y=y_position,
+                                text=f"<b>{int(round(total, 0))}</b>",
+                                showarrow=False,
+                                font=dict(size=14, color="white"),
+                                xanchor="center",
+                                yanchor="bottom",
+                                bgcolor="rgba(0,0,0,0.5)",
+                                xshift=10,
+                            )
+
+            # Add trend line if checkbox is checked
+            if show_trend:
+                # Calculate overall trend across all reasons (sum by period)
+                total_by_period_sorted = total_by_period.sort_values(period_col)
+                if len(total_by_period_sorted) > 1:
+                    # Use period values as x positions
+                    x_positions = total_by_period_sorted[period_col].tolist()
+                    y_values = total_by_period_sorted["Количество"].values
+
+                    # Create numeric x values for trend calculation (for fitting)
+                    x_numeric = range(len(y_values))
+
+                    # Calculate linear trend
+                    z = np.polyfit(x_numeric, y_values, 1)
+                    p = np.poly1d(z)
+                    trend_y = p(x_numeric)
+
+                    # Add single trend line across all data
+                    fig.add_trace(
+                        go.Scatter(
+                            x=x_positions,
+                            y=trend_y,
+                            mode="lines",
+                            name="Линия тренда",
+                            line=dict(dash="dash", width=3, color="white"),
+                            showlegend=True,
+                            hoverinfo="skip",
+                        )
+                    )
+
+        return apply_chart_background(fig)
+
+    st.plotly_chart(
+        cached_figure(
+            "reason_dynamics",
+            reason_dynamics,
+            (view_type, selected_project == "Все", show_trend, period_col, period_label),
+            _reason_dynamics_chart,
+        ),
+        use_container_width=True,
+    )
+
+    # Summary table - always show by reason (summarized values)
+    # Group by reason and sum across all periods
+    summary_by_reason = (
+        reason_dynamics.groupby("reason of deviation", observed=True)["Количество"]
+        .sum()
+        .reset_index()
+    )
+    summary_by_reason.columns = ["Причина отклонения", "Суммарное количество"]
+    summary_by_reason = summary_by_reason.sort_values(
+        "Суммарное количество", ascending=False
+    )
+
+    st.subheader(f"Сводная таблица по {period_label.lower()}")
+    st.table(style_dataframe_for_dark_theme(summary_by_reason))
@@ -0,0 +1,919 @@
+"""
+Дашборды выдачи рабочей/проектной документации и просрочки выдачи РД.
+"""
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from datetime import date
+
+from dashboard_cache import cached_computation
+from filter_engine import apply_filters, filter_options
+from schema import get_field_column
+from utils import (
+    apply_chart_background,
+    style_dataframe_for_dark_theme,
+    to_datetime_series,
+)
+
+
+def _prepare_rd_delay(
+    df, project_col, section_col, task_col, rd_deviation_col, selected_project, selected_section
+):
+    """
+    Подготовка данных «Просрочка выдачи РД» (без отрисовки): фильтры, числовое отклонение
+    и строки графика по задачам (выбран этап) или по проектам. Нет данных — {"info": текст}.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Apply filters
+    filtered_df = apply_filters(
+        df, {project_col: selected_project, section_col: selected_section}
+    )
+
+    if filtered_df.empty:
+        return {"info": "Нет данных для выбранных фильтров."}
+
+    # Convert "Отклонение разделов РД" to numeric - handle comma as decimal separator
+    # First, get the raw column values
+    rd_deviation_raw = filtered_df[rd_deviation_col].copy()
+
+    # Convert to string, handling NaN properly
+    rd_deviation_str = rd_deviation_raw.astype(str)
+
+    # Replace various representations of empty/NaN values with empty string
+    rd_deviation_str = rd_deviation_str.replace(
+        ["nan", "None", "NaN", "NaT", "<NA>", "None"], ""
+    )
+
+    # Strip whitespace
+    rd_deviation_str = rd_deviation_str.str.strip()
+
+    # Replace comma with dot for decimal separator FIRST (European format: 6,00 -> 6.00)
+    rd_deviation_str = rd_deviation_str.str.replace(",", ".", regex=False)
+
+    # Now replace empty strings with '0' AFTER comma replacement
+    rd_deviation_str = rd_deviation_str.replace("", "0")
+
+    # Convert to numeric - this handles most cases
+    filtered_df["rd_deviation_numeric"] = pd.to_numeric(
+        rd_deviation_str, errors="coerce"
+    ).fillna(0)
+
+    # Determine grouping mode: if section is selected, show tasks; otherwise group by project
+    show_by_tasks = selected_section != "Все"
+
+    if show_by_tasks:
+        # Prepare data for chart - each task is a separate bar
+        # Create label combining section and task for better readability
+        if section_col and section_col in filtered_df.columns:
+            filtered_df["Задача_полная"] = (
+                filtered_df[section_col].astype(str)
+                + " | "
+                + filtered_df[task_col].astype(str)
+            )
+        else:
+            filtered_df["Задача_полная"] = filtered_df[task_col].astype(str)
+
+        chart_data = filtered_df[
+            [task_col, "Задача_полная", "rd_deviation_numeric"]
+        ].copy()
+        chart_data.columns = ["Задача", "Задача_полная", "Отклонение разделов РД"]
+
+        # Sort by deviation value (descending) to show largest deviations first
+        chart_data = chart_data.sort_values(
+            "Отклонение разделов РД", ascending=False
+        )
+        y_column = "Задача_полная"
+        y_title = "Задача"
+    else:
+        # Group by project and sum deviations
+        if project_col and project_col in filtered_df.columns:
+            chart_data = (
+                filtered_df.groupby(project_col, observed=True)
+                .agg({"rd_deviation_numeric": "sum"})
+                .reset_index()
+            )
+            chart_data.columns = ["Проект", "Отклонение разделов РД"]
+
+            # Sort by deviation value (descending)
+            chart_data = chart_data.sort_values(
+                "Отклонение разделов РД", ascending=False
+            )
+            y_column = "Проект"
+            y_title = "Проект"
+        else:
+            return {"info": "Нет данных для построения графика."}
+
+    if chart_data.empty:
+        return {"info": "Нет данных для построения графика."}
+
+    return {
+        "chart_data": chart_data,
+        "show_by_tasks": show_by_tasks,
+        "y_column": y_column,
+        "y_title": y_title,
+    }
+
+
+# ==================== DASHBOARD 8.6: RD Delay Chart ====================
+def dashboard_rd_delay(df):
+    st.subheader("⏱️ Просрочка выдачи РД")
+
+    # Find column names (they might have different formats)
+    # Try to find columns by partial name matching
+    # Find required columns
+    # Column for Y-axis: "Отклонение разделов РД" (exact match from CSV file)
+    # This is column 17 in the CSV file (after header row)
+    rd_deviation_col = None
+
+    # First try exact match
+    if "Отклонение разделов РД" in df.columns:
+        rd_deviation_col = "Отклонение разделов РД"
+    else:
+        # Try with find_column function for variations
+        rd_deviation_col = get_field_column(df, "rd_deviation")
+
+        # Special handling: if not found, try to find by key words
+        if not rd_deviation_col:
+            for col in df.columns:
+                col_lower = str(col).lower().replace("\n", " ").replace("\r", " ")
+                key_words = ["отклон", "раздел", "рд"]
+                if all(word in col_lower for word in key_words if len(word) > 3):
+                    rd_deviation_col = col
+                    break
+
+    if not rd_deviation_col:
+        st.warning("⚠️ Колонка 'Отклонение разделов РД' не найдена.")
+        return
+
+    # Find required columns
+    plan_start_col = (
+        "plan start"
+        if "plan start" in df.columns
+        else get_field_column(df, "plan_start")
+    )
+    project_col = (
+        "project name"
+        if "project name" in df.columns
+        else get_field_column(df, "project")
+    )
+    section_col = (
+        "section" if "section" in df.columns else get_field_column(df, "section")
+    )
+    task_col = (
+        "task name"
+        if "task name" in df.columns
+        else get_field_column(df, "task")
+    )
+
+    # Check if required columns exist
+    missing_cols = []
+    if not project_col or project_col not in df.columns:
+        missing_cols.append("Проект (project name)")
+    if not section_col or section_col not in df.columns:
+        missing_cols.append("Раздел (section)")
+    if not task_col or task_col not in df.columns:
+        missing_cols.append("Задача (task name)")
+
+    if missing_cols:
+        st.warning(f"⚠️ Отсутствуют необходимые колонки: {', '.join(missing_cols)}")
+        st.info("Пожалуйста, убедитесь, что файл содержит все необходимые колонки.")
+        return
+
+    # Add filters
+    st.subheader("Фильтры")
+    filter_col1, filter_col2, filter_col3 = st.columns(3)
+
+    # Project filter
+    with filter_col1:
+        try:
+            projects = filter_options(df, project_col)
+            selected_project = st.selectbox(
+                "Фильтр по проекту", projects, key="rd_delay_project"
+            )
+        except Exception as e:
+            st.error(f"Ошибка при загрузке списка проектов: {str(e)}")
+            return
+
+    # Section filter
+    with filter_col2:
+        try:
+            sections = filter_options(df, section_col)
+            selected_section = st.selectbox(
+                "Фильтр по этапу", sections, key="rd_delay_section"
+            )
+        except Exception as e:
+            st.error(f"Ошибка при загрузке списка разделов: {str(e)}")
+            return
+
+    # Prepare data for "Просрочка выдачи РД"
+    # X-axis: "Задача" (each task is a separate bar)
+    # Y-axis: "Отклонение разделов РД" (deviation values)
+    try:
+        prepared = cached_computation(
+            "rd_delay",
+            df,
+            (
+                project_col,
+                section_col,
+                task_col,
+                rd_deviation_col,
+                selected_project,
+                selected_section,
+            ),
+            lambda: _prepare_rd_delay(
+                df,
+                project_col,
+                section_col,
+                task_col,
+                rd_deviation_col,
+                selected_project,
+                selected_section,
+            ),
+        )
+        if "info" in prepared:
+            st.info(prepared["info"])
+            return
+        chart_data = prepared["chart_data"]
+        show_by_tasks = prepared["show_by_tasks"]
+        y_column = prepared["y_column"]
+        y_title = prepared["y_title"]
+
+        # Format text values for display on bars (same approach as "Отклонение от базового плана")
+        text_values = []
+        for _, row in chart_data.iterrows():
+            val = row["Отклонение разделов РД"]
+            if pd.notna(val):
+                text_values.append(f"{int(round(val, 0))}")
+            else:
+                text_values.append("")
+
+        # Create horizontal bar chart
+        fig = px.bar(
+            chart_data,
+            x="Отклонение разделов РД",
+            y=y_column,
+            orientation="h",
+            title="Просрочка выдачи РД",
+            labels={
+                y_column: y_title,
+                "Отклонение разделов РД": "Отклонение разделов РД",
+            },
+            text=text_values,
+            color_discrete_sequence=["#2E86AB"],  # Single color for all bars
+        )
+
+        # Format text labels (same as "Отклонение от базового плана")
+        fig.update_traces(
+            textposition="outside",
+            textfont=dict(size=14, color="white"),
+            marker=dict(line=dict(width=1, color="white")),
+            showlegend=False,  # Hide legend
+        )
+
+        # Add vertical line at 0 to separate positive and negative deviations (without annotation)
+        fig.add_vline(x=0, line_dash="dash", line_color="gray")
+
+        # Set category order to show largest values at top (descending order)
+        # For horizontal bars, reverse the list so largest is at top
+        category_list = chart_data[y_column].tolist()
+        fig.update_layout(
+            xaxis_title="Отклонение разделов РД",
+            yaxis_title=y_title,
+            height=max(
+                600, len(chart_data) * 40
+            ),  # Adjust height based on number of items
+            showlegend=False,
+            yaxis=dict(
+                tickangle=0,  # Horizontal labels
+                categoryorder="array",
+                categoryarray=list(
+                    reversed(category_list)
+                ),  # Reverse to show largest at top
+            ),
+            bargap=0.1,  # Reduce gap between bars to make them appear larger
+        )
+
+        fig = apply_chart_background(fig)
+        st.plotly_chart(fig, use_container_width=True)
+
+        # Summary table
+        st.subheader("Сводка по просрочке")
+        # Show appropriate columns based on grouping mode
+        if show_by_tasks:
+            summary_table = chart_data[
+                ["Задача_полная", "Отклонение разделов РД"]
+            ].copy()
+            summary_table.columns = ["Задача", "Отклонение разделов РД"]
+        else:
+            summary_table = chart_data[["Проект", "Отклонение разделов РД"]].copy()
+        if "Отклонение разделов РД" in summary_table.columns:
+            summary_table["Отклонение разделов РД"] = summary_table["Отклонение разделов РД"].apply(
+                lambda x: int(round(float(x), 0)) if pd.notna(x) else ""
+            )
+        st.table(style_dataframe_for_dark_theme(summary_table))
+
+        # Summary metrics
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            total_deviation = chart_data["Отклонение разделов РД"].sum()
+            st.metric(
+                "Сумма отклонений",
+                f"{total_deviation:,.0f}" if pd.notna(total_deviation) else "Н/Д",
+            )
+        with col2:
+            positive_deviation = chart_data[chart_data["Отклонение разделов РД"] > 0][
+                "Отклонение разделов РД"
+            ].sum()
+            st.metric(
+                "Положительные отклонения",
+                f"{positive_deviation:,.0f}" if pd.notna(positive_deviation) else "0",
+            )
+        with col3:
+            negative_deviation = chart_data[chart_data["Отклонение разделов РД"] < 0][
+                "Отклонение разделов РД"
+            ].sum()
+            st.metric(
+                "Отрицательные отклонения",
+                f"{negative_deviation:,.0f}" if pd.notna(negative_deviation) else "0",
+            )
+
+    except Exception as e:
+        st.error(f"Ошибка при построении графика 'Просрочка выдачи РД': {str(e)}")
+
+
+def _prepare_documentation(
+    df,
+    project_col,
+    plan_start_col,
+    on_approval_col,
+    in_production_col,
+    contractor_col,
+    rework_col,
+    selected_project,
+    selected_date_start,
+    selected_date_end,
+    selected_statuses,
+):
+    """
+    Отбор строк «Выдача рабочей/проектной документации» по проекту, периоду «Старт План»
+    и статусам РД. Нет строк — {"info": текст}.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Apply project filter
+    filtered_df = apply_filters(df, {project_col: selected_project})
+
+    # Apply date filter
+    if (
+        selected_date_start
+        and selected_date_end
+        and plan_start_col
+        and plan_start_col in df.columns
+    ):
+        filtered_df[plan_start_col + "_parsed"] = to_datetime_series(
+            filtered_df[plan_start_col], mixed=True
+        )
+        date_mask = (
+            filtered_df[plan_start_col + "_parsed"].notna()
+            & (filtered_df[plan_start_col + "_parsed"].dt.date >= selected_date_start)
+            & (filtered_df[plan_start_col + "_parsed"].dt.date <= selected_date_end)
+        )
+        filtered_df = filtered_df[date_mask].copy()
+
+    # Apply status filter
+    if "Все" not in selected_statuses and selected_statuses:
+        status_mask = pd.Series([False] * len(filtered_df), index=filtered_df.index)
+
+        if (
+            "На согласовании" in selected_statuses
+            and on_approval_col
+            and on_approval_col in filtered_df.columns
+        ):
+            on_approval_series = (
+                filtered_df[on_approval_col]
+                .astype(str)
+                .str.replace(",", ".", regex=False)
+            )
+            on_approval_numeric = pd.to_numeric(
+                on_approval_series, errors="coerce"
+            ).fillna(0)
+            status_mask = status_mask | (on_approval_numeric > 0)
+
+        if (
+            "Выдано в производство работ" in selected_statuses
+            and in_production_col
+            and in_production_col in filtered_df.columns
+        ):
+            in_production_series = (
+                filtered_df[in_production_col]
+                .astype(str)
+                .str.replace(",", ".", regex=False)
+            )
+            in_production_numeric = pd.to_numeric(
+                in_production_series, errors="coerce"
+            ).fillna(0)
+            status_mask = status_mask | (in_production_numeric > 0)
+
+        if (
+            "Выдана подрядчику" in selected_statuses
+            and contractor_col
+            and contractor_col in filtered_df.columns
+        ):
+            contractor_series = (
+                filtered_df[contractor_col]
+                .astype(str)
+                .str.replace(",", ".", regex=False)
+            )
+            contractor_numeric = pd.to_numeric(
+                contractor_series, errors="coerce"
+            ).fillna(0)
+            status_mask = status_mask | (contractor_numeric > 0)
+
+        if (
+            "На доработке" in selected_statuses
+            and rework_col
+            and rework_col in filtered_df.columns
+        ):
+            rework_series = (
+                filtered_df[rework_col].astype(str).str.replace(",", ".", regex=False)
+            )
+            rework_numeric = pd.to_numeric(rework_series, errors="coerce").fillna(0)
+            status_mask = status_mask | (rework_numeric > 0)
+
+        filtered_df = filtered_df[status_mask].copy()
+
+    if filtered_df.empty:
+        return {"info": "Нет данных для выбранных фильтров."}
+
+    return {"filtered_df": filtered_df}
+
+
+def _prepare_rd_execution(df, on_approval_col, in_production_col):
+    """
+    Суммы «На согласовании» и «Выдано в производство работ» для диаграммы «Исполнение РД».
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Convert to numeric, handling comma as decimal separator
+    on_approval_series = (
+        df[on_approval_col].astype(str).str.replace(",", ".", regex=False)
+    )
+    on_approval_sum = (
+        pd.to_numeric(on_approval_series, errors="coerce").fillna(0).sum()
+    )
+
+    in_production_series = (
+        df[in_production_col].astype(str).str.replace(",", ".", regex=False)
+    )
+    in_production_sum = (
+        pd.to_numeric(in_production_series, errors="coerce").fillna(0).sum()
+    )
+
+    return {"on_approval_sum": on_approval_sum, "in_production_sum": in_production_sum}
+
+
+def _prepare_rd_dynamics(df, plan_start_col, in_production_col):
+    """
+    Накопительные план («РД по Договору») и факт («Выдано в производство работ») по датам
+    «Старт План». Нет нужной колонки — {"warning": текст}; нет данных — dynamics_df = None.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Find column for plan data: "РД по Договору"
+    rd_plan_col = get_field_column(df, "rd_plan")
+
+    # Check if required columns exist
+    if not plan_start_col or plan_start_col not in df.columns:
+        return {
+            "warning": "⚠️ Для построения графика 'Динамика выдачи РД' необходима колонка 'Старт План' (plan start)."
+        }
+
+    if not rd_plan_col or rd_plan_col not in df.columns:
+        return {
+            "warning": "⚠️ Для построения графика 'Динамика выдачи РД' необходима колонка 'РД по Договору'."
+        }
+
+    if not in_production_col or in_production_col not in df.columns:
+        return {
+            "warning": "⚠️ Для построения графика 'Динамика выдачи РД' необходима колонка 'Выдано в производство работ'."
+        }
+
+    df = df.copy(deep=False)
+
+    # Convert columns to numeric - handle comma as decimal separator
+    # Replace comma with dot for numeric conversion
+    # Plan: use "РД по Договору"
+    rd_plan_series = df[rd_plan_col].astype(str).str.replace(",", ".", regex=False)
+    df["rd_plan_numeric"] = pd.to_numeric(rd_plan_series, errors="coerce").fillna(0)
+
+    # Convert "Выдано в производство работ" to numeric - handle comma as decimal separator
+    in_production_series = (
+        df[in_production_col].astype(str).str.replace(",", ".", regex=False)
+    )
+    df["in_production_numeric"] = pd.to_numeric(
+        in_production_series, errors="coerce"
+    ).fillna(0)
+
+    # Convert dates - handle DD.MM.YYYY format (no-op for columns typed at load)
+    df[plan_start_col] = to_datetime_series(df[plan_start_col], mixed=True)
+
+    # Prepare data
+    # Both Plan and Fact are grouped by plan_start_col (Старт план)
+    dynamics_data = []
+
+    # Plan data: group by plan start date, sum "РД по Договору"
+    # Always include plan data, even if some values are 0
+    plan_mask = df[plan_start_col].notna()
+    if plan_mask.any():
+        plan_grouped = (
+            df[plan_mask]
+            .groupby(df[plan_mask][plan_start_col].dt.date, observed=True)
+            .agg({"rd_plan_numeric": "sum"})
+            .reset_index()
+        )
+        plan_grouped.columns = ["Дата", "Количество"]
+        plan_grouped["Тип"] = "План"
+        # Fill NaN with 0 and ensure all values are numeric
+        plan_grouped["Количество"] = plan_grouped["Количество"].fillna(0)
+        # Always add plan data, even if all values are 0
+        dynamics_data.append(plan_grouped)
+
+    # Fact data: group by plan start date (same as Plan!), sum "Выдано в производство работ"
+    fact_mask = df[plan_start_col].notna()  # Use plan_start_col for both!
+    if fact_mask.any():
+        fact_grouped = (
+            df[fact_mask]
+            .groupby(df[fact_mask][plan_start_col].dt.date, observed=True)
+            .agg({"in_production_numeric": "sum"})
+            .reset_index()
+        )
+        fact_grouped.columns = ["Дата", "Количество"]
+        fact_grouped["Тип"] = "Факт"
+        # Fill NaN with 0 and ensure all values are numeric
+        fact_grouped["Количество"] = fact_grouped["Количество"].fillna(0)
+        # Filter out rows where sum is 0 for fact (only show actual production)
+        fact_grouped = fact_grouped[fact_grouped["Количество"] > 0]
+        if not fact_grouped.empty:
+            dynamics_data.append(fact_grouped)
+
+    if not dynamics_data:
+        return {"dynamics_df": None}
+
+    dynamics_df = pd.concat(dynamics_data, ignore_index=True)
+    dynamics_df = dynamics_df.sort_values("Дата")
+
+    # Вычисляем накопительные значения для каждого типа отдельно
+    dynamics_df["Накопительное_значение"] = 0
+    for typ in dynamics_df["Тип"].unique():
+        mask = dynamics_df["Тип"] == typ
+        dynamics_df.loc[mask, "Накопительное_значение"] = dynamics_df.loc[
+            mask, "Количество"
+        ].cumsum()
+
+    # Используем накопительные значения для графика
+    dynamics_df["Количество"] = dynamics_df["Накопительное_значение"]
+
+    return {"dynamics_df": dynamics_df}
+
+
+# ==================== DASHBOARD 8.7: Documentation ====================
+def dashboard_documentation(df):
+    st.header("📚 Выдача рабочей/проектной документации")
+
+    # Find column names (they might have different formats)
+    # Try to find columns by partial name matching
+    # Find required columns (sample_project_data_fixed.csv: «РД по Договору», нет «Количество разделов РД по Договору»)
+    rd_count_col = get_field_column(df, "rd_count")
+
+    on_approval_col = get_field_column(df, "rd_on_approval")
+    in_production_col = get_field_column(df, "rd_in_production")
+    plan_start_col = (
+        "plan start"
+        if "plan start" in df.columns
+        else get_field_column(df, "plan_start")
+    )
+    plan_end_col = (
+        "plan end"
+        if "plan end" in df.columns
+        else get_field_column(df, "plan_end")
+    )
+    base_start_col = (
+        "base start"
+        if "base start" in df.columns
+        else get_field_column(df, "base_start")
+    )
+    base_end_col = (
+        "base end"
+        if "base end" in df.columns
+        else get_field_column(df, "base_end")
+    )
+
+    # Check if required columns exist
+    missing_cols = []
+    if not rd_count_col:
+        missing_cols.append("Количество разделов РД по Договору")
+    if not on_approval_col:
+        missing_cols.append("На согласовании")
+    if not in_production_col:
+        missing_cols.append("Выдано в производство работ")
+
+    if missing_cols:
+        st.warning(f"⚠️ Отсутствуют необходимые колонки: {', '.join(missing_cols)}")
+        st.info("Пожалуйста, убедитесь, что файл содержит все необходимые колонки.")
+        return
+
+    # Find project column for filtering
+    project_col = (
+        "project name"
+        if "project name" in df.columns
+        else get_field_column(df, "project")
+    )
+
+    # Add filters
+    st.subheader("Фильтры")
+    filter_col1, filter_col2, filter_col3 = st.columns(3)
+
+    # Filter by project
+    selected_project = "Все"
+    if project_col and project_col in df.columns:
+        with filter_col1:
+            projects = filter_options(df, project_col)
+            selected_project = st.selectbox(
+                "Фильтр по проекту", projects, key="doc_project_filter"
+            )
+
+    # Filter by date period
+    selected_date_start = None
+    selected_date_end = None
+    if plan_start_col and plan_start_col in df.columns:
+        with filter_col2:
+            # Convert dates for filtering
+            df_dates = to_datetime_series(df[plan_start_col], mixed=True)
+            valid_dates = df_dates[df_dates.notna()]
+
+            if not valid_dates.empty:
+                min_date = valid_dates.min().date()
+                max_date = valid_dates.max().date()
+                selected_date_start = st.date_input(
+                    "Дата начала периода",
+                    value=min_date,
+                    min_value=min_date,
+                    max_value=max_date,
+                    key="doc_date_start",
+                )
+                selected_date_end = st.date_input(
+                    "Дата окончания периода",
+                    value=max_date,
+                    min_value=min_date,
+                    max_value=max_date,
+                    key="doc_date_end",
+                )
+
+    # Filter by RD status
+    with filter_col3:
+        rd_status_options = ["Все"]
+        if on_approval_col and on_approval_col in df.columns:
+            rd_status_options.append("На согласовании")
+        if in_production_col and in_production_col in df.columns:
+            rd_status_options.append("Выдано в производство работ")
+
+        # Find other status columns
+        contractor_col = get_field_column(df, "rd_issued_to_contractor")
+        rework_col = get_field_column(df, "rd_rework")
+
+        if contractor_col and contractor_col in df.columns:
+            rd_status_options.append("Выдана подрядчику")
+        if rework_col and rework_col in df.columns:
+            rd_status_options.append("На доработке")
+
+        selected_statuses = st.multiselect(
+            "Фильтр по статусу РД",
+            options=rd_status_options,
+            default=["Все"],
+            key="doc_status_filter",
+        )
+
+    # Отбор строк и подготовка графиков кэшируются по (набор данных, колонки, фильтры)
+    params = (
+        project_col,
+        plan_start_col,
+        on_approval_col,
+        in_production_col,
+        contractor_col,
+        rework_col,
+        selected_project,
+        selected_date_start,
+        selected_date_end,
+        tuple(selected_statuses),
+    )
+    prepared = cached_computation(
+        "documentation",
+        df,
+        params,
+        lambda: _prepare_documentation(df, *params),
+    )
+    if "info" in prepared:
+        st.info(prepared["info"])
+        return
+    source_df = df
+
+    # Use filtered_df for all subsequent operations
+    df = prepared["filtered_df"]
+
+    # Prepare data for pie chart "Исполнение РД"
+    # Sum values for "На согласовании" and "Выдано в производство работ"
+    try:
+        execution = cached_computation(
+            "rd_execution",
+            source_df,
+            params,
+            lambda: _prepare_rd_execution(df, on_approval_col, in_production_col),
+        )
+        on_approval_sum = execution["on_approval_sum"]
+        in_production_sum = execution["in_production_sum"]
+
+        # Create pie chart
+        if on_approval_sum > 0 or in_production_sum > 0:
+            st.subheader("Исполнение РД")
+            # Округляем значения до целых
+            pie_data = {
+                "На согласовании": int(round(on_approval_sum)),
+                "Выдано в производство работ": int(round(in_production_sum)),
+            }
+
+            fig_pie = px.pie(
+                values=list(pie_data.values()),
+                names=list(pie_data.keys()),
+                title="Исполнение РД",
+                color_discrete_map={
+                    "На согласовании": "#2E86AB",
+                    "Выдано в производство работ": "#06A77D",
+                },
+            )
+            # На круговой диаграмме: абсолютное значение и процент в подписи (без наведения)
+            fig_pie.update_traces(
+                textinfo="label+value+percent",
+                texttemplate="%{label}<br>%{value}<br>(%{percent:.0%})",
+                textposition="inside",
+                textfont=dict(size=14, color="white"),
+                hovertemplate="<b>%{label}</b><br>Значение: %{value}<br>Процент: %{percent}<br><extra></extra>",
+            )
+
+            fig_pie = apply_chart_background(fig_pie)
+            st.plotly_chart(fig_pie, use_container_width=True)
+        else:
+            st.info("Нет данных для построения графика 'Исполнение РД'.")
+    except Exception as e:
+        st.error(f"Ошибка при построении графика 'Исполнение РД': {str(e)}")
+
+    # Prepare data for "Динамика выдачи РД"
+    # X-axis: "Старт План" (plan start date)
+    # Plan (Y-axis): "РД по Договору" (grouped by "Старт План")
+    # Fact (Y-axis): "Выдано в производство работ" (grouped by "Старт План")
+    try:
+        dynamics = cached_computation(
+            "rd_dynamics",
+            source_df,
+            params,
+            lambda: _prepare_rd_dynamics(df, plan_start_col, in_production_col),
+        )
+        if "warning" in dynamics:
+            st.warning(dynamics["warning"])
+            return
+
+        # Always show graph if we have plan data, even if fact data is empty
+        if dynamics["dynamics_df"] is not None:
+            st.subheader("Динамика выдачи РД")
+            dynamics_df = dynamics["dynamics_df"].copy()
+
+            # Показатели: план по проекту, план/факт/отклонение на текущую дату, прогноз производительности
+            plan_df = dynamics_df[dynamics_df["Тип"] == "План"].sort_values("Дата")
+            fact_df = dynamics_df[dynamics_df["Тип"] == "Факт"].sort_values("Дата")
+            today = date.today()
+
+            plan_total = float(plan_df["Количество"].max()) if not plan_df.empty else 0.0
+            plan_to_date = 0.0
+            if not plan_df.empty:
+                dt_plan = pd.to_datetime(plan_df["Дата"])
+                past_plan = plan_df[dt_plan.dt.date <= today]
+                plan_to_date = float(past_plan["Количество"].iloc[-1]) if not past_plan.empty else 0.0
+            fact_to_date = 0.0
+            if not fact_df.empty:
+                dt_fact = pd.to_datetime(fact_df["Дата"])
+                past_fact = fact_df[dt_fact.dt.date <= today]
+                fact_to_date = float(past_fact["Количество"].iloc[-1]) if not past_fact.empty else 0.0
+            deviation_to_date = fact_to_date - plan_to_date
+
+            # Прогноз: текущая производительность в неделю и необходимая для выполнения плана
+            first_plan_date = plan_df["Дата"].min() if not plan_df.empty else None
+            last_plan_date = plan_df["Дата"].max() if not plan_df.empty else None
+            if first_plan_date is not None:
+                first_d = pd.to_datetime(first_plan_date).date()
+            else:
+                first_d = today
+            if last_plan_date is not None:
+                last_d = pd.to_datetime(last_plan_date).date()
+            else:
+                last_d = today
+            weeks_elapsed = max((today - first_d).days / 7.0, 1.0 / 7.0)
+            current_productivity = fact_to_date / weeks_elapsed if weeks_elapsed > 0 else 0.0
+            remaining_days = (last_d - today).days
+            remaining_weeks = max(remaining_days / 7.0, 0.0)
+            remaining_to_plan = max(plan_total - fact_to_date, 0.0)
+            required_productivity = (remaining_to_plan / remaining_weeks) if remaining_weeks > 0 else float("inf")
+
+            c1, c2, c3, c4 = st.columns(4)
+            with c1:
+                st.metric("План по проекту", f"{plan_total:,.0f}".replace(",", " "))
+            with c2:
+                st.metric("План на текущую дату", f"{plan_to_date:,.0f}".replace(",", " "))
+            with c3:
+                st.metric("Факт на текущую дату", f"{fact_to_date:,.0f}".replace(",", " "))
+            with c4:
+                st.metric("Отклонение на текущую дату", f"{deviation_to_date:+,.0f}".replace(",", " "))
+
+            st.caption("Прогноз производительности (РД в неделю)")
+            p1, p2 = st.columns(2)
+            with p1:
+                st.metric(
+                    "Текущая производительность в неделю",
+                    f"{current_productivity:,.1f}".replace(",", " "),
+                    help="Факт на текущую дату / число недель с начала плана",
+                )
+            with p2:
+                if remaining_weeks <= 0:
+                    st.metric(
+                        "Необходимая для выполнения плана",
+                        "—",
+                        help="Плановый срок завершения уже наступил или прошёл",
+                    )
+                elif required_productivity == float("inf"):
+                    st.metric("Необходимая для выполнения плана", "—", help="Нет оставшегося срока")
+                else:
+                    st.metric(
+                        "Необходимая для выполнения плана",
+                        f"{required_productivity:,.1f}".replace(",", " "),
+                        help="(План по проекту − Факт на текущую дату) / оставшиеся недели",
+                    )
+
+            # Create line chart with text labels always visible
+            # Prepare text labels for each data point
+            dynamics_df["Текст"] = dynamics_df["Количество"].apply(
+                lambda x: f"{x:.0f}" if pd.notna(x) else ""
+            )
+
+            fig_dynamics = px.line(
+                dynamics_df,
+                x="Дата",
+                y="Количество",
+                color="Тип",
+                title="Динамика выдачи РД",
+                markers=True,
+                labels={"Количество": "Количество", "Дата": "Дата (Старт План)"},
+                text="Текст",
+            )
+
+            fig_dynamics.update_layout(
+                xaxis_title="Дата (Старт План)",
+                yaxis_title="Количество",
+                hovermode="x unified",
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=1.02,
+                    xanchor="right",
+                    x=1,
+                    title_text="",
+                ),
+            )
+            # Update legend labels to be more descriptive
+            fig_dynamics.for_each_trace(
+                lambda t: t.update(
+                    name=(
+                        "План (РД по Договору)"
+                        if t.name == "План"
+                        else (
+                            "Факт (Выдано в производство работ)"
+                            if t.name == "Факт"
+                            else t.name
+                        )
+                    )
+                )
+            )
+            # Add text labels and format - ensure text is always visible
+            fig_dynamics.update_traces(
+                line=dict(width=2),
+                marker=dict(size=8),
+                mode="lines+markers+text",  # Enable text display mode
+                textposition="top center",
+                textfont=dict(size=10, color="white"),
+            )
+            fig_dynamics = apply_chart_background(fig_dynamics)
+            st.plotly_chart(fig_dynamics, use_container_width=True)
+        else:
+            st.warning("⚠️ Нет данных для построения графика 'Динамика выдачи РД'.")
+    except Exception as e:
+        st.error(f"Ошибка при построении графика 'Динамика выдачи РД': {str(e)}")
+
+    # Add separator
+    st.divider()
+
+    # Add "Просрочка выдачи РД" chart
+    dashboard_rd_delay(df)
@@ -0,0 +1,2116 @@
+"""
+Дашборды ресурсов: техника, движение рабочей силы, СКУД стройка.
+"""
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from dashboard_cache import cached_computation, cached_figure
+from filter_engine import apply_filters, filter_options, get_filter_engine
+from schema import find_column_by_partial, get_field_column
+from utils import (
+    get_russian_month_name,
+    apply_chart_background,
+    style_dataframe_for_dark_theme,
+)
+
+
+def _filter_resource_rows(work_df, project_col, selected_projects, selected_contractor):
+    """
+    Строки данных о ресурсах/технике по выбранным проектам и контрагенту (без пустого контрагента).
+    Нет строк — {"info": текст}; нет колонки контрагента — {"error": текст}.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Apply filters (список проектов — любой из выбранных; пустой список не фильтрует)
+    filtered_df = apply_filters(
+        work_df,
+        {project_col: list(selected_projects), "Контрагент": selected_contractor},
+    )
+
+    if filtered_df.empty:
+        return {"info": "Нет данных для отображения с выбранными фильтрами."}
+
+    # Ensure Контрагент column exists and has values
+    if (
+        "Контрагент" not in filtered_df.columns
+        or filtered_df["Контрагент"].isna().all()
+    ):
+        return {
+            "error": "❌ Колонка 'Контрагент' отсутствует или пуста после фильтрации."
+        }
+
+    # Remove rows where Контрагент is NaN before grouping
+    filtered_df = filtered_df[filtered_df["Контрагент"].notna()].copy()
+
+    if filtered_df.empty:
+        return {"info": "Нет данных с указанными контрагентами после фильтрации."}
+
+    return {"filtered_df": filtered_df}
+
+
+def _prepare_technique_work(technique_df):
+    """
+    Числовые колонки данных о технике (план, недели, факт, дельта, дельта %) и период.
+    Ошибки — {"error": текст, "details": [подсказки]} или {"warning": текст}.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Create working copy
+    work_df = technique_df.copy(deep=False)
+
+    # sample_resources_data.csv: Проект, Контрагент, Период, План, Среднее за месяц, 1–5 неделя, Дельта, Дельта (%)
+    # Use Russian column names directly
+
+    # Check required columns - Контрагент is essential
+    if "Контрагент" not in work_df.columns:
+        # Try to find contractor column by partial match
+        contractor_col = get_field_column(work_df, "contractor")
+        if contractor_col:
+            work_df["Контрагент"] = work_df[contractor_col]
+        else:
+            return {
+                "error": f"❌ Отсутствует необходимая колонка 'Контрагент'",
+                "details": [f"Доступные колонки: {', '.join(work_df.columns)}"],
+            }
+
+    # Find week columns dynamically - also try partial match
+    week_columns = []
+    for week_num in range(1, 6):
+        week_col = f"{week_num} неделя"
+        if week_col in work_df.columns:
+            week_columns.append(week_col)
+        else:
+            # Try to find by partial match
+            found_col = get_field_column(work_df, f"week_{week_num}")
+            if found_col:
+                week_columns.append(found_col)
+
+    # Check if we have any data
+    if work_df.empty:
+        return {"warning": "⚠️ Данные пусты после обработки."}
+
+    # Process numeric columns
+    # Process План
+    if "План" in work_df.columns:
+        work_df["План_numeric"] = pd.to_numeric(
+            work_df["План"].astype(str).str.replace(",", ".").str.replace(" ", ""),
+            errors="coerce",
+        ).fillna(0)
+    else:
+        work_df["План_numeric"] = 0
+
+    # Process week columns - convert to numeric, handle empty strings
+    for week_col in week_columns:
+        work_df[f"{week_col}_numeric"] = pd.to_numeric(
+            work_df[week_col]
+            .astype(str)
+            .str.replace(",", ".")
+            .str.replace(" ", "")
+            .replace("", "0"),
+            errors="coerce",
+        ).fillna(0)
+
+    # Факт: sample_resources_data.csv — «Среднее за месяц»; sample_technique_data.csv — «Среднее за неделю»
+    if "Среднее за месяц" in work_df.columns:
+        work_df["Среднее_за_месяц_numeric"] = pd.to_numeric(
+            work_df["Среднее за месяц"]
+            .astype(str)
+            .str.replace(",", ".")
+            .str.replace(" ", ""),
+            errors="coerce",
+        ).fillna(0)
+        work_df["week_sum"] = work_df["Среднее_за_месяц_numeric"]
+    elif "Среднее за неделю" in work_df.columns:
+        work_df["Среднее_за_неделю_numeric"] = pd.to_numeric(
+            work_df["Среднее за неделю"]
+            .astype(str)
+            .str.replace(",", ".")
+            .str.replace(" ", ""),
+            errors="coerce",
+        ).fillna(0)
+        work_df["week_sum"] = work_df["Среднее_за_неделю_numeric"]
+    elif week_columns:
+        week_numeric_cols = [f"{col}_numeric" for col in week_columns]
+        work_df["week_sum"] = work_df[week_numeric_cols].sum(axis=1)
+    else:
+        work_df["week_sum"] = 0
+
+    # Process Дельта (Delta) if available - try to find column by partial match
+    delta_col = None
+    if "Дельта" in work_df.columns:
+        delta_col = "Дельта"
+    else:
+        delta_col = get_field_column(work_df, "delta")
+
+    if delta_col and delta_col in work_df.columns:
+        work_df["Дельта_numeric"] = pd.to_numeric(
+            work_df[delta_col].astype(str).str.replace(",", ".").str.replace(" ", ""),
+            errors="coerce",
+        ).fillna(0)
+    else:
+        # Calculate delta as plan - fact (week_sum)
+        work_df["Дельта_numeric"] = work_df["План_numeric"] - work_df["week_sum"]
+
+    # Process Дельта (%) (Delta %) if available - extract numeric value from percentage string
+    # Try to find column by partial match
+    delta_pct_col = None
+    if "Дельта (%)" in work_df.columns:
+        delta_pct_col = "Дельта (%)"
+    else:
+        delta_pct_col = get_field_column(work_df, "delta_pct")
+
+    if delta_pct_col and delta_pct_col in work_df.columns:
+
+        def extract_percentage(value):
+            """Extract numeric value from percentage string like '-90%' or '90%', or numeric value"""
+            if pd.isna(value):
+                return 0
+            # If already numeric, return as is
+            if isinstance(value, (int, float)):
+                return float(value)
+            # Otherwise, try to extract from string
+            value_str = str(value).strip()
+            # Remove % sign and convert to float
+            value_str = value_str.replace("%", "").replace(",", ".").replace(" ", "")
+            try:
+                return float(value_str)
+            except:
+                return 0
+
+        work_df["Дельта_процент_numeric"] = work_df[delta_pct_col].apply(
+            extract_percentage
+        )
+    else:
+        # Calculate delta percentage if we have delta and plan
+        work_df["Дельта_процент_numeric"] = 0
+        if "Дельта_numeric" in work_df.columns and "План_numeric" in work_df.columns:
+            mask = work_df["План_numeric"] != 0
+            work_df.loc[mask, "Дельта_процент_numeric"] = (
+                work_df.loc[mask, "Дельта_numeric"] / work_df.loc[mask, "План_numeric"]
+            ) * 100
+        work_df["Дельта_процент_numeric"] = work_df["Дельта_процент_numeric"].fillna(0)
+
+    # Find Проект column
+    period_col = None
+    if "Период" in work_df.columns:
+        period_col = "Период"
+    else:
+        # Try to find period column by partial match
+        period_col = get_field_column(work_df, "period")
+
+    if period_col:
+        # Parse period format like "дек.25" or "декабрь 2025"
+        def parse_period(period_val):
+            if pd.isna(period_val):
+                return None
+            period_str = str(period_val).strip()
+            # Try to extract year and month
+            # Format: "дек.25" -> period="дек.2025"
+            # Format: "декабрь 2025" -> period="декабрь 2025"
+            if "." in period_str:
+                parts = period_str.split(".")
+                if len(parts) >= 2:
+                    month_part = parts[0].strip()
+                    year_part = parts[1].strip()
+                    try:
+                        year = int(year_part)
+                        if year < 100:
+                            year = 2000 + year
+                        return f"{month_part}.{year}"
+                    except:
+                        pass
+            return period_str
+
+        work_df["period_display"] = work_df[period_col].apply(parse_period)
+    else:
+        work_df["period_display"] = "Н/Д"
+
+    # Find Проект column
+    project_col = None
+    if "Проект" in work_df.columns:
+        project_col = "Проект"
+    else:
+        project_col = get_field_column(work_df, "resource_project")
+
+    return {"work_df": work_df, "project_col": project_col}
+
+
+# ==================== DASHBOARD 8.6.5: Technique Visualization ====================
+def dashboard_technique(df):
+    st.header("🔧 Аналитика по технике")
+
+    # Get technique data from session state
+    technique_df = st.session_state.get("technique_data", None)
+
+    if technique_df is None or technique_df.empty:
+        st.warning(
+            "⚠️ Для отображения аналитики по технике необходимо загрузить файл с данными о технике."
+        )
+        st.info(
+            "📋 Ожидаемые колонки: Проект, Контрагент, Период, План, Среднее за месяц или Среднее за неделю, 1–5 неделя, Дельта, Дельта (%)"
+        )
+        return
+
+    # Данные для круговых и иных диаграмм берутся только из загруженного файла (session technique_data)
+    st.caption("📁 Данные из загруженного файла с данными о технике.")
+
+    # Числовые колонки и период рассчитываются один раз на загруженный файл
+    prepared = cached_computation(
+        "technique_work", technique_df, (), lambda: _prepare_technique_work(technique_df)
+    )
+    if "error" in prepared:
+        st.error(prepared["error"])
+        for text in prepared["details"]:
+            st.info(text)
+        return
+    if "warning" in prepared:
+        st.warning(prepared["warning"])
+        return
+    work_df = prepared["work_df"]
+    project_col = prepared["project_col"]
+
+    # Filters - project and contractor filters
+    col1, col2 = st.columns(2)
+
+    with col1:
+        # Project filter - multiselect для выбора нескольких проектов
+        if project_col and project_col in work_df.columns:
+            all_projects = get_filter_engine(work_df).options(work_df, project_col)
+            selected_projects = st.multiselect(
+                "Фильтр по проектам (можно выбрать несколько)",
+                all_projects,
+                default=all_projects if len(all_projects) <= 3 else all_projects[:3],
+                key="technique_projects",
+            )
+        else:
+            selected_projects = []
+            st.info("Колонка 'Проект' не найдена")
+
+    with col2:
+        # Contractor filter
+        if "Контрагент" in work_df.columns:
+            contractors = filter_options(work_df, "Контрагент")
+            selected_contractor = st.selectbox(
+                "Фильтр по контрагенту", contractors, key="technique_contractor"
+            )
+        else:
+            selected_contractor = "Все"
+            st.info("Колонка 'Контрагент' не найдена")
+
+    # Отбор строк кэшируется по (файл, выбранные проекты, контрагент)
+    prepared = cached_computation(
+        "technique_rows",
+        technique_df,
+        (tuple(selected_projects), selected_contractor),
+        lambda: _filter_resource_rows(
+            work_df, project_col, selected_projects, selected_contractor
+        ),
+    )
+    if "error" in prepared:
+        st.error(prepared["error"])
+        return
+    if "info" in prepared:
+        st.info(prepared["info"])
+        return
+    filtered_df = prepared["filtered_df"]
+
+    # Определяем список проектов для обработки
+    if selected_projects and project_col and project_col in filtered_df.columns:
+        projects_to_process = selected_projects
+    else:
+        # Если проекты не выбраны или колонка не найдена, обрабатываем все проекты
+        if project_col and project_col in filtered_df.columns:
+            projects_to_process = sorted(
+                filtered_df[project_col].dropna().unique().tolist()
+            )
+        else:
+            projects_to_process = ["Все проекты"]
+
+    # Обрабатываем каждый проект отдельно
+    for project_name in projects_to_process:
+        # Фильтруем данные по проекту
+        if project_name != "Все проекты":
+            project_filtered_df = apply_filters(filtered_df, {project_col: project_name})
+        else:
+            project_filtered_df = filtered_df.copy()
+
+        if project_filtered_df.empty:
+            continue
+
+        # Заголовок для проекта
+        if len(projects_to_process) > 1:
+            st.markdown("---")
+            st.subheader(f"📊 Проект: {project_name}")
+
+        # ========== Chart 1: Pie Chart by Contractor (Delta %) ==========
+        st.subheader("📊 Круговая диаграмма: Распределение дельты (%) по контрагентам")
+
+        # Group by Контрагент and aggregate for pie chart (Delta %)
+        # Ensure Дельта_процент_numeric exists - check if it was created in work_df
+        if "Дельта_процент_numeric" not in project_filtered_df.columns:
+            # Try to find Дельта (%) column by partial match
+            delta_pct_col = None
+            if "Дельта (%)" in project_filtered_df.columns:
+                delta_pct_col = "Дельта (%)"
+            else:
+                delta_pct_col = get_field_column(project_filtered_df, "delta_pct")
+
+            if delta_pct_col and delta_pct_col in project_filtered_df.columns:
+                # Extract percentage values from the column
+                def extract_percentage(value):
+                    """Extract numeric value from percentage string like '-90%' or '90%', or numeric value"""
+                    if pd.isna(value):
+                        return 0
+                    # If already numeric, return as is
+                    if isinstance(value, (int, float)):
+                        return float(value)
+                    # Otherwise, try to extract from string
+                    value_str = str(value).strip()
+                    # Remove % sign and convert to float
+                    value_str = (
+                        value_str.replace("%", "").replace(",", ".").replace(" ", "")
+                    )
+                    try:
+                        return float(value_str)
+                    except:
+                        return 0
+
+                project_filtered_df["Дельта_процент_numeric"] = project_filtered_df[
+                    delta_pct_col
+                ].apply(extract_percentage)
+            else:
+                # Try to calculate from Дельта and План if available
+                if (
+                    "Дельта_numeric" in project_filtered_df.columns
+                    and "План_numeric" in project_filtered_df.columns
+                ):
+                    project_filtered_df["Дельта_процент_numeric"] = 0
+                    mask = project_filtered_df["План_numeric"] != 0
+                    project_filtered_df.loc[mask, "Дельта_процент_numeric"] = (
+                        project_filtered_df.loc[mask, "Дельта_numeric"]
+                        / project_filtered_df.loc[mask, "План_numeric"]
+                    ) * 100
+                    project_filtered_df["Дельта_процент_numeric"] = project_filtered_df[
+                        "Дельта_процент_numeric"
+                    ].fillna(0)
+                else:
+                    st.error(
+                        "❌ Не удалось найти или рассчитать Дельта (%). Отсутствуют необходимые колонки."
+                    )
+                    st.info(
+                        f"Доступные колонки: {', '.join(project_filtered_df.columns)}"
+                    )
+                    contractor_delta_pct = pd.DataFrame(
+                        columns=["Контрагент", "Дельта (%)"]
+                    )
+
+        # Group by contractor and aggregate
+        if "Дельта_процент_numeric" in project_filtered_df.columns:
+            # Check if we have any data before grouping
+            if (
+                not project_filtered_df.empty
+                and "Контрагент" in project_filtered_df.columns
+            ):
+                contractor_delta_pct = (
+                    project_filtered_df.groupby("Контрагент", observed=True)
+                    .agg({"Дельта_процент_numeric": "sum"})  # Sum of delta percentages
+                    .reset_index()
+                )
+
+                contractor_delta_pct.columns = ["Контрагент", "Дельта (%)"]
+            else:
+                contractor_delta_pct = pd.DataFrame(
+                    columns=["Контрагент", "Дельта (%)"]
+                )
+        else:
+            contractor_delta_pct = pd.DataFrame(columns=["Контрагент", "Дельта (%)"])
+
+        # Check if we have data (внутри цикла по проектам — круговая и столбчатая по каждому проекту)
+        if contractor_delta_pct.empty or len(contractor_delta_pct) == 0:
+            st.info("Нет данных для отображения круговой диаграммы.")
+        else:
+            # Ensure Дельта (%) is numeric
+            contractor_delta_pct["Дельта (%)"] = pd.to_numeric(
+                contractor_delta_pct["Дельта (%)"], errors="coerce"
+            ).fillna(0)
+
+            # Check if we have any non-zero values
+            total_abs_sum = contractor_delta_pct["Дельта (%)"].abs().sum()
+
+            if total_abs_sum == 0:
+                st.info(
+                    "Все значения дельты (%) равны нулю. Диаграмма не может быть построена."
+                )
+            else:
+                # Remove only exactly zero values (not small values)
+                non_zero_data = contractor_delta_pct[
+                    contractor_delta_pct["Дельта (%)"] != 0
+                ].copy()
+
+                # Use non-zero data if available
+                if not non_zero_data.empty:
+                    contractor_delta_pct = non_zero_data
+
+                # Sort by absolute value for better visualization
+                contractor_delta_pct = contractor_delta_pct.sort_values(
+                    "Дельта (%)", key=abs, ascending=False
+                )
+
+                # Create a copy with absolute values for pie chart (pie charts don't support negative values)
+                contractor_delta_pct_abs = contractor_delta_pct.copy()
+                contractor_delta_pct_abs["Дельта (%)_abs"] = contractor_delta_pct_abs[
+                    "Дельта (%)"
+                ].abs()
+
+                # Store original values for display
+                original_values = contractor_delta_pct_abs["Дельта (%)"].tolist()
+
+                # Create pie chart using absolute values
+                fig_pie = px.pie(
+                    contractor_delta_pct_abs,
+                    values="Дельта (%)_abs",
+                    names="Контрагент",
+                    title="Распределение дельты (%) по контрагентам",
+                    color_discrete_sequence=px.colors.qualitative.Set3,
+                )
+
+                fig_pie.update_layout(
+                    height=600,
+                    showlegend=True,
+                    legend=dict(
+                        orientation="v", yanchor="middle", y=0.5, xanchor="left", x=1.1
+                    ),
+                    title_font_size=16,
+                )
+
+                # На круговой диаграмме: подпись с абсолютным значением и процентом (без наведения)
+                fig_pie.update_traces(
+                    textinfo="label+value+percent",
+                    texttemplate="%{label}<br>%{value}<br>(%{percent:.0%})",
+                    textposition="inside",
+                    textfont=dict(size=12, color="white"),
+                    customdata=original_values,
+                    hovertemplate="<b>%{label}</b><br>Дельта (%): %{customdata:.0f}%<br>Процент: %{percent}<br><extra></extra>",
+                )
+
+                fig_pie = apply_chart_background(fig_pie)
+                st.plotly_chart(fig_pie, use_container_width=True)
+
+        # ========== Chart 2: Bar Chart by Contractor (Plan, Average, Delta) ==========
+        st.subheader(
+            "📊 Столбчатая диаграмма: План, Среднее за месяц, Дельта (группировка по контрагенту)"
+        )
+
+        # Group by Контрагент and aggregate
+        # Ensure Дельта_numeric exists
+        if "Дельта_numeric" not in project_filtered_df.columns:
+            # Try to calculate if missing
+            if (
+                "План_numeric" in project_filtered_df.columns
+                and "week_sum" in project_filtered_df.columns
+            ):
+                project_filtered_df["Дельта_numeric"] = (
+                    project_filtered_df["План_numeric"]
+                    - project_filtered_df["week_sum"]
+                )
+            else:
+                project_filtered_df["Дельта_numeric"] = 0
+
+        contractor_data = (
+            project_filtered_df.groupby("Контрагент", observed=True)
+            .agg(
+                {
+                    "План_numeric": "sum",  # Sum of plans
+                    "week_sum": "sum",  # Sum of weeks = среднее за месяц
+                    "Дельта_numeric": "sum",  # Sum of deltas
+                }
+            )
+            .reset_index()
+        )
+
+        contractor_data.columns = ["Контрагент", "План", "Среднее за месяц", "Дельта"]
+
+        # Ensure Дельта column has numeric values
+        contractor_data["Дельта"] = pd.to_numeric(
+            contractor_data["Дельта"], errors="coerce"
+        ).fillna(0)
+
+        # Sort by contractor name
+        contractor_data = contractor_data.sort_values("Контрагент")
+
+        # Create bar chart
+        fig_bar = go.Figure()
+
+        # Add bars for Plan
+        fig_bar.add_trace(
+            go.Bar(
+                name="План",
+                x=contractor_data["Контрагент"],
+                y=contractor_data["План"],
+                marker_color="#3498db",
+                text=contractor_data["План"].apply(
+                    lambda x: f"{int(x)}" if pd.notna(x) else "0"
+                ),
+                textposition="outside",
+                textfont=dict(size=12, color="white"),
+            )
+        )
+
+        # Add bars for Average
+        fig_bar.add_trace(
+            go.Bar(
+                name="Среднее за месяц",
+                x=contractor_data["Контрагент"],
+                y=contractor_data["Среднее за месяц"],
+                marker_color="#2ecc71",
+                text=contractor_data["Среднее за месяц"].apply(
+                    lambda x: f"{int(x)}" if pd.notna(x) else "0"
+                ),
+                textposition="outside",
+                textfont=dict(size=12, color="white"),
+            )
+        )
+
+        # Add bars for Delta - ensure values are properly formatted
+        # Разделяем на положительные и отрицательные значения для разных цветов
+        delta_values = contractor_data["Дельта"].fillna(0)
+        delta_abs = delta_values.abs()  # Абсолютные значения для отображения
+
+        # Положительные значения дельты (зеленый)
+        positive_mask = delta_values > 0
+        if positive_mask.any():
+            fig_bar.add_trace(
+                go.Bar(
+                    name="Дельта (+)",
+                    x=contractor_data.loc[positive_mask, "Контрагент"],
+                    y=delta_abs[positive_mask],
+                    marker_color="#2ecc71",  # Зеленый для положительных
+                    text=delta_abs[positive_mask].apply(
+                        lambda x: f"{int(x)}" if pd.notna(x) and abs(x) >= 0.5 else "0"
+                    ),
+                    textposition="outside",
+                    textfont=dict(size=12, color="white"),
+                    showlegend=False,
+                )
+            )
+
+        # Отрицательные значения дельты (красный)
+        negative_mask = delta_values < 0
+        if negative_mask.any():
+            fig_bar.add_trace(
+                go.Bar(
+                    name="Дельта (-)",
+                    x=contractor_data.loc[negative_mask, "Контрагент"],
+                    y=delta_abs[negative_mask],
+                    marker_color="#e74c3c",  # Красный для отрицательных
+                    text=delta_abs[negative_mask].apply(
+                        lambda x: f"{int(x)}" if pd.notna(x) and abs(x) >= 0.5 else "0"
+                    ),
+                    textposition="outside",
+                    textfont=dict(size=12, color="white"),
+                    showlegend=False,
+                )
+            )
+
+        # Нулевые значения (если есть)
+        zero_mask = delta_values == 0
+        if zero_mask.any():
+            fig_bar.add_trace(
+                go.Bar(
+                    name="Дельта (0)",
+                    x=contractor_data.loc[zero_mask, "Контрагент"],
+                    y=delta_abs[zero_mask],
+                    marker_color="#95a5a6",  # Серый для нулевых
+                    text=delta_abs[zero_mask].apply(
+                        lambda x: f"{int(x)}" if pd.notna(x) and abs(x) >= 0.5 else "0"
+                    ),
+                    textposition="outside",
+                    textfont=dict(size=12, color="white"),
+                    showlegend=False,
+                )
+            )
+
+        # Update layout
+        fig_bar.update_layout(
+            title="План, Среднее за месяц и Дельта по контрагентам",
+            xaxis_title="Контрагент",
+            yaxis_title="Значение",
+            barmode="group",
+            height=600,
+            legend=dict(
+                orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1
+            ),
+            xaxis=dict(tickangle=-45),
+        )
+
+        fig_bar = apply_chart_background(fig_bar)
+        st.plotly_chart(fig_bar, use_container_width=True)
+
+        # ========== Chart 3: Pie Chart by Contractor (Plan + Average) ==========
+        st.subheader(
+            "📊 Круговая диаграмма: Распределение суммы Плана и Среднего за месяц по контрагентам"
+        )
+
+        # Group by Контрагент and aggregate for pie chart (Plan + Average)
+        contractor_plan_avg = (
+            project_filtered_df.groupby("Контрагент", observed=True)
+            .agg(
+                {
+                    "План_numeric": "sum",  # Sum of plans
+                    "week_sum": "sum",  # Sum of weeks = среднее за месяц
+                    "Дельта_numeric": "sum",  # Sum of deltas
+                }
+            )
+            .reset_index()
+        )
+
+        contractor_plan_avg.columns = [
+            "Контрагент",
+            "План",
+            "Среднее за месяц",
+            "Дельта",
+        ]
+
+        # Calculate sum of Plan + Average for each contractor
+        contractor_plan_avg["Сумма"] = (
+            contractor_plan_avg["План"] + contractor_plan_avg["Среднее за месяц"]
+        )
+
+        # Calculate доля факта (Среднее за месяц / Сумма * 100) and доля отклонения (Дельта / План * 100)
+        contractor_plan_avg["Доля факта (%)"] = 0
+        contractor_plan_avg["Доля отклонения (%)"] = 0
+        mask_sum = contractor_plan_avg["Сумма"] != 0
+        contractor_plan_avg.loc[mask_sum, "Доля факта (%)"] = (
+            contractor_plan_avg.loc[mask_sum, "Среднее за месяц"]
+            / contractor_plan_avg.loc[mask_sum, "Сумма"]
+        ) * 100
+        mask_plan = contractor_plan_avg["План"] != 0
+        contractor_plan_avg.loc[mask_plan, "Доля отклонения (%)"] = (
+            contractor_plan_avg.loc[mask_plan, "Дельта"]
+            / contractor_plan_avg.loc[mask_plan, "План"]
+        ) * 100
+
+        # Remove zero values for pie chart
+        contractor_plan_avg = contractor_plan_avg[
+            contractor_plan_avg["Сумма"] != 0
+        ].copy()
+
+        if contractor_plan_avg.empty:
+            st.info("Нет данных для отображения.")
+        else:
+            # Sort by sum value for better visualization
+            contractor_plan_avg = contractor_plan_avg.sort_values(
+                "Сумма", ascending=False
+            )
+
+            # Create pie chart
+            fig_pie_plan_avg = px.pie(
+                contractor_plan_avg,
+                values="Сумма",
+                names="Контрагент",
+                title="Распределение суммы Плана и Среднего за месяц по контрагентам",
+                color_discrete_sequence=px.colors.qualitative.Set2,
+            )
+
+            fig_pie_plan_avg.update_layout(
+                height=600,
+                showlegend=True,
+                legend=dict(
+                    orientation="v", yanchor="middle", y=0.5, xanchor="left", x=1.1
+                ),
+                title_font_size=16,
+            )
+
+            # На круговой диаграмме: абсолютное значение и процент в подписи (без наведения)
+            fig_pie_plan_avg.update_traces(
+                textinfo="label+value+percent",
+                texttemplate="%{label}<br>%{value:,.0f}<br>(%{percent:.0%})",
+                textposition="inside",
+                textfont=dict(size=12, color="white"),
+            )
+            # Долю факта и отклонения оставляем в hover
+            fig_pie_plan_avg.update_traces(
+                customdata=list(
+                    zip(
+                        contractor_plan_avg["Доля факта (%)"],
+                        contractor_plan_avg["Доля отклонения (%)"],
+                    )
+                ),
+                hovertemplate="<b>%{label}</b><br>Сумма: %{value:,.0f}<br>Процент: %{percent}<br>Доля факта: %{customdata[0]:.0f}%<br>Доля отклонения: %{customdata[1]:.0f}%<br><extra></extra>",
+            )
+
+            fig_pie_plan_avg = apply_chart_background(fig_pie_plan_avg)
+            st.plotly_chart(fig_pie_plan_avg, use_container_width=True)
+
+        # ========== Summary Table ==========
+        st.subheader("📋 Сводная таблица по контрагентам")
+
+        # Format numbers for display
+        summary_table = contractor_data.copy()
+        summary_table["План"] = summary_table["План"].apply(
+            lambda x: f"{int(x)}" if pd.notna(x) else "0"
+        )
+        summary_table["Среднее за месяц"] = summary_table["Среднее за месяц"].apply(
+            lambda x: f"{int(x)}" if pd.notna(x) else "0"
+        )
+        summary_table["Дельта"] = summary_table["Дельта"].apply(
+            lambda x: f"{int(x)}" if pd.notna(x) else "0"
+        )
+
+        st.table(style_dataframe_for_dark_theme(summary_table))
+
+        # Summary metrics
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            total_plan = contractor_data["План"].sum()
+            st.metric("Общий план", f"{int(total_plan)}")
+
+        with col2:
+            total_average = contractor_data["Среднее за месяц"].sum()
+            st.metric("Общее среднее за месяц", f"{int(total_average)}")
+
+        with col3:
+            total_delta = contractor_data["Дельта"].sum()
+            st.metric("Общая дельта", f"{int(total_delta)}")
+
+
+def _prepare_workforce_work(combined_df):
+    """
+    Числовые колонки объединённых данных о ресурсах и технике (план, недели, факт, среднее
+    за неделю, дельта, дельта %) и колонка проекта.
+    Ошибки — {"error": текст, "details": [подсказки]} или {"warning": текст}.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Create working copy
+    work_df = combined_df.copy(deep=False)
+
+    # sample_technique_data.csv: Проект, Контрагент, Период, План, Среднее за неделю, 1–5 неделя, Дельта, Дельта (%)
+    # Use Russian column names directly
+
+    # Check required columns - Контрагент is essential
+    if "Контрагент" not in work_df.columns:
+        # Try to find contractor column by partial match
+        contractor_col = get_field_column(work_df, "contractor")
+        if contractor_col:
+            work_df["Контрагент"] = work_df[contractor_col]
+        else:
+            return {
+                "error": f"❌ Отсутствует необходимая колонка 'Контрагент'",
+                "details": [f"Доступные колонки: {', '.join(work_df.columns)}"],
+            }
+
+    # Find week columns dynamically - also try partial match
+    week_columns = []
+    for week_num in range(1, 6):
+        week_col = f"{week_num} неделя"
+        if week_col in work_df.columns:
+            week_columns.append(week_col)
+        else:
+            # Try to find by partial match
+            found_col = get_field_column(work_df, f"week_{week_num}")
+            if found_col:
+                week_columns.append(found_col)
+
+    # Check if we have any data
+    if work_df.empty:
+        return {"warning": "⚠️ Данные пусты после обработки."}
+
+    # Process numeric columns
+    # Process План
+    if "План" in work_df.columns:
+        work_df["План_numeric"] = pd.to_numeric(
+            work_df["План"].astype(str).str.replace(",", ".").str.replace(" ", ""),
+            errors="coerce",
+        ).fillna(0)
+    else:
+        work_df["План_numeric"] = 0
+
+    # Process week columns - convert to numeric, handle empty strings
+    for week_col in week_columns:
+        work_df[f"{week_col}_numeric"] = pd.to_numeric(
+            work_df[week_col]
+            .astype(str)
+            .str.replace(",", ".")
+            .str.replace(" ", "")
+            .replace("", "0"),
+            errors="coerce",
+        ).fillna(0)
+
+    # Calculate sum of weeks (fact for the month = среднее за месяц)
+    # Handle both "Среднее за неделю" (resources) and "Среднее за месяц" (technique)
+    if "Среднее за неделю" in work_df.columns:
+        # If we have Среднее за неделю (resources), multiply by number of weeks (typically 4-5)
+        work_df["Среднее_за_неделю_numeric"] = pd.to_numeric(
+            work_df["Среднее за неделю"]
+            .astype(str)
+            .str.replace(",", ".")
+            .str.replace(" ", ""),
+            errors="coerce",
+        ).fillna(0)
+        # Calculate week_sum as Среднее за неделю * number of weeks
+        num_weeks = len(week_columns) if week_columns else 4
+        work_df["week_sum"] = work_df["Среднее_за_неделю_numeric"] * num_weeks
+    elif "Среднее за месяц" in work_df.columns:
+        # If we have Среднее за месяц (technique), use it directly as week_sum
+        work_df["Среднее_за_месяц_numeric"] = pd.to_numeric(
+            work_df["Среднее за месяц"]
+            .astype(str)
+            .str.replace(",", ".")
+            .str.replace(" ", ""),
+            errors="coerce",
+        ).fillna(0)
+        work_df["week_sum"] = work_df["Среднее_за_месяц_numeric"]
+        # Also create Среднее_за_неделю_numeric for consistency (divide by number of weeks)
+        num_weeks = len(week_columns) if week_columns else 4
+        work_df["Среднее_за_неделю_numeric"] = (
+            work_df["week_sum"] / num_weeks if num_weeks > 0 else 0
+        )
+    elif week_columns:
+        # Calculate from week columns if available
+        week_numeric_cols = [f"{col}_numeric" for col in week_columns]
+        work_df["week_sum"] = work_df[week_numeric_cols].sum(axis=1)
+        # Calculate average per week
+        num_weeks = len(week_columns) if week_columns else 4
+        work_df["Среднее_за_неделю_numeric"] = (
+            work_df["week_sum"] / num_weeks if num_weeks > 0 else 0
+        )
+    else:
+        work_df["week_sum"] = 0
+        work_df["Среднее_за_неделю_numeric"] = 0
+
+    # Process Дельта (Delta) if available - try to find column by partial match
+    delta_col = None
+    if "Дельта" in work_df.columns:
+        delta_col = "Дельта"
+    else:
+        delta_col = get_field_column(work_df, "delta")
+
+    if delta_col and delta_col in work_df.columns:
+        work_df["Дельта_numeric"] = pd.to_numeric(
+            work_df[delta_col].astype(str).str.replace(",", ".").str.replace(" ", ""),
+            errors="coerce",
+        ).fillna(0)
+    else:
+        # Calculate delta as plan - fact (week_sum)
+        work_df["Дельта_numeric"] = work_df["План_numeric"] - work_df["week_sum"]
+
+    # Process Дельта (%) (Delta %) if available - extract numeric value from percentage string
+    # Try to find column by partial match
+    delta_pct_col = None
+    if "Дельта (%)" in work_df.columns:
+        delta_pct_col = "Дельта (%)"
+    else:
+        delta_pct_col = get_field_column(work_df, "delta_pct")
+
+    if delta_pct_col and delta_pct_col in work_df.columns:
+
+        def extract_percentage(value):
+            """Extract numeric value from percentage string like '-90%' or '90%', or numeric value"""
+            if pd.isna(value):
+                return 0
+            # If already numeric, return as is
+            if isinstance(value, (int, float)):
+                return float(value)
+            # Otherwise, try to extract from string
+            value_str = str(value).strip()
+            # Remove % sign and convert to float
+            value_str = value_str.replace("%", "").replace(",", ".").replace(" ", "")
+            try:
+                return float(value_str)
+            except:
+                return 0
+
+        work_df["Дельта_процент_numeric"] = work_df[delta_pct_col].apply(
+            extract_percentage
+        )
+    else:
+        # Calculate delta percentage if we have delta and plan
+        work_df["Дельта_процент_numeric"] = 0
+        if "Дельта_numeric" in work_df.columns and "План_numeric" in work_df.columns:
+            mask = work_df["План_numeric"] != 0
+            work_df.loc[mask, "Дельта_процент_numeric"] = (
+                work_df.loc[mask, "Дельта_numeric"] / work_df.loc[mask, "План_numeric"]
+            ) * 100
+        work_df["Дельта_процент_numeric"] = work_df["Дельта_процент_numeric"].fillna(0)
+
+    # Ensure Среднее_за_неделю_numeric exists (should already be calculated above)
+    if "Среднее_за_неделю_numeric" not in work_df.columns:
+        # Fallback: calculate from week_sum / number of weeks
+        num_weeks = len(week_columns) if week_columns else 4
+        work_df["Среднее_за_неделю_numeric"] = (
+            work_df["week_sum"] / num_weeks if num_weeks > 0 else 0
+        )
+
+    # Find Проект column
+    project_col = None
+    if "Проект" in work_df.columns:
+        project_col = "Проект"
+    else:
+        project_col = get_field_column(work_df, "resource_project")
+
+    return {"work_df": work_df, "project_col": project_col}
+
+
+# ==================== DASHBOARD 8.6.7: Workforce Movement ====================
+def dashboard_workforce_movement(df):
+    st.header("👥 График движения рабочей силы")
+
+    # Get resources and technique data from session state
+    resources_df = st.session_state.get("resources_data", None)
+    technique_df = st.session_state.get("technique_data", None)
+
+    # Combine both data sources if available
+    combined_df = None
+
+    if resources_df is not None and not resources_df.empty:
+        combined_df = resources_df.copy()
+        combined_df["data_source"] = "Ресурсы"
+
+    if technique_df is not None and not technique_df.empty:
+        if combined_df is not None:
+            technique_copy = technique_df.copy()
+            technique_copy["data_source"] = "Техника"
+            # Align columns before concatenation to avoid issues
+            # If technique has "Среднее за месяц" but resources has "Среднее за неделю", keep both
+            combined_df = pd.concat(
+                [combined_df, technique_copy], ignore_index=True, sort=False
+            )
+        else:
+            combined_df = technique_df.copy()
+            combined_df["data_source"] = "Техника"
+
+    if combined_df is None or combined_df.empty:
+        st.warning(
+            "⚠️ Для отображения графика движения рабочей силы необходимо загрузить файл с данными о ресурсах или технике."
+        )
+        st.info(
+            "📋 Ожидаемые колонки: Проект, Контрагент, Период, План, Среднее за месяц (ресурсы) или Среднее за неделю (техника), 1–5 неделя, Дельта, Дельта (%)"
+        )
+        return
+
+    # Данные для круговых и иных диаграмм берутся только из загруженных файлов (resources_data + technique_data)
+    st.caption("📁 Данные из загруженных файлов (ресурсы и/или техника).")
+
+    # Числовые колонки рассчитываются один раз на набор загруженных файлов
+    prepared = cached_computation(
+        "workforce_work", combined_df, (), lambda: _prepare_workforce_work(combined_df)
+    )
+    if "error" in prepared:
+        st.error(prepared["error"])
+        for text in prepared["details"]:
+            st.info(text)
+        return
+    if "warning" in prepared:
+        st.warning(prepared["warning"])
+        return
+    work_df = prepared["work_df"]
+    project_col = prepared["project_col"]
+
+    # Filters - project and contractor filters
+    col1, col2 = st.columns(2)
+
+    with col1:
+        # Project filter - multiselect для выбора нескольких проектов
+        if project_col and project_col in work_df.columns:
+            all_projects = get_filter_engine(work_df).options(work_df, project_col)
+            selected_projects = st.multiselect(
+                "Фильтр по проектам (можно выбрать несколько)",
+                all_projects,
+                default=all_projects if len(all_projects) <= 3 else all_projects[:3],
+                key="workforce_projects",
+            )
+        else:
+            selected_projects = []
+            st.info("Колонка 'Проект' не найдена")
+
+    with col2:
+        # Contractor filter
+        if "Контрагент" in work_df.columns:
+            contractors = filter_options(work_df, "Контрагент")
+            selected_contractor = st.selectbox(
+                "Фильтр по контрагенту", contractors, key="workforce_contractor"
+            )
+        else:
+            selected_contractor = "Все"
+            st.info("Колонка 'Контрагент' не найдена")
+
+    # Отбор строк кэшируется по (данные, выбранные проекты, контрагент)
+    prepared = cached_computation(
+        "workforce_rows",
+        combined_df,
+        (tuple(selected_projects), selected_contractor),
+        lambda: _filter_resource_rows(
+            work_df, project_col, selected_projects, selected_contractor
+        ),
+    )
+    if "error" in prepared:
+        st.error(prepared["error"])
+        return
+    if "info" in prepared:
+        st.info(prepared["info"])
+        return
+    filtered_df = prepared["filtered_df"]
+
+    # Определяем список проектов для обработки
+    if selected_projects and project_col and project_col in filtered_df.columns:
+        projects_to_process = selected_projects
+    else:
+        # Если проекты не выбраны или колонка не найдена, обрабатываем все проекты
+        if project_col and project_col in filtered_df.columns:
+            projects_to_process = sorted(
+                filtered_df[project_col].dropna().unique().tolist()
+            )
+        else:
+            projects_to_process = ["Все проекты"]
+
+    # Обрабатываем каждый проект отдельно
+    for project_name in projects_to_process:
+        # Фильтруем данные по проекту
+        if project_name != "Все проекты":
+            project_filtered_df = apply_filters(filtered_df, {project_col: project_name})
+        else:
+            project_filtered_df = filtered_df.copy()
+
+        if project_filtered_df.empty:
+            continue
+
+        # Заголовок для проекта
+        if len(projects_to_process) > 1:
+            st.markdown("---")
+            st.subheader(f"📊 Проект: {project_name}")
+
+        # ========== Chart 1: Pie Chart by Contractor (Delta %) ==========
+        st.subheader("📊 Круговая диаграмма: Распределение дельты (%) по контрагентам")
+
+        # Group by Контрагент and aggregate for pie chart (Delta %)
+        # Ensure Дельта_процент_numeric exists - check if it was created in work_df
+        if "Дельта_процент_numeric" not in project_filtered_df.columns:
+            # Try to find Дельта (%) column by partial match
+            delta_pct_col = None
+            if "Дельта (%)" in project_filtered_df.columns:
+                delta_pct_col = "Дельта (%)"
+            else:
+                delta_pct_col = get_field_column(project_filtered_df, "delta_pct")
+
+            if delta_pct_col and delta_pct_col in project_filtered_df.columns:
+                # Extract percentage values from the column
+                def extract_percentage(value):
+                    """Extract numeric value from percentage string like '-90%' or '90%', or numeric value"""
+                    if pd.isna(value):
+                        return 0
+                    # If already numeric, return as is
+                    if isinstance(value, (int, float)):
+                        return float(value)
+                    # Otherwise, try to extract from string
+                    value_str = str(value).strip()
+                    # Remove % sign and convert to float
+                    value_str = (
+                        value_str.replace("%", "").replace(",", ".").replace(" ", "")
+                    )
+                    try:
+                        return float(value_str)
+                    except:
+                        return 0
+
+                project_filtered_df["Дельта_процент_numeric"] = project_filtered_df[
+                    delta_pct_col
+                ].apply(extract_percentage)
+            else:
+                # Try to calculate from Дельта and План if available
+                if (
+                    "Дельта_numeric" in project_filtered_df.columns
+                    and "План_numeric" in project_filtered_df.columns
+                ):
+                    project_filtered_df["Дельта_процент_numeric"] = 0
+                    mask = project_filtered_df["План_numeric"] != 0
+                    project_filtered_df.loc[mask, "Дельта_процент_numeric"] = (
+                        project_filtered_df.loc[mask, "Дельта_numeric"]
+                        / project_filtered_df.loc[mask, "План_numeric"]
+                    ) * 100
+                    project_filtered_df["Дельта_процент_numeric"] = project_filtered_df[
+                        "Дельта_процент_numeric"
+                    ].fillna(0)
+                else:
+                    st.error(
+                        "❌ Не удалось найти или рассчитать Дельта (%). Отсутствуют необходимые колонки."
+                    )
+                    st.info(
+                        f"Доступные колонки: {', '.join(project_filtered_df.columns)}"
+                    )
+                    contractor_delta_pct = pd.DataFrame(
+                        columns=["Контрагент", "Дельта (%)"]
+                    )
+
+        # Group by contractor and aggregate
+        if "Дельта_процент_numeric" in project_filtered_df.columns:
+            # Check if we have any data before grouping
+            if (
+                not project_filtered_df.empty
+                and "Контрагент" in project_filtered_df.columns
+            ):
+                contractor_delta_pct = (
+                    project_filtered_df.groupby("Контрагент", observed=True)
+                    .agg({"Дельта_процент_numeric": "sum"})  # Sum of delta percentages
+                    .reset_index()
+                )
+
+                contractor_delta_pct.columns = ["Контрагент", "Дельта (%)"]
+            else:
+                contractor_delta_pct = pd.DataFrame(
+                    columns=["Контрагент", "Дельта (%)"]
+                )
+        else:
+            contractor_delta_pct = pd.DataFrame(columns=["Контрагент", "Дельта (%)"])
+
+        # Check if we have data (внутри цикла по проектам — круговая и столбчатая по каждому проекту)
+        if contractor_delta_pct.empty or len(contractor_delta_pct) == 0:
+            st.info("Нет данных для отображения круговой диаграммы.")
+        else:
+            # Ensure Дельта (%) is numeric
+            contractor_delta_pct["Дельта (%)"] = pd.to_numeric(
+                contractor_delta_pct["Дельта (%)"], errors="coerce"
+            ).fillna(0)
+
+            # Check if we have any non-zero values
+            total_abs_sum = contractor_delta_pct["Дельта (%)"].abs().sum()
+
+            if total_abs_sum == 0:
+                st.info(
+                    "Все значения дельты (%) равны нулю. Диаграмма не может быть построена."
+                )
+            else:
+                # Remove only exactly zero values (not small values)
+                non_zero_data = contractor_delta_pct[
+                    contractor_delta_pct["Дельта (%)"] != 0
+                ].copy()
+
+                # Use non-zero data if available
+                if not non_zero_data.empty:
+                    contractor_delta_pct = non_zero_data
+
+                # Sort by absolute value for better visualization
+                contractor_delta_pct = contractor_delta_pct.sort_values(
+                    "Дельта (%)", key=abs, ascending=False
+                )
+
+                # Create a copy with absolute values for pie chart (pie charts don't support negative values)
+                contractor_delta_pct_abs = contractor_delta_pct.copy()
+                contractor_delta_pct_abs["Дельта (%)_abs"] = contractor_delta_pct_abs[
+                    "Дельта (%)"
+                ].abs()
+
+                # Store original values for display
+                original_values = contractor_delta_pct_abs["Дельта (%)"].tolist()
+
+                # Create pie chart using absolute values
+                fig_pie = px.pie(
+                    contractor_delta_pct_abs,
+                    values="Дельта (%)_abs",
+                    names="Контрагент",
+                    title="Распределение дельты (%) по контрагентам",
+                    color_discrete_sequence=px.colors.qualitative.Set3,
+                )
+
+                fig_pie.update_layout(
+                    height=600,
+                    showlegend=True,
+                    legend=dict(
+                        orientation="v", yanchor="middle", y=0.5, xanchor="left", x=1.1
+                    ),
+                    title_font_size=16,
+                )
+
+                # На круговой диаграмме: абсолютное значение и процент в подписи (без наведения)
+                fig_pie.update_traces(
+                    textinfo="label+value+percent",
+                    texttemplate="%{label}<br>%{value}<br>(%{percent:.0%})",
+                    textposition="inside",
+                    textfont=dict(size=12, color="white"),
+                    customdata=original_values,
+                    hovertemplate="<b>%{label}</b><br>Дельта (%): %{customdata:.0f}%<br>Процент: %{percent}<br><extra></extra>",
+                )
+
+                fig_pie = apply_chart_background(fig_pie)
+                st.plotly_chart(fig_pie, use_container_width=True)
+
+        # ========== Chart 2: Bar Chart by Contractor (Plan, Average, Delta) ==========
+        st.subheader(
+            "📊 Столбчатая диаграмма: План, Среднее за месяц, Дельта (группировка по контрагенту)"
+        )
+
+        # Group by Контрагент and aggregate for bar chart
+        contractor_data = (
+            project_filtered_df.groupby("Контрагент", observed=True)
+            .agg(
+                {
+                    "План_numeric": "sum",  # Sum of plans
+                    "week_sum": "sum",  # Sum of weeks = среднее за месяц
+                    "Дельта_numeric": "sum",  # Sum of deltas
+                }
+            )
+            .reset_index()
+        )
+
+        contractor_data.columns = ["Контрагент", "План", "Среднее за месяц", "Дельта"]
+
+        # Ensure Дельта column has numeric values
+        contractor_data["Дельта"] = pd.to_numeric(
+            contractor_data["Дельта"], errors="coerce"
+        ).fillna(0)
+
+        # Sort by contractor name
+        contractor_data = contractor_data.sort_values("Контрагент")
+
+        def _workforce_by_contractor_chart():
+            # Create bar chart
+            fig_bar = go.Figure()
+
+            # Add bars for Plan
+            fig_bar.add_trace(
+                go.Bar(
+                    name="План",
+                    x=contractor_data["Контрагент"],
+                    y=contractor_data["План"],
+                    marker_color="#3498db",
+                    text=contractor_data["План"].apply(
+                        lambda x: f"{int(x)}" if pd.notna(x) else "0"
+                    ),
+                    textposition="outside",
+                    textfont=dict(size=12, color="white"),
+                )
+            )
+
+            # Add bars for Average
+            fig_bar.add_trace(
+                go.Bar(
+                    name="Среднее за месяц",
+                    x=contractor_data["Контрагент"],
+                    y=contractor_data["Среднее за месяц"],
+                    marker_color="#2ecc71",
+                    text=contractor_data["Среднее за месяц"].apply(
+                        lambda x: f"{int(x)}" if pd.notna(x) else "0"
+                    ),
+                    textposition="outside",
+                    textfont=dict(size=12, color="white"),
+                )
+            )
+
+            # Add bars for Delta - ensure values are properly formatted
+            # Разделяем на положительные и отрицательные значения для разных цветов
+            delta_values = contractor_data["Дельта"].fillna(0)
+            delta_abs = delta_values.abs()  # Абсолютные значения для отображения
+
+            # Положительные значения дельты (зеленый)
+            positive_mask = delta_values > 0
+            if positive_mask.any():
+                fig_bar.add_trace(
+                    go.Bar(
+                        name="Дельта (+)",
+                        x=contractor_data.loc[positive_mask, "Контрагент"],
+                        y=delta_abs[positive_mask],
+                        marker_color="#2ecc71",  # Зеленый для положительных
+                        text=delta_abs[positive_mask].apply(
+                            lambda x: f"{int(x)}" if pd.notna(x) and abs(x) >= 0.5 else "0"
+                        ),
+                        textposition="outside",
+                        textfont=dict(size=12, color="white"),
+                        showlegend=False,
+                    )
+                )
+
+            # Отрицательные значения дельты (красный)
+            negative_mask = delta_values < 0
+            if negative_mask.any():
+                fig_bar.add_trace(
+                    go.Bar(
+                        name="Дельта (-)",
+                        x=contractor_data.loc[negative_mask, "Контрагент"],
+                        y=delta_abs[negative_mask],
+                        marker_color="#e74c3c",  # Красный для отрицательных
+                        text=delta_abs[negative_mask].apply(
+                            lambda x: f"{int(x)}" if pd.notna(x) and abs(x) >= 0.5 else "0"
+                        ),
+                        textposition="outside",
+                        textfont=dict(size=12, color="white"),
+                        showlegend=False,
+                    )
+                )
+
+            # Нулевые значения (если есть)
+            zero_mask = delta_values == 0
+            if zero_mask.any():
+                fig_bar.add_trace(
+                    go.Bar(
+                        name="Дельта (0)",
+                        x=contractor_data.loc[zero_mask, "Контрагент"],
+                        y=delta_abs[zero_mask],
+                        marker_color="#95a5a6",  # Серый для нулевых
+                        text=delta_abs[zero_mask].apply(
+                            lambda x: f"{int(x)}" if pd.notna(x) and abs(x) >= 0.5 else "0"
+                        ),
+                        textposition="outside",
+                        textfont=dict(size=12, color="white"),
+                        showlegend=False,
+                    )
+                )
+
+            # Update layout
+            fig_bar.update_layout(
+                title="План, Среднее за месяц и Дельта по контрагентам",
+                xaxis_title="Контрагент",
+                yaxis_title="Значение",
+                barmode="group",
+                height=600,
+                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+                xaxis=dict(tickangle=-45),
+            )
+
+            return apply_chart_background(fig_bar)
+
+        st.plotly_chart(
+            cached_figure(
+                "workforce_by_contractor",
+                contractor_data,
+                (),
+                _workforce_by_contractor_chart,
+            ),
+            use_container_width=True,
+        )
+
+        # ========== Chart 3: Pie Chart by Contractor (Plan + Average) ==========
+        st.subheader(
+            "📊 Круговая диаграмма: Распределение суммы Плана и Среднего за месяц по контрагентам"
+        )
+
+        # Group by Контрагент and aggregate for pie chart (Plan + Average)
+        contractor_plan_avg = (
+            project_filtered_df.groupby("Контрагент", observed=True)
+            .agg(
+                {
+                    "План_numeric": "sum",  # Sum of plans
+                    "week_sum": "sum",  # Sum of weeks = среднее за месяц
+                    "Дельта_numeric": "sum",  # Sum of deltas
+                }
+            )
+            .reset_index()
+        )
+
+        contractor_plan_avg.columns = ["Контрагент", "План", "Среднее за месяц", "Дельта"]
+
+        # Calculate sum of Plan + Average for each contractor
+        contractor_plan_avg["Сумма"] = (
+            contractor_plan_avg["План"] + contractor_plan_avg["Среднее за месяц"]
+        )
+
+        # Calculate доля факта (Среднее за месяц / Сумма * 100) and доля отклонения (Дельта / План * 100)
+        contractor_plan_avg["Доля факта (%)"] = 0
+        contractor_plan_avg["Доля отклонения (%)"] = 0
+        mask_sum = contractor_plan_avg["Сумма"] != 0
+        contractor_plan_avg.loc[mask_sum, "Доля факта (%)"] = (
+            contractor_plan_avg.loc[mask_sum, "Среднее за месяц"]
+            / contractor_plan_avg.loc[mask_sum, "Сумма"]
+        ) * 100
+        mask_plan = contractor_plan_avg["План"] != 0
+        contractor_plan_avg.loc[mask_plan, "Доля отклонения (%)"] = (
+            contractor_plan_avg.loc[mask_plan, "Дельта"]
+            / contractor_plan_avg.loc[mask_plan, "План"]
+        ) * 100
+
+        # Remove zero values for pie chart
+        contractor_plan_avg = contractor_plan_avg[contractor_plan_avg["Сумма"] != 0].copy()
+
+        if contractor_plan_avg.empty:
+            st.info("Нет данных для отображения.")
+        else:
+            # Sort by sum value for better visualization
+            contractor_plan_avg = contractor_plan_avg.sort_values("Сумма", ascending=False)
+
+            # Create pie chart
+            fig_pie_plan_avg = px.pie(
+                contractor_plan_avg,
+                values="Сумма",
+                names="Контрагент",
+                title="Распределение суммы Плана и Среднего за месяц по контрагентам",
+                color_discrete_sequence=px.colors.qualitative.Set2,
+            )
+
+            fig_pie_plan_avg.update_layout(
+                height=600,
+                showlegend=True,
+                legend=dict(
+                    orientation="v", yanchor="middle", y=0.5, xanchor="left", x=1.1
+                ),
+                title_font_size=16,
+            )
+
+            # На круговой диаграмме: абсолютное значение и процент в подписи (без наведения)
+            fig_pie_plan_avg.update_traces(
+                textinfo="label+value+percent",
+                texttemplate="%{label}<br>%{value:,.0f}<br>(%{percent:.0%})",
+                textposition="inside",
+                textfont=dict(size=12, color="white"),
+            )
+            fig_pie_plan_avg.update_traces(
+                customdata=list(
+                    zip(
+                        contractor_plan_avg["Доля факта (%)"],
+                        contractor_plan_avg["Доля отклонения (%)"],
+                    )
+                ),
+                hovertemplate="<b>%{label}</b><br>Сумма: %{value:,.0f}<br>Процент: %{percent}<br>Доля факта: %{customdata[0]:.0f}%<br>Доля отклонения: %{customdata[1]:.0f}%<br><extra></extra>",
+            )
+
+            fig_pie_plan_avg = apply_chart_background(fig_pie_plan_avg)
+            st.plotly_chart(fig_pie_plan_avg, use_container_width=True)
+
+            # ========== Summary Table ==========
+            st.subheader("📋 Сводная таблица по контрагентам")
+
+            # Format numbers for display
+            summary_table = contractor_data.copy()
+            summary_table["План"] = summary_table["План"].apply(
+                lambda x: f"{int(x)}" if pd.notna(x) else "0"
+            )
+            summary_table["Среднее за месяц"] = summary_table["Среднее за месяц"].apply(
+                lambda x: f"{int(x)}" if pd.notna(x) else "0"
+            )
+            summary_table["Дельта"] = summary_table["Дельта"].apply(
+                lambda x: f"{int(x)}" if pd.notna(x) else "0"
+            )
+
+            st.table(style_dataframe_for_dark_theme(summary_table))
+
+            # Summary metrics
+            col1, col2, col3 = st.columns(3)
+
+            with col1:
+                total_plan = contractor_data["План"].sum()
+                st.metric("Общий план", f"{int(total_plan)}")
+
+            with col2:
+                total_average = contractor_data["Среднее за месяц"].sum()
+                st.metric("Общее среднее за месяц", f"{int(total_average)}")
+
+            with col3:
+                total_delta = contractor_data["Дельта"].sum()
+                st.metric("Общая дельта", f"{int(total_delta)}")
+
+
+def _prepare_skud_work(resources_df):
+    """
+    Числовое среднее и месяц периода для данных о ресурсах (СКУД стройка), найденные колонки
+    проекта, контрагента и периода. Ошибки — {"error": текст, "details": [подсказки]}.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Create working copy
+    work_df = resources_df.copy(deep=False)
+
+    # Find required columns
+    project_col = get_field_column(work_df, "resource_project")
+    contractor_col = get_field_column(work_df, "contractor")
+    period_col = find_column_by_partial(
+        work_df, ["Период", "период", "period", "Period", "Месяц", "месяц"]
+    )
+
+    # Find average column (Среднее за неделю or Среднее за месяц)
+    avg_col = None
+    if "Среднее за неделю" in work_df.columns:
+        avg_col = "Среднее за неделю"
+    elif "Среднее за месяц" in work_df.columns:
+        avg_col = "Среднее за месяц"
+    else:
+        avg_col = get_field_column(work_df, "average")
+
+    if not avg_col:
+        return {
+            "error": "❌ Не найдена колонка со средним значением (Среднее за неделю или Среднее за месяц)",
+            "details": [
+                f"Доступные колонки: {', '.join(work_df.columns)}",
+                f"Количество строк в данных: {len(work_df)}",
+            ],
+        }
+
+    # Process average column to numeric
+    work_df["Среднее_numeric"] = pd.to_numeric(
+        work_df[avg_col].astype(str).str.replace(",", ".").str.replace(" ", ""),
+        errors="coerce",
+    )
+
+    # Check if we have any valid numeric values
+    if work_df["Среднее_numeric"].isna().all():
+        return {
+            "error": "❌ Все значения в колонке со средним значением не являются числами.",
+            "details": [
+                f"Примеры значений из колонки '{avg_col}': {work_df[avg_col].head(10).tolist()}"
+            ],
+        }
+
+    # Fill NaN with 0 only for display purposes, but keep track of valid data
+    work_df["Среднее_numeric"] = work_df["Среднее_numeric"].fillna(0)
+
+    # Process period column - try to convert to datetime/period
+    if period_col and period_col in work_df.columns:
+        # Try to parse period as date
+        work_df["period_parsed"] = pd.to_datetime(
+            work_df[period_col], errors="coerce", dayfirst=True
+        )
+        # If parsing failed, try to extract month/year from string
+        mask = work_df["period_parsed"].isna()
+        if mask.any():
+            # Try to extract month and year from period string
+            def extract_period(val):
+                if pd.isna(val):
+                    return None
+                val_str = str(val)
+                # Try patterns like "2025-01", "01.2025", "январь 2025", etc.
+                try:
+                    # Try YYYY-MM format
+                    if "-" in val_str:
+                        parts = val_str.split("-")
+                        if len(parts) >= 2:
+                            year = int(parts[0])
+                            month = int(parts[1])
+                            return pd.Period(f"{year}-{month:02d}", freq="M")
+                    # Try DD.MM.YYYY or MM.YYYY
+                    if "." in val_str:
+                        parts = val_str.split(".")
+                        if len(parts) >= 2:
+                            if len(parts) == 3:  # DD.MM.YYYY
+                                year = int(parts[2])
+                                month = int(parts[1])
+                            else:  # MM.YYYY
+                                year = int(parts[1])
+                                month = int(parts[0])
+                            return pd.Period(f"{year}-{month:02d}", freq="M")
+                except:
+                    pass
+                return None
+
+            work_df.loc[mask, "period_parsed"] = work_df.loc[mask, period_col].apply(
+                extract_period
+            )
+
+        # Convert to Period if possible
+        work_df["period_month"] = work_df["period_parsed"].apply(
+            lambda x: (
+                x.to_period("M")
+                if pd.notna(x) and isinstance(x, pd.Timestamp)
+                else (x if isinstance(x, pd.Period) else None)
+            )
+        )
+    else:
+        work_df["period_month"] = None
+
+    return {
+        "work_df": work_df,
+        "project_col": project_col,
+        "contractor_col": contractor_col,
+        "period_col": period_col,
+    }
+
+
+def _prepare_skud(
+    work_df,
+    project_col,
+    contractor_col,
+    selected_grouping,
+    selected_period_from,
+    selected_period_to,
+    selected_project,
+    selected_contractor,
+):
+    """
+    Отбор строк СКУД стройка по фильтрам и средние по выбранной группировке (и месяцам).
+    Ошибки фильтра периода — в period_warnings; нет строк — ещё и {"warning": текст}.
+    Результат кэшируется (dashboard_cache) и не должен изменяться.
+    """
+    # Apply filters
+    filtered_df = work_df.copy(deep=False)
+
+    if selected_project != "Все" and project_col and project_col in filtered_df.columns:
+        # More robust filtering - handle NaN values and case-insensitive comparison
+        project_mask = (
+            filtered_df[project_col].astype(str).str.strip().str.lower()
+            == str(selected_project).strip().lower()
+        )
+        filtered_df = filtered_df[project_mask]
+
+    if (
+        selected_contractor != "Все"
+        and contractor_col
+        and contractor_col in filtered_df.columns
+    ):
+        # More robust filtering - handle NaN values and case-insensitive comparison
+        contractor_mask = (
+            filtered_df[contractor_col].astype(str).str.strip().str.lower()
+            == str(selected_contractor).strip().lower()
+        )
+        filtered_df = filtered_df[contractor_mask]
+
+    # Apply period filters
+    period_warnings = []
+    if (
+        "period_month" in filtered_df.columns
+        and filtered_df["period_month"].notna().any()
+    ):
+        if selected_period_from != "Все":
+            try:
+                period_from = pd.Period(selected_period_from, freq="M")
+                filtered_df = filtered_df[filtered_df["period_month"] >= period_from]
+            except Exception as e:
+                period_warnings.append(f"Ошибка при фильтрации по периоду от: {e}")
+
+        if selected_period_to != "Все":
+            try:
+                period_to = pd.Period(selected_period_to, freq="M")
+                filtered_df = filtered_df[filtered_df["period_month"] <= period_to]
+            except Exception as e:
+                period_warnings.append(f"Ошибка при фильтрации по периоду до: {e}")
+
+    if filtered_df.empty:
+        return {
+            "period_warnings": period_warnings,
+            "warning": "⚠️ Нет данных для отображения с выбранными фильтрами.",
+        }
+
+    # Group data based on selected grouping
+    group_cols = []
+    if (
+        selected_grouping == "По проектам"
+        and project_col
+        and project_col in filtered_df.columns
+    ):
+        group_cols.append(project_col)
+    elif (
+        selected_grouping == "По контрагентам"
+        and contractor_col
+        and contractor_col in filtered_df.columns
+    ):
+        group_cols.append(contractor_col)
+    elif selected_grouping == "По проектам и контрагентам":
+        if project_col and project_col in filtered_df.columns:
+            group_cols.append(project_col)
+        if contractor_col and contractor_col in filtered_df.columns:
+            group_cols.append(contractor_col)
+
+    # Always group by period_month for time series (only if not filtering by specific period range)
+    # Only add period_month if it has valid (non-NaN) values
+    if (
+        (selected_period_from == "Все" and selected_period_to == "Все")
+        and "period_month" in filtered_df.columns
+        and filtered_df["period_month"].notna().any()
+    ):
+        group_cols.append("period_month")
+
+    if group_cols:
+        # Filter out rows where any grouping column is NaN before grouping
+        mask = pd.Series([True] * len(filtered_df))
+        for col in group_cols:
+            if col in filtered_df.columns:
+                mask = mask & filtered_df[col].notna()
+
+        if mask.any():
+            grouped_data = (
+                filtered_df[mask]
+                .groupby(group_cols, observed=True)["Среднее_numeric"]
+                .mean()
+                .reset_index()
+            )
+            grouped_data.columns = list(group_cols) + ["Среднее за месяц"]
+        else:
+            # All grouping columns are NaN, aggregate without grouping
+            grouped_data = pd.DataFrame(
+                {"Среднее за месяц": [filtered_df["Среднее_numeric"].mean()]}
+            )
+    else:
+        # No grouping, just aggregate by period if available
+        if (
+            "period_month" in filtered_df.columns
+            and filtered_df["period_month"].notna().any()
+        ):
+            grouped_data = (
+                filtered_df.groupby("period_month", observed=True)["Среднее_numeric"]
+                .mean()
+                .reset_index()
+            )
+            grouped_data.columns = ["period_month", "Среднее за месяц"]
+        else:
+            # No period available, just aggregate all data
+            mean_value = filtered_df["Среднее_numeric"].mean()
+            if pd.isna(mean_value):
+                mean_value = 0
+            grouped_data = pd.DataFrame({"Среднее за месяц": [mean_value]})
+
+    # Format period for display
+    def format_period_display(period_val):
+        if pd.isna(period_val):
+            return "Н/Д"
+        if isinstance(period_val, pd.Period):
+            try:
+                month_name = get_russian_month_name(period_val)
+                year = period_val.year
+                if month_name:
+                    return f"{month_name} {year}"
+                return str(period_val)
+            except:
+                return str(period_val)
+        return str(period_val)
+
+    if "period_month" in grouped_data.columns:
+        grouped_data["period_display"] = grouped_data["period_month"].apply(
+            format_period_display
+        )
+
+    return {
+        "period_warnings": period_warnings,
+        "filtered_df": filtered_df,
+        "grouped_data": grouped_data,
+        "group_cols": group_cols,
+    }
+
+
+# ==================== DASHBOARD 8.6: SKUD Stroyka ====================
+def dashboard_skud_stroyka(df):
+    st.header("🏗️ СКУД стройка")
+
+    # Get resources data from session state
+    resources_df = st.session_state.get("resources_data", None)
+
+    if resources_df is None or resources_df.empty:
+        st.warning(
+            "⚠️ Для отображения графика СКУД стройка необходимо загрузить файл с данными о ресурсах."
+        )
+        st.info(
+            "📋 Ожидаемые колонки в файле: Проект, Контрагент, Период, Среднее за неделю или Среднее за месяц"
+        )
+        return
+
+    # Числовое среднее и периоды рассчитываются один раз на загруженный файл
+    prepared = cached_computation(
+        "skud_work", resources_df, (), lambda: _prepare_skud_work(resources_df)
+    )
+    if "error" in prepared:
+        st.error(prepared["error"])
+        for text in prepared["details"]:
+            st.info(text)
+        return
+    work_df = prepared["work_df"]
+    project_col = prepared["project_col"]
+    contractor_col = prepared["contractor_col"]
+    period_col = prepared["period_col"]
+
+    # Filters
+    col1, col2, col3, col4, col5 = st.columns(5)
+
+    with col1:
+        # Grouping filter
+        grouping_options = [
+            "По проектам",
+            "По контрагентам",
+            "По проектам и контрагентам",
+            "Без группировки",
+        ]
+        selected_grouping = st.selectbox(
+            "Группировка", grouping_options, key="skud_grouping"
+        )
+
+    with col2:
+        # Фильтр по периоду от
+        if period_col and "period_month" in work_df.columns and work_df["period_month"].notna().any():
+            available_months = sorted(
+                work_df[work_df["period_month"].notna()]["period_month"].unique()
+            )
+            month_options = ["Все"] + [str(m) for m in available_months]
+            selected_period_from = st.selectbox(
+                "Период от", month_options, key="skud_period_from"
+            )
+        else:
+            selected_period_from = st.selectbox(
+                "Период от", ["Все"], key="skud_period_from"
+            )
+
+    with col3:
+        # Фильтр по периоду до
+        if period_col and "period_month" in work_df.columns and work_df["period_month"].notna().any():
+            available_months = sorted(
+                work_df[work_df["period_month"].notna()]["period_month"].unique()
+            )
+            month_options = ["Все"] + [str(m) for m in available_months]
+            selected_period_to = st.selectbox(
+                "Период до", month_options, key="skud_period_to"
+            )
+        else:
+            selected_period_to = st.selectbox(
+                "Период до", ["Все"], key="skud_period_to"
+            )
+
+    with col4:
+        # Project filter
+        if project_col and project_col in work_df.columns:
+            projects = filter_options(work_df, project_col)
+            selected_project = st.selectbox(
+                "Фильтр по проекту", projects, key="skud_project"
+            )
+        else:
+            selected_project = st.selectbox(
+                "Фильтр по проекту", ["Все"], key="skud_project"
+            )
+
+    with col5:
+        # Contractor filter
+        if contractor_col and contractor_col in work_df.columns:
+            contractors = filter_options(work_df, contractor_col)
+            selected_contractor = st.selectbox(
+                "Фильтр по контрагенту", contractors, key="skud_contractor"
+            )
+        else:
+            selected_contractor = st.selectbox(
+                "Фильтр по контрагенту", ["Все"], key="skud_contractor"
+            )
+
+    # Отбор строк и группировка кэшируются по (файл, фильтры)
+    filters = (
+        selected_grouping,
+        selected_period_from,
+        selected_period_to,
+        selected_project,
+        selected_contractor,
+    )
+    prepared = cached_computation(
+        "skud",
+        resources_df,
+        filters,
+        lambda: _prepare_skud(work_df, project_col, contractor_col, *filters),
+    )
+    for text in prepared["period_warnings"]:
+        st.warning(text)
+    if "warning" in prepared:
+        st.warning(prepared["warning"])
+        return
+    filtered_df = prepared["filtered_df"]
+    grouped_data = prepared["grouped_data"]
+    group_cols = prepared["group_cols"]
+
+    # Check if we have data to display
+    if grouped_data.empty:
+        st.warning("⚠️ Нет данных для отображения после применения фильтров.")
+        with st.expander("🔍 Детали проблемы", expanded=True):
+            st.write(f"**Исходных строк:** {len(work_df)}")
+            st.write(f"**Строк после фильтрации:** {len(filtered_df)}")
+            st.write(f"**Строк после группировки:** {len(grouped_data)}")
+            st.write(f"**Выбранная группировка:** {selected_grouping}")
+            st.write(f"**Колонки для группировки:** {group_cols}")
+            st.write(f"**Выбранный проект:** {selected_project}")
+            st.write(f"**Выбранный контрагент:** {selected_contractor}")
+            st.write(f"**Период от:** {selected_period_from}")
+            st.write(f"**Период до:** {selected_period_to}")
+            if len(filtered_df) > 0:
+                st.write("**Данные после фильтрации (первые 10 строк):**")
+                st.table(style_dataframe_for_dark_theme(filtered_df.head(10)))
+                if "Среднее_numeric" in filtered_df.columns:
+                    st.write(f"**Среднее_numeric в отфильтрованных данных:**")
+                    st.write(
+                        f"- Не пустых значений: {filtered_df['Среднее_numeric'].notna().sum()}"
+                    )
+                    st.write(
+                        f"- Среднее значение: {filtered_df['Среднее_numeric'].mean():.2f}"
+                    )
+                    st.write(f"- Сумма: {filtered_df['Среднее_numeric'].sum():.2f}")
+            else:
+                st.write(
+                    "**Проблема:** После применения фильтров не осталось ни одной строки."
+                )
+                st.write("**Возможные причины:**")
+                st.write("- Фильтры слишком строгие")
+                st.write("- Данные не соответствуют выбранным фильтрам")
+                st.write("- Проблемы с типами данных при сравнении")
+        return
+
+    # Check if all values are NaN (but allow zeros - zeros are valid data)
+    if "Среднее за месяц" in grouped_data.columns:
+        if grouped_data["Среднее за месяц"].isna().all():
+            st.warning("⚠️ Все значения среднего равны NaN после группировки.")
+            with st.expander("🔍 Детали проблемы", expanded=True):
+                st.write(f"**Строк после группировки:** {len(grouped_data)}")
+                st.table(style_dataframe_for_dark_theme(grouped_data))
+            return
+
+    # Create visualization
+    has_period = (
+        "period_month" in grouped_data.columns
+        or "period_display" in grouped_data.columns
+    )
+
+    if selected_grouping == "Без группировки":
+        if has_period:
+            # Simple line chart with time series
+            x_col = (
+                "period_display"
+                if "period_display" in grouped_data.columns
+                else "period_month"
+            )
+            fig = px.line(
+                grouped_data,
+                x=x_col,
+                y="Среднее за месяц",
+                title="Среднее за месяц по людям в динамике",
+                labels={x_col: "Месяц", "Среднее за месяц": "Среднее за месяц (чел.)"},
+                markers=True,
+            )
+            fig.update_xaxes(tickangle=-45)
+            fig = apply_chart_background(fig)
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            # Single value bar chart
+            fig = px.bar(
+                grouped_data,
+                y="Среднее за месяц",
+                title="Среднее за месяц по людям",
+                labels={"Среднее за месяц": "Среднее за месяц (чел.)"},
+                text="Среднее за месяц",
+            )
+            fig.update_traces(
+                textposition="outside", textfont=dict(size=12, color="white")
+            )
+            fig = apply_chart_background(fig)
+            st.plotly_chart(fig, use_container_width=True)
+    else:
+        # Grouped visualization
+        grouping_cols = [col for col in group_cols if col != "period_month"]
+
+        if has_period and len(grouping_cols) > 0:
+            # Grouped bar chart with time series
+            x_col = (
+                "period_display"
+                if "period_display" in grouped_data.columns
+                else "period_month"
+            )
+            color_col = grouping_cols[0] if len(grouping_cols) == 1 else None
+
+            if color_col:
+                fig = px.bar(
+                    grouped_data,
+                    x=x_col,
+                    y="Среднее за месяц",
+                    color=color_col,
+                    title="Среднее за месяц по людям в динамике",
+                    labels={
+                        x_col: "Месяц",
+                        "Среднее за месяц": "Среднее за месяц (чел.)",
+                    },
+                    text="Среднее за месяц",
+                )
+                fig.update_layout(barmode="group")
+                fig.update_xaxes(tickangle=-45)
+                fig.update_traces(
+                    textposition="outside", textfont=dict(size=12, color="white")
+                )
+                fig = apply_chart_background(fig)
+                st.plotly_chart(fig, use_container_width=True)
+            elif len(grouping_cols) > 1:
+                # Multiple grouping columns - use first for color, show others in hover
+                fig = px.bar(
+                    grouped_data,
+                    x=x_col,
+                    y="Среднее за месяц",
+                    color=grouping_cols[0],
+                    title="Среднее за месяц по людям в динамике",
+                    labels={
+                        x_col: "Месяц",
+                        "Среднее за месяц": "Среднее за месяц (чел.)",
+                    },
+                    text="Среднее за месяц",
+                    facet_col=grouping_cols[1] if len(grouping_cols) > 1 else None,
+                )
+                fig.update_layout(barmode="group")
+                fig.update_xaxes(tickangle=-45)
+                fig.update_traces(
+                    textposition="outside", textfont=dict(size=12, color="white")
+                )
+                fig = apply_chart_background(fig)
+                st.plotly_chart(fig, use_container_width=True)
+            else:
+                # Fallback to line chart
+                fig = px.line(
+                    grouped_data,
+                    x=x_col,
+                    y="Среднее за месяц",
+                    title="Среднее за месяц по людям в динамике",
+                    labels={
+                        x_col: "Месяц",
+                        "Среднее за месяц": "Среднее за месяц (чел.)",
+                    },
+                    markers=True,
+                )
+                fig.update_xaxes(tickangle=-45)
+                fig = apply_chart_background(fig)
+                st.plotly_chart(fig, use_container_width=True)
+        elif len(grouping_cols) > 0:
+            # Grouped bar chart without time series (single month selected)
+            color_col = grouping_cols[0] if len(grouping_cols) == 1 else None
+            if color_col:
+                fig = px.bar(
+                    grouped_data,
+                    x=color_col,
+                    y="Среднее за месяц",
+                    title="Среднее за месяц по людям",
+                    labels={"Среднее за месяц": "Среднее за месяц (чел.)"},
+                    text="Среднее за месяц",
+                )
+                fig.update_traces(
+                    textposition="outside", textfont=dict(size=12, color="white")
+                )
+                fig.update_xaxes(tickangle=-45)
+                fig = apply_chart_background(fig)
+                st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.info("Не удалось построить график с выбранной группировкой.")
+        else:
+            st.info("Не удалось построить график с выбранной группировкой.")
+
+    # Summary table
+    if not grouped_data.empty:
+        st.subheader("📋 Сводная таблица")
+        display_cols = []
+
+        # Add period column only if not filtering by specific period range
+        if (selected_period_from == "Все" and selected_period_to == "Все") and (
+            "period_display" in grouped_data.columns
+            or "period_month" in grouped_data.columns
+        ):
+            display_cols.append(
+                "period_display"
+                if "period_display" in grouped_data.columns
+                else "period_month"
+            )
+
+        # Add grouping columns
+        if selected_grouping != "Без группировки":
+            for col in group_cols:
+                if col != "period_month" and col in grouped_data.columns:
+                    display_cols.append(col)
+
+        display_cols.append("Среднее за месяц")
+
+        # Filter to only existing columns
+        display_cols = [col for col in display_cols if col in grouped_data.columns]
+
+        summary_table = grouped_data[display_cols].copy()
+        summary_table["Среднее за месяц"] = summary_table["Среднее за месяц"].apply(
+            lambda x: f"{x:.2f}" if pd.notna(x) else "0"
+        )
+        st.table(style_dataframe_for_dark_theme(summary_table))
+
+
+# ==================== DASHBOARD: График движения рабочей силы + СКУД стройка (объединённый) ====================
+def dashboard_workforce_and_skud(df):
+    """
+    Объединённый отчёт: «График движения рабочей силы» и «СКУД стройка» в двух вкладках.
+    """
+    st.header("👥 График движения рабочей силы / СКУД стройка")
+    tab1, tab2 = st.tabs(["График движения рабочей силы", "СКУД стройка"])
+    with tab1:
+        dashboard_workforce_movement(df)
+    with tab2:
+        dashboard_skud_stroyka(df)
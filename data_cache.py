@@ -0,0 +1,129 @@
+"""
+Процессный (общий для всех сессий Streamlit) LRU-кэш с ограничением по объёму в байтах.
+Используется для хранения уже нормализованных DataFrame, чтобы одинаковые файлы не парсились повторно.
+"""
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import pandas as pd
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 содержимого файла (hex)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+# Сколько строк DataFrame хешировать для отпечатка (равномерная выборка)
+FINGERPRINT_SAMPLE_ROWS = 1000
+
+
+def frame_fingerprint(df: pd.DataFrame, sample_rows: Optional[int] = FINGERPRINT_SAMPLE_ROWS) -> str:
+    """
+    Отпечаток набора данных для ключей кэшей: content_hash из df.attrs (если файл
+    загружен через data_loader), форма, колонки и хеш равномерной выборки строк.
+    Выборка отличает отфильтрованные копии, которым attrs достаются от исходного DataFrame.
+    sample_rows=None — хешируются все строки (для небольших агрегатов, где важна каждая строка).
+    """
+    h = hashlib.sha256()
+    h.update(str(df.attrs.get("content_hash", "")).encode("utf-8"))
+    h.update(repr((df.shape, [str(c) for c in df.columns])).encode("utf-8"))
+    step = 1 if sample_rows is None else max(1, len(df) // sample_rows)
+    rows = df.iloc[::step]
+    try:
+        sample = pd.util.hash_pandas_object(rows, index=True)
+    except TypeError:
+        # Нехешируемые значения (списки, словари) — хешируется их текстовое представление
+        sample = pd.util.hash_pandas_object(rows.astype(str), index=True)
+    h.update(sample.to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def estimate_nbytes(value: Any) -> int:
+    """Оценка объёма значения в памяти: для DataFrame/Series — с учётом строк (deep=True), контейнеры — по элементам."""
+    if isinstance(value, pd.DataFrame):
+        try:
+            return int(value.memory_usage(index=True, deep=True).sum())
+        except Exception:
+            return int(value.size * 8)
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class ByteLRUCache:
+    """
+    Потокобезопасный LRU-кэш: вытесняет самые давно использованные записи,
+    пока суммарный объём превышает max_bytes или число записей превышает max_entries.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int = 64):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._total = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Возвращает значение по ключу (и помечает его как недавно использованное) или None."""
+        with self._lock:
+            if key not in self._items:
+                self._misses += 1
+                return None
+            self._items.move_to_end(key)
+            self._hits += 1
+            return self._items[key]
+
+    def put(self, key: Hashable, value: Any, nbytes: Optional[int] = None) -> None:
+        """Кладёт значение в кэш. Значение больше max_bytes не кэшируется."""
+        size = estimate_nbytes(value) if nbytes is None else nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._total -= self._sizes.pop(key)
+                del self._items[key]
+            self._items[key] = value
+            self._sizes[key] = size
+            self._total += size
+            while self._items and (
+                self._total > self.max_bytes or len(self._items) > self.max_entries
+            ):
+                old_key, _ = self._items.popitem(last=False)
+                self._total -= self._sizes.pop(old_key)
+
+    def pop(self, key: Hashable) -> None:
+        """Удаляет запись, если она есть."""
+        with self._lock:
+            if key in self._items:
+                del self._items[key]
+                self._total -= self._sizes.pop(key)
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self._total = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика: число записей, занятый объём, попадания и промахи."""
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
@@ -2,11 +2,102 @@
 Загрузка данных из CSV/Excel и обновление session state.
 Вся логика «прочитать файл и положить в сессию» — только здесь.
 """
+import codecs
 import csv
-from typing import Optional
+import io
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import streamlit as st
+from pandas.api.types import union_categoricals
+
+from config import (
+    CHUNKED_INGEST_MIN_BYTES,
+    CHUNKED_INGEST_ROWS,
+    PARALLEL_LOAD_WORKERS,
+    PARSED_DATA_CACHE_MAX_BYTES,
+    PARSED_DATA_CACHE_MAX_ENTRIES,
+)
+from data_cache import ByteLRUCache, content_hash, estimate_nbytes
+from data_snapshot import load_snapshot, save_snapshot
+from schema import resolve_schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+# Copy-on-Write (в pandas >= 3 включён всегда): сессии получают поверхностные копии общего
+# кэша, а колонки-алиасы делят буфер с каноническими
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# Версия конвейера нормализации: увеличивать при любом изменении результата load_data,
+# чтобы кэш не отдавал DataFrame, собранный старой логикой.
+LOADER_VERSION = 7
+
+# Колонка дат -> префикс колонок периодов (plan end -> plan_*, base end -> base_* и actual_*)
+PERIOD_SOURCES = (
+    ("plan start", "plan_start"),
+    ("plan end", "plan"),
+    ("base start", "base_start"),
+    ("base end", "base"),
+)
+PERIOD_FREQS = (("month", "M"), ("quarter", "Q"), ("year", "Y"))
+
+# Форматы дат, из которых по выборке выбирается основной формат колонки (день первым)
+DATE_FORMATS = (
+    "%d.%m.%Y",
+    "%d.%m.%Y %H:%M:%S",
+    "%d.%m.%Y %H:%M",
+    "%d.%m.%y",
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%d/%m/%Y",
+    "%d-%m-%Y",
+)
+# Сколько различных значений колонки смотреть при выборе формата
+DATE_SAMPLE_SIZE = 200
+
+# Ключи df.attrs: пары (исходная колонка, каноническая) из _apply_dtype_plan
+# и раскладка колонок снимка (см. _split_aliases)
+ALIASES_ATTR = "column_aliases"
+LAYOUT_ATTR = "column_layout"
+
+# Типы данных в сессии: для каждого — ключ st.session_state[f"{тип}_data"]
+DATA_TYPES = ("project", "resources", "technique")
+
+# Текстовые колонки с малым числом различных значений — храним как category
+CATEGORY_COLUMNS = (
+    "project name",
+    "Проект",
+    "task name",
+    "Задача",
+    "abbreviation",
+    "Аббревиатура",
+    "block",
+    "Блок",
+    "section",
+    "Раздел",
+    "reason of deviation",
+    "Причина отклонений",
+    "Контрагент",
+    "Подразделение",
+)
+# Доля различных значений, выше которой колонка остаётся текстовой
+CATEGORY_MAX_RATIO = 0.5
+
+# Общий для всех сессий кэш нормализованных DataFrame: (sha256 файла, расширение, версия) -> DataFrame
+_parsed_cache = ByteLRUCache(
+    max_bytes=PARSED_DATA_CACHE_MAX_BYTES,
+    max_entries=PARSED_DATA_CACHE_MAX_ENTRIES,
+)
 
 
 def detect_data_type(df: pd.DataFrame, file_name: Optional[str] = None) -> str:
@@ -54,258 +145,677 @@ def detect_data_type(df: pd.DataFrame, file_name: Optional[str] = None) -> str:
     return "project"
 
 
-def load_data(uploaded_file, file_name: Optional[str] = None) -> Optional[pd.DataFrame]:
+def _read_uploaded_bytes(uploaded_file) -> bytes:
+    """Возвращает содержимое загруженного файла (UploadedFile Streamlit или файловый объект)."""
+    if hasattr(uploaded_file, "getvalue"):
+        return uploaded_file.getvalue()
+    uploaded_file.seek(0)
+    return uploaded_file.read()
+
+
+# Сколько байт из начала файла читать для определения кодировки/разделителя
+SNIFF_BYTES = 64 * 1024
+_SNIFF_DELIMITERS = (";", ",", "\t")
+_DECIMAL_COMMA_RE = re.compile(r"^-?\d+,\d+$")
+_DECIMAL_DOT_RE = re.compile(r"^-?\d+\.\d+$")
+
+
+def _sniff_csv(data: bytes) -> Tuple[str, str, str]:
     """
-    Загрузка данных из загруженного файла (CSV/Excel).
-    Возвращает DataFrame с attrs: data_type, file_name; при ошибке — None.
+    Определяет (кодировку, разделитель, десятичный знак) CSV по первым SNIFF_BYTES байтам,
+    чтобы разбирать файл одним вызовом read_csv вместо перебора вариантов.
     """
+    sample = data[:SNIFF_BYTES]
+    if sample.startswith(codecs.BOM_UTF8):
+        encoding = "utf-8-sig"
+        sample = sample[len(codecs.BOM_UTF8):]
+    else:
+        encoding = "utf-8"
     try:
-        original_name = file_name if file_name else uploaded_file.name
-        if uploaded_file.name.endswith(".csv"):
-            encodings = ["utf-8", "utf-8-sig", "windows-1251", "cp1251"]
-            df = None
-            for encoding in encodings:
-                try:
-                    uploaded_file.seek(0)
-                    df = pd.read_csv(
-                        uploaded_file,
-                        sep=";",
-                        encoding=encoding,
-                        quoting=csv.QUOTE_MINIMAL,
-                        quotechar='"',
-                        doublequote=True,
-                        decimal=",",  # европейский формат: 84615,38462
-                    )
-                    break
-                except (UnicodeDecodeError, pd.errors.ParserError):
-                    try:
-                        uploaded_file.seek(0)
-                        df = pd.read_csv(
-                            uploaded_file,
-                            sep=",",
-                            encoding=encoding,
-                            quoting=csv.QUOTE_MINIMAL,
-                            quotechar='"',
-                            doublequote=True,
-                            decimal=",",
-                        )
-                        break
-                    except (UnicodeDecodeError, pd.errors.ParserError):
-                        continue
-            if df is None:
-                uploaded_file.seek(0)
-                try:
-                    df = pd.read_csv(uploaded_file, encoding="utf-8")
-                except Exception:
-                    uploaded_file.seek(0)
-                    df = pd.read_csv(uploaded_file)
-        elif uploaded_file.name.endswith((".xlsx", ".xls")):
-            df = pd.read_excel(uploaded_file)
-        else:
-            st.error("Неподдерживаемый формат файла. Загрузите CSV или Excel файл.")
-            return None
+        # final=False: обрезанный на границе выборки многобайтовый символ не считается ошибкой
+        text = codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+    except UnicodeDecodeError:
+        encoding = "cp1251"
+        text = sample.decode("cp1251")
+
+    lines = text.splitlines()
+    if len(data) > SNIFF_BYTES and len(lines) > 1:
+        lines = lines[:-1]  # последняя строка выборки может быть неполной
+    lines = [line for line in lines[:50] if line.strip()]
+
+    # Разделитель: максимум колонок при одинаковом числе полей в строках; при равенстве — «;»
+    sep, best_width = ";", 1
+    for candidate in _SNIFF_DELIMITERS:
+        try:
+            widths = {len(row) for row in csv.reader(lines, delimiter=candidate, quotechar='"')}
+        except csv.Error:
+            continue
+        width = max(widths) if widths else 0
+        if len(widths) == 1 and width > best_width:
+            sep, best_width = candidate, width
+
+    # Десятичный знак: «,» (европейский формат 84615,38462), если не видно чисел с точкой
+    decimal = ","
+    if sep == ",":
+        decimal = "."
+    else:
+        comma = dot = 0
+        for row in csv.reader(lines[1:], delimiter=sep, quotechar='"'):
+            for value in row:
+                value = value.strip()
+                if _DECIMAL_COMMA_RE.match(value):
+                    comma += 1
+                elif _DECIMAL_DOT_RE.match(value):
+                    dot += 1
+        if dot > comma:
+            decimal = "."
+    return encoding, sep, decimal
+
+
+def _read_csv(data: bytes, consume: Callable, chunksize: Optional[int] = None):
+    """
+    Чтение CSV с параметрами из _sniff_csv и запасными вариантами разбора:
+    UnicodeDecodeError -> Windows-1251, ParserError -> параметры read_csv по умолчанию.
+    consume(результат read_csv, буфер) вызывается заново при каждой попытке, поэтому
+    ошибка посреди потокового чтения (chunksize) приводит к повторному чтению с начала.
+    """
+    encoding, sep, decimal = _sniff_csv(data)
+    read_kwargs = dict(
+        sep=sep,
+        quoting=csv.QUOTE_MINIMAL,
+        quotechar='"',
+        doublequote=True,
+        decimal=decimal,
+    )
+
+    def attempt(encoding: str, **kwargs):
+        buffer = io.BytesIO(data)
+        result = pd.read_csv(buffer, encoding=encoding, chunksize=chunksize, **kwargs)
+        if chunksize is None:
+            return consume(result, buffer)
+        with result:
+            return consume(result, buffer)
+
+    try:
+        return attempt(encoding, **read_kwargs)
+    except UnicodeDecodeError:
+        # Не-UTF-8 байты встретились дальше выборки — файл в Windows-1251
+        return attempt("cp1251", **read_kwargs)
+    except pd.errors.ParserError:
+        return attempt(encoding)
+
+
+def _parse_file(data: bytes, name: str) -> pd.DataFrame:
+    """Разбор байтов CSV/Excel в «сырой» DataFrame (без нормализации колонок)."""
+    if not name.endswith(".csv"):
+        return pd.read_excel(io.BytesIO(data))
+    return _read_csv(data, lambda frame, _buffer: frame)
+
+
+def _clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
+    """Нормализация названий колонок (BOM, переносы, пробелы)."""
+    df.columns = [
+        str(col).replace("\ufeff", "").replace("\n", " ").replace("\r", " ").strip()
+        for col in df.columns
+    ]
+    return df
+
+
+def _normalize_frame(df: pd.DataFrame, keep_empty_periods: bool = False) -> pd.DataFrame:
+    """Алиасы колонок, типизация дат и периоды для группировки. Возвращает нормализованный df."""
+    # Маппинг по sample_project_data_fixed.csv (разделитель ;, кодировка UTF-8).
+    # Колонки в файле: №, Проект, Аббревиатура, Блок, Раздел, Задача, Старт План, Конец План,
+    # Старт Факт, Конец Факт, Отклонение, Отклонений в днях, Причина отклонений, Бюджет План,
+    # Бюджет Факт, Резерв, РД по Договору, Отклонение разделов РД, Всего загружено, На согласовании,
+    # Выдана подрядчику, Выдано в производство работ, На доработке
+    column_mapping = {
+        "Проект": "project name",
+        "Аббревиатура": "abbreviation",
+        "Блок": "block",
+        "Раздел": "section",
+        "Задача": "task name",
+        "Старт Факт": "base start",
+        "Конец Факт": "base end",
+        "Старт План": "plan start",
+        "Конец План": "plan end",
+        "Отклонение": "deviation",
+        "Отклонений в днях": "deviation in days",
+        "Причина отклонений": "reason of deviation",
+        "Бюджет План": "budget plan",
+        "Бюджет Факт": "budget fact",
+        "Бюджет план": "budget plan",
+        "Бюджет факт": "budget fact",
+        "Резерв": "reserve",
+        "Резерв бюджета": "reserve budget",
+    }
+    # Пары (исходная колонка, каноническая): после типизации исходная получает те же значения
+    aliases = []
+    for russian_name, english_name in column_mapping.items():
+        if russian_name in df.columns and english_name not in df.columns:
+            df[english_name] = df[russian_name]
+            aliases.append((russian_name, english_name))
+    # Нормализация колонок РД: приводим к виду из sample_project_data_fixed.csv (регистр РД/Договору)
+    rd_columns_normalize = {
+        "РД по договору": "РД по Договору",
+        "рд по договору": "РД по Договору",
+        "Отклонение разделов рд": "Отклонение разделов РД",
+    }
+    for alt_name, canonical in rd_columns_normalize.items():
+        if alt_name in df.columns and canonical not in df.columns:
+            df[canonical] = df[alt_name]
+            aliases.append((alt_name, canonical))
+    # Дополнительно: варианты названий бюджета (регистр, пробелы)
+    budget_plan_aliases = ("Бюджет План", "Бюджет план", "Budget Plan", "budget_plan")
+    budget_fact_aliases = ("Бюджет Факт", "Бюджет факт", "Budget Fact", "budget_fact")
+    for col in list(df.columns):
+        c = str(col).strip()
+        if "budget plan" not in df.columns and c in budget_plan_aliases:
+            df["budget plan"] = df[col]
+            aliases.append((col, "budget plan"))
+        if "budget fact" not in df.columns and c in budget_fact_aliases:
+            df["budget fact"] = df[col]
+            aliases.append((col, "budget fact"))
+
+    # Даты
+    date_columns = ["base start", "base end", "plan start", "plan end"]
+    for col in date_columns:
+        if col in df.columns:
+            df[col] = _parse_date_column(df[col])
+
+    df = _derive_period_columns(df, keep_empty=keep_empty_periods)
+    return _apply_dtype_plan(df, aliases)
+
+
+def _infer_date_format(values: pd.Series) -> Optional[str]:
+    """Формат из DATE_FORMATS, под который подходит большинство значений выборки (None — ни один)."""
+    sample = values.head(DATE_SAMPLE_SIZE)
+    best_format, best_count = None, 0
+    for fmt in DATE_FORMATS:
+        count = int(pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum())
+        if count > best_count:
+            best_format, best_count = fmt, count
+            if count == len(sample):
+                break
+    return best_format
+
+
+def _parse_date_column(series: pd.Series) -> pd.Series:
+    """
+    Разбор колонки дат: основной формат определяется по выборке и разбирается
+    фиксированным форматом (быстро), медленный смешанный разбор (format="mixed")
+    — только для строк, не подошедших под него. Результат — datetime64,
+    повторный to_datetime в дашбордах для такой колонки ничего не делает.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+        # Числа / смешанные типы из Excel — как раньше
+        return pd.to_datetime(series, errors="coerce", dayfirst=True)
+
+    text = series.astype(str).str.strip()
+    present = series.notna() & (text != "")
+    text = text.where(present)
+    fmt = _infer_date_format(text[present].drop_duplicates())
+    if fmt is None:
+        return pd.to_datetime(text, errors="coerce", dayfirst=True, format="mixed")
+    parsed = pd.to_datetime(text, format=fmt, errors="coerce")
+    stragglers = present & parsed.isna()
+    if stragglers.any():
+        parsed.loc[stragglers] = pd.to_datetime(
+            text[stragglers], errors="coerce", dayfirst=True, format="mixed"
+        )
+    return parsed
+
+
+def _apply_dtype_plan(df: pd.DataFrame, aliases: List[Tuple[str, str]]) -> pd.DataFrame:
+    """
+    План типов при загрузке: сужение типов (_narrow_dtypes), затем исходные колонки-алиасы
+    («Старт План», «Проект», ...) получают уже типизированные значения канонических
+    (datetime вместо строк дат, category с общим словарём вместо повторяющегося текста).
+    Под Copy-on-Write алиас и каноническая колонка делят один буфер; пары сохраняются
+    в df.attrs[ALIASES_ATTR], чтобы снимки и потоковая загрузка хранили колонку один раз.
+    """
+    df = _narrow_dtypes(df, skip={source for source, _ in aliases})
+    for source, canonical in aliases:
+        df[source] = df[canonical]
+    df.attrs[ALIASES_ATTR] = [[source, canonical] for source, canonical in aliases]
+    return df
+
+
+def _split_aliases(df: pd.DataFrame) -> Tuple[pd.DataFrame, dict]:
+    """
+    DataFrame без колонок-алиасов (для снимка и частей потоковой загрузки)
+    и раскладка {"aliases": пары, "columns": порядок колонок} для _join_aliases.
+    """
+    aliases = df.attrs.get(ALIASES_ATTR) or []
+    layout = {"aliases": aliases, "columns": [str(col) for col in df.columns]}
+    return df.drop(columns=[source for source, _ in aliases]), layout
+
+
+def _join_aliases(df: pd.DataFrame, layout: Optional[dict]) -> pd.DataFrame:
+    """Восстанавливает колонки-алиасы по раскладке _split_aliases (без копирования данных)."""
+    if not layout or not layout.get("aliases"):
+        return df
+    for source, canonical in layout["aliases"]:
+        df[source] = df[canonical]
+    return df[layout["columns"]]
+
+
+def _derive_period_columns(df: pd.DataFrame, keep_empty: bool = False) -> pd.DataFrame:
+    """
+    Периоды для группировки: {prefix}_day/_month/_quarter/_year по каждой колонке дат.
+    Один проход на колонку без масок: NaT даёт NaT-период. Периоды хранятся как PeriodDtype
+    (внутри — целочисленные ординалы int64), actual_* — те же массивы, что и base_*.
+    Все новые колонки добавляются одним concat, без поколоночных вставок.
+    keep_empty=True создаёт колонки и для полностью пустых дат (нужно для частей при потоковой загрузке).
+    """
+    new_columns = {}
+    for date_col, prefix in PERIOD_SOURCES:
+        if date_col not in df.columns:
+            continue
+        dates = df[date_col]
+        if not keep_empty and not dates.notna().any():
+            continue
+        new_columns[f"{prefix}_day"] = dates.dt.date
+        for suffix, freq in PERIOD_FREQS:
+            new_columns[f"{prefix}_{suffix}"] = dates.dt.to_period(freq)
+    if "base_month" in new_columns:
+        for suffix, _ in PERIOD_FREQS:
+            new_columns[f"actual_{suffix}"] = new_columns[f"base_{suffix}"]
+    if not new_columns:
+        return df
+    existing = [col for col in new_columns if col in df.columns]
+    if existing:
+        df = df.drop(columns=existing)
+    return pd.concat([df, pd.DataFrame(new_columns, index=df.index)], axis=1)
+
+
+def _is_text(series: pd.Series) -> bool:
+    return series.dtype == object or isinstance(series.dtype, pd.StringDtype)
+
+
+def _narrow_dtypes(df: pd.DataFrame, skip: Optional[set] = None) -> pd.DataFrame:
+    """
+    Сужение типов: повторяющийся текст из CATEGORY_COLUMNS -> category,
+    целые -> int32 (меньше не берём, чтобы арифметика в дашбордах не переполнялась),
+    дробные -> float32, только если значения представимы без потерь.
+    Колонки из skip не трогаются (алиасы, которые всё равно получат значения канонических).
+    """
+    for col in df.columns:
+        if skip and col in skip:
+            continue
+        series = df[col]
+        if col in CATEGORY_COLUMNS and _is_text(series):
+            if series.nunique(dropna=True) <= max(1, len(series) * CATEGORY_MAX_RATIO):
+                df[col] = series.astype("category")
+        elif pd.api.types.is_integer_dtype(series) and series.dtype.itemsize > 4:
+            if series.empty or (
+                series.min() >= np.iinfo(np.int32).min and series.max() <= np.iinfo(np.int32).max
+            ):
+                df[col] = series.astype(np.int32)
+        elif pd.api.types.is_float_dtype(series) and series.dtype.itemsize > 4:
+            narrowed = series.astype(np.float32)
+            if np.array_equal(
+                narrowed.to_numpy(dtype=np.float64), series.to_numpy(dtype=np.float64), equal_nan=True
+            ):
+                df[col] = narrowed
+    return df
 
-        # Нормализация названий колонок (BOM, переносы, пробелы)
-        df.columns = [
-            str(col).replace("\ufeff", "").replace("\n", " ").replace("\r", " ").strip()
-            for col in df.columns
-        ]
+
+def _concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Склейка DataFrame с общими категориями: если колонка категориальная хотя бы в одном из них,
+    во всех она приводится к объединённому набору категорий (иначе concat даст object).
+    Исходные DataFrame не изменяются.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    categorical = {
+        col
+        for frame in frames
+        for col in frame.columns
+        if isinstance(frame[col].dtype, pd.CategoricalDtype)
+    }
+    if categorical:
+        frames = [frame.copy(deep=False) for frame in frames]
+        for col in categorical:
+            holders = [frame for frame in frames if col in frame.columns]
+            parts = [frame[col].astype("category") for frame in holders]
+            categories = union_categoricals(parts, ignore_order=True).categories.sort_values()
+            for frame, part in zip(holders, parts):
+                frame[col] = part.cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _unify_arrow_parts(tables: list) -> list:
+    """
+    Приводит части к общим типам перед склейкой: колонка, категориальная хотя бы в одной
+    части, кодируется словарём во всех (иначе склейка дала бы текст).
+    Остальные расхождения (int32/int64, float32/float64, пустые колонки) снимает
+    concat_tables(promote_options="permissive").
+    """
+    encoded = {
+        field.name
+        for table in tables
+        for field in table.schema
+        if pa.types.is_dictionary(field.type)
+    }
+    unified = []
+    for table in tables:
+        for name in encoded:
+            index = table.schema.get_field_index(name)
+            if index >= 0 and not pa.types.is_dictionary(table.schema.field(index).type):
+                column = pc.dictionary_encode(table.column(index))
+                table = table.set_column(index, name, column)
+        unified.append(table)
+    return unified
+
+
+def _ingest_csv_chunked(
+    data: bytes, on_progress: Optional[Callable[[float], None]] = None
+) -> pd.DataFrame:
+    """
+    Потоковая загрузка большого CSV: части по CHUNKED_INGEST_ROWS строк разбираются,
+    нормализуются и сужаются по типам сразу после чтения, поэтому в памяти одновременно
+    находится только одна «сырая» часть. on_progress получает долю прочитанных байт (0..1).
+    Нормализованные части (без колонок-алиасов) хранятся таблицами Arrow: их склейка
+    не копирует данные, а перевод в pandas с self_destruct освобождает буферы Arrow по мере
+    заполнения колонок, так что пик памяти — итоговый DataFrame и одна часть.
+    Без pyarrow части склеиваются _concat_frames.
+    """
+
+    def consume(reader, buffer: io.BytesIO) -> Tuple[list, Optional[dict]]:
+        parts, layout = [], None
+        for chunk in reader:
+            part = _normalize_frame(_clean_column_names(chunk), keep_empty_periods=True)
+            part, layout = _split_aliases(part)
+            if pa is not None:
+                part = pa.Table.from_pandas(part, preserve_index=False)
+            parts.append(part)
+            if on_progress is not None:
+                on_progress(min(buffer.tell() / max(len(data), 1), 1.0))
+        return parts, layout
+
+    parts, layout = _read_csv(data, consume, chunksize=CHUNKED_INGEST_ROWS)
+    if not parts:
+        return pd.DataFrame()
+    if pa is None:
+        df = _concat_frames(parts)
+    else:
+        table = pa.concat_tables(_unify_arrow_parts(parts), promote_options="permissive")
+        del parts
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+        del table
+    # Категории — в том же порядке, что даёт astype("category") при обычной загрузке
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            categories = df[col].cat.categories
+            if not categories.is_monotonic_increasing:
+                df[col] = df[col].cat.reorder_categories(categories.sort_values())
+    df = _join_aliases(df, layout)
+    df.attrs = {ALIASES_ATTR: layout["aliases"]}
+    return df
+
+
+class _EmptyFileError(ValueError):
+    """Файл разобран, но не содержит строк или колонок."""
+
+
+def _is_supported_file(name: str) -> bool:
+    return name.endswith((".csv", ".xlsx", ".xls"))
+
+
+def _load_bytes(
+    data: bytes,
+    name: str,
+    original_name: str,
+    on_progress: Optional[Callable[[float], None]] = None,
+) -> pd.DataFrame:
+    """
+    Разбор и нормализация содержимого файла без обращений к Streamlit
+    (можно вызывать из рабочих потоков). Ошибки пробрасываются вызывающему.
+    """
+    digest = content_hash(data)
+    extension = os.path.splitext(name)[1]
+    cache_key = (digest, extension, LOADER_VERSION)
+    snapshot_key = f"{digest}_{extension.lstrip('.')}_v{LOADER_VERSION}"
+    cached = _parsed_cache.get(cache_key)
+    if cached is None:
+        # Второй уровень: колоночный снимок на диске (переживает перезапуск процесса)
+        cached = load_snapshot(snapshot_key)
+        if cached is not None:
+            nbytes = estimate_nbytes(cached)
+            cached = _join_aliases(cached, cached.attrs.get(LAYOUT_ATTR))
+            cached.attrs = {}
+            _parsed_cache.put(cache_key, cached, nbytes=nbytes)
+    if cached is not None:
+        # Поверхностная копия: дашборды дописывают колонки в df, а изменение данных
+        # под Copy-on-Write копирует только затронутую колонку, не трогая общий экземпляр
+        df = cached.copy(deep=False)
+    else:
+        chunked = extension == ".csv" and len(data) >= CHUNKED_INGEST_MIN_BYTES
+        if chunked:
+            df = _ingest_csv_chunked(data, on_progress=on_progress)
+        else:
+            df = _clean_column_names(_parse_file(data, name))
 
         # Валидация: пустой файл или нет колонок
         if df.empty or len(df.columns) == 0:
-            st.warning(
+            raise _EmptyFileError(
                 f"Файл '{original_name}' пуст или не содержит колонок. "
                 "Проверьте кодировку (UTF-8 или Windows-1251) и разделитель (; или ,)."
             )
+
+        if not chunked:
+            df = _normalize_frame(df)
+        # Алиасы делят буферы с каноническими колонками: в кэше и снимке они не учитываются
+        stored, layout = _split_aliases(df)
+        df.attrs = {}
+        _parsed_cache.put(cache_key, df, nbytes=estimate_nbytes(stored))
+        save_snapshot(
+            snapshot_key,
+            stored,
+            attrs={
+                "data_type": detect_data_type(df, original_name),
+                "file_name": original_name,
+                "content_hash": digest,
+                "loader_version": LOADER_VERSION,
+                LAYOUT_ATTR: layout,
+            },
+        )
+        df = df.copy(deep=False)
+
+    data_type = detect_data_type(df, original_name)
+    df.attrs["data_type"] = data_type
+    df.attrs["file_name"] = original_name
+    df.attrs["content_hash"] = digest
+    # Сопоставление канонических полей с колонками — один раз, дальше дашборды берут его из attrs
+    resolve_schema(df)
+    return df
+
+
+def load_data(uploaded_file, file_name: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    Загрузка данных из загруженного файла (CSV/Excel).
+    Возвращает DataFrame с attrs: data_type, file_name, content_hash, schema; при ошибке — None.
+    Результат нормализации кэшируется на уровне процесса по хэшу содержимого файла
+    и сохраняется колоночным снимком на диск (data_snapshot), поэтому повторная загрузка
+    того же файла (в любой сессии и после перезапуска) не разбирает его заново.
+    """
+    try:
+        original_name = file_name if file_name else uploaded_file.name
+        if not _is_supported_file(uploaded_file.name):
+            st.error("Неподдерживаемый формат файла. Загрузите CSV или Excel файл.")
             return None
 
-        # Маппинг по sample_project_data_fixed.csv (разделитель ;, кодировка UTF-8).
-        # Колонки в файле: №, Проект, Аббревиатура, Блок, Раздел, Задача, Старт План, Конец План,
-        # Старт Факт, Конец Факт, Отклонение, Отклонений в днях, Причина отклонений, Бюджет План,
-        # Бюджет Факт, Резерв, РД по Договору, Отклонение разделов РД, Всего загружено, На согласовании,
-        # Выдана подрядчику, Выдано в производство работ, На доработке
-        column_mapping = {
-            "Проект": "project name",
-            "Аббревиатура": "abbreviation",
-            "Блок": "block",
-            "Раздел": "section",
-            "Задача": "task name",
-            "Старт Факт": "base start",
-            "Конец Факт": "base end",
-            "Старт План": "plan start",
-            "Конец План": "plan end",
-            "Отклонение": "deviation",
-            "Отклонений в днях": "deviation in days",
-            "Причина отклонений": "reason of deviation",
-            "Бюджет План": "budget plan",
-            "Бюджет Факт": "budget fact",
-            "Бюджет план": "budget plan",
-            "Бюджет факт": "budget fact",
-            "Резерв": "reserve",
-            "Резерв бюджета": "reserve budget",
-        }
-        for russian_name, english_name in column_mapping.items():
-            if russian_name in df.columns and english_name not in df.columns:
-                df[english_name] = df[russian_name]
-        # Нормализация колонок РД: приводим к виду из sample_project_data_fixed.csv (регистр РД/Договору)
-        rd_columns_normalize = {
-            "РД по договору": "РД по Договору",
-            "рд по договору": "РД по Договору",
-            "Отклонение разделов рд": "Отклонение разделов РД",
-        }
-        for alt_name, canonical in rd_columns_normalize.items():
-            if alt_name in df.columns and canonical not in df.columns:
-                df[canonical] = df[alt_name]
-        # Дополнительно: варианты названий бюджета (регистр, пробелы)
-        budget_plan_aliases = ("Бюджет План", "Бюджет план", "Budget Plan", "budget_plan")
-        budget_fact_aliases = ("Бюджет Факт", "Бюджет факт", "Budget Fact", "budget_fact")
-        for col in list(df.columns):
-            c = str(col).strip()
-            if "budget plan" not in df.columns and c in budget_plan_aliases:
-                df["budget plan"] = df[col].copy()
-            if "budget fact" not in df.columns and c in budget_fact_aliases:
-                df["budget fact"] = df[col].copy()
-
-        # Даты
-        date_columns = ["base start", "base end", "plan start", "plan end"]
-        for col in date_columns:
-            if col in df.columns:
-                if df[col].dtype == "object":
-                    df[col] = pd.to_datetime(
-                        df[col], errors="coerce", dayfirst=True, format="mixed"
+        data = _read_uploaded_bytes(uploaded_file)
+        progress = None
+        if uploaded_file.name.endswith(".csv") and len(data) >= CHUNKED_INGEST_MIN_BYTES:
+            progress = st.progress(0.0, text=f"Загрузка файла '{original_name}'...")
+        try:
+            return _load_bytes(
+                data,
+                uploaded_file.name,
+                original_name,
+                on_progress=(
+                    lambda share: progress.progress(
+                        share, text=f"Загрузка файла '{original_name}': {share:.0%}"
                     )
-                else:
-                    df[col] = pd.to_datetime(df[col], errors="coerce", dayfirst=True)
-
-        # Периоды для группировки
-        for date_col, prefix in [
-            ("plan start", "plan_start"),
-            ("plan end", "plan"),
-            ("base start", "base_start"),
-            ("base end", "base"),
-        ]:
-            if date_col in df.columns:
-                mask = df[date_col].notna()
-                if mask.any():
-                    df.loc[mask, f"{prefix}_day"] = df.loc[mask, date_col].dt.date
-                    df.loc[mask, f"{prefix}_month"] = df.loc[
-                        mask, date_col
-                    ].dt.to_period("M")
-                    df.loc[mask, f"{prefix}_quarter"] = df.loc[
-                        mask, date_col
-                    ].dt.to_period("Q")
-                    df.loc[mask, f"{prefix}_year"] = df.loc[
-                        mask, date_col
-                    ].dt.to_period("Y")
-
-        if "plan end" in df.columns:
-            mask = df["plan end"].notna()
-            if mask.any():
-                df.loc[mask, "plan_month"] = df.loc[mask, "plan end"].dt.to_period("M")
-                df.loc[mask, "plan_quarter"] = df.loc[mask, "plan end"].dt.to_period("Q")
-                df.loc[mask, "plan_year"] = df.loc[mask, "plan end"].dt.to_period("Y")
-
-        if "base end" in df.columns:
-            mask = df["base end"].notna()
-            if mask.any():
-                df.loc[mask, "actual_month"] = df.loc[mask, "base end"].dt.to_period(
-                    "M"
-                )
-                df.loc[mask, "actual_quarter"] = df.loc[mask, "base end"].dt.to_period(
-                    "Q"
                 )
-                df.loc[mask, "actual_year"] = df.loc[mask, "base end"].dt.to_period("Y")
-
-        data_type = detect_data_type(df, original_name)
-        df.attrs["data_type"] = data_type
-        df.attrs["file_name"] = original_name
-        return df
+                if progress is not None
+                else None,
+            )
+        finally:
+            if progress is not None:
+                progress.empty()
+    except _EmptyFileError as e:
+        st.warning(str(e))
+        return None
     except Exception as e:
         st.error(f"Ошибка загрузки файла: {str(e)}")
         return None
 
 
+def load_files(uploaded_files: list) -> List[Tuple[str, pd.DataFrame]]:
+    """
+    Загрузка нескольких файлов: разбор идёт параллельно в пуле потоков
+    (read_csv/read_excel большую часть времени работают без GIL), результаты
+    возвращаются списком (file_id, DataFrame) в порядке исходного списка.
+    Сообщения об ошибках выводятся в основном потоке, тоже в исходном порядке.
+    """
+    if len(uploaded_files) <= 1:
+        loaded = []
+        for uploaded_file in uploaded_files:
+            df = load_data(uploaded_file, uploaded_file.name)
+            if df is not None:
+                loaded.append((uploaded_file.name, df))
+        return loaded
+
+    jobs = []
+    for uploaded_file in uploaded_files:
+        if not _is_supported_file(uploaded_file.name):
+            st.error(
+                f"Неподдерживаемый формат файла '{uploaded_file.name}'. Загрузите CSV или Excel файл."
+            )
+            continue
+        jobs.append((uploaded_file.name, _read_uploaded_bytes(uploaded_file)))
+    if not jobs:
+        return []
+
+    progress = st.progress(0.0, text=f"Загрузка файлов: 0 из {len(jobs)}")
+    try:
+        with ThreadPoolExecutor(max_workers=min(len(jobs), PARALLEL_LOAD_WORKERS)) as pool:
+            futures = [pool.submit(_load_bytes, data, name, name) for name, data in jobs]
+            for done, _ in enumerate(as_completed(futures), start=1):
+                progress.progress(
+                    done / len(futures), text=f"Загрузка файлов: {done} из {len(futures)}"
+                )
+    finally:
+        progress.empty()
+
+    loaded = []
+    for (name, _), future in zip(jobs, futures):
+        try:
+            loaded.append((name, future.result()))
+        except _EmptyFileError as e:
+            st.warning(str(e))
+        except Exception as e:
+            st.error(f"Ошибка загрузки файла '{name}': {str(e)}")
+    return loaded
+
+
+def get_parsed_cache_stats() -> dict:
+    """Статистика общего кэша разобранных файлов (для админки/диагностики)."""
+    return _parsed_cache.stats()
+
+
+def _data_key(data_type: str) -> str:
+    return f"{data_type}_data"
+
+
 def ensure_data_session_state() -> None:
     """Инициализирует ключи данных в st.session_state при отсутствии."""
-    if "project_data" not in st.session_state:
-        st.session_state.project_data = None
-    if "resources_data" not in st.session_state:
-        st.session_state.resources_data = None
-    if "technique_data" not in st.session_state:
-        st.session_state.technique_data = None
+    for data_type in DATA_TYPES:
+        if _data_key(data_type) not in st.session_state:
+            st.session_state[_data_key(data_type)] = None
+    if "data_parts" not in st.session_state:
+        # Тип данных -> {file_id: DataFrame} в порядке загрузки
+        st.session_state.data_parts = {data_type: {} for data_type in DATA_TYPES}
+    if "data_dirty" not in st.session_state:
+        # Типы данных, у которых набор файлов изменился и склейку нужно пересобрать
+        st.session_state.data_dirty = set()
     if "loaded_files_info" not in st.session_state:
         st.session_state.loaded_files_info = {}
     if "previous_uploaded_files" not in st.session_state:
         st.session_state.previous_uploaded_files = []
 
 
+def _mark_dirty(data_type: str) -> None:
+    st.session_state.data_dirty.add(data_type)
+    st.session_state[_data_key(data_type)] = None
+
+
 def update_session_with_loaded_file(df: pd.DataFrame, file_id: str) -> None:
-    """Добавляет загруженный DataFrame в session state по его типу."""
+    """
+    Добавляет загруженный DataFrame в хранилище сессии по его типу.
+    Файлы хранятся по отдельности; общий DataFrame собирается при первом чтении (get_data),
+    поэтому добавление N файлов стоит одну склейку, а не N.
+    """
     data_type = df.attrs.get("data_type", "project")
-    if data_type == "project":
-        if st.session_state.project_data is None:
-            st.session_state.project_data = df
-        else:
-            st.session_state.project_data = pd.concat(
-                [st.session_state.project_data, df], ignore_index=True
-            )
-        st.session_state.loaded_files_info[file_id] = {
-            "type": "project",
-            "rows": len(df),
-            "columns": list(df.columns),
-        }
-    elif data_type == "resources":
-        if st.session_state.resources_data is None:
-            st.session_state.resources_data = df
-        else:
-            st.session_state.resources_data = pd.concat(
-                [st.session_state.resources_data, df], ignore_index=True
-            )
-        st.session_state.loaded_files_info[file_id] = {
-            "type": "resources",
-            "rows": len(df),
-            "columns": list(df.columns),
-        }
-    elif data_type == "technique":
-        if st.session_state.technique_data is None:
-            st.session_state.technique_data = df
-        else:
-            st.session_state.technique_data = pd.concat(
-                [st.session_state.technique_data, df], ignore_index=True
-            )
-        st.session_state.loaded_files_info[file_id] = {
-            "type": "technique",
-            "rows": len(df),
-            "columns": list(df.columns),
-        }
+    if data_type not in DATA_TYPES:
+        return
+    ensure_data_session_state()
+    st.session_state.data_parts[data_type][file_id] = df
+    _mark_dirty(data_type)
+    st.session_state.loaded_files_info[file_id] = {
+        "type": data_type,
+        "rows": len(df),
+        "columns": list(df.columns),
+    }
+
+
+def get_data(data_type: str) -> Optional[pd.DataFrame]:
+    """
+    Общий DataFrame типа data_type (project / resources / technique) из всех загруженных файлов.
+    Склейка выполняется лениво — только если набор файлов этого типа изменился.
+    """
+    ensure_data_session_state()
+    if data_type in st.session_state.data_dirty:
+        parts = st.session_state.data_parts.get(data_type, {})
+        combined = None
+        if parts:
+            combined = _concat_frames(list(parts.values()))
+            if len(parts) > 1:
+                combined.attrs = {
+                    "data_type": data_type,
+                    "file_name": ", ".join(parts.keys()),
+                    "content_hash": content_hash(
+                        "".join(p.attrs.get("content_hash", "") for p in parts.values()).encode()
+                    ),
+                }
+                resolve_schema(combined)
+        st.session_state[_data_key(data_type)] = combined
+        st.session_state.data_dirty.discard(data_type)
+    return st.session_state.get(_data_key(data_type))
 
 
 def remove_file_from_session(file_name: str) -> None:
-    """Удаляет один файл из loaded_files_info и обнуляет соответствующий тип данных."""
+    """Удаляет один файл из сессии; остальные файлы того же типа остаются загруженными."""
     if file_name not in st.session_state.loaded_files_info:
         return
-    file_info = st.session_state.loaded_files_info[file_name]
-    file_type = file_info["type"]
-    if file_type == "project":
-        st.session_state.project_data = None
-    elif file_type == "resources":
-        st.session_state.resources_data = None
-    elif file_type == "technique":
-        st.session_state.technique_data = None
+    file_type = st.session_state.loaded_files_info[file_name]["type"]
+    ensure_data_session_state()
+    st.session_state.data_parts.get(file_type, {}).pop(file_name, None)
+    _mark_dirty(file_type)
     del st.session_state.loaded_files_info[file_name]
 
 
 def clear_all_data_for_removed_files(files_to_remove: list) -> None:
-    """Удаляет из сессии все файлы из списка; при непустом списке сбрасывает все данные и loaded_files_info."""
+    """Удаляет из сессии файлы из списка, не трогая остальные (их не нужно разбирать заново)."""
     for file_name in files_to_remove:
         remove_file_from_session(file_name)
-    if files_to_remove:
-        st.session_state.project_data = None
-        st.session_state.resources_data = None
-        st.session_state.technique_data = None
-        st.session_state.loaded_files_info = {}
 
 
 def get_main_df() -> Optional[pd.DataFrame]:
     """Возвращает основной DataFrame для отчётов (project_data)."""
-    return st.session_state.get("project_data", None)
+    return get_data("project")
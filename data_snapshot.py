@@ -0,0 +1,160 @@
+"""
+Колоночные снимки (Feather / Arrow IPC) нормализованных DataFrame рядом с users.db.
+Позволяют при повторном открытии известного файла не разбирать CSV/Excel заново:
+снимок читается через memory map с сохранёнными типами (даты, периоды) и df.attrs:
+числовые колонки и даты без пропусков не копируются в память процесса, а ссылаются
+на страницы файла (массивы только для чтения).
+Требует pyarrow (есть в requirements.txt); без него снимки отключены.
+"""
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from config import SNAPSHOT_DIR, SNAPSHOT_MAX_BYTES
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+# Ключ метаданных схемы Arrow, в котором хранятся df.attrs
+SNAPSHOT_META_KEY = b"bi_analytics_attrs"
+SNAPSHOT_EXT = ".feather"
+
+_log = logging.getLogger(__name__)
+
+
+def snapshots_available() -> bool:
+    """True, если установлен pyarrow и снимки можно писать/читать."""
+    return feather is not None
+
+
+def _snapshot_path(key: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{key}{SNAPSHOT_EXT}")
+
+
+def has_snapshot(key: str) -> bool:
+    """Есть ли снимок с таким ключом."""
+    return snapshots_available() and os.path.exists(_snapshot_path(key))
+
+
+def save_snapshot(key: str, df: pd.DataFrame, attrs: Optional[Dict] = None) -> bool:
+    """
+    Сохраняет DataFrame как несжатый Feather (для чтения через memory map).
+    attrs — метаданные (data_type, file_name и т.п.), по умолчанию df.attrs.
+    Возвращает True при успехе; ошибки (например, смешанные типы в колонке) только логируются.
+    """
+    if not snapshots_available():
+        return False
+    path = _snapshot_path(key)
+    tmp_path = path + ".tmp"
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[SNAPSHOT_META_KEY] = json.dumps(
+            attrs if attrs is not None else dict(df.attrs), ensure_ascii=False, default=str
+        ).encode("utf-8")
+        table = table.replace_schema_metadata(metadata)
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+    except Exception as e:
+        _log.warning("Не удалось сохранить снимок данных %s: %s", key, e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    try:
+        prune_snapshots()
+    except Exception as e:
+        # Снимок уже сохранён — ошибка вытеснения не должна срывать загрузку данных
+        _log.warning("Не удалось очистить каталог снимков данных: %s", e)
+    return True
+
+
+def load_snapshot(key: str) -> Optional[pd.DataFrame]:
+    """
+    Читает снимок по ключу через memory map без копирования числовых колонок;
+    восстанавливает df.attrs. None — снимка нет или он повреждён.
+    """
+    if not has_snapshot(key):
+        return None
+    path = _snapshot_path(key)
+    try:
+        table = feather.read_table(path, memory_map=True)
+        raw_attrs = (table.schema.metadata or {}).get(SNAPSHOT_META_KEY)
+        # Без консолидации блоков: числовые колонки и даты без пропусков остаются
+        # представлениями страниц memory map (только для чтения), текст материализуется
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+        del table
+        df.attrs = json.loads(raw_attrs.decode("utf-8")) if raw_attrs else {}
+        # Время последнего использования — для вытеснения старых снимков
+        os.utime(path, None)
+        return df
+    except Exception as e:
+        _log.warning("Не удалось прочитать снимок данных %s: %s", key, e)
+        return None
+
+
+def list_snapshots() -> List[Dict]:
+    """Список снимков: ключ, размер, время изменения и сохранённые attrs (читается только схема)."""
+    if not snapshots_available() or not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    result = []
+    for name in os.listdir(SNAPSHOT_DIR):
+        if not name.endswith(SNAPSHOT_EXT):
+            continue
+        path = os.path.join(SNAPSHOT_DIR, name)
+        try:
+            with pa.memory_map(path) as source:
+                schema = pa.ipc.open_file(source).schema
+            raw_attrs = (schema.metadata or {}).get(SNAPSHOT_META_KEY)
+            stat = os.stat(path)
+            result.append(
+                {
+                    "key": name[: -len(SNAPSHOT_EXT)],
+                    "bytes": stat.st_size,
+                    "modified": stat.st_mtime,
+                    "attrs": json.loads(raw_attrs.decode("utf-8")) if raw_attrs else {},
+                }
+            )
+        except Exception as e:
+            _log.warning("Пропущен повреждённый снимок %s: %s", name, e)
+    return result
+
+
+def delete_snapshot(key: str) -> None:
+    """Удаляет снимок, если он есть."""
+    path = _snapshot_path(key)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def prune_snapshots(max_bytes: int = SNAPSHOT_MAX_BYTES) -> None:
+    """Удаляет давно не использованные снимки, пока их суммарный объём больше max_bytes."""
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return
+    files = []
+    for name in os.listdir(SNAPSHOT_DIR):
+        if name.endswith(SNAPSHOT_EXT):
+            path = os.path.join(SNAPSHOT_DIR, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # снимок удалён параллельной очисткой
+            files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            total -= size  # уже удалён параллельной очисткой
+        except OSError as e:
+            _log.warning("Не удалось удалить снимок %s: %s", path, e)
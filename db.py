@@ -1,13 +1,28 @@
 """
 Единая точка входа для подключения к БД и инициализации всех таблиц.
+
+Соединения берутся из пула (connect / get_connection): соединение открывается один раз
+в режиме WAL (читатели не блокируются писателем) с настроенными PRAGMA и кэшем
+подготовленных запросов, а close() возвращает его в пул, а не закрывает. Соединение
+в каждый момент используется одним потоком — тем, который его взял.
 """
+import atexit
+import logging
 import os
 import sqlite3
 import hashlib
-from typing import Optional
+import threading
+from typing import Dict, List, Optional, Set
 from contextlib import contextmanager
 
-from config import DB_PATH
+from config import (
+    DB_BUSY_TIMEOUT_MS,
+    DB_CACHE_SIZE_KB,
+    DB_MMAP_SIZE,
+    DB_PATH,
+    DB_POOL_SIZE,
+    DB_STATEMENT_CACHE,
+)
 
 # Переменные окружения для дефолтного суперадмина (при первом запуске)
 # Не задавайте пароль в коде — только через .env / окружение развёртывания
@@ -19,10 +34,151 @@ def _hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
 
+_log = logging.getLogger(__name__)
+
+
+class PooledConnection(sqlite3.Connection):
+    """Соединение из пула: close() возвращает его в пул (см. ConnectionPool.release)."""
+
+    _pool: Optional["ConnectionPool"] = None
+    _in_pool = False
+
+    def close(self) -> None:
+        if self._pool is None:
+            super().close()
+        else:
+            self._pool.release(self)
+
+    def close_physically(self) -> None:
+        """Закрывает соединение по-настоящему."""
+        self._pool = None
+        super().close()
+
+
+class ConnectionPool:
+    """
+    Пул соединений с одной БД SQLite. Свободные соединения хранятся стеком (последнее
+    возвращённое выдаётся первым — его кэш страниц «тёплый»); сверх max_idle свободных
+    соединения закрываются.
+    """
+
+    def __init__(self, path: str, max_idle: int = DB_POOL_SIZE):
+        self.path = path
+        self.max_idle = max_idle
+        self._idle: List[PooledConnection] = []
+        self._lock = threading.Lock()
+        self._opened = 0
+
+    def _open(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            cached_statements=DB_STATEMENT_CACHE,
+            factory=PooledConnection,
+        )
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
+            conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE)}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+        except sqlite3.Error as e:
+            # Например, БД на файловой системе без общей памяти — работаем в режиме по умолчанию
+            _log.warning("Не удалось настроить соединение с %s: %s", self.path, e)
+        conn._pool = self
+        with self._lock:
+            self._opened += 1
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        """Свободное соединение из пула или новое."""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            return self._open()
+        conn._in_pool = False
+        return conn
+
+    def release(self, conn: PooledConnection) -> None:
+        """
+        Возвращает соединение в пул: незавершённая транзакция откатывается
+        (как при закрытии), row_factory / text_factory сбрасываются.
+        """
+        if conn._in_pool:
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+            conn.text_factory = str
+        except sqlite3.Error:
+            conn.close_physically()
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                conn._in_pool = True
+                self._idle.append(conn)
+                return
+        conn.close_physically()
+
+    def close_all(self) -> None:
+        """Закрывает свободные соединения (выданные закроются при возврате в пул)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self.max_idle = 0
+        for conn in idle:
+            try:
+                conn.close_physically()
+            except sqlite3.Error:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика: свободных соединений и всего открыто за время работы."""
+        with self._lock:
+            return {"idle": len(self._idle), "opened": self._opened}
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: Optional[str] = None) -> ConnectionPool:
+    """Пул соединений для файла БД (по умолчанию DB_PATH)."""
+    path = path or DB_PATH
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(path, ConnectionPool(path))
+    return pool
+
+
+def connect(path: Optional[str] = None) -> PooledConnection:
+    """
+    Соединение с БД из пула — замена sqlite3.connect(DB_PATH).
+    После работы нужно вызвать conn.close(): соединение вернётся в пул.
+    """
+    return get_pool(path).acquire()
+
+
+@atexit.register
+def close_all_connections() -> None:
+    """Закрывает соединения всех пулов (при завершении процесса)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
+
+
+# Файлы БД, для которых init_all_tables уже выполнен в этом процессе
+_initialized: Set[str] = set()
+
+
 @contextmanager
 def get_connection():
-    """Контекстный менеджер для подключения к SQLite."""
-    conn = sqlite3.connect(DB_PATH)
+    """Контекстный менеджер для подключения к SQLite (соединение из пула)."""
+    conn = connect()
     try:
         yield conn
         conn.commit()
@@ -35,123 +191,19 @@ def get_connection():
 
 def init_all_tables(st_callback=None):
     """
-    Создание всех таблиц приложения в одном месте.
+    Приведение схемы БД к текущей версии (migrations.migrate) и создание дефолтного
+    суперадминистратора. Выполняется один раз на процесс: повторные вызовы (init_db на каждой
+    странице) ничего не делают, а при актуальной схеме migrate не выполняет DDL.
     st_callback: опционально вызывается с сообщением для отображения в Streamlit (например, о создании дефолтного пользователя).
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    if DB_PATH in _initialized:
+        return
+    from migrations import migrate
 
-    # Таблица пользователей
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            role TEXT NOT NULL,
-            email TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_login TIMESTAMP,
-            is_active INTEGER DEFAULT 1
-        )
-    """)
-
-    # Таблица токенов для восстановления пароля
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS password_reset_tokens (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT NOT NULL,
-            token TEXT UNIQUE NOT NULL,
-            expires_at TIMESTAMP NOT NULL,
-            used INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (username) REFERENCES users(username)
-        )
-    """)
-
-    # Таблица настроек путей к файлам (legacy)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS file_paths_settings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            setting_key TEXT UNIQUE NOT NULL,
-            setting_value TEXT NOT NULL,
-            description TEXT,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_by TEXT
-        )
-    """)
-
-    # Таблица логов действий пользователей
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_activity_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT NOT NULL,
-            action TEXT NOT NULL,
-            details TEXT,
-            ip_address TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (username) REFERENCES users(username)
-        )
-    """)
-
-    # Таблица прав доступа к проектам (единая схема: created_at, granted_by)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS project_permissions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            project_name TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            granted_by TEXT,
-            FOREIGN KEY (user_id) REFERENCES users(id),
-            UNIQUE(user_id, project_name)
-        )
-    """)
-
-    # Таблица фильтров по умолчанию для ролей и отчетов
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS default_filters (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            role TEXT NOT NULL,
-            report_name TEXT NOT NULL,
-            filter_key TEXT NOT NULL,
-            filter_value TEXT,
-            filter_type TEXT DEFAULT 'string',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_by TEXT,
-            UNIQUE(role, report_name, filter_key)
-        )
-    """)
-
-    # Таблица параметров отчетов для аналитиков
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS report_parameters (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            report_name TEXT NOT NULL,
-            parameter_key TEXT NOT NULL,
-            parameter_value TEXT,
-            parameter_type TEXT DEFAULT 'string',
-            description TEXT,
-            is_editable_by_analyst INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_by TEXT,
-            UNIQUE(report_name, parameter_key)
-        )
-    """)
-
-    # Таблица настроек (settings)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS settings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            key TEXT UNIQUE NOT NULL,
-            value TEXT,
-            description TEXT,
-            updated_at TEXT,
-            updated_by TEXT
-        )
-    """)
+    conn = connect()
+    cursor = conn.cursor()
 
-    conn.commit()
+    migrate(conn)
 
     # Дефолтный суперадминистратор — создаётся только если заданы переменные окружения
     default_username = os.environ.get(DEFAULT_ADMIN_USERNAME_ENV)
@@ -168,3 +220,4 @@ def init_all_tables(st_callback=None):
             st_callback(f"⚠️ Создан дефолтный пользователь: {default_username} (пароль задан через {DEFAULT_ADMIN_PASSWORD_ENV})")
 
     conn.close()
+    _initialized.add(DB_PATH)
@@ -0,0 +1,141 @@
+"""
+Общий движок фильтров дашбордов (проект / лот / этап / причина и т.п.).
+Для каждой колонки один раз на набор данных строятся коды значений после strip
+и отсортированный список вариантов для selectbox; для выбранных значений —
+битовые карты строк (np.packbits). Смена одного фильтра — это AND битовых карт,
+а не несколько проходов astype(str).str.strip() по всему DataFrame.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    FILTER_BITMAPS_PER_COLUMN,
+    FILTER_INDEX_CACHE_MAX_BYTES,
+    FILTER_INDEX_CACHE_MAX_ENTRIES,
+)
+from data_cache import ByteLRUCache, frame_fingerprint
+
+# Значение selectbox «без фильтра»
+ALL_LABEL = "Все"
+
+# Отпечаток набора данных -> FilterEngine
+_engines = ByteLRUCache(
+    FILTER_INDEX_CACHE_MAX_BYTES, max_entries=FILTER_INDEX_CACHE_MAX_ENTRIES
+)
+
+
+class _ColumnIndex:
+    """Коды значений одной колонки (сравнение как astype(str).str.strip()) и кэш битовых карт."""
+
+    def __init__(self, series: pd.Series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # strip только по категориям; код -1 (пропуск) попадает на последний ключ None -> -1
+            keys = [str(c).strip() for c in series.cat.categories] + [None]
+            key_codes, uniques = pd.factorize(pd.Index(keys, dtype=object))
+            codes = key_codes[series.cat.codes.to_numpy()]
+        else:
+            codes, uniques = pd.factorize(series.astype(str).str.strip())
+            # Пропуски не совпадают ни с одним значением
+            codes[series.isna().to_numpy()] = -1
+        self._codes = np.asarray(codes, dtype=np.int32)
+        self._lookup = {key: i for i, key in enumerate(uniques)}
+        self._bitmaps: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        values = series.dropna().unique().tolist()
+        try:
+            self.options: List[Any] = sorted(values)
+        except TypeError:
+            # Смешанные типы (например, номера лотов числами и строками) — по тексту
+            self.options = sorted(values, key=str)
+
+    def bitmap(self, value: Any) -> np.ndarray:
+        """Упакованная битовая карта строк, где значение после strip равно str(value).strip()."""
+        code = self._lookup.get(str(value).strip())
+        if code is None:
+            return np.zeros((len(self._codes) + 7) // 8, dtype=np.uint8)
+        packed = self._bitmaps.get(code)
+        if packed is None:
+            packed = np.packbits(self._codes == code)
+            self._bitmaps[code] = packed
+            while len(self._bitmaps) > FILTER_BITMAPS_PER_COLUMN:
+                self._bitmaps.popitem(last=False)
+        else:
+            self._bitmaps.move_to_end(code)
+        return packed
+
+
+class FilterEngine:
+    """Индексы фильтров одного набора данных; колонки индексируются при первом обращении."""
+
+    def __init__(self, n_rows: int):
+        self.n_rows = n_rows
+        self._indexes: Dict[Hashable, _ColumnIndex] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, df: pd.DataFrame, column: Hashable) -> _ColumnIndex:
+        with self._lock:
+            index = self._indexes.get(column)
+            if index is None:
+                index = _ColumnIndex(df[column])
+                self._indexes[column] = index
+            return index
+
+    def options(self, df: pd.DataFrame, column: Hashable) -> List[Any]:
+        """Отсортированные непустые значения колонки."""
+        return self._index(df, column).options
+
+    def mask(self, df: pd.DataFrame, selections: Dict[Hashable, Any]) -> Optional[np.ndarray]:
+        """
+        Булева маска строк по выбранным значениям {колонка: значение}. Значение-список
+        (multiselect) — строки с любым из значений; пустой список, ALL_LABEL, None
+        и отсутствующие в df колонки не фильтруют; None — фильтров нет.
+        """
+        bitmaps = []
+        for column, value in selections.items():
+            if column not in df.columns:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                if not value:
+                    continue
+            elif value is None or value == ALL_LABEL:
+                continue
+            index = self._index(df, column)
+            with self._lock:
+                if isinstance(value, (list, tuple, set)):
+                    bitmaps.append(np.bitwise_or.reduce([index.bitmap(v) for v in value]))
+                else:
+                    bitmaps.append(index.bitmap(value))
+        if not bitmaps:
+            return None
+        packed = bitmaps[0] if len(bitmaps) == 1 else np.bitwise_and.reduce(bitmaps)
+        return np.unpackbits(packed, count=self.n_rows).astype(bool)
+
+
+def get_filter_engine(df: pd.DataFrame) -> FilterEngine:
+    """Движок фильтров для df (общий для всех сессий с тем же набором данных)."""
+    key = frame_fingerprint(df)
+    engine = _engines.get(key)
+    if engine is None:
+        engine = FilterEngine(len(df))
+        # Оценка: коды int32 и несколько битовых карт на каждую индексируемую колонку
+        _engines.put(key, engine, nbytes=len(df) * 8)
+    return engine
+
+
+def filter_options(df: pd.DataFrame, column: Hashable, all_label: str = ALL_LABEL) -> List[Any]:
+    """Варианты selectbox: all_label и отсортированные значения колонки (из кэша)."""
+    return [all_label] + get_filter_engine(df).options(df, column)
+
+
+def apply_filters(df: pd.DataFrame, selections: Dict[Hashable, Any]) -> pd.DataFrame:
+    """
+    Строки df, подходящие под все выбранные значения (сравнение после strip, как раньше
+    в дашбордах). Без активных фильтров возвращается поверхностная копия без копирования данных.
+    """
+    mask = get_filter_engine(df).mask(df, selections)
+    if mask is None:
+        return df.copy(deep=False)
+    return df[mask]
@@ -13,6 +13,18 @@ try:
 except ImportError:
     AVAILABLE_REPORTS = []
 
+# Запросы фильтров (их планы проверяет migrations.index_advisor_report)
+DEFAULT_FILTERS_SQL = """
+    SELECT filter_key, filter_value, filter_type
+    FROM default_filters
+    WHERE role = ? AND report_name = ?
+"""
+# Все записи фильтров для админки; условие WHERE добавляется по заданным role / report_name
+ALL_DEFAULT_FILTERS_SQL = """
+    SELECT role, report_name, filter_key, filter_value, filter_type, updated_at, updated_by
+    FROM default_filters
+"""
+
 FILTER_TYPES = {
     "string": "Текст",
     "number": "Число",
@@ -33,14 +45,7 @@ def get_default_filters(role: str, report_name: str) -> Dict[str, Any]:
         with get_connection() as conn:
             conn.row_factory = lambda c, r: dict(zip([col[0] for col in c.description], r))
             cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT filter_key, filter_value, filter_type
-                FROM default_filters
-                WHERE role = ? AND report_name = ?
-                """,
-                (role, report_name),
-            )
+            cur.execute(DEFAULT_FILTERS_SQL, (role, report_name))
             for row in cur.fetchall():
                 key = row["filter_key"]
                 val = row["filter_value"]
@@ -136,36 +141,15 @@ def get_all_default_filters(
             cur = conn.cursor()
             if role is not None and report_name is not None:
                 cur.execute(
-                    """
-                    SELECT role, report_name, filter_key, filter_value, filter_type, updated_at, updated_by
-                    FROM default_filters WHERE role = ? AND report_name = ?
-                    """,
+                    ALL_DEFAULT_FILTERS_SQL + " WHERE role = ? AND report_name = ?",
                     (role, report_name),
                 )
             elif role is not None:
-                cur.execute(
-                    """
-                    SELECT role, report_name, filter_key, filter_value, filter_type, updated_at, updated_by
-                    FROM default_filters WHERE role = ?
-                    """,
-                    (role,),
-                )
+                cur.execute(ALL_DEFAULT_FILTERS_SQL + " WHERE role = ?", (role,))
             elif report_name is not None:
-                cur.execute(
-                    """
-                    SELECT role, report_name, filter_key, filter_value, filter_type, updated_at, updated_by
-                    FROM default_filters WHERE report_name = ?
-                    """,
-                    (report_name,),
-                )
+                cur.execute(ALL_DEFAULT_FILTERS_SQL + " WHERE report_name = ?", (report_name,))
             else:
-                cur.execute(
-                    """
-                    SELECT role, report_name, filter_key, filter_value, filter_type, updated_at, updated_by
-                    FROM default_filters
-                    ORDER BY role, report_name, filter_key
-                    """
-                )
+                cur.execute(ALL_DEFAULT_FILTERS_SQL + " ORDER BY role, report_name, filter_key")
             rows = cur.fetchall()
             result = list(rows) if rows else []
     except Exception:
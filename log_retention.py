@@ -0,0 +1,350 @@
+"""
+Хранение журнала действий пользователей (user_activity_logs).
+
+Записи старше срока хранения (LOG_RETENTION_DAYS, для отдельных действий —
+LOG_RETENTION_DAYS_BY_ACTION) переносятся из users.db в помесячные архивные БД
+LOG_ARCHIVE_DIR/user_activity_logs_ГГГГ-ММ.db (месяц — по created_at записи), поэтому
+основная БД, которую читает вход в систему, остаётся небольшой. Перенос идемпотентен:
+записи сначала копируются в архив (INSERT OR IGNORE по исходному id), затем удаляются из
+users.db, так что прерванный перенос достаточно повторить. Архивы старше
+LOG_ARCHIVE_KEEP_MONTHS удаляются. Освободившиеся страницы users.db возвращаются системе
+шагами PRAGMA incremental_vacuum; полный VACUUM — только вручную (vacuum_main_db).
+
+Запуск — schedule_log_retention (фоновый поток, не чаще раза в LOG_RETENTION_INTERVAL_HOURS;
+время последнего запуска хранится в settings) или run_log_retention вручную. Чтение журнала
+вместе с архивами — logger.get_logs / get_logs_count с include_archive=True.
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import (
+    LOG_ARCHIVE_DIR,
+    LOG_ARCHIVE_KEEP_MONTHS,
+    LOG_RETENTION_BATCH_ROWS,
+    LOG_RETENTION_DAYS,
+    LOG_RETENTION_DAYS_BY_ACTION,
+    LOG_RETENTION_INTERVAL_HOURS,
+)
+from db import connect
+from migrations import LOG_INDEXES
+
+ARCHIVE_PREFIX = "user_activity_logs_"
+ARCHIVE_EXT = ".db"
+_ARCHIVE_NAME_RE = re.compile(r"^user_activity_logs_(\d{4}-\d{2})\.db$")
+_MONTH_RE = re.compile(r"^\d{4}-\d{2}$")
+# Месяц для записей с нераспознанной датой
+_UNKNOWN_MONTH = "0000-00"
+
+# Ключ settings со временем последнего запуска
+_LAST_RUN_SETTING = "log_retention_last_run"
+
+# Параметров в одном запросе (ограничение SQLite на число "?" в старых версиях — 999)
+_IDS_PER_STATEMENT = 500
+# Свободных страниц users.db, возвращаемых системе за один шаг PRAGMA incremental_vacuum,
+# и пауза между шагами: каждый шаг — короткая транзакция, между ними пишут другие соединения
+_INCREMENTAL_VACUUM_PAGES = 1000
+_INCREMENTAL_VACUUM_PAUSE = 0.05
+# Значение PRAGMA auto_vacuum для режима INCREMENTAL
+_AUTO_VACUUM_INCREMENTAL = 2
+
+_ARCHIVE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS user_activity_logs (
+        id INTEGER PRIMARY KEY,
+        username TEXT NOT NULL,
+        action TEXT NOT NULL,
+        details TEXT,
+        ip_address TEXT,
+        created_at TIMESTAMP
+    )
+"""
+_LOG_COLUMNS = "id, username, action, details, ip_address, created_at"
+# Кандидаты на перенос: записи раньше максимальной границы хранения, по индексу created_at
+# после позиции курсора (created_at, id)
+ARCHIVE_CANDIDATES_SQL = (
+    "SELECT id, action, created_at FROM user_activity_logs "
+    "WHERE created_at < ? AND (created_at, id) > (?, ?) "
+    "ORDER BY created_at, id LIMIT ?"
+)
+
+_log = logging.getLogger(__name__)
+_run_lock = threading.Lock()
+_scheduler_lock = threading.Lock()
+_scheduler: Optional[threading.Thread] = None
+
+
+def archive_path(month: str) -> str:
+    """Путь архивной БД за месяц ГГГГ-ММ."""
+    return os.path.join(LOG_ARCHIVE_DIR, f"{ARCHIVE_PREFIX}{month}{ARCHIVE_EXT}")
+
+
+def list_archives() -> List[Tuple[str, str]]:
+    """Архивные БД журнала: (месяц ГГГГ-ММ, путь), от новых к старым."""
+    try:
+        names = os.listdir(LOG_ARCHIVE_DIR)
+    except OSError:
+        return []
+    archives = []
+    for name in names:
+        match = _ARCHIVE_NAME_RE.match(name)
+        if match:
+            archives.append((match.group(1), os.path.join(LOG_ARCHIVE_DIR, name)))
+    archives.sort(reverse=True)
+    return archives
+
+
+def open_archive(path: str) -> sqlite3.Connection:
+    """Соединение с архивной БД только для чтения (архивы не входят в пул соединений)."""
+    return sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+
+
+def retention_cutoffs(now: Optional[datetime] = None) -> Tuple[str, Dict[str, str]]:
+    """
+    Границы хранения в users.db: (граница по умолчанию, действие -> граница).
+    Граница — дата ГГГГ-ММ-ДД; переносятся записи с created_at раньше этой даты.
+    """
+    now = now or datetime.now()
+
+    def cutoff(days: int) -> str:
+        return (now - timedelta(days=max(0, days))).strftime("%Y-%m-%d")
+
+    by_action = {action: cutoff(days) for action, days in LOG_RETENTION_DAYS_BY_ACTION.items()}
+    return cutoff(LOG_RETENTION_DAYS), by_action
+
+
+def _record_month(created_at) -> str:
+    month = str(created_at)[:7]
+    return month if _MONTH_RE.match(month) else _UNKNOWN_MONTH
+
+
+def _prepare_archive(path: str) -> None:
+    """Создаёт архивную БД с таблицей и индексами журнала (если их ещё нет)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(_ARCHIVE_TABLE_SQL)
+        for statement in LOG_INDEXES:
+            conn.execute(statement)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _chunks(ids: List[int]):
+    for start in range(0, len(ids), _IDS_PER_STATEMENT):
+        yield ids[start : start + _IDS_PER_STATEMENT]
+
+
+def _move_rows(conn: sqlite3.Connection, path: str, ids: List[int]) -> None:
+    """Копирует записи ids в архивную БД path и удаляет их из users.db."""
+    conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    try:
+        for chunk in _chunks(ids):
+            placeholders = ",".join("?" * len(chunk))
+            conn.execute(
+                f"INSERT OR IGNORE INTO archive.user_activity_logs ({_LOG_COLUMNS}) "
+                f"SELECT {_LOG_COLUMNS} FROM main.user_activity_logs WHERE id IN ({placeholders})",
+                chunk,
+            )
+        # Архив фиксируется раньше удаления: при сбое между ними запись останется в обеих БД,
+        # и повторный перенос её не задвоит
+        conn.commit()
+        for chunk in _chunks(ids):
+            placeholders = ",".join("?" * len(chunk))
+            conn.execute(
+                f"DELETE FROM main.user_activity_logs WHERE id IN ({placeholders})", chunk
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("DETACH DATABASE archive")
+
+
+def _compact_main_db(conn: sqlite3.Connection) -> int:
+    """
+    Возвращает системе свободные страницы users.db после переноса — шагами
+    PRAGMA incremental_vacuum, не блокируя БД надолго. Полный VACUUM здесь не выполняется:
+    БД без auto_vacuum=INCREMENTAL сжимается только вручную (vacuum_main_db).
+    Возвращает число освобождённых страниц.
+    """
+    released = 0
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == _AUTO_VACUUM_INCREMENTAL:
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free_pages:
+            # executescript выполняет PRAGMA до конца (execute освобождает одну страницу за шаг)
+            conn.executescript(f"PRAGMA incremental_vacuum({_INCREMENTAL_VACUUM_PAGES});")
+            remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if remaining >= free_pages:
+                break
+            released += free_pages - remaining
+            free_pages = remaining
+            if free_pages:
+                time.sleep(_INCREMENTAL_VACUUM_PAUSE)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return released
+
+
+def vacuum_main_db() -> Optional[bool]:
+    """
+    Полное сжатие users.db (VACUUM) — только по явному запуску администратором: на время
+    перестроения файла запись в БД блокируется. Заодно переводит БД, созданную до миграции
+    auto_vacuum, в режим INCREMENTAL. None — уже выполняется перенос журнала или сжатие.
+    """
+    if not _run_lock.acquire(blocking=False):
+        return None
+    try:
+        conn = connect()
+        try:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+        return True
+    finally:
+        _run_lock.release()
+
+
+def archive_old_logs(
+    now: Optional[datetime] = None, batch_rows: int = LOG_RETENTION_BATCH_ROWS
+) -> Dict[str, int]:
+    """
+    Переносит записи старше срока хранения в помесячные архивы.
+    Возвращает число перенесённых записей по месяцам.
+    """
+    default_cutoff, action_cutoffs = retention_cutoffs(now)
+    max_cutoff = max([default_cutoff] + list(action_cutoffs.values()))
+    moved: Dict[str, int] = {}
+    prepared: Set[str] = set()
+    position: Tuple[str, int] = ("", 0)
+    conn = connect()
+    try:
+        while True:
+            # Кандидаты — по индексу created_at; записи с более долгим сроком пропускаются курсором
+            rows = conn.execute(
+                ARCHIVE_CANDIDATES_SQL, (max_cutoff, position[0], position[1], batch_rows)
+            ).fetchall()
+            if not rows:
+                break
+            position = (rows[-1][2], rows[-1][0])
+            by_month: Dict[str, List[int]] = {}
+            for row_id, action, created_at in rows:
+                if str(created_at) < action_cutoffs.get(action, default_cutoff):
+                    by_month.setdefault(_record_month(created_at), []).append(row_id)
+            for month, ids in by_month.items():
+                path = archive_path(month)
+                if path not in prepared:
+                    _prepare_archive(path)
+                    prepared.add(path)
+                _move_rows(conn, path, ids)
+                moved[month] = moved.get(month, 0) + len(ids)
+        if moved:
+            _compact_main_db(conn)
+    finally:
+        conn.close()
+
+    if moved:
+        from logger import invalidate_logs_count_cache
+
+        invalidate_logs_count_cache()
+    return moved
+
+
+def expire_archives(now: Optional[datetime] = None) -> List[str]:
+    """Удаляет архивы старше LOG_ARCHIVE_KEEP_MONTHS месяцев. Возвращает удалённые месяцы."""
+    if LOG_ARCHIVE_KEEP_MONTHS <= 0:
+        return []
+    now = now or datetime.now()
+    months = now.year * 12 + now.month - 1 - LOG_ARCHIVE_KEEP_MONTHS
+    oldest_kept = f"{months // 12:04d}-{months % 12 + 1:02d}"
+    removed = []
+    for month, path in list_archives():
+        if month < oldest_kept:
+            try:
+                os.remove(path)
+                removed.append(month)
+            except OSError as e:
+                _log.warning("Не удалось удалить архив журнала %s: %s", path, e)
+    return removed
+
+
+def run_log_retention(now: Optional[datetime] = None) -> Optional[Dict]:
+    """
+    Перенос старых записей в архивы и удаление устаревших архивов.
+    None — перенос уже выполняется в другом потоке.
+    """
+    if not _run_lock.acquire(blocking=False):
+        return None
+    try:
+        started = time.perf_counter()
+        moved = archive_old_logs(now)
+        removed = expire_archives(now)
+        try:
+            from settings import set_setting
+
+            set_setting(
+                _LAST_RUN_SETTING,
+                datetime.now().isoformat(),
+                description="Последний перенос журнала действий в архив",
+                updated_by="system",
+            )
+        except Exception as e:
+            _log.warning("Не удалось сохранить время переноса журнала: %s", e)
+        result = {"moved": moved, "removed_archives": removed}
+        if moved or removed:
+            _log.info(
+                "Журнал действий: в архив перенесено %s записей, удалено архивов %s (%.1f с)",
+                sum(moved.values()),
+                len(removed),
+                time.perf_counter() - started,
+            )
+        return result
+    finally:
+        _run_lock.release()
+
+
+def _retention_due() -> bool:
+    from settings import get_setting
+
+    last_run = get_setting(_LAST_RUN_SETTING)
+    if not last_run:
+        return True
+    try:
+        last = datetime.fromisoformat(last_run)
+    except ValueError:
+        return True
+    return datetime.now() - last >= timedelta(hours=LOG_RETENTION_INTERVAL_HOURS)
+
+
+def _scheduler_loop() -> None:
+    # Проверяем раз в час (или чаще при коротком интервале); первый запуск — сразу
+    check_seconds = min(3600, max(60, LOG_RETENTION_INTERVAL_HOURS * 3600))
+    while True:
+        try:
+            if _retention_due():
+                run_log_retention()
+        except Exception as e:
+            _log.warning("Ошибка при переносе журнала действий в архив: %s", e)
+        time.sleep(check_seconds)
+
+
+def schedule_log_retention() -> None:
+    """Запускает (один раз на процесс) фоновый поток переноса журнала в архив."""
+    global _scheduler
+    if LOG_RETENTION_INTERVAL_HOURS <= 0:
+        return
+    with _scheduler_lock:
+        if _scheduler is not None and _scheduler.is_alive():
+            return
+        _scheduler = threading.Thread(
+            target=_scheduler_loop, name="activity-log-retention", daemon=True
+        )
+        _scheduler.start()
@@ -124,12 +124,185 @@
 #
 
 """
-Модуль для логирования действий пользователей
+Модуль для логирования действий пользователей.
+
+log_action не пишет в БД сам: событие кладётся в очередь в памяти, а фоновый поток
+(LogWriter) записывает накопленные события одной транзакцией — раз в LOG_FLUSH_INTERVAL_MS
+или по набору LOG_BATCH_SIZE событий. Очередь ограничена LOG_QUEUE_MAX_SIZE: при
+переполнении log_action ждёт не дольше LOG_ENQUEUE_TIMEOUT_MS, затем событие отбрасывается
+(счётчик dropped). Перед чтением журнала (get_logs) и при завершении процесса очередь
+сбрасывается в БД.
+
+Старые записи переносятся в помесячные архивы (log_retention); get_logs / get_logs_count
+с include_archive=True читают users.db и архивы вместе.
 """
-import sqlite3
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
 from datetime import datetime
-from typing import Optional, List, Dict
-from config import DB_PATH
+from typing import Optional, List, Dict, Tuple
+from config import (
+    LOG_BATCH_SIZE,
+    LOG_COUNT_RECOUNT_SECONDS,
+    LOG_ENQUEUE_TIMEOUT_MS,
+    LOG_FLUSH_INTERVAL_MS,
+    LOG_QUEUE_MAX_SIZE,
+)
+from db import connect
+
+_log = logging.getLogger(__name__)
+
+_INSERT_LOG_SQL = """
+    INSERT INTO user_activity_logs
+    (username, action, details, ip_address, created_at)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+# Маркер остановки фонового потока
+_STOP = object()
+
+
+class LogWriter:
+    """Фоновая запись событий журнала пачками (одна транзакция на пачку)."""
+
+    def __init__(
+        self,
+        max_queue: int = LOG_QUEUE_MAX_SIZE,
+        batch_size: int = LOG_BATCH_SIZE,
+        flush_interval: float = LOG_FLUSH_INTERVAL_MS / 1000,
+        enqueue_timeout: float = LOG_ENQUEUE_TIMEOUT_MS / 1000,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_queue))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="activity-log-writer", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, row: Tuple) -> bool:
+        """Ставит строку журнала в очередь. False — очередь переполнена, событие отброшено."""
+        self._ensure_started()
+        try:
+            self._queue.put(row, timeout=self.enqueue_timeout)
+            return True
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+                dropped = self._dropped
+            # Не засоряем журнал: первое отброшенное событие и далее каждое тысячное
+            if dropped == 1 or dropped % 1000 == 0:
+                _log.warning("Очередь журнала действий переполнена, отброшено событий: %s", dropped)
+            return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Ждёт записи всех событий, поставленных в очередь до вызова. False — не дождались."""
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Записывает очередь и останавливает фоновый поток."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика: в очереди, записано, отброшено при переполнении, потеряно из-за ошибок БД."""
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self._written,
+                "dropped": self._dropped,
+                "failed": self._failed,
+            }
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch: List[Tuple] = []
+            waiters: List[threading.Event] = []
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            # Набираем пачку до таймера, размера пачки или запроса flush / остановки
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stop or waiters or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+
+    def _write(self, batch: List[Tuple]) -> None:
+        if not batch:
+            return
+        conn = None
+        try:
+            conn = connect()
+            conn.executemany(_INSERT_LOG_SQL, batch)
+            conn.commit()
+            with self._lock:
+                self._written += len(batch)
+        except Exception as e:
+            with self._lock:
+                self._failed += len(batch)
+            _log.warning("Ошибка при записи журнала действий (%s событий): %s", len(batch), e)
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+_writer = LogWriter()
+atexit.register(_writer.stop)
+
+
+def flush_logs(timeout: float = 5.0) -> bool:
+    """Записывает в БД все события журнала, поставленные в очередь до вызова."""
+    return _writer.flush(timeout)
+
+
+def get_log_writer_stats() -> Dict[str, int]:
+    """Статистика фоновой записи журнала (см. LogWriter.stats)."""
+    return _writer.stats()
 
 
 def get_client_ip() -> Optional[str]:
@@ -182,87 +355,166 @@ def log_action(
         details: Дополнительные детали действия
         ip_address: IP-адрес пользователя (если передан вручную)
     """
-    # Если IP не передан явно — пытаемся определить автоматически
+    # Если IP не передан явно — пытаемся определить автоматически (в потоке сессии,
+    # пока доступен st.context)
     if ip_address is None:
         ip_address = get_client_ip()
 
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO user_activity_logs
-            (username, action, details, ip_address, created_at)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (username, action, details, ip_address, datetime.now().isoformat()),
+    # Время фиксируется в момент действия, запись в БД — в фоновом потоке
+    _writer.submit((username, action, details, ip_address, datetime.now().isoformat()))
+
+
+# Курсор страницы журнала: (created_at, id) последней показанной записи
+LogCursor = Tuple[str, int]
+
+_LOG_COLUMNS = ("id", "username", "action", "details", "ip_address", "created_at")
+
+
+def _log_filters(
+    username: Optional[str], action: Optional[str], use_indexes: bool = True
+) -> Tuple[str, List]:
+    """
+    Условие WHERE по фильтрам журнала и его параметры.
+    use_indexes=False — фильтры не используют индексы (унарный +), чтобы SQLite выбрал
+    диапазон по первичному ключу id.
+    """
+    prefix = "" if use_indexes else "+"
+    conditions = []
+    params: List = []
+    if username:
+        conditions.append(f"{prefix}username = ?")
+        params.append(username)
+    if action:
+        conditions.append(f"{prefix}action = ?")
+        params.append(action)
+    return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+
+def logs_page_query(
+    username: Optional[str],
+    action: Optional[str],
+    before: Optional[LogCursor],
+    limit: int,
+) -> Tuple[str, List]:
+    """Запрос страницы журнала (сначала новые) и его параметры."""
+    where, params = _log_filters(username, action)
+    if before is not None:
+        # Keyset-пагинация: продолжение по индексу (..., created_at) без OFFSET
+        where += (" AND " if where else " WHERE ") + "(created_at, id) < (?, ?)"
+        params.extend(before)
+    params.append(limit)
+    return (
+        f"SELECT {', '.join(_LOG_COLUMNS)} FROM user_activity_logs{where}"
+        " ORDER BY created_at DESC, id DESC LIMIT ?",
+        params,
+    )
+
+
+def logs_count_query(username: Optional[str], action: Optional[str]) -> Tuple[str, List]:
+    """Запрос полного подсчёта записей журнала по фильтрам и его параметры."""
+    where, params = _log_filters(username, action)
+    return f"SELECT COUNT(*) FROM user_activity_logs{where}", params
+
+
+def logs_new_rows_query(
+    username: Optional[str], action: Optional[str], max_id: int
+) -> Tuple[str, List]:
+    """Запрос количества (и максимального id) записей, добавленных после max_id."""
+    where, params = _log_filters(username, action, use_indexes=False)
+    where += (" AND " if where else " WHERE ") + "id > ?"
+    return f"SELECT COUNT(*), MAX(id) FROM user_activity_logs{where}", params + [max_id]
+
+
+def log_distinct_values_query(column: str) -> str:
+    """
+    Различные значения колонки журнала по возрастанию: значения перебираются по индексу
+    «следующее большее» — без полного просмотра таблицы.
+    """
+    return f"""
+        WITH RECURSIVE value_list(value) AS (
+            SELECT MIN({column}) FROM user_activity_logs
+            UNION ALL
+            SELECT (SELECT MIN({column}) FROM user_activity_logs WHERE {column} > value)
+            FROM value_list WHERE value IS NOT NULL
         )
-        conn.commit()
-    except Exception as e:
-        import logging
-        logging.getLogger(__name__).warning("Ошибка при логировании действия: %s", e)
-    finally:
-        if 'conn' in locals():
-            conn.close()
+        SELECT value FROM value_list WHERE value IS NOT NULL
+    """
+
+
+def _select_logs(
+    conn,
+    limit: int,
+    username: Optional[str],
+    action: Optional[str],
+    before: Optional[LogCursor],
+) -> List[Dict]:
+    """Страница журнала из одной БД (users.db или архив), сначала новые."""
+    query, params = logs_page_query(username, action, before, limit)
+    return [dict(zip(_LOG_COLUMNS, row)) for row in conn.execute(query, params).fetchall()]
+
+
+def _log_sort_key(log: Dict) -> Tuple[str, int]:
+    return str(log["created_at"]), log["id"]
+
+
+def _select_archived_logs(
+    logs: List[Dict],
+    limit: int,
+    username: Optional[str],
+    action: Optional[str],
+    before: Optional[LogCursor],
+) -> List[Dict]:
+    """
+    Дополняет страницу журнала записями из помесячных архивов (log_retention).
+    Архивы просматриваются от новых к старым, пока они могут содержать записи новее
+    последней записи страницы.
+    """
+    from log_retention import list_archives, open_archive
+
+    for month, path in list_archives():
+        if before is not None and month > str(before[0])[:7]:
+            continue  # весь месяц новее курсора
+        if len(logs) >= limit and str(logs[limit - 1]["created_at"])[:7] > month:
+            break
+        try:
+            archive = open_archive(path)
+            try:
+                archived = _select_logs(archive, limit, username, action, before)
+            finally:
+                archive.close()
+        except Exception as e:
+            import logging
+            logging.getLogger(__name__).warning("Ошибка при чтении архива журнала %s: %s", path, e)
+            continue
+        logs = sorted(logs + archived, key=_log_sort_key, reverse=True)[:limit]
+    return logs
 
 
 def get_logs(
     limit: int = 100,
     username: Optional[str] = None,
     action: Optional[str] = None,
+    before: Optional[LogCursor] = None,
+    include_archive: bool = False,
 ) -> List[Dict]:
     """
-    Получение логов действий пользователей
+    Получение логов действий пользователей (сначала новые)
 
     Args:
         limit: Максимальное количество записей
         username: Фильтр по имени пользователя
         action: Фильтр по типу действия
+        before: Курсор (created_at, id) — вернуть записи старше него (следующая страница)
+        include_archive: Искать и в архивах журнала (log_retention)
 
     Returns:
         Список словарей с логами
     """
+    # События, ещё не записанные фоновым потоком, тоже должны попасть в выборку
+    flush_logs()
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        query = """
-            SELECT id, username, action, details, ip_address, created_at
-            FROM user_activity_logs
-            WHERE 1=1
-        """
-        params = []
-
-        if username:
-            query += " AND username = ?"
-            params.append(username)
-
-        if action:
-            query += " AND action = ?"
-            params.append(action)
-
-        query += " ORDER BY created_at DESC LIMIT ?"
-        params.append(limit)
-
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-
-        # Преобразуем в список словарей
-        logs = []
-        for row in rows:
-            logs.append(
-                {
-                    "id": row[0],
-                    "username": row[1],
-                    "action": row[2],
-                    "details": row[3],
-                    "ip_address": row[4],
-                    "created_at": row[5],
-                }
-            )
-
-        return logs
-
+        conn = connect()
+        logs = _select_logs(conn, limit, username, action, before)
     except Exception as e:
         import logging
         logging.getLogger(__name__).warning("Ошибка при получении логов: %s", e)
@@ -271,39 +523,130 @@ def get_logs(
         if 'conn' in locals():
             conn.close()
 
+    if include_archive:
+        logs = _select_archived_logs(logs, limit, username, action, before)
+    return logs
+
+
+def get_logs_page(
+    page_size: int = 100,
+    username: Optional[str] = None,
+    action: Optional[str] = None,
+    before: Optional[LogCursor] = None,
+    include_archive: bool = False,
+) -> Tuple[List[Dict], Optional[LogCursor]]:
+    """
+    Страница журнала и курсор следующей (более старой) страницы; None — страница последняя.
+    """
+    logs = get_logs(
+        page_size + 1,
+        username=username,
+        action=action,
+        before=before,
+        include_archive=include_archive,
+    )
+    if len(logs) <= page_size:
+        return logs, None
+    logs = logs[:page_size]
+    return logs, (logs[-1]["created_at"], logs[-1]["id"])
+
+
+# Кэш количества записей журнала: (username, action) -> (количество, максимальный id, время полного подсчёта)
+_count_cache: Dict[Tuple[Optional[str], Optional[str]], Tuple[int, int, float]] = {}
+_count_lock = threading.Lock()
+
+
+def invalidate_logs_count_cache() -> None:
+    """Сбрасывает кэш количества записей (после удаления записей из журнала)."""
+    with _count_lock:
+        _count_cache.clear()
+
+
+# Количество записей в архивах: (путь, mtime, размер, username, action) -> количество
+_archive_count_cache: Dict[Tuple, int] = {}
+
+
+def _archived_logs_count(username: Optional[str], action: Optional[str]) -> int:
+    """Количество записей в архивах журнала; архив пересчитывается только после изменения файла."""
+    from log_retention import list_archives, open_archive
+
+    query, params = logs_count_query(username, action)
+    total = 0
+    for _, path in list_archives():
+        try:
+            stat = os.stat(path)
+            key = (path, stat.st_mtime_ns, stat.st_size, username or None, action or None)
+            with _count_lock:
+                count = _archive_count_cache.get(key)
+            if count is None:
+                archive = open_archive(path)
+                try:
+                    count = archive.execute(query, params).fetchone()[0]
+                finally:
+                    archive.close()
+                with _count_lock:
+                    _archive_count_cache[key] = count
+            total += count
+        except Exception as e:
+            import logging
+            logging.getLogger(__name__).warning("Ошибка при подсчете архива журнала %s: %s", path, e)
+    return total
+
 
 def get_logs_count(
     username: Optional[str] = None,
     action: Optional[str] = None,
+    approximate: bool = True,
+    include_archive: bool = False,
 ) -> int:
     """
     Получение количества логов
 
+    При approximate=True полный COUNT(*) выполняется не чаще раза в LOG_COUNT_RECOUNT_SECONDS,
+    а между пересчётами к запомненному количеству добавляются только новые записи
+    (id больше запомненного — диапазон по первичному ключу). Удалённые за это время записи
+    не учитываются до следующего пересчёта.
+
     Args:
         username: Фильтр по имени пользователя
         action: Фильтр по типу действия
+        approximate: Разрешить приближённое (кэшированное) значение
+        include_archive: Учитывать и архивы журнала (log_retention)
 
     Returns:
         Количество записей
     """
+    # События, ещё не записанные фоновым потоком, тоже должны попасть в выборку
+    flush_logs()
+    key = (username or None, action or None)
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
 
-        query = "SELECT COUNT(*) FROM user_activity_logs WHERE 1=1"
-        params = []
-
-        if username:
-            query += " AND username = ?"
-            params.append(username)
-
-        if action:
-            query += " AND action = ?"
-            params.append(action)
-
-        cursor.execute(query, params)
-        count = cursor.fetchone()[0]
-
+        with _count_lock:
+            cached = _count_cache.get(key)
+        now = time.monotonic()
+
+        if approximate and cached is not None and now - cached[2] < LOG_COUNT_RECOUNT_SECONDS:
+            count, max_id, counted_at = cached
+            cursor.execute(*logs_new_rows_query(username, action, max_id))
+            new_rows, new_max_id = cursor.fetchone()
+            count += new_rows
+            max_id = new_max_id if new_max_id is not None else max_id
+        else:
+            # Количество и максимальный id — из одного снимка БД (одна транзакция чтения)
+            cursor.execute("BEGIN")
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM user_activity_logs")
+            max_id = cursor.fetchone()[0]
+            cursor.execute(*logs_count_query(username, action))
+            count = cursor.fetchone()[0]
+            conn.commit()
+            counted_at = now
+
+        with _count_lock:
+            _count_cache[key] = (count, max_id, counted_at)
+        if include_archive:
+            count += _archived_logs_count(username, action)
         return count
 
     except Exception as e:
@@ -313,3 +656,21 @@ def get_logs_count(
     finally:
         if 'conn' in locals():
             conn.close()
+
+
+def get_log_distinct_values(column: str) -> List[str]:
+    """Различные значения username или action в журнале (по возрастанию)."""
+    if column not in ("username", "action"):
+        raise ValueError(f"Недопустимая колонка журнала: {column}")
+    try:
+        conn = connect()
+        cursor = conn.cursor()
+        cursor.execute(log_distinct_values_query(column))
+        return [row[0] for row in cursor.fetchall()]
+    except Exception as e:
+        import logging
+        logging.getLogger(__name__).warning("Ошибка при получении значений журнала: %s", e)
+        return []
+    finally:
+        if 'conn' in locals():
+            conn.close()
@@ -0,0 +1,424 @@
+"""
+Версионные миграции схемы users.db.
+
+Каждая миграция — (версия, описание, функция), применяется в своей транзакции
+(BEGIN IMMEDIATE: параллельно запущенные процессы не применят её дважды), номер версии
+записывается в таблицу schema_version. Миграции идемпотентны (IF NOT EXISTS), поэтому
+первая из них — базовые таблицы — безопасно «принимает» уже существующие БД.
+Если схема актуальна, migrate выполняет один SELECT и никакого DDL.
+
+index_advisor_report — отчёт по планам (EXPLAIN QUERY PLAN) запросов приложения:
+полные просмотры таблиц, сортировки во временном B-дереве и предлагаемые индексы.
+Запуск из командной строки: python migrations.py — версия схемы и отчёт по индексам.
+"""
+import logging
+import re
+import sqlite3
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+_log = logging.getLogger(__name__)
+
+# Индексы журнала действий (user_activity_logs): страницы журнала по фильтрам
+# пользователь / действие в порядке «сначала новые» (ключ created_at, затем id — rowid
+# входит в каждый индекс) и подсчёт записей по фильтрам. Те же индексы есть в архивах журнала
+LOG_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_user_activity_logs_created_at "
+    "ON user_activity_logs (created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_user_activity_logs_username_created_at "
+    "ON user_activity_logs (username, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_user_activity_logs_action_created_at "
+    "ON user_activity_logs (action, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_user_activity_logs_username_action_created_at "
+    "ON user_activity_logs (username, action, created_at)",
+]
+
+_SCHEMA_VERSION_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TEXT NOT NULL
+    )
+"""
+
+
+def _create_base_tables(conn: sqlite3.Connection) -> None:
+    """Таблицы приложения (схема до введения миграций)."""
+    cursor = conn.cursor()
+
+    # Таблица пользователей
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL,
+            email TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP,
+            is_active INTEGER DEFAULT 1
+        )
+    """)
+
+    # Таблица токенов для восстановления пароля
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS password_reset_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            token TEXT UNIQUE NOT NULL,
+            expires_at TIMESTAMP NOT NULL,
+            used INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    """)
+
+    # Таблица настроек путей к файлам (legacy)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS file_paths_settings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            setting_key TEXT UNIQUE NOT NULL,
+            setting_value TEXT NOT NULL,
+            description TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_by TEXT
+        )
+    """)
+
+    # Таблица логов действий пользователей
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_activity_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            action TEXT NOT NULL,
+            details TEXT,
+            ip_address TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    """)
+
+    # Таблица прав доступа к проектам (единая схема: created_at, granted_by)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS project_permissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            project_name TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            granted_by TEXT,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            UNIQUE(user_id, project_name)
+        )
+    """)
+
+    # Таблица фильтров по умолчанию для ролей и отчетов
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS default_filters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            role TEXT NOT NULL,
+            report_name TEXT NOT NULL,
+            filter_key TEXT NOT NULL,
+            filter_value TEXT,
+            filter_type TEXT DEFAULT 'string',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_by TEXT,
+            UNIQUE(role, report_name, filter_key)
+        )
+    """)
+
+    # Таблица параметров отчетов для аналитиков
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS report_parameters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            report_name TEXT NOT NULL,
+            parameter_key TEXT NOT NULL,
+            parameter_value TEXT,
+            parameter_type TEXT DEFAULT 'string',
+            description TEXT,
+            is_editable_by_analyst INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_by TEXT,
+            UNIQUE(report_name, parameter_key)
+        )
+    """)
+
+    # Таблица настроек (settings)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT UNIQUE NOT NULL,
+            value TEXT,
+            description TEXT,
+            updated_at TEXT,
+            updated_by TEXT
+        )
+    """)
+
+
+def _create_log_indexes(conn: sqlite3.Connection) -> None:
+    for statement in LOG_INDEXES:
+        conn.execute(statement)
+
+
+def _index_prefixes(conn: sqlite3.Connection, table: str) -> List[Tuple[str, ...]]:
+    """Колонки каждого индекса таблицы (включая индексы UNIQUE-ограничений)."""
+    prefixes = []
+    for index in conn.execute(f"PRAGMA index_list({table})").fetchall():
+        columns = conn.execute(f"PRAGMA index_info({index[1]})").fetchall()
+        prefixes.append(tuple(column[2] for column in sorted(columns)))
+    return prefixes
+
+
+def ensure_index(conn: sqlite3.Connection, name: str, table: str, columns: Sequence[str]) -> bool:
+    """
+    Создаёт индекс, если ни один существующий индекс таблицы не начинается с тех же колонок
+    (например, UNIQUE(role, report_name, filter_key) уже обслуживает поиск по role, report_name).
+    Возвращает True, если индекс создан.
+    """
+    columns = tuple(columns)
+    if any(prefix[: len(columns)] == columns for prefix in _index_prefixes(conn, table)):
+        return False
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+    return True
+
+
+def _create_lookup_indexes(conn: sqlite3.Connection) -> None:
+    ensure_index(conn, "idx_project_permissions_project_name", "project_permissions", ["project_name"])
+    ensure_index(conn, "idx_default_filters_role_report", "default_filters", ["role", "report_name"])
+    ensure_index(conn, "idx_default_filters_report_name", "default_filters", ["report_name"])
+    ensure_index(conn, "idx_report_parameters_report_name", "report_parameters", ["report_name"])
+    ensure_index(conn, "idx_password_reset_tokens_username", "password_reset_tokens", ["username"])
+
+
+def _enable_incremental_vacuum(conn: sqlite3.Connection) -> None:
+    """
+    Режим auto_vacuum=INCREMENTAL: свободные страницы возвращаются системе шагами
+    PRAGMA incremental_vacuum (log_retention) без полного VACUUM. Новая БД получает режим
+    сразу (см. migrate), существующая — после одного ручного сжатия (log_retention.vacuum_main_db).
+    """
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+
+# (версия, описание, функция применения) — по возрастанию версии; применённые миграции не меняются
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "Базовые таблицы приложения", _create_base_tables),
+    (2, "Индексы журнала действий", _create_log_indexes),
+    (
+        3,
+        "Индексы прав доступа к проектам, фильтров, параметров отчётов и токенов сброса пароля",
+        _create_lookup_indexes,
+    ),
+    (4, "Инкрементальное освобождение свободных страниц (auto_vacuum)", _enable_incremental_vacuum),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Текущая версия схемы (0 — миграции ещё не применялись)."""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0  # таблицы schema_version ещё нет
+    return row[0] or 0
+
+
+def migrate(conn: sqlite3.Connection) -> List[int]:
+    """Применяет недостающие миграции по порядку. Возвращает применённые версии."""
+    if get_schema_version(conn) >= LATEST_VERSION:
+        return []
+    if conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0:
+        # Новая (пустая) БД: режим auto_vacuum применяет VACUUM, пока таблиц нет — он мгновенный
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    conn.execute(_SCHEMA_VERSION_SQL)
+    conn.commit()
+    applied = []
+    for version, description, apply in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Версию перечитываем под блокировкой записи: миграцию мог применить другой процесс
+            if version <= get_schema_version(conn):
+                conn.rollback()
+                continue
+            apply(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (version, description, datetime.now().isoformat()),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+        _log.info("Схема БД: применена миграция %s (%s)", version, description)
+    return applied
+
+
+def _query_name(function: str, parts: Sequence[str]) -> str:
+    return f"{function} ({', '.join(parts)})" if parts else function
+
+
+def app_queries() -> List[Tuple[str, str, Tuple]]:
+    """
+    Запросы приложения для index_advisor_report: (где используется, SQL, пример параметров).
+    SQL берётся из модулей, которые выполняют запросы, поэтому отчёт не расходится с кодом.
+    Модули импортируются здесь, а не в начале файла: log_retention сам импортирует migrations.
+    """
+    import auth
+    import filters
+    import log_retention
+    import logger
+    import permissions
+    import report_params
+    import settings
+
+    queries = [
+        ("auth.authenticate", auth.AUTHENTICATE_SQL, ("u",)),
+        ("auth.authenticate (last_login)", auth.UPDATE_LAST_LOGIN_SQL, ("t", 1)),
+        ("auth.generate_reset_token", auth.DELETE_UNUSED_RESET_TOKENS_SQL, ("u",)),
+        ("auth.verify_reset_token", auth.VERIFY_RESET_TOKEN_SQL, ("t",)),
+        ("settings.get_setting", settings.GET_SETTING_SQL, ("k",)),
+        ("permissions.has_project_access", permissions.HAS_PROJECT_ACCESS_SQL, (1, "p")),
+        ("permissions.get_user_projects", permissions.USER_PROJECTS_SQL, (1,)),
+        ("permissions.get_project_users", permissions.PROJECT_USERS_SQL, ("p",)),
+        ("permissions.get_all_projects", permissions.ALL_PROJECTS_SQL, ()),
+        ("filters.get_default_filters", filters.DEFAULT_FILTERS_SQL, ("r", "n")),
+        ("filters.get_all_default_filters (role)", filters.ALL_DEFAULT_FILTERS_SQL + " WHERE role = ?", ("r",)),
+        ("filters.get_all_default_filters (report)", filters.ALL_DEFAULT_FILTERS_SQL + " WHERE report_name = ?", ("n",)),
+        ("report_params.get_report_parameter", report_params.GET_REPORT_PARAMETER_SQL, ("n", "k")),
+        ("report_params.get_all_report_parameters", report_params.GET_ALL_REPORT_PARAMETERS_SQL, ("n",)),
+        (
+            "log_retention.archive_old_logs",
+            log_retention.ARCHIVE_CANDIDATES_SQL,
+            ("2000-01-01", "", 0, 1000),
+        ),
+    ]
+    # Страницы и количество записей журнала по всем сочетаниям фильтров
+    for username, action in ((None, None), ("u", None), (None, "a"), ("u", "a")):
+        filters_used = [name for name, value in (("username", username), ("action", action)) if value]
+        for before in (None, ("t", 1)):
+            parts = filters_used + (["cursor"] if before else [])
+            sql, params = logger.logs_page_query(username, action, before, 100)
+            queries.append((_query_name("logger.get_logs", parts), sql, tuple(params)))
+        sql, params = logger.logs_count_query(username, action)
+        queries.append((_query_name("logger.get_logs_count", filters_used), sql, tuple(params)))
+        sql, params = logger.logs_new_rows_query(username, action, 1)
+        queries.append(
+            (_query_name("logger.get_logs_count", filters_used + ["approximate"]), sql, tuple(params))
+        )
+    for column in ("username", "action"):
+        queries.append(
+            (f"logger.get_log_distinct_values ({column})", logger.log_distinct_values_query(column), ())
+        )
+    return queries
+
+
+_EQUALITY_RE = re.compile(r"(?:\b\w+\.)?\b(\w+)\s*=\s*\?")
+_TABLE_RE = re.compile(r"\b(?:FROM|UPDATE|INTO)\s+(\w+)", re.IGNORECASE)
+# Шаг плана «просмотр»: SCAN <таблица или подзапрос WITH> (в старых SQLite — SCAN TABLE <таблица>)
+_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+
+def _suggest_index(sql: str, with_order: bool) -> Optional[str]:
+    """
+    Индекс по колонкам условий равенства запроса, а при with_order (сортировка во временном
+    B-дереве) — и по колонкам ORDER BY.
+    """
+    table = _TABLE_RE.search(sql)
+    if not table:
+        return None
+    parts = re.split(r"\bORDER\s+BY\b", sql, maxsplit=1, flags=re.IGNORECASE)
+    where = re.split(r"\bWHERE\b", parts[0], maxsplit=1, flags=re.IGNORECASE)
+    condition = re.split(r"\b(?:GROUP|LIMIT)\b", where[1], maxsplit=1)[0] if len(where) > 1 else ""
+    columns = [c for c in _EQUALITY_RE.findall(condition) if c.lower() != "id"]
+    if with_order and len(parts) > 1:
+        order = re.split(r"\bLIMIT\b", parts[1], maxsplit=1, flags=re.IGNORECASE)[0]
+        for item in order.split(","):
+            words = item.split()
+            column = words[0].split(".")[-1] if words else ""
+            # id — это rowid, он и так входит в каждый индекс
+            if column and column.lower() != "id":
+                columns.append(column)
+    if not columns:
+        return None
+    columns = list(dict.fromkeys(columns))
+    name = f"idx_{table.group(1)}_{'_'.join(columns)}"
+    return f"CREATE INDEX {name} ON {table.group(1)} ({', '.join(columns)})"
+
+
+def index_advisor_report(
+    conn: Optional[sqlite3.Connection] = None,
+    queries: Optional[Sequence[Tuple[str, str, Tuple]]] = None,
+) -> List[Dict]:
+    """
+    Планы запросов приложения: для каждого — строки EXPLAIN QUERY PLAN, признаки полного
+    просмотра таблицы (SCAN без индекса или SCAN индекса при условиях WHERE) и сортировки во временном B-дереве,
+    предлагаемый индекс (по условиям равенства и, для сортировки, по ORDER BY).
+    """
+    own_connection = conn is None
+    if own_connection:
+        from db import connect
+
+        conn = connect()
+    if queries is None:
+        queries = app_queries()
+    report = []
+    try:
+        # Просмотр подзапроса WITH (рекурсивного перебора значений) — не просмотр таблицы
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for name, sql, params in queries:
+            try:
+                plan = [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+            except sqlite3.Error as e:
+                report.append({"query": name, "plan": [], "error": str(e)})
+                continue
+            # Просмотр индекса целиком при наличии условий — тоже полный просмотр
+            has_where = re.search(r"\bWHERE\b", sql, re.IGNORECASE) is not None
+            full_scan = False
+            for step in plan:
+                scan = _SCAN_RE.match(step)
+                if scan and scan.group(1) in tables and (" INDEX " not in step or has_where):
+                    full_scan = True
+            temp_sort = any("TEMP B-TREE" in step for step in plan)
+            order_sort = any("TEMP B-TREE FOR ORDER BY" in step for step in plan)
+            report.append(
+                {
+                    "query": name,
+                    "plan": plan,
+                    "full_scan": full_scan,
+                    "temp_sort": temp_sort,
+                    "suggestion": (
+                        _suggest_index(sql, order_sort) if full_scan or order_sort else None
+                    ),
+                }
+            )
+    finally:
+        if own_connection:
+            conn.close()
+    return report
+
+
+if __name__ == "__main__":
+    from db import connect
+
+    connection = connect()
+    try:
+        print(f"Версия схемы: {get_schema_version(connection)} из {LATEST_VERSION}")
+        for item in index_advisor_report(connection):
+            if item.get("error"):
+                status = f"ошибка: {item['error']}"
+            elif item["full_scan"]:
+                status = "ПОЛНЫЙ ПРОСМОТР"
+            elif item["temp_sort"]:
+                status = "сортировка во временном B-дереве"
+            else:
+                status = "ok"
+            print(f"{item['query']}: {status}")
+            for step in item["plan"]:
+                print(f"    {step}")
+            if item.get("suggestion"):
+                print(f"    предлагается: {item['suggestion']}")
+    finally:
+        connection.close()
@@ -34,8 +34,8 @@ def load_custom_css():
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime
-import sqlite3
 
 from auth import (
     check_authentication,
@@ -47,10 +47,22 @@ from auth import (
     init_db,
     render_sidebar_menu,
 )
-from config import DB_PATH
-from logger import log_action, get_logs, get_logs_count
+from db import connect
+from logger import log_action, get_logs_count, get_logs_page, get_log_distinct_values
+from log_retention import vacuum_main_db
 from settings import get_setting, set_setting, get_all_settings, SETTING_KEYS
 from utils import format_dataframe_as_html
+from report_params import initialize_predefined_parameters
+from budget_rules import (
+    BUILTIN_BUDGET_RULES,
+    RULE_FIRST_MIDDLE_LAST,
+    RULE_KINDS,
+    RULE_WEIGHTS,
+    budget_rule_percents,
+    delete_budget_rule,
+    get_budget_rules,
+    register_budget_rule,
+)
 from permissions import (
     grant_project_access,
     revoke_project_access,
@@ -99,6 +111,9 @@ except ImportError as e:
 # Инициализация базы данных
 init_db()
 
+# Предопределённые параметры отчётов (в том числе хранилище пользовательских правил бюджета)
+initialize_predefined_parameters()
+
 
 # ┌──────────────────────────────────────────────────────────────────────────┐ #
 # │ ⊗ Красивый формат даты ¤ Start                                           │ #
@@ -556,7 +571,7 @@ if user is not None:
     # tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(
     # tab1, tab2, tab4, tab5, tab6, tab7 = st.tabs(
     # tab1, tab2, tab4, tab5, tab6 = st.tabs(
-    tab1, tab2, tab4, tab6 = st.tabs(
+    tab1, tab2, tab4, tab6, tab8 = st.tabs(
         [
             # "👥 Управление пользователями",
             # "📊 Статистика",
@@ -576,6 +591,7 @@ if user is not None:
             # "Права доступа к проектам",
             "Права доступа",
             # "Фильтры по умолчанию",
+            "Правила бюджета",
         ]
     )
 
@@ -594,7 +610,7 @@ if user is not None:
 
         st.markdown("<h3 class='Muquhununee'>Список пользователей</h3>", unsafe_allow_html=True)
 
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -704,7 +720,7 @@ if user is not None:
         # Изменение роли пользователя
         st.markdown("### Изменить роль пользователя")
 
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
         cursor.execute(
             "SELECT id, username, role FROM users WHERE is_active = 1 ORDER BY username"
@@ -742,7 +758,7 @@ if user is not None:
 
                 if submitted:
                     if new_role != current_role:
-                        conn = sqlite3.connect(DB_PATH)
+                        conn = connect()
                         cursor = conn.cursor()
                         cursor.execute(
                             "UPDATE users SET role = ? WHERE id = ?",
@@ -780,7 +796,7 @@ if user is not None:
 
         st.markdown("<h2 class='Duquhununee'>Статистика системы</h2>", unsafe_allow_html=True)
 
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
 
         # Общая статистика
@@ -1053,39 +1069,62 @@ if user is not None:
 
         with col1:
 
-            conn = sqlite3.connect(DB_PATH)
-
-            usernames = pd.read_sql_query(
-                "SELECT DISTINCT username FROM user_activity_logs ORDER BY username",
-                conn
-            )["username"].tolist()
-
-            conn.close()
+            usernames = get_log_distinct_values("username")
 
             filter_username = st.selectbox("Фильтр по пользователю", ["Все"] + usernames)
 
         with col2:
 
-            conn = sqlite3.connect(DB_PATH)
-
-            actions = pd.read_sql_query(
-                "SELECT DISTINCT action FROM user_activity_logs ORDER BY action",
-                conn
-            )["action"].tolist()
-
-            conn.close()
+            actions = get_log_distinct_values("action")
 
             filter_action = st.selectbox("Фильтр по действию", ["Все"] + actions)
 
         with col3:
 
-            log_limit = st.number_input("Количество записей", 10, 1000, 100, 10)
+            log_limit = st.number_input("Записей на странице", 10, 1000, 100, 10)
+
+        include_archive = st.checkbox(
+            "Включая архив (записи старше срока хранения)", key="logs_include_archive"
+        )
 
         username_filter = None if filter_username == "Все" else filter_username
         action_filter = None if filter_action == "Все" else filter_action
 
+        # Постраничный просмотр по курсору: в стеке — курсоры уже открытых страниц.
+        # При смене фильтров или размера страницы возвращаемся к первой странице
+        logs_query = (username_filter, action_filter, int(log_limit), include_archive)
+        if st.session_state.get("logs_query") != logs_query:
+            st.session_state["logs_query"] = logs_query
+            st.session_state["logs_cursors"] = [None]
+        cursors = st.session_state["logs_cursors"]
+
         # Получаем логи
-        logs = get_logs(limit=log_limit, username=username_filter, action=action_filter)
+        logs, next_cursor = get_logs_page(
+            int(log_limit),
+            username=username_filter,
+            action=action_filter,
+            before=cursors[-1],
+            include_archive=include_archive,
+        )
+        total_logs = get_logs_count(
+            username=username_filter, action=action_filter, include_archive=include_archive
+        )
+
+        first_row = (len(cursors) - 1) * int(log_limit) + 1
+        nav_prev, nav_info, nav_next = st.columns([1, 3, 1])
+        with nav_prev:
+            if st.button("← Новее", disabled=len(cursors) == 1, key="logs_newer"):
+                cursors.pop()
+                st.rerun()
+        with nav_info:
+            if logs:
+                st.caption(
+                    f"Записи {first_row}–{first_row + len(logs) - 1} из ≈{total_logs:,}".replace(",", " ")
+                )
+        with nav_next:
+            if st.button("Старее →", disabled=next_cursor is None, key="logs_older"):
+                cursors.append(next_cursor)
+                st.rerun()
 
         if logs:
 
@@ -1127,6 +1166,26 @@ if user is not None:
         else:
             st.info("Логи не найдены")
 
+        st.markdown("---")
+
+        # Полное сжатие БД — только вручную (перенос журнала освобождает страницы шагами)
+        st.markdown("### Сжатие базы данных")
+        st.caption(
+            "Перестраивает файл БД целиком — на это время вход в систему и запись действий "
+            "ожидают. Выполняйте в период низкой нагрузки."
+        )
+        if st.button("Сжать базу данных", key="vacuum_main_db"):
+            try:
+                vacuumed = vacuum_main_db()
+            except Exception as e:
+                st.error(f"❌ Ошибка при сжатии базы данных: {e}")
+            else:
+                if vacuumed is None:
+                    st.warning("⚠️ Выполняется перенос журнала в архив, повторите позже")
+                else:
+                    log_action(user["username"], "vacuum_main_db", "Выполнено сжатие базы данных")
+                    st.success("✅ База данных сжата")
+
     # ┌──────────────────────────────────────────────────────────────────────┐ #
     # │ ⊗ TAB 4: Логи действий ¤ End                                         │ #
     # └──────────────────────────────────────────────────────────────────────┘ #
@@ -1245,7 +1304,7 @@ if user is not None:
             col1, col2 = st.columns(2)
 
             with col1:
-                conn = sqlite3.connect(DB_PATH)
+                conn = connect()
                 cursor = conn.cursor()
                 cursor.execute(
                     "SELECT id, username FROM users WHERE is_active = 1 ORDER BY username"
@@ -1671,3 +1730,170 @@ if user is not None:
     # ┌──────────────────────────────────────────────────────────────────────┐ #
     # │ ⊗ TAB 7: Фильтры по умолчанию ¤ End                                  │ #
     # └──────────────────────────────────────────────────────────────────────┘ #
+
+    # ┌──────────────────────────────────────────────────────────────────────┐ #
+    # │ ⊗ TAB 8: Правила распределения бюджета ¤ Start                       │ #
+    # └──────────────────────────────────────────────────────────────────────┘ #
+
+    with tab8:
+
+        st.markdown("<h2 class='Duquhununee'>Правила распределения бюджета</h2>", unsafe_allow_html=True)
+
+        st.info(
+            """
+        Правила задают доли месяцев этапа в утвержденном и прогнозном бюджете.
+        Встроенные правила изменить нельзя, пользовательские можно добавлять, заменять и удалять.
+        """
+        )
+
+        budget_rules = get_budget_rules()
+
+        # Список правил
+        st.markdown("### Доступные правила")
+
+        rules_data = []
+        for rule_key, rule in budget_rules.items():
+            rules_data.append(
+                {
+                    "Ключ": rule_key,
+                    "Название": rule.get("name") or rule_key,
+                    "Вид": RULE_KINDS.get(rule.get("kind"), rule.get("kind")),
+                    "Тип": "Встроенное" if rule_key in BUILTIN_BUDGET_RULES else "Пользовательское",
+                    "Описание": rule.get("description") or "-",
+                }
+            )
+        st.dataframe(pd.DataFrame(rules_data), use_container_width=True, hide_index=True)
+
+        # Доли месяцев по правилу для этапа заданной длины
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            preview_rule_key = st.selectbox(
+                "Правило",
+                options=list(budget_rules.keys()),
+                format_func=lambda key: budget_rules[key].get("name") or key,
+                key="budget_rule_preview",
+            )
+        with col2:
+            preview_months = st.number_input(
+                "Длина этапа, мес.", min_value=1, max_value=60, value=6, step=1
+            )
+        preview_percents = budget_rule_percents(
+            budget_rules[preview_rule_key],
+            np.arange(int(preview_months)),
+            np.full(int(preview_months), int(preview_months)),
+        )
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "Месяц этапа": np.arange(1, int(preview_months) + 1),
+                    "Доля, %": np.round(preview_percents * 100, 2),
+                }
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+        st.markdown("---")
+
+        # Добавление правила
+        st.markdown("### Добавить или заменить правило")
+
+        with st.form("budget_rule_form"):
+            col1, col2 = st.columns(2)
+
+            with col1:
+                new_rule_key = st.text_input(
+                    "Ключ правила *", help="Латиница без пробелов, например custom_60_35_5"
+                )
+                new_rule_name = st.text_input("Название *")
+                new_rule_kind = st.selectbox(
+                    "Вид правила",
+                    options=list(RULE_KINDS.keys()),
+                    format_func=lambda kind: RULE_KINDS[kind],
+                )
+                new_rule_description = st.text_area("Описание")
+
+            with col2:
+                st.caption("Для вида «Первый / промежуточные / последний месяц», сумма — 100%")
+                first_percent = st.number_input(
+                    "Первый месяц, %", min_value=0.0, max_value=100.0, value=50.0, step=1.0
+                )
+                middle_percent = st.number_input(
+                    "Промежуточные месяцы, %", min_value=0.0, max_value=100.0, value=45.0, step=1.0
+                )
+                last_percent = st.number_input(
+                    "Последний месяц, %", min_value=0.0, max_value=100.0, value=5.0, step=1.0
+                )
+                st.caption("Для вида «Вектор весов»")
+                weights_text = st.text_input(
+                    "Веса через запятую", help="Например: 1, 3, 4, 2 — растягиваются на длину этапа"
+                )
+
+            submitted = st.form_submit_button("Сохранить правило", type="primary")
+
+            if submitted:
+                new_rule_key = new_rule_key.strip()
+                if not new_rule_key or not new_rule_name.strip():
+                    st.warning("Введите ключ и название правила")
+                else:
+                    new_rule = {
+                        "kind": new_rule_kind,
+                        "name": new_rule_name.strip(),
+                        "description": new_rule_description.strip(),
+                    }
+                    if new_rule_kind == RULE_FIRST_MIDDLE_LAST:
+                        new_rule["first_month_percent"] = first_percent / 100
+                        new_rule["middle_months_percent"] = middle_percent / 100
+                        new_rule["last_month_percent"] = last_percent / 100
+                    elif new_rule_kind == RULE_WEIGHTS:
+                        new_rule["weights"] = [
+                            w.strip() for w in weights_text.split(",") if w.strip()
+                        ]
+
+                    error = register_budget_rule(new_rule_key, new_rule, user["username"])
+                    if error:
+                        st.error(f"❌ {error}")
+                    else:
+                        log_action(
+                            user["username"],
+                            "register_budget_rule",
+                            f"Сохранено правило распределения бюджета {new_rule_key}",
+                        )
+                        st.success(f"✅ Правило {new_rule_key} сохранено!")
+                        st.rerun()
+
+        st.markdown("---")
+
+        # Удаление правила
+        st.markdown("### Удалить пользовательское правило")
+
+        custom_rule_keys = [key for key in budget_rules if key not in BUILTIN_BUDGET_RULES]
+
+        if custom_rule_keys:
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                rule_to_delete = st.selectbox(
+                    "Правило",
+                    options=custom_rule_keys,
+                    format_func=lambda key: f"{budget_rules[key].get('name') or key} ({key})",
+                    key="budget_rule_delete",
+                )
+            with col2:
+                if st.button("Удалить", key="delete_budget_rule"):
+                    error = delete_budget_rule(rule_to_delete, user["username"])
+                    if error:
+                        st.error(f"❌ {error}")
+                    else:
+                        log_action(
+                            user["username"],
+                            "delete_budget_rule",
+                            f"Удалено правило распределения бюджета {rule_to_delete}",
+                        )
+                        st.success(f"✅ Правило {rule_to_delete} удалено!")
+                        st.rerun()
+        else:
+            st.info("Пользовательских правил нет")
+
+    # ┌──────────────────────────────────────────────────────────────────────┐ #
+    # │ ⊗ TAB 8: Правила распределения бюджета ¤ End                         │ #
+    # └──────────────────────────────────────────────────────────────────────┘ #
@@ -1,11 +1,28 @@
 """
 Модуль для управления правами доступа к проектам
 """
-import sqlite3
 from datetime import datetime
 from typing import Optional, List, Dict
 
-from config import DB_PATH
+from db import connect
+
+# Запросы проверки прав (их планы проверяет migrations.index_advisor_report)
+USER_PROJECTS_SQL = """
+    SELECT project_name FROM project_permissions
+    WHERE user_id = ?
+"""
+PROJECT_USERS_SQL = """
+    SELECT user_id FROM project_permissions
+    WHERE project_name = ?
+"""
+HAS_PROJECT_ACCESS_SQL = """
+    SELECT COUNT(*) FROM project_permissions
+    WHERE user_id = ? AND project_name = ?
+"""
+ALL_PROJECTS_SQL = """
+    SELECT DISTINCT project_name FROM project_permissions
+    ORDER BY project_name
+"""
 
 
 def grant_project_access(user_id: int, project_name: str, granted_by: Optional[str] = None) -> bool:
@@ -21,7 +38,7 @@ def grant_project_access(user_id: int, project_name: str, granted_by: Optional[s
         True если успешно, False если ошибка
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
         cursor.execute("""
             INSERT OR IGNORE INTO project_permissions (user_id, project_name, created_at, granted_by)
@@ -49,7 +66,7 @@ def revoke_project_access(user_id: int, project_name: str) -> bool:
         True если успешно, False если ошибка
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
         cursor.execute("""
             DELETE FROM project_permissions 
@@ -76,12 +93,9 @@ def get_user_projects(user_id: int) -> List[str]:
         Список названий проектов
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT project_name FROM project_permissions 
-            WHERE user_id = ?
-        """, (user_id,))
+        cursor.execute(USER_PROJECTS_SQL, (user_id,))
         projects = [row[0] for row in cursor.fetchall()]
         conn.close()
         return projects
@@ -102,12 +116,9 @@ def get_project_users(project_name: str) -> List[int]:
         Список ID пользователей
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT user_id FROM project_permissions 
-            WHERE project_name = ?
-        """, (project_name,))
+        cursor.execute(PROJECT_USERS_SQL, (project_name,))
         user_ids = [row[0] for row in cursor.fetchall()]
         conn.close()
         return user_ids
@@ -125,7 +136,7 @@ def get_all_project_permissions() -> List[Dict]:
         Список словарей с информацией о правах доступа
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
         cursor.execute("""
             SELECT 
@@ -174,12 +185,9 @@ def has_project_access(user_id: int, project_name: str) -> bool:
         True если есть доступ, False если нет
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT COUNT(*) FROM project_permissions 
-            WHERE user_id = ? AND project_name = ?
-        """, (user_id, project_name))
+        cursor.execute(HAS_PROJECT_ACCESS_SQL, (user_id, project_name))
         count = cursor.fetchone()[0]
         conn.close()
         return count > 0
@@ -197,12 +205,9 @@ def get_all_projects() -> List[str]:
         Список уникальных названий проектов
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT DISTINCT project_name FROM project_permissions 
-            ORDER BY project_name
-        """)
+        cursor.execute(ALL_PROJECTS_SQL)
         projects = [row[0] for row in cursor.fetchall()]
         conn.close()
         return projects
@@ -22,7 +22,8 @@ from auth import (
     get_user_by_username,
 )
 from data_loader import (
-    load_data,
+    load_files,
+    get_data,
     ensure_data_session_state,
     update_session_with_loaded_file,
     clear_all_data_for_removed_files,
@@ -917,21 +918,20 @@ def main():
         ]
         clear_all_data_for_removed_files(files_to_remove)
 
-        for uploaded_file in uploaded_files:
-            file_id = uploaded_file.name
-            if file_id in st.session_state.loaded_files_info:
-                continue
-            df_loaded = load_data(uploaded_file, file_id)
-            if df_loaded is not None:
-                update_session_with_loaded_file(df_loaded, file_id)
+        # Новые файлы разбираются параллельно, в сессию добавляются в порядке загрузки
+        new_files = [
+            f for f in uploaded_files if f.name not in st.session_state.loaded_files_info
+        ]
+        for file_id, df_loaded in load_files(new_files):
+            update_session_with_loaded_file(df_loaded, file_id)
 
     # Use project data as main df for backward compatibility
-    df = st.session_state.project_data
+    df = get_data("project")
 
     # Dashboard selection - allow access if any data is loaded (project, resources, or technique)
     has_project_data = df is not None and not df.empty
-    resources_data = st.session_state.get("resources_data")
-    technique_data = st.session_state.get("technique_data")
+    resources_data = get_data("resources")
+    technique_data = get_data("technique")
     has_resources_data = resources_data is not None and not resources_data.empty
     has_technique_data = technique_data is not None and not technique_data.empty
     has_any_data = has_project_data or has_resources_data or has_technique_data
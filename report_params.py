@@ -1,12 +1,11 @@
 """
 Модуль для работы с параметрами отчетов, редактируемыми аналитиком
 """
-import sqlite3
 import json
 from datetime import datetime
 from typing import Optional, Dict, List
 
-from config import DB_PATH
+from db import connect
 
 # Единый источник списка отчётов — dashboards.REPORT_CATEGORIES
 try:
@@ -27,6 +26,19 @@ except ImportError:
         "График движения рабочей силы",
     ]
 
+# Чтение параметров (их планы проверяет migrations.index_advisor_report)
+GET_REPORT_PARAMETER_SQL = '''
+    SELECT parameter_value, parameter_type, description, is_editable_by_analyst, updated_at, updated_by
+    FROM report_parameters
+    WHERE report_name = ? AND parameter_key = ?
+'''
+GET_ALL_REPORT_PARAMETERS_SQL = '''
+    SELECT parameter_key, parameter_value, parameter_type, description, is_editable_by_analyst, updated_at, updated_by
+    FROM report_parameters
+    WHERE report_name = ?
+    ORDER BY parameter_key
+'''
+
 # Типы параметров
 PARAMETER_TYPES = {
     'string': 'Текст',
@@ -34,7 +46,8 @@ PARAMETER_TYPES = {
     'date': 'Дата',
     'select': 'Выбор из списка',
     'task_select': 'Выбор задачи',
-    'boolean': 'Да/Нет'
+    'boolean': 'Да/Нет',
+    'json': 'JSON'
 }
 
 # Предопределенные параметры для отчетов
@@ -62,6 +75,15 @@ PREDEFINED_PARAMETERS = {
             'editable': True
         }
     ],
+    "Утвержденный бюджет": [
+        {
+            'key': 'budget_rules',
+            'name': 'Пользовательские правила распределения бюджета',
+            'type': 'json',
+            'description': 'Правила распределения бюджета этапа по месяцам (см. budget_rules.py)',
+            'editable': False
+        }
+    ],
     "Отклонение текущего срока от базового плана": [
         {
             'key': 'selected_task_for_plan_fact',
@@ -85,14 +107,10 @@ def get_report_parameter(report_name: str, parameter_key: str) -> Optional[Dict]
     Returns:
         Словарь с информацией о параметре или None
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT parameter_value, parameter_type, description, is_editable_by_analyst, updated_at, updated_by
-        FROM report_parameters
-        WHERE report_name = ? AND parameter_key = ?
-    ''', (report_name, parameter_key))
+    cursor.execute(GET_REPORT_PARAMETER_SQL, (report_name, parameter_key))
     
     result = cursor.fetchone()
     conn.close()
@@ -108,7 +126,7 @@ def get_report_parameter(report_name: str, parameter_key: str) -> Optional[Dict]
                 parsed_value = value
         elif param_type == 'boolean':
             parsed_value = value.lower() == 'true' if value else False
-        elif param_type in ['select', 'task_select']:
+        elif param_type in ['select', 'task_select', 'json']:
             try:
                 parsed_value = json.loads(value) if value else None
             except:
@@ -138,15 +156,10 @@ def get_all_report_parameters(report_name: str) -> Dict[str, Dict]:
     Returns:
         Словарь параметров {parameter_key: parameter_info}
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT parameter_key, parameter_value, parameter_type, description, is_editable_by_analyst, updated_at, updated_by
-        FROM report_parameters
-        WHERE report_name = ?
-        ORDER BY parameter_key
-    ''', (report_name,))
+    cursor.execute(GET_ALL_REPORT_PARAMETERS_SQL, (report_name,))
     
     parameters = {}
     for row in cursor.fetchall():
@@ -160,7 +173,7 @@ def get_all_report_parameters(report_name: str) -> Dict[str, Dict]:
                 parsed_value = value
         elif param_type == 'boolean':
             parsed_value = value.lower() == 'true' if value else False
-        elif param_type in ['select', 'task_select']:
+        elif param_type in ['select', 'task_select', 'json']:
             try:
                 parsed_value = json.loads(value) if value else None
             except:
@@ -200,7 +213,7 @@ def set_report_parameter(report_name: str, parameter_key: str, parameter_value:
         True если успешно
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
         
         # Преобразуем значение в строку для хранения
@@ -248,7 +261,7 @@ def set_report_parameter(report_name: str, parameter_key: str, parameter_value:
 def delete_report_parameter(report_name: str, parameter_key: str) -> bool:
     """Удаление параметра отчета"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
         
         cursor.execute('''
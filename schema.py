@@ -0,0 +1,193 @@
+"""
+Реестр схемы данных: канонические поля и варианты названий колонок в загружаемых файлах.
+Поиск колонки по вариантам названий кэшируется по набору колонок, поэтому на каждом
+перезапуске скрипта Streamlit дашборды получают готовое сопоставление, а не перебирают
+все колонки заново. Сопоставление всех полей считается один раз при загрузке (resolve_schema)
+и хранится в df.attrs["schema"].
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+# Режимы сопоставления
+MATCH_WORDS = "words"  # точное / подстрока / все значимые слова варианта есть в колонке
+MATCH_PARTIAL = "partial"  # точное или подстрока в любую сторону
+MATCH_EXACT = "exact"  # точное совпадение после strip
+
+# Каноническое поле -> (варианты названий, режим). Варианты совпадают с теми,
+# что передают дашборды, чтобы сопоставление при загрузке прогревало общий кэш.
+SCHEMA_FIELDS: Dict[str, Tuple[Tuple[str, ...], str]] = {
+    # Данные проекта
+    "project": (("Проект", "project"), MATCH_WORDS),
+    "task": (("Задача", "task"), MATCH_WORDS),
+    "section": (("Раздел", "section"), MATCH_WORDS),
+    "plan_start": (("Старт План", "План Старт"), MATCH_WORDS),
+    "plan_end": (("Конец План", "План Конец"), MATCH_WORDS),
+    "base_start": (("Старт Факт", "Факт Старт"), MATCH_WORDS),
+    "base_end": (("Конец Факт", "Факт Конец"), MATCH_WORDS),
+    "budget_plan": (
+        ("budget plan", "Бюджет План", "Бюджет план", "Budget Plan", "budget_plan"),
+        MATCH_EXACT,
+    ),
+    "budget_fact": (
+        ("budget fact", "Бюджет Факт", "Бюджет факт", "Budget Fact", "budget_fact"),
+        MATCH_EXACT,
+    ),
+    # Рабочая/проектная документация
+    "rd_deviation": (
+        (
+            "Отклонение разделов РД",
+            "Отклонение разделов рд",
+            "отклонение разделов рд",
+            "Отклон. Количества разделов РД",
+            "Отклонение количества разделов РД",
+            "Отклон. разделов РД",
+            "Отклонение разделов РД по Договору",
+        ),
+        MATCH_WORDS,
+    ),
+    "rd_count": (
+        (
+            "Количество разделов РД по Договору",
+            "Количество разделов РД",
+            "РД по Договору",
+            "разделов РД",
+            "Количетсов разделов РД по Договору",
+            "Количество разделов РД по договору",
+        ),
+        MATCH_WORDS,
+    ),
+    "rd_plan": (
+        ("РД по Договору", "РД по договору", "рд по договору", "РД по Договору"),
+        MATCH_WORDS,
+    ),
+    "rd_on_approval": (("На согласовании", "согласовании"), MATCH_WORDS),
+    "rd_in_production": (
+        ("Выдано в производство работ", "производство работ", "в производство"),
+        MATCH_WORDS,
+    ),
+    "rd_issued_to_contractor": (("Выдана подрядчику", "подрядчику"), MATCH_WORDS),
+    "rd_rework": (("На доработке", "доработке"), MATCH_WORDS),
+    # Ресурсы / техника
+    "contractor": (
+        ("Контрагент", "контрагент", "Подразделение", "подразделение", "contractor"),
+        MATCH_PARTIAL,
+    ),
+    "resource_project": (("Проект", "проект", "project", "Project"), MATCH_PARTIAL),
+    "period": (("Период", "период", "period", "Месяц", "месяц", "month"), MATCH_PARTIAL),
+    "average": (
+        ("Среднее за неделю", "Среднее за месяц", "среднее", "average"),
+        MATCH_PARTIAL,
+    ),
+    "delta": (("Дельта", "дельта", "delta", "Delta", "Дельта (без %)"), MATCH_PARTIAL),
+    "delta_pct": (
+        (
+            "Дельта (%)",
+            "Дельта %",
+            "дельта (%)",
+            "дельта %",
+            "Delta %",
+            "delta %",
+            "Дельта(%)",
+            "Дельта%",
+        ),
+        MATCH_PARTIAL,
+    ),
+}
+for _week in range(1, 6):
+    SCHEMA_FIELDS[f"week_{_week}"] = (
+        (f"{_week} неделя", f"{_week} недел", f"недел {_week}", f"week {_week}"),
+        MATCH_PARTIAL,
+    )
+
+
+def _normalize_name(col) -> str:
+    return str(col).replace("\n", " ").replace("\r", " ").strip().lower()
+
+
+@lru_cache(maxsize=4096)
+def _match(columns: Tuple, names: Tuple[str, ...], mode: str):
+    """Первая колонка (в порядке df.columns), подходящая под любой из вариантов names."""
+    if mode == MATCH_EXACT:
+        wanted = {str(name).strip() for name in names}
+        for col in columns:
+            if str(col).strip() in wanted:
+                return col
+        return None
+
+    if mode == MATCH_PARTIAL:
+        lowered = [str(name).lower().strip() for name in names]
+        for col in columns:
+            col_lower = str(col).lower().strip()
+            for name_lower in lowered:
+                if (
+                    name_lower == col_lower
+                    or name_lower in col_lower
+                    or col_lower in name_lower
+                ):
+                    return col
+        return None
+
+    prepared = []
+    for name in names:
+        name_lower = name.lower().strip()
+        prepared.append((name_lower, [w for w in name_lower.split() if len(w) > 2]))
+    for col in columns:
+        col_lower = _normalize_name(col)
+        for name_lower, name_words in prepared:
+            # Точное совпадение или подстрока
+            if name_lower == col_lower or name_lower in col_lower or col_lower in name_lower:
+                return col
+            # Все значимые слова варианта есть в названии колонки
+            if name_words and all(word in col_lower for word in name_words):
+                return col
+
+    # Колонка количества разделов РД: ищем по ключевым словам
+    if any(
+        "разделов" in n.lower() and "рд" in n.lower() and "договор" in n.lower()
+        for n in names
+    ):
+        key_words = [w for w in ("разделов", "рд", "договор", "количество") if len(w) > 3]
+        for col in columns:
+            col_lower = str(col).lower().replace("\n", " ").replace("\r", " ")
+            if all(word in col_lower for word in key_words):
+                return col
+    return None
+
+
+def find_column(df: pd.DataFrame, possible_names: Iterable[str]) -> Optional[str]:
+    """Колонка по вариантам названий: точное совпадение, подстрока или все слова варианта."""
+    return _match(tuple(df.columns), tuple(possible_names), MATCH_WORDS)
+
+
+def find_column_by_partial(df: pd.DataFrame, possible_names: Iterable[str]) -> Optional[str]:
+    """Колонка по вариантам названий: точное совпадение или подстрока в любую сторону."""
+    return _match(tuple(df.columns), tuple(possible_names), MATCH_PARTIAL)
+
+
+def resolve_schema(df: pd.DataFrame) -> Dict[str, Optional[str]]:
+    """
+    Сопоставляет все канонические поля SCHEMA_FIELDS с колонками df
+    и сохраняет результат в df.attrs["schema"].
+    """
+    columns = tuple(df.columns)
+    mapping = {
+        field: _match(columns, names, mode) for field, (names, mode) in SCHEMA_FIELDS.items()
+    }
+    df.attrs["schema"] = mapping
+    return mapping
+
+
+def get_field_column(df: pd.DataFrame, field: str) -> Optional[str]:
+    """
+    Колонка канонического поля: из df.attrs["schema"], если она есть в df,
+    иначе — сопоставление по текущим колонкам (тоже кэшированное).
+    """
+    schema = df.attrs.get("schema")
+    if schema:
+        col = schema.get(field)
+        if col is not None and col in df.columns:
+            return col
+    names, mode = SCHEMA_FIELDS[field]
+    return _match(tuple(df.columns), names, mode)
@@ -1,11 +1,13 @@
 """
 Модуль для управления настройками системы
 """
-import sqlite3
 from datetime import datetime
 from typing import Optional, Dict
 
-from config import DB_PATH
+from db import connect
+
+# Чтение настройки (его план проверяет migrations.index_advisor_report)
+GET_SETTING_SQL = "SELECT value FROM settings WHERE key = ?"
 
 # Ключи настроек
 SETTING_KEYS = {
@@ -27,9 +29,9 @@ def get_setting(key: str, default: Optional[str] = None) -> Optional[str]:
         Значение настройки или default
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
-        cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
+        cursor.execute(GET_SETTING_SQL, (key,))
         result = cursor.fetchone()
         conn.close()
         
@@ -53,7 +55,7 @@ def set_setting(key: str, value: str, description: Optional[str] = None, updated
         updated_by: Пользователь, который обновил настройку
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
         cursor.execute("""
             INSERT OR REPLACE INTO settings (key, value, description, updated_at, updated_by)
@@ -74,7 +76,7 @@ def get_all_settings() -> Dict[str, Dict]:
         Словарь с настройками
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
         cursor.execute("SELECT key, value, description, updated_at, updated_by FROM settings")
         rows = cursor.fetchall()
@@ -104,7 +106,7 @@ def delete_setting(key: str):
         key: Ключ настройки
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = connect()
         cursor = conn.cursor()
         cursor.execute("DELETE FROM settings WHERE key = ?", (key,))
         conn.commit()
@@ -3,12 +3,13 @@
 """
 import html as html_module
 import re
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
-from config import RUSSIAN_MONTHS
+from config import RUSSIAN_MONTHS, TABLE_PAGE_ROWS
 
 
 def ensure_budget_columns(df: Optional[pd.DataFrame]) -> None:
@@ -48,6 +49,21 @@ def ensure_date_columns(df: Optional[pd.DataFrame]) -> None:
                     break
 
 
+def to_datetime_series(series: pd.Series, mixed: bool = False) -> pd.Series:
+    """
+    pd.to_datetime(..., errors="coerce", dayfirst=True) для колонки дат.
+    Колонки, уже разобранные при загрузке (datetime64), возвращаются как есть.
+    mixed=True — разбор строкового представления с format="mixed" (разные форматы в одной колонке).
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    if mixed:
+        return pd.to_datetime(
+            series.astype(str), errors="coerce", dayfirst=True, format="mixed"
+        )
+    return pd.to_datetime(series, errors="coerce", dayfirst=True)
+
+
 def get_russian_month_name(period_val: Any) -> str:
     """Возвращает русское название месяца для Period, Timestamp или строки."""
     if isinstance(period_val, pd.Period):
@@ -74,6 +90,11 @@ def get_russian_month_name(period_val: Any) -> str:
     return ""
 
 
+# Идентификатор оформления графиков (apply_chart_background) для ключей кэша графиков:
+# при изменении оформления поменять, чтобы не показывать графики со старым видом
+CHART_THEME = "dark-12385C-v1"
+
+
 def apply_chart_background(fig):
     """Применяет стандартный фон #12385C к графикам для тёмной темы."""
     fig.update_layout(
@@ -218,23 +239,78 @@ def style_dataframe_for_dark_theme(
     return base
 
 
-def _parse_finance_value(v) -> Optional[float]:
-    """Извлекает число из ячейки (например '0.94 млн руб.' или '-1.20')."""
-    if v is None or (isinstance(v, float) and pd.isna(v)):
-        return None
-    try:
-        s = str(v).strip().replace(",", ".")
-        if s and s not in ("", "nan", "None"):
-            return float(s)
-    except (TypeError, ValueError):
-        pass
-    match = re.search(r"-?\d+[.,]?\d*", str(v))
-    if match:
-        try:
-            return float(match.group().replace(",", "."))
-        except (TypeError, ValueError):
-            pass
-    return None
+_FINANCE_NUMBER_RE = r"(-?\d+[.,]?\d*)"
+
+# Ячейки таблиц HTML (открывающие теги; текст ячейки уже экранирован)
+_BUDGET_TD = (
+    f'<td style="border: 1px solid rgba(255,255,255,0.2); padding: 8px; '
+    f'background-color: {TABLE_BG_COLOR}; color: {TABLE_TEXT_COLOR};">'
+)
+_BUDGET_TD_RED = (
+    '<td class="bd-cell-red" style="border: 1px solid rgba(0,0,0,0.2); padding: 8px; '
+    'font-weight: bold;"><span>'
+)
+_BUDGET_TD_GREEN = _BUDGET_TD_RED.replace("bd-cell-red", "bd-cell-green")
+
+
+def _cell_text(values: pd.Series) -> pd.Series:
+    """Текст ячеек колонки: str(значение), пропуски — пустая строка."""
+    if values.dtype.kind in "Mm":
+        text = values.map(str)
+    else:
+        text = values.astype(str)
+    return text.astype(object).where(values.notna().to_numpy(), "")
+
+
+def _escape_column(text: pd.Series) -> np.ndarray:
+    """html.escape для всей колонки сразу (как html.escape(s, quote=True))."""
+    text = text.astype(str)
+    for char, entity in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;")):
+        text = text.str.replace(char, entity, regex=False)
+    return text.to_numpy(dtype=object)
+
+
+def _join_rows(pieces, n_rows: int) -> str:
+    """
+    Строки <tr> одним буфером. pieces — части строки по порядку: строка (одинаковая для
+    всех строк таблицы) или массив длины n_rows (по строке таблицы).
+    """
+    grid = np.empty((n_rows, len(pieces) + 2), dtype=object)
+    grid[:, 0] = "<tr>"
+    for i, piece in enumerate(pieces, start=1):
+        grid[:, i] = piece
+    grid[:, -1] = "</tr>"
+    return "".join(grid.ravel().tolist())
+
+
+def _finance_values(text: pd.Series) -> pd.Series:
+    """
+    Числа из ячеек колонки отклонения ('0.94 млн руб.', '-1.20'): сначала вся строка
+    как число, иначе первое число в тексте. NaN — число не найдено.
+    """
+    stripped = text.str.strip().str.replace(",", ".", regex=False)
+    values = pd.to_numeric(stripped.where(~stripped.isin(["", "nan", "None"])), errors="coerce")
+    missing = values.isna() & (text != "")
+    if missing.any():
+        found = text[missing].str.extract(_FINANCE_NUMBER_RE, expand=False)
+        values[missing] = pd.to_numeric(found.str.replace(",", ".", regex=False), errors="coerce")
+    return values
+
+
+def _finance_cells(values: pd.Series) -> List:
+    """
+    Ячейки колонки отклонения: положительное или ноль — красный текст, отрицательное — зелёный.
+    Текст без числа красится по знаку (минус — зелёный), пустые ячейки — без раскраски.
+    """
+    text = _cell_text(values).astype(str)
+    numbers = _finance_values(text)
+    stripped = text.str.strip()
+    parsed = numbers.notna().to_numpy()
+    empty = (stripped == "").to_numpy()
+    green = np.where(parsed, (numbers < 0).to_numpy(), stripped.str.startswith("-").to_numpy())
+    opening = np.where(empty & ~parsed, _BUDGET_TD, np.where(green, _BUDGET_TD_GREEN, _BUDGET_TD_RED))
+    closing = np.where(empty & ~parsed, "</td>", "</span></td>")
+    return [opening, _escape_column(text), closing]
 
 
 def budget_table_to_html(
@@ -245,6 +321,7 @@ def budget_table_to_html(
     Строит HTML таблицы бюджета с раскраской колонки отклонения:
     положительное или ноль = красный фон, отрицательное = зелёный.
     Гарантированно работает в Streamlit (inline-стили в каждой ячейке).
+    Ячейки форматируются и экранируются по колонкам; большие таблицы — через paginate_table.
     """
     if df is None or df.empty:
         return "<p>Нет данных для отображения.</p>"
@@ -270,40 +347,85 @@ def budget_table_to_html(
             f'<th style="border: 1px solid rgba(255,255,255,0.3); padding: 8px; background-color: {TABLE_BG_COLOR};">{col_esc}</th>'
         )
     parts.append("</tr></thead><tbody>")
-    for _, row in df.iterrows():
-        parts.append("<tr>")
-        for col in df.columns:
-            val = row[col]
-            val_str = "" if (val is None or (isinstance(val, float) and pd.isna(val))) else str(val)
-            val_esc = html_module.escape(val_str)
-            if finance_deviation_column and col == finance_deviation_column:
-                num = _parse_finance_value(val)
-                if num is not None:
-                    cell_class = "bd-cell-red" if num >= 0 else "bd-cell-green"
-                    parts.append(
-                        f'<td class="{cell_class}" style="border: 1px solid rgba(0,0,0,0.2); padding: 8px; font-weight: bold;"><span>{val_esc}</span></td>'
-                    )
-                else:
-                    # Число не распарсилось — красим по тексту (минус = зелёный) или стиль по умолчанию для пустых
-                    s = val_str.strip()
-                    if not s:
-                        parts.append(
-                            f'<td style="border: 1px solid rgba(255,255,255,0.2); padding: 8px; background-color: {TABLE_BG_COLOR}; color: {TABLE_TEXT_COLOR};">{val_esc}</td>'
-                        )
-                    else:
-                        cell_class = "bd-cell-green" if (s.startswith("-") or re.search(r"^-\d", s)) else "bd-cell-red"
-                        parts.append(
-                            f'<td class="{cell_class}" style="border: 1px solid rgba(0,0,0,0.2); padding: 8px; font-weight: bold;"><span>{val_esc}</span></td>'
-                        )
-            else:
-                parts.append(
-                    f'<td style="border: 1px solid rgba(255,255,255,0.2); padding: 8px; background-color: {TABLE_BG_COLOR}; color: {TABLE_TEXT_COLOR};">{val_esc}</td>'
-                )
-        parts.append("</tr>")
+    pieces = []
+    for i, col in enumerate(df.columns):
+        values = df.iloc[:, i]
+        if finance_deviation_column and col == finance_deviation_column:
+            pieces.extend(_finance_cells(values))
+        else:
+            pieces.extend([_BUDGET_TD, _escape_column(_cell_text(values)), "</td>"])
+    parts.append(_join_rows(pieces, len(df)))
     parts.append("</tbody></table></div>")
     return "".join(parts)
 
 
+def dark_table_to_html(df: pd.DataFrame, days_column: Optional[str] = None) -> str:
+    """
+    HTML-таблица в оформлении style_dataframe_for_dark_theme (фон #12385C, белый текст) без
+    pandas Styler: для больших таблиц, которые Styler не отрисовывает. days_column — колонка
+    с днями: красный фон при > 0, зелёный при == 0.
+    """
+    if df is None or df.empty:
+        return "<p>Нет данных для отображения.</p>"
+    border = "padding: 6px 8px; border: 1px solid rgba(255,255,255,0.2);"
+    td = f'<td style="{border} background-color: {TABLE_BG_COLOR}; color: {TABLE_TEXT_COLOR};">'
+    parts = [
+        '<div style="overflow-x: auto; margin: 1em 0;">',
+        f'<table style="width:100%; border-collapse: collapse; background-color: {TABLE_BG_COLOR}; '
+        f'color: {TABLE_TEXT_COLOR}; font-size: 14px;"><thead><tr>',
+    ]
+    for col in df.columns:
+        parts.append(
+            f'<th style="{border.replace("0.2", "0.3")} background-color: {TABLE_BG_COLOR}; '
+            f'color: {TABLE_TEXT_COLOR}; text-align: left;">{html_module.escape(str(col))}</th>'
+        )
+    parts.append("</tr></thead><tbody>")
+    pieces = []
+    for i, col in enumerate(df.columns):
+        values = df.iloc[:, i]
+        opening = td
+        if days_column and col == days_column:
+            days = pd.to_numeric(values, errors="coerce")
+            opening = np.select(
+                [(days > 0).to_numpy(), (days <= 0).to_numpy()],
+                [
+                    f'<td style="{border} background-color: #c0392b; color: #ffffff;">',
+                    f'<td style="{border} background-color: #27ae60; color: #ffffff;">',
+                ],
+                default=td,
+            )
+        pieces.extend([opening, _escape_column(_cell_text(values)), "</td>"])
+    parts.append(_join_rows(pieces, len(df)))
+    parts.append("</tbody></table></div>")
+    return "".join(parts)
+
+
+def paginate_table(df: pd.DataFrame, key: str, page_rows: int = TABLE_PAGE_ROWS) -> pd.DataFrame:
+    """
+    Окно строк большой таблицы: при числе строк больше page_rows показывает выбор страницы
+    (number_input с ключом key) и возвращает только строки выбранной страницы, чтобы в
+    браузер уходило не больше page_rows строк HTML.
+    """
+    if df is None or len(df) <= page_rows:
+        return df
+    page_rows = max(1, page_rows)
+    page_count = (len(df) + page_rows - 1) // page_rows
+    page = int(
+        st.number_input(
+            f"Страница (по {page_rows} строк, всего {page_count})",
+            min_value=1,
+            max_value=page_count,
+            value=1,
+            step=1,
+            key=key,
+        )
+    )
+    start = (page - 1) * page_rows
+    stop = min(len(df), start + page_rows)
+    st.caption(f"Строки {start + 1}–{stop} из {len(df)}")
+    return df.iloc[start:stop]
+
+
 def render_styled_table_to_html(styler, hide_index: bool = True) -> str:
     """
     Возвращает HTML строку стилизованной таблицы для вывода через st.markdown(..., unsafe_allow_html=True).
@@ -345,58 +467,138 @@ def apply_default_filters(report_name: str, user_role: str, filter_widgets: dict
     return filter_widgets
 
 
+def _is_number(value) -> bool:
+    """Число для раскраски/форматирования (int/float, не пропуск)."""
+    return isinstance(value, (int, float)) and not pd.isna(value)
+
+
+def _numeric_column(values: pd.Series) -> Optional[Tuple[np.ndarray, bool]]:
+    """
+    Числовая колонка без смешения типов: (значения float, целые ли числа) или None,
+    если в колонке есть не только числа одного вида (тогда ячейки форматируются поштучно).
+    """
+    if values.dtype.kind in "iub":
+        return values.to_numpy(dtype=float), True
+    if values.dtype.kind == "f":
+        return values.to_numpy(dtype=float), False
+    if values.dtype == object:
+        kind = pd.api.types.infer_dtype(values, skipna=False)
+        if kind in ("integer", "boolean"):
+            return values.to_numpy(dtype=float), True
+        if kind == "floating":
+            return values.to_numpy(dtype=float), False
+    return None
+
+
+def _conditional_cells(values: pd.Series, pos_color: str, neg_color: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Текст и цвет ячеек колонки с условной раскраской: > 0 — pos_color, иначе neg_color."""
+    numeric = _numeric_column(values)
+    if numeric is not None:
+        numbers, integer = numeric
+        missing = np.isnan(numbers)
+        if integer:
+            text = np.char.mod("%d", np.where(missing, 0, numbers)).astype(object)
+        else:
+            text = np.char.mod("%.2f", numbers).astype(object)
+        text[missing] = "0"
+        positive = np.greater(numbers, 0, where=~missing, out=np.zeros(len(numbers), dtype=bool))
+        return text, np.where(positive, pos_color, neg_color)
+
+    def _text(value):
+        if _is_number(value):
+            return f"{value:.2f}" if isinstance(value, float) else f"{int(value)}"
+        if isinstance(value, (int, float)):
+            return "0"  # NaN
+        return str(value) if value != "" else "0"
+
+    text = np.array([_text(v) for v in values], dtype=object)
+    positive = np.array([_is_number(v) and v > 0 for v in values], dtype=bool)
+    return text, np.where(positive, pos_color, neg_color)
+
+
+def _plain_cells(values: pd.Series, deviation: bool) -> np.ndarray:
+    """
+    Текст ячеек колонки без раскраски: отклонения и дробные числа — два знака после точки,
+    целые — без дробной части, пропуски — пустая строка.
+    """
+    numeric = _numeric_column(values)
+    if numeric is not None:
+        numbers, integer = numeric
+        missing = np.isnan(numbers)
+        filled = np.where(missing, 0, numbers)
+        if deviation:
+            two_decimals = np.ones(len(numbers), dtype=bool)
+        elif integer:
+            two_decimals = np.zeros(len(numbers), dtype=bool)
+        else:
+            two_decimals = (filled % 1 != 0) | (np.abs(filled) < 1)
+        text = np.where(
+            two_decimals, np.char.mod("%.2f", filled), np.char.mod("%d", filled)
+        ).astype(object)
+        text[missing] = ""
+        return text
+
+    def _text(value):
+        if _is_number(value) and pd.api.types.is_scalar(value):
+            if deviation or (isinstance(value, float) and (value % 1 != 0 or abs(value) < 1)):
+                return f"{float(value):.2f}"
+            return f"{int(value)}"
+        if pd.api.types.is_scalar(value) and pd.isna(value):
+            return ""
+        return str(value)
+
+    if values.dtype == object:
+        return np.array([_text(v) for v in values], dtype=object)
+    return _cell_text(values).to_numpy(dtype=object)
+
+
 def format_dataframe_as_html(
     df: Optional[pd.DataFrame],
     conditional_cols: Optional[Dict[str, Dict[str, str]]] = None,
     column_colors: Optional[Dict[str, str]] = None,
 ) -> str:
-    """Форматирует DataFrame в HTML-таблицу для отображения в Streamlit."""
+    """
+    Форматирует DataFrame в HTML-таблицу для отображения в Streamlit.
+    Ячейки форматируются, экранируются и раскрашиваются по колонкам целиком.
+    """
     if df is None or df.empty:
         return "<p>Нет данных для отображения.</p>"
-    html_table = (
-        "<table style='width:100%; border-collapse: collapse; background-color: #12385C; color: #ffffff;'>"
-    )
-    html_table += "<thead><tr>"
+    parts = [
+        "<table style='width:100%; border-collapse: collapse; background-color: #12385C; color: #ffffff;'>",
+        "<thead><tr>",
+    ]
     for col in df.columns:
         col_escaped = html_module.escape(str(col))
-        html_table += f"<th style='border: 1px solid #ffffff; padding: 8px; background-color: rgba(18, 56, 92, 0.95);'>{col_escaped}</th>"
-    html_table += "</tr></thead><tbody>"
-    for idx, row in df.iterrows():
-        html_table += "<tr>"
-        for col in df.columns:
-            value = row[col]
-            is_scalar = pd.api.types.is_scalar(value)
-            if conditional_cols and col in conditional_cols:
-                cond_config = conditional_cols[col]
-                pos_color = cond_config.get("positive_color", "#ff4444")
-                neg_color = cond_config.get("negative_color", "#44ff44")
-                if is_scalar and not (isinstance(value, (int, float)) and pd.isna(value)):
-                    if isinstance(value, (int, float)):
-                        color = pos_color if value > 0 else neg_color
-                        formatted_value = f"{value:.2f}" if isinstance(value, float) else f"{int(value)}"
-                    else:
-                        formatted_value = str(value) if value != "" else "0"
-                        color = neg_color
-                else:
-                    formatted_value = "0" if (is_scalar and pd.isna(value)) else str(value)
-                    color = neg_color
-                formatted_value = html_module.escape(str(formatted_value))
-                html_table += f"<td style='border: 1px solid #ffffff; padding: 8px; color: {color}; font-weight: bold;'>{formatted_value}</td>"
-            else:
-                if isinstance(value, (int, float)) and is_scalar and not pd.isna(value):
-                    if "отклонен" in str(col).lower() or "deviation" in str(col).lower():
-                        formatted_value = f"{float(value):.2f}"
-                    elif isinstance(value, float) and (value % 1 != 0 or abs(value) < 1):
-                        formatted_value = f"{value:.2f}"
-                    else:
-                        formatted_value = f"{int(value)}"
-                else:
-                    formatted_value = "" if (is_scalar and pd.isna(value)) else str(value)
-                formatted_value = html_module.escape(str(formatted_value))
-                cell_style = "border: 1px solid #ffffff; padding: 8px;"
-                if column_colors and col in column_colors:
-                    cell_style += f" color: {column_colors[col]};"
-                html_table += f"<td style='{cell_style}'>{formatted_value}</td>"
-        html_table += "</tr>"
-    html_table += "</tbody></table>"
-    return html_table
+        parts.append(
+            f"<th style='border: 1px solid #ffffff; padding: 8px; background-color: rgba(18, 56, 92, 0.95);'>{col_escaped}</th>"
+        )
+    parts.append("</tr></thead><tbody>")
+    pieces = []
+    for i, col in enumerate(df.columns):
+        values = df.iloc[:, i]
+        if conditional_cols and col in conditional_cols:
+            cond_config = conditional_cols[col]
+            text, colors = _conditional_cells(
+                values,
+                cond_config.get("positive_color", "#ff4444"),
+                cond_config.get("negative_color", "#44ff44"),
+            )
+            pieces.extend(
+                [
+                    "<td style='border: 1px solid #ffffff; padding: 8px; color: ",
+                    colors,
+                    "; font-weight: bold;'>",
+                    _escape_column(pd.Series(text)),
+                    "</td>",
+                ]
+            )
+        else:
+            deviation = "отклонен" in str(col).lower() or "deviation" in str(col).lower()
+            cell_style = "border: 1px solid #ffffff; padding: 8px;"
+            if column_colors and col in column_colors:
+                cell_style += f" color: {column_colors[col]};"
+            text = _escape_column(pd.Series(_plain_cells(values, deviation)))
+            pieces.extend([f"<td style='{cell_style}'>", text, "</td>"])
+    parts.append(_join_rows(pieces, len(df)))
+    parts.append("</tbody></table>")
+    return "".join(parts)